@@ -1,14 +1,21 @@
 import streamlit as st
+from utils.instrumentation import begin_rerun, end_rerun, panel_rendimiento
 from sections.inicio            import show_inicio
 from sections.gestor_portfolio  import gestor_portfolio
 from sections.simulador_opciones import simulador_opciones
 from sections.dashboard        import dashboard
 from sections.backtest_darvas  import backtest_darvas
 from sections.top_volume       import top_volume
+from sections.darvas_screener  import darvas_screener
+from sections.income_scanner   import income_scanner
+from sections.alertas          import alertas
 from sections.schwab_demo      import schwab_demo
 
 st.set_page_config(page_title="Agent GrowthIA M&M", layout="wide")
 
+# ——— Instrumentación del rerun (se activa desde el panel lateral) ————————
+begin_rerun(st.session_state.get("perf_enabled"))
+
 # ——— Subida de Excel global ————————————————————————————————
 uploaded_file = st.sidebar.file_uploader(
     "📁 Subí tu archivo Excel (.xlsx) para Portafolio, Simulador y Dashboard",
@@ -26,6 +33,9 @@ seccion = st.sidebar.radio(
         "Dashboard de Desempeño",
         "Backtesting Darvas",
         "Top Volumen",
+        "Screener Darvas",
+        "Escáner de Ingresos",
+        "Alertas",
         "Schwab API Test"
     ]
 )
@@ -49,6 +59,18 @@ elif seccion == "Backtesting Darvas":
 elif seccion == "Top Volumen":
     top_volume()
 
+elif seccion == "Screener Darvas":
+    darvas_screener()
+
+elif seccion == "Escáner de Ingresos":
+    income_scanner()
+
+elif seccion == "Alertas":
+    alertas()
+
 else:  # Schwab API Test
     schwab_demo()
 
+# ——— Panel de rendimiento del rerun actual ——————————————————————
+panel_rendimiento()
+end_rerun()
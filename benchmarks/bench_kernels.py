@@ -0,0 +1,77 @@
+"""
+Benchmark de los kernels de ``utils.kernels`` frente a las llamadas pandas.
+
+Uso (desde la raíz del repo)::
+
+    python -m benchmarks.bench_kernels --sizes 10000 100000 1000000 --symbols 1 50
+
+Para cada tamaño compara el camino pandas original (rolling max/min, WMA con
+``rolling.apply``, ``calc_wae`` más el EMA duplicado de ``wae_trendDown``)
+contra ``darvas_wae_kernels`` y reporta tiempos y la diferencia máxima.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.indicators import calc_mavilimw, calc_wae
+from utils.kernels import darvas_wae_kernels
+from benchmarks.synthetic import synthetic_hlc
+
+
+def pandas_reference(high, low, close, darvas_window=5, sensitivity=150,
+                     fast=20, slow=40) -> dict[str, np.ndarray]:
+    """Camino pandas previo, símbolo por símbolo."""
+    out = {k: [] for k in ("darvas_high", "darvas_low", "mavilimw",
+                           "wae_trendUp", "wae_trendDown", "wae_e1", "wae_deadzone")}
+    for h, lo, c in zip(high, low, close):
+        df = pd.DataFrame({"High": h, "Low": lo, "Close": c})
+        out["darvas_high"].append(df["High"].rolling(darvas_window).max().to_numpy())
+        out["darvas_low"].append(df["Low"].rolling(darvas_window).min().to_numpy())
+        out["mavilimw"].append(calc_mavilimw(df).to_numpy())
+        df = calc_wae(df, sensitivity=sensitivity, fastLength=fast, slowLength=slow)
+        macd = (df["Close"].ewm(span=fast, adjust=False).mean()
+                - df["Close"].ewm(span=slow, adjust=False).mean())
+        t1 = (macd - macd.shift(1)) * sensitivity
+        out["wae_trendDown"].append(np.where(t1 < 0, -t1, 0))
+        for k in ("wae_trendUp", "wae_e1", "wae_deadzone"):
+            out[k].append(df[k].to_numpy())
+    return {k: np.vstack(v) for k, v in out.items()}
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--symbols", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-pandas", action="store_true",
+                        help="No medir el camino pandas (lento en series grandes)")
+    args = parser.parse_args(argv)
+
+    print(f"{'symbols':>8} {'bars':>10} {'pandas s':>10} {'kernels s':>10} {'speedup':>8} {'max|diff|':>10}")
+    for n_sym in args.symbols:
+        for n in args.sizes:
+            h, lo, c = synthetic_hlc(n_sym, n)
+            t_k = _best_of(lambda: darvas_wae_kernels(h, lo, c), args.repeat)
+            if args.skip_pandas:
+                print(f"{n_sym:>8} {n:>10} {'-':>10} {t_k:>10.4f} {'-':>8} {'-':>10}")
+                continue
+            t_p = _best_of(lambda: pandas_reference(h, lo, c), 1)
+            ref = pandas_reference(h, lo, c)
+            got = darvas_wae_kernels(h, lo, c)
+            diff = max(np.nanmax(np.abs(got[k] - ref[k])) for k in ref)
+            print(f"{n_sym:>8} {n:>10} {t_p:>10.4f} {t_k:>10.4f} {t_p / t_k:>7.1f}x {diff:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
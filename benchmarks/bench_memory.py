@@ -0,0 +1,110 @@
+"""
+Pico de memoria del camino de backtest Darvas: DataFrames vs. ``OHLCV``.
+
+Uso (desde la raíz del repo)::
+
+    python -m benchmarks.bench_memory --bars 1000000
+
+"Antes" reproduce el flujo anterior de ``sections.backtest_darvas``
+(``reset_index`` + ``pd.to_numeric`` por columna para la tabla, copia +
+``reset_index`` + ``dropna`` para el cálculo, ~20 columnas agregadas de a una
+y la copia coercionada de la tabla de señales).  "Después" usa el contenedor
+``OHLCV`` con derivados como arrays.  Ambos usan los mismos kernels, así la
+diferencia es sólo de copias intermedias.  Se mide con ``tracemalloc``
+(NumPy reporta allí sus buffers).
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_ohlcv
+from utils.backtest_helpers import darvas_signal_arrays
+from utils.kernels import darvas_wae_kernels
+from utils.ohlcv import OHLCV
+
+_SIGNAL_COLS = [
+    'Date', 'Close', 'darvas_high', 'darvas_low', 'mavilimw',
+    'wae_trendUp', 'wae_e1', 'wae_deadzone', 'wae_trendDown',
+    'buy_signal', 'trend_up', 'wae_filter_buy', 'buy_final',
+    'sell_signal', 'trend_down', 'wae_filter_sell', 'sell_final',
+]
+
+
+def antes(df: pd.DataFrame, window: int = 5):
+    df_hist = df.reset_index().rename(columns={'index': 'Date'})
+    df_hist['Date'] = pd.to_datetime(df_hist['Date']).dt.tz_localize(None)
+    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        df_hist[col] = pd.to_numeric(df_hist[col], errors='coerce')
+
+    df_calc = df.copy().reset_index(drop=False).rename(columns={'index': 'Date'})
+    df_calc['Date'] = pd.to_datetime(df_calc['Date']).dt.tz_localize(None)
+    df_calc = df_calc.dropna(subset=['Close', 'High', 'Low'])
+    k = darvas_wae_kernels(df_calc['High'].to_numpy(), df_calc['Low'].to_numpy(),
+                           df_calc['Close'].to_numpy(), darvas_window=window)
+    df_calc['darvas_high'] = k['darvas_high']
+    df_calc['darvas_low'] = k['darvas_low']
+    df_calc['prev_dh'] = df_calc['darvas_high'].shift(1)
+    df_calc['prev_dl'] = df_calc['darvas_low'].shift(1)
+    df_calc['prev_c'] = df_calc['Close'].shift(1)
+    df_calc['buy_signal'] = (df_calc['Close'] > df_calc['prev_dh']) & (df_calc['prev_c'] <= df_calc['prev_dh'])
+    df_calc['sell_signal'] = (df_calc['Close'] < df_calc['prev_dl']) & (df_calc['prev_c'] >= df_calc['prev_dl'])
+    df_calc['mavilimw'] = k['mavilimw']
+    df_calc['trend_up'] = df_calc['Close'] > df_calc['mavilimw'].shift(2)
+    df_calc['trend_down'] = df_calc['Close'] < df_calc['mavilimw'].shift(2)
+    for col in ('wae_trendUp', 'wae_e1', 'wae_deadzone', 'wae_trendDown'):
+        df_calc[col] = k[col]
+    df_calc['wae_filter_buy'] = (df_calc['wae_trendUp'] > df_calc['wae_e1']) & (df_calc['wae_trendUp'] > df_calc['wae_deadzone'])
+    df_calc['wae_filter_sell'] = (df_calc['wae_trendDown'] > df_calc['wae_e1']) & (df_calc['wae_trendDown'] > df_calc['wae_deadzone'])
+    df_calc['trend_state'] = np.select([df_calc['trend_up'], df_calc['trend_down']], [1, -1], default=0)
+    prev_up = df_calc['trend_up'].shift(1, fill_value=False)
+    prev_down = df_calc['trend_down'].shift(1, fill_value=False)
+    df_calc['buy_final'] = (df_calc['buy_signal'] & df_calc['trend_up'] & df_calc['wae_filter_buy']
+                            & ((~prev_up & ~prev_down) | prev_down))
+    df_calc['sell_final'] = (df_calc['sell_signal'] & df_calc['trend_down'] & df_calc['wae_filter_sell']
+                             & ((~prev_up & ~prev_down) | prev_up))
+    df_signals = df_calc.loc[df_calc['buy_final'] | df_calc['sell_final'], _SIGNAL_COLS].copy()
+    for col in _SIGNAL_COLS[1:9]:
+        df_signals[col] = pd.to_numeric(df_signals[col], errors='coerce')
+    return df_hist, df_calc, df_signals
+
+
+def despues(df: pd.DataFrame, window: int = 5):
+    data = OHLCV.from_frame(df)
+    df_hist = data.to_frame()
+    data = data.dropna()
+    senales = darvas_signal_arrays(data, darvas_window=window)
+    df_calc = data.to_frame(senales)
+    df_signals = df_calc.loc[df_calc['buy_final'] | df_calc['sell_final'], _SIGNAL_COLS]
+    return df_hist, df_calc, df_signals
+
+
+def medir(fn, df) -> tuple[float, float]:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    result = fn(df)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 2**20, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pico de memoria del backtest Darvas")
+    parser.add_argument("--bars", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    df = synthetic_ohlcv(args.bars)
+    entrada_mb = df.memory_usage(deep=True).sum() / 2**20
+    print(f"Historia: {args.bars:,} velas ({entrada_mb:,.1f} MB de entrada)")
+    for nombre, fn in (("antes (DataFrames)", antes), ("después (OHLCV)", despues)):
+        peak, elapsed = medir(fn, df)
+        print(f"  {nombre:<20} pico {peak:>9,.1f} MB  ({peak / entrada_mb:4.1f}x entrada)  {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Apertura y consulta por rango del almacén memmap de históricos intradía.
+
+Uso (desde la raíz del repo)::
+
+    python -m benchmarks.bench_store --years 1 --dir /tmp/growthia_store
+
+Escribe ``years`` años de velas de 1m (24/7) para un símbolo sintético y
+mide el tiempo de abrir el almacén y leer un día, una semana y todo el
+rango, junto con el crecimiento de la memoria residente (RSS) en cada caso.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_ohlcv
+from utils.history_store import HistoryStore
+from utils.ohlcv import OHLCV
+
+
+def _rss_mb() -> float | None:
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del almacén memmap")
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--dir", type=Path, help="Directorio del almacén (por defecto uno temporal)")
+    args = parser.parse_args(argv)
+
+    n = int(args.years * 365 * 24 * 60)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(args.dir or tmp)
+        df = synthetic_ohlcv(n, freq="1min", start="2023-01-01")
+        t0 = time.perf_counter()
+        store.append("SYN", "1m", OHLCV.from_frame(df))
+        print(f"Escritura de {n:,} velas: {time.perf_counter() - t0:.2f} s")
+        del df
+
+        mitad = pd.Timestamp("2023-01-01") + pd.Timedelta(minutes=n // 2)
+        consultas = {
+            "abrir (sin leer)": (None, None, False),
+            "1 día": (mitad, mitad + pd.Timedelta(days=1), True),
+            "1 semana": (mitad, mitad + pd.Timedelta(days=7), True),
+            "todo": (None, None, True),
+        }
+        for nombre, (start, end, tocar) in consultas.items():
+            rss0 = _rss_mb()
+            t0 = time.perf_counter()
+            data = store.read("SYN", "1m", start, end)
+            if tocar:
+                float(np.nanmean(data.close))  # fuerza la lectura de las páginas
+            ms = (time.perf_counter() - t0) * 1000
+            rss1 = _rss_mb()
+            delta = "" if rss0 is None else f"  RSS +{rss1 - rss0:,.1f} MB"
+            print(f"  {nombre:<18} {len(data):>10,} velas  {ms:8.2f} ms{delta}")
+            del data
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Endpoint local que imita la Trader API de Schwab para probar la ingesta de
+transacciones sin credenciales ni red.
+
+Sirve ``/trader/v1/accounts/accountNumbers`` y
+``/trader/v1/accounts/<hash>/transactions`` (filtrado por ``startDate``/
+``endDate`` y con el límite de un año por pedido de la API real) sobre
+años de operaciones sintéticas.  Uso::
+
+    python -m benchmarks.fake_schwab --port 8765 --years 5
+    SCHWAB_BASE_URL=http://127.0.0.1:8765 CLIENT_ID=x CLIENT_SECRET=x REFRESH_TOKEN=x \\
+        streamlit run app.py
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+CUENTA = "12345678"
+HASH = "HASHCUENTA"
+MAX_RANGO = pd.Timedelta(days=366)
+
+
+def transacciones_sinteticas(
+    years: float = 3,
+    symbols=("AAPL", "MSFT", "KO", "SPY"),
+    por_dia: float = 2.0,
+    seed: int = 0,
+    fin: str | None = None,
+) -> list[dict]:
+    """
+    Operaciones ``TRADE`` en el formato de Schwab: compras y ventas al
+    azar sobre precios con paseo log-normal, más algunas PUTs vendidas y
+    recompradas (``OPTION``), con comisión en una pata ``CURRENCY``.
+    """
+    rng = np.random.default_rng(seed)
+    fin = pd.Timestamp(fin or pd.Timestamp.now(tz="UTC").floor("D")).tz_localize(None)
+    dias = pd.bdate_range(fin - pd.Timedelta(days=int(years * 365)), fin - pd.Timedelta(days=1))
+    precios = {s: 100 * np.exp(np.cumsum(rng.normal(0, 0.015, len(dias)))) for s in symbols}
+    txs = []
+    for i, dia in enumerate(dias):
+        for _ in range(rng.poisson(por_dia)):
+            s = symbols[rng.integers(len(symbols))]
+            precio = round(float(precios[s][i]), 2)
+            if rng.random() < 0.1:
+                # PUT OTM del mes siguiente: se vende (abre corto) o se recompra
+                vence = dia + pd.offsets.MonthEnd(1)
+                simbolo = f"{s:<6}{vence:%y%m%d}P{int(round(precio * 0.9 / 5) * 5 * 1000):08d}"
+                s, tipo, precio = simbolo, "OPTION", round(float(rng.uniform(0.5, 3.0)), 2)
+                cant = int(rng.integers(1, 4)) * (-1 if rng.random() < 0.6 else 1)
+                mult = 100
+            else:
+                tipo, mult = "EQUITY", 1
+                cant = int(rng.integers(1, 50)) * (1 if rng.random() < 0.55 else -1)
+            hora = dia + pd.Timedelta(hours=14) + pd.Timedelta(seconds=int(rng.integers(0, 6.5 * 3600)))
+            comision = 0.65 * abs(cant) if tipo == "OPTION" else 0.0
+            costo = -cant * precio * mult
+            txs.append({
+                "activityId": 10_000_000 + len(txs),
+                "time": f"{hora:%Y-%m-%dT%H:%M:%S}+0000",
+                "accountNumber": CUENTA,
+                "type": "TRADE",
+                "status": "VALID",
+                "netAmount": round(costo - comision, 2),
+                "transferItems": [
+                    {"instrument": {"assetType": "CURRENCY", "symbol": "CURRENCY_USD"},
+                     "amount": 0.0, "cost": -comision, "feeType": "COMMISSION"},
+                    {"instrument": {"assetType": tipo, "symbol": s}, "amount": float(abs(cant)),
+                     "cost": round(costo, 2), "price": precio, "positionEffect": "AUTOMATIC"},
+                ],
+            })
+    return txs
+
+
+class FakeSchwab:
+    """Servidor HTTP en un hilo; ``pedidos`` registra los rangos consultados."""
+
+    def __init__(self, transacciones: list[dict], port: int = 0):
+        self.publicar(transacciones)
+        self.pedidos: list[tuple[pd.Timestamp, pd.Timestamp]] = []
+        self.fallar = 0  # cantidad de pedidos de transacciones a responder con 500
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, status: int, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/trader/v1/accounts/accountNumbers":
+                    return self._json(200, [{"accountNumber": CUENTA, "hashValue": HASH}])
+                if url.path == f"/trader/v1/accounts/{HASH}/transactions":
+                    return self._json(*fake.responder(parse_qs(url.query)))
+                return self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                # Acepta cualquier refresh_token; no devuelve uno nuevo para no pisar el guardado
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if urlparse(self.path).path == "/v1/oauth/token":
+                    return self._json(200, {"access_token": "token-falso", "expires_in": 1800})
+                return self._json(404, {"error": "not found"})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._lock = threading.Lock()
+        self._hilo = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def publicar(self, transacciones: list[dict]) -> None:
+        """Reemplaza las transacciones que devuelve el endpoint."""
+        self.transacciones = sorted(transacciones, key=lambda t: t["time"])
+        self._tiempos = pd.to_datetime([t["time"] for t in self.transacciones], utc=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def responder(self, q: dict) -> tuple[int, object]:
+        inicio = pd.Timestamp(q["startDate"][0])
+        fin = pd.Timestamp(q["endDate"][0])
+        with self._lock:
+            self.pedidos.append((inicio, fin))
+            if self.fallar > 0:
+                self.fallar -= 1
+                return 500, {"error": "falla simulada"}
+        if fin - inicio > MAX_RANGO:
+            return 400, {"error": "El rango de fechas no puede superar un año"}
+        i, j = np.searchsorted(self._tiempos, [inicio, fin])
+        return 200, self.transacciones[i:j]
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Trader API de Schwab falsa con transacciones sintéticas")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--por-dia", type=float, default=2.0)
+    args = parser.parse_args()
+    with FakeSchwab(transacciones_sinteticas(args.years, por_dia=args.por_dia), args.port) as fake:
+        print(f"Schwab falso en {fake.url} (cuenta {CUENTA}, hash {HASH}); Ctrl+C para salir")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
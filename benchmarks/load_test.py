@@ -0,0 +1,439 @@
+"""
+Prueba de carga con sesiones concurrentes de la app de Streamlit.
+
+Uso (desde la raíz del repo)::
+
+    python -m benchmarks.load_test --sessions 1 2 4 8 --reruns 10 --out carga.json
+    python -m benchmarks.load_test --out nuevo.json --compare carga.json --threshold 0.25
+    python -m benchmarks.load_test --sessions 4 --scenarios backtest simulador
+
+Cada sesión es un ``AppTest`` propio (estado de sesión independiente) que
+corre una sección en modo headless y repite interacciones del usuario:
+ejecutar el backtest Darvas, cambiar parámetros del screener, mover el
+shift de IV del simulador, escanear ingresos o evaluar alertas.  Las
+sesiones de un nivel corren en hilos del mismo proceso, como las atiende
+``streamlit run``, así compiten por el GIL y comparten ``st.cache_data``.
+
+Todo corre sin red ni credenciales: precios y cadenas salen de fixtures
+sintéticos (``GROWTHIA_DATA_PROVIDER=fixture``), los SQLite de la app van a
+un directorio temporal y Telegram se reemplaza por un backend falso que
+sólo cuenta los envíos.
+
+Por nivel de concurrencia se reporta la latencia de cada rerun (p50, p95,
+p99), el CPU por sesión (tiempo de CPU del hilo del script), la memoria
+(RSS pico y su incremento por sesión) y el throughput en reruns/s; el techo
+es el nivel con mayor throughput.  Antes de medir se corre una pasada de
+calentamiento, así las cifras son de reruns con caché caliente.  Con
+``--compare`` se marca regresión si el p95 de algún nivel o el techo
+empeoran más que ``--threshold`` (el proceso sale con código 1).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SESSIONS = [1, 2, 4, 8]
+TICKERS_EXCEL = ["AAPL", "MSFT", "KO"]
+
+
+@dataclass
+class Escenario:
+    seccion: str  # "modulo:funcion"
+    acciones: list[Callable]  # cada una prepara un rerun del AppTest (se ciclan)
+
+
+def _click(key):
+    return lambda at: at.button(key=key).click()
+
+
+def _ciclar(widget, key, valores, despues=None):
+    # Cambia el widget al siguiente valor en cada llamada (un rerun siempre hace trabajo)
+    estado = {"i": 0}
+
+    def accion(at):
+        estado["i"] += 1
+        getattr(at, widget)(key=key).set_value(valores[estado["i"] % len(valores)])
+        if despues is not None:
+            at.button(key=despues).click()
+        return at
+    return accion
+
+
+def escenarios() -> dict[str, Escenario]:
+    """Escenarios nuevos por sesión (las acciones que ciclan guardan estado)."""
+    return {
+        "backtest": Escenario("sections.backtest_darvas:backtest_darvas", [
+            _click("run_darvas"),
+            _ciclar("slider", "darvas_window", [5, 10, 20], despues="run_darvas"),
+        ]),
+        "screener": Escenario("sections.darvas_screener:darvas_screener", [
+            _ciclar("slider", "screener_darvas_window", [5, 10, 20]),
+        ]),
+        "top_volumen": Escenario("sections.top_volume:top_volume", [lambda at: at]),
+        "simulador": Escenario("sections.simulador_opciones:simulador_opciones", [
+            _ciclar("select_slider", "simu_shift_iv", [-0.1, 0.0, 0.1]),
+            _click("simu_telegram"),
+        ]),
+        "ingresos": Escenario("sections.income_scanner:income_scanner", [
+            _click("ingresos_run"),
+            _ciclar("slider", "ingresos_prob", [50, 60, 70]),
+        ]),
+        "alertas": Escenario("sections.alertas:alertas", [_click("alerta_evaluar")]),
+    }
+
+
+class TelegramFalso:
+    """
+    Reemplaza ``requests.post``: los pedidos a la Bot API de Telegram se
+    cuentan y responden 200; el resto pasa al ``post`` original.
+    """
+
+    status_code = 200
+    text = '{"ok": true}'
+
+    def __init__(self):
+        import requests
+
+        self.envios = 0
+        self._lock = threading.Lock()
+        self._post = requests.post
+
+    def post(self, url, *args, **kwargs):
+        if not str(url).startswith("https://api.telegram.org/"):
+            return self._post(url, *args, **kwargs)
+        with self._lock:
+            self.envios += 1
+        return self
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Sin /proc (macOS): el pico del proceso es lo mejor disponible (en bytes)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**20
+
+
+class _MuestreoRSS:
+    """Pico de RSS muestreado en un hilo mientras corre el bloque."""
+
+    def __init__(self, intervalo: float = 0.05):
+        self.intervalo = intervalo
+        self.pico = 0.0
+        self._fin = threading.Event()
+
+    def _muestrear(self):
+        while not self._fin.wait(self.intervalo):
+            self.pico = max(self.pico, _rss_mb())
+
+    def __enter__(self):
+        self.pico = _rss_mb()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._hilo.join()
+        self.pico = max(self.pico, _rss_mb())
+
+
+def preparar_entorno(raiz: Path, fixtures: Path | None = None) -> Path:
+    """
+    Variables de entorno para correr sin red ni tocar ``data/``.  Hay que
+    llamarla antes de importar ``utils``: las rutas se leen al importar.
+    """
+    raiz.mkdir(parents=True, exist_ok=True)
+    if fixtures is None:
+        fixtures = raiz / "fixtures"
+    os.environ.update({
+        "GROWTHIA_DATA_PROVIDER": "fixture",
+        "GROWTHIA_FIXTURE_DIR": str(fixtures),
+        "GROWTHIA_STORE_DIR": str(raiz / "store"),
+        "GROWTHIA_MATERIALIZED_DIR": str(raiz / "materialized"),
+        "GROWTHIA_SHARED_CACHE": str(raiz / "shared_cache.sqlite"),
+        "GROWTHIA_ALERTAS": str(raiz / "alertas.sqlite"),
+        "GROWTHIA_LEDGER": str(raiz / "ledger.sqlite"),
+    })
+    return fixtures
+
+
+def preparar_datos(fixtures: Path, n_bars: int = 1_500) -> bytes:
+    """Fixtures del universo, lista del S&P 500 y reglas de alerta; devuelve el Excel de tenencias."""
+    from benchmarks.synthetic import escribir_fixtures
+    from utils.alerts import ARCHIVO_ALERTAS, CAMPOS, MotorAlertas, Regla
+    from utils.shared_cache import shared_cache
+    from utils.universe import TTL_SP500, tickers_sp500_local, universo
+
+    if not (fixtures / "history").exists():
+        escribir_fixtures(fixtures, sorted(set(universo())), n_bars)
+    # La lista del S&P 500 ya "descargada": ninguna sesión sale a la red
+    shared_cache().put("universo", "sp500", tickers_sp500_local(), ttl=TTL_SP500)
+
+    motor = MotorAlertas(ARCHIVO_ALERTAS)
+    if not len(motor):
+        rng = np.random.default_rng(0)
+        motor.agregar(
+            Regla(s, campo, direccion, nivel, cooldown=0)
+            for s in tickers_sp500_local()[:20]
+            for campo, nivel in (("precio", float(rng.uniform(80, 120))), ("mavilimw", 0.0), ("volumen_pct", 80.0))
+            for direccion in ("arriba", "abajo")
+            if campo in CAMPOS
+        )
+        motor.guardar()
+
+    buf = io.BytesIO()
+    pd.DataFrame({
+        "Ticker": TICKERS_EXCEL,
+        "Cantidad": [10, 5, 20],
+        "Precio Actual": [100.0, 100.0, 100.0],
+    }).to_excel(buf, sheet_name="Inversiones", index=False)
+    return buf.getvalue()
+
+
+# Script de cada AppTest.  Se escribe una sola vez antes de lanzar las sesiones:
+# ``AppTest.from_function`` reescribe el mismo archivo temporal en cada sesión
+# y una que lo lee a medio escribir corre un script vacío.
+GUION = "from benchmarks.load_test import ejecutar_seccion\nejecutar_seccion()\n"
+
+
+def ejecutar_seccion() -> None:
+    """Corre la sección de la sesión con el Excel de tenencias cargado y anota el CPU del hilo."""
+    import importlib
+
+    import streamlit as st
+
+    modulo, funcion = st.session_state["carga_seccion"].split(":")
+    cpu = st.session_state["carga_cpu"]
+    st.session_state["global_excel"] = io.BytesIO(st.session_state["carga_excel"])
+    t0 = time.thread_time()
+    try:
+        getattr(importlib.import_module(modulo), funcion)()
+    finally:
+        cpu.append(time.thread_time() - t0)
+
+
+def _correr_escenario(guion: Path, escenario: Escenario, excel: bytes, reruns: int, timeout: float) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    cpu: list[float] = []
+    at = AppTest.from_file(str(guion), default_timeout=timeout)
+    at.session_state["carga_seccion"] = escenario.seccion
+    at.session_state["carga_excel"] = excel
+    at.session_state["carga_cpu"] = cpu
+    at.secrets["TELEGRAM_TOKEN"] = "falso"
+    at.secrets["TELEGRAM_CHAT_ID"] = "falso"
+
+    latencias, errores = [], []
+    for i in range(reruns + 1):
+        if i:
+            try:
+                escenario.acciones[(i - 1) % len(escenario.acciones)](at)
+            except KeyError as e:
+                # La sección no dibujó el widget (p. ej. cortó con un st.error)
+                errores.append(f"falta el widget {e}")
+        t0 = time.perf_counter()
+        at.run()
+        # La carga inicial de la sección no cuenta como rerun
+        if i:
+            latencias.append(time.perf_counter() - t0)
+        errores += [str(e.value) for e in at.exception]
+    return {"latencias": latencias, "cpu": sum(cpu[1:]), "errores": errores}
+
+
+def sesion(guion: Path, nombres: list[str], excel: bytes, reruns: int, inicio: int = 0, timeout: float = 300) -> dict:
+    """
+    Una sesión recorre todos los escenarios (empezando por el `inicio`-ésimo,
+    para que las sesiones simultáneas no hagan lo mismo a la vez) y en cada
+    uno repite `reruns` interacciones.  Devuelve latencias y CPU por escenario.
+    """
+    todos = escenarios()
+    orden = nombres[inicio % len(nombres):] + nombres[:inicio % len(nombres)]
+    return {e: _correr_escenario(guion, todos[e], excel, reruns, timeout) for e in orden}
+
+
+def percentiles(valores) -> dict:
+    if not len(valores):
+        return {"p50_s": None, "p95_s": None, "p99_s": None, "max_s": None}
+    p50, p95, p99 = np.percentile(valores, [50, 95, 99])
+    return {"p50_s": float(p50), "p95_s": float(p95), "p99_s": float(p99), "max_s": float(np.max(valores))}
+
+
+def correr_nivel(guion: Path, n: int, nombres: list[str], excel: bytes, reruns: int) -> dict:
+    """`n` sesiones simultáneas, cada una en su hilo."""
+    rss_inicial = _rss_mb()
+    with _MuestreoRSS() as rss, ThreadPoolExecutor(n) as pool:
+        t0 = time.perf_counter()
+        sesiones = list(pool.map(lambda i: sesion(guion, nombres, excel, reruns, inicio=i), range(n)))
+        pared = time.perf_counter() - t0
+
+    latencias = [x for s in sesiones for r in s.values() for x in r["latencias"]]
+    cpu = [sum(r["cpu"] for r in s.values()) for s in sesiones]
+    return {
+        "sessions": n,
+        "reruns": len(latencias),
+        "wall_s": pared,
+        "throughput_rps": len(latencias) / pared if pared > 0 else 0.0,
+        **percentiles(latencias),
+        "cpu_s_por_sesion": float(np.mean(cpu)),
+        "cpu_s_por_rerun": float(sum(cpu) / max(1, len(latencias))),
+        "rss_pico_mb": rss.pico,
+        "rss_mb_por_sesion": max(0.0, rss.pico - rss_inicial) / n,
+        "errores": sorted({err for s in sesiones for r in s.values() for err in r["errores"]}),
+        "por_escenario": {e: percentiles([x for s in sesiones for x in s[e]["latencias"]]) for e in nombres},
+    }
+
+
+def techo(niveles: list[dict]) -> dict:
+    """Throughput máximo y el primer nivel donde sumar sesiones ya no rinde (+10%)."""
+    if not niveles:
+        return {"throughput_rps": 0.0, "sessions": None, "saturacion": None}
+    mejor = max(niveles, key=lambda r: r["throughput_rps"])
+    saturacion = None
+    for prev, r in zip(niveles, niveles[1:]):
+        if r["throughput_rps"] < prev["throughput_rps"] * 1.10:
+            saturacion = prev["sessions"]
+            break
+    return {"throughput_rps": mejor["throughput_rps"], "sessions": mejor["sessions"], "saturacion": saturacion}
+
+
+@contextmanager
+def _sesiones_simultaneas():
+    """
+    ``AppTest`` supone una corrida a la vez: al empezar instala un runtime
+    falso y activa ``global.appTest``, y al terminar los quita.  Con sesiones
+    simultáneas la primera en terminar los quitaría a las demás, así que
+    mientras dura la prueba la opción queda fija y el runtime se conserva.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.testing.v1.util import patch_config_options
+
+    ultimo = []
+
+    def instancia(cls):
+        if cls._instance is not None:
+            ultimo[:] = [cls._instance]
+        if not ultimo:
+            raise RuntimeError("Runtime hasn't been created!")
+        return ultimo[0]
+
+    with patch_config_options({"global.appTest": True}), \
+            mock.patch.object(Runtime, "instance", classmethod(instancia)), \
+            mock.patch.object(Runtime, "exists", classmethod(lambda cls: cls._instance is not None or bool(ultimo))):
+        yield
+
+
+def run_load(sessions, nombres, reruns: int, raiz: Path, fixtures: Path | None = None) -> dict:
+    fixtures = preparar_entorno(raiz, fixtures)
+    from benchmarks.run import _git_commit
+    from utils.instrumentation import silenciar_avisos_sin_runtime
+
+    silenciar_avisos_sin_runtime()
+    excel = preparar_datos(fixtures)
+    guion = raiz / "guion_carga.py"
+    guion.write_text(GUION)
+
+    telegram = TelegramFalso()
+    niveles = []
+    with mock.patch("requests.post", telegram.post), _sesiones_simultaneas():
+        # Calentamiento: una sesión llena las cachés compartidas
+        for e, r in sesion(guion, nombres, excel, reruns=2).items():
+            if r["errores"]:
+                print(f"  calentamiento {e}: {r['errores'][0]}")
+        for n in sessions:
+            r = correr_nivel(guion, n, nombres, excel, reruns)
+            niveles.append(r)
+            print(f"  {n:>3} sesiones  p50 {r['p50_s']:.3f} s  p95 {r['p95_s']:.3f} s  p99 {r['p99_s']:.3f} s  "
+                  f"{r['throughput_rps']:6.1f} reruns/s  CPU {r['cpu_s_por_sesion']:.2f} s/sesión  "
+                  f"RSS {r['rss_pico_mb']:.0f} MB (+{r['rss_mb_por_sesion']:.1f} MB/sesión)"
+                  + (f"  {len(r['errores'])} errores" if r["errores"] else ""))
+
+    t = techo(niveles)
+    print(f"Techo: {t['throughput_rps']:.1f} reruns/s con {t['sessions']} sesiones"
+          + (f" (satura desde {t['saturacion']})" if t["saturacion"] else ""))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "scenarios": nombres,
+            "reruns": reruns,
+            "telegram_envios": telegram.envios,
+        },
+        "results": niveles,
+        "ceiling": t,
+    }
+
+
+def compare(actual: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Niveles cuyo p95 empeoró más que `threshold` y caída del techo de throughput."""
+    previos = {r["sessions"]: r for r in baseline["results"]}
+    regresiones = []
+    for r in actual["results"]:
+        prev = previos.get(r["sessions"])
+        if prev is None or not prev["p95_s"] or r["p95_s"] is None:
+            continue
+        ratio = r["p95_s"] / prev["p95_s"]
+        if ratio > 1 + threshold:
+            regresiones.append({"caso": f"p95 con {r['sessions']} sesiones", "baseline": prev["p95_s"],
+                                "actual": r["p95_s"], "ratio": ratio})
+    previo, ahora = baseline["ceiling"]["throughput_rps"], actual["ceiling"]["throughput_rps"]
+    if previo > 0 and ahora > 0 and previo / ahora > 1 + threshold:
+        regresiones.append({"caso": "techo de throughput (reruns/s)", "baseline": previo,
+                            "actual": ahora, "ratio": previo / ahora})
+    return regresiones
+
+
+def main(argv=None) -> int:
+    nombres = list(escenarios())
+    parser = argparse.ArgumentParser(description="Prueba de carga de sesiones concurrentes de GrowthIA")
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS)
+    parser.add_argument("--scenarios", nargs="+", choices=nombres, default=nombres)
+    parser.add_argument("--reruns", type=int, default=10, help="Interacciones medidas por escenario en cada sesión")
+    parser.add_argument("--fixtures", type=Path, help="Fixtures existentes (por defecto se generan)")
+    parser.add_argument("--workdir", type=Path, help="Directorio de trabajo (por defecto uno temporal)")
+    parser.add_argument("--out", type=Path, help="Archivo JSON de resultados")
+    parser.add_argument("--compare", type=Path, help="JSON previo contra el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Empeoramiento relativo tolerado antes de marcar regresión")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="growthia-carga-") as tmp:
+        actual = run_load(sorted(set(args.sessions)), args.scenarios, args.reruns,
+                          args.workdir or Path(tmp), args.fixtures)
+    if args.out:
+        args.out.write_text(json.dumps(actual, indent=2))
+        print(f"Resultados guardados en {args.out}")
+
+    if args.compare:
+        regresiones = compare(actual, json.loads(args.compare.read_text()), args.threshold)
+        for r in regresiones:
+            print(f"REGRESIÓN {r['caso']}: {r['baseline']:.3f} -> {r['actual']:.3f} ({r['ratio']:.2f}x)")
+        if regresiones:
+            return 1
+        print(f"Sin regresiones por encima de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Suite de benchmarks de indicadores, backtests y screeners.
+
+Uso (desde la raíz del repo)::
+
+    python -m benchmarks.run --out bench.json
+    python -m benchmarks.run --sizes 1000 100000 --filter wae --profile prof/
+    python -m benchmarks.run --out new.json --compare bench.json --threshold 0.15
+
+Cada benchmark corre sobre OHLCV sintético generado localmente para cada
+tamaño pedido (por defecto de 1k a 10M barras).  Los casos cuyo coste crece
+demasiado rápido (p. ej. la WMA con ``rolling.apply``) tienen un tope de
+tamaño por defecto que se ignora con ``--no-cap``.
+
+Los resultados se guardan en JSON; con ``--compare`` se contrastan contra un
+JSON previo y se marca como regresión todo caso cuyo mejor tiempo empeore más
+que ``--threshold`` (el proceso sale con código 1).  Con ``--profile DIR`` se
+vuelca un ``.prof`` de cProfile por benchmark y tamaño, más un resumen en
+texto; el ``.prof`` se puede abrir como flamegraph con ``snakeviz`` o
+``flameprof``.
+"""
+import argparse
+import cProfile
+import io
+import json
+import platform
+import pstats
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import silenciar_avisos_sin_runtime
+
+# Antes de importar los módulos con cachés: avisan al decorar
+silenciar_avisos_sin_runtime()
+
+from benchmarks.synthetic import synthetic_hlc, synthetic_ohlcv
+from utils.alerts import CAMPOS, MotorAlertas, Regla
+from utils.backtest_helpers import compute_darvas_signals, robust_trend_filter
+from utils.data_quality import validar_historia
+from utils.indicators import calc_mavilimw, calc_wae, wma
+from utils.kernels import darvas_wae_kernels
+from utils.options import calcular_delta_call_put, calcular_payoff_call, calcular_payoff_put
+from utils.ohlcv import OHLCV
+from utils.payoff import Pata, superficie_pnl
+from utils.performance import metricas
+from utils.resample import remuestrear
+from utils.screeners import ratio_volumen
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[int], tuple]
+    run: Callable
+    max_size: int | None = None
+
+
+def _setup_ohlcv(n):
+    return (synthetic_ohlcv(n),)
+
+
+def _setup_trend(n):
+    df = synthetic_ohlcv(n)[["Close"]].reset_index(drop=True)
+    df["mavilimw"] = df["Close"].rolling(50).mean()
+    return (df,)
+
+
+def _setup_kernels(n):
+    return synthetic_hlc(1, n)
+
+
+def _setup_options(n):
+    return (np.linspace(50, 150, n),)
+
+
+def _run_payoffs(S):
+    calcular_payoff_call(S, 100, 5)
+    calcular_payoff_put(S, 100, 5)
+
+
+def _setup_delta(n):
+    rng = np.random.default_rng(0)
+    return (rng.uniform(50, 150, n),)
+
+
+def _run_delta(S):
+    for s in S:
+        calcular_delta_call_put(s, 100, 0.25, 0.02, 0.3, "CALL")
+
+
+_DIAS_SCREENER = 60
+
+
+def _setup_screener(n):
+    # `n` barras repartidas en tickers de 60 días, como en top_volume
+    n_tickers = max(1, n // _DIAS_SCREENER)
+    rng = np.random.default_rng(0)
+    vol = rng.lognormal(14, 0.6, (n_tickers, _DIAS_SCREENER))
+    return ([pd.Series(v) for v in vol],)
+
+
+def _run_screener(series):
+    for v in series:
+        ratio_volumen(v, 0.2)
+
+
+def _setup_superficie(n):
+    # `n` valuaciones: cóndor de 4 patas × 90 días × 5 shifts de IV
+    patas = (Pata("PUT", 90, 45, 1, 1.2, 0.30), Pata("PUT", 95, 45, -1, 2.1, 0.28),
+             Pata("CALL", 105, 45, -1, 2.0, 0.25), Pata("CALL", 110, 45, 1, 1.5, 0.24))
+    return patas, 100.0, 0.04, max(2, n // (4 * 90 * 5)), 90
+
+
+_REGLAS = 100_000
+_SIMBOLOS_ALERTAS = 500
+
+
+def _setup_alertas(n):
+    # 100k reglas sobre 500 símbolos; `n` velas intercaladas después de precalentar
+    rng = np.random.default_rng(0)
+    simbolos = np.array([f"S{i:03d}" for i in range(_SIMBOLOS_ALERTAS)])
+    pasos = 100 + -(-n // _SIMBOLOS_ALERTAS)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (pasos, _SIMBOLOS_ALERTAS)), axis=0))
+    barras = pd.DataFrame({
+        "Ticker": np.tile(simbolos, pasos),
+        "Fecha": np.repeat(pd.date_range("2020-01-01", periods=pasos), _SIMBOLOS_ALERTAS),
+        "Close": close.ravel(), "High": close.ravel() * 1.01, "Low": close.ravel() * 0.99,
+        "Volume": rng.lognormal(14, 0.5, close.size),
+    })
+    s = rng.integers(0, _SIMBOLOS_ALERTAS, _REGLAS)
+    campo = np.array(list(CAMPOS))[rng.integers(0, len(CAMPOS), _REGLAS)]
+    nivel = np.select(
+        [campo == "precio", campo == "volumen_pct"],
+        [close[99, s] * rng.uniform(0.8, 1.2, _REGLAS), rng.uniform(50, 99, _REGLAS)],
+        rng.uniform(-5, 5, _REGLAS),
+    )
+    direccion = np.where(rng.random(_REGLAS) < 0.5, "arriba", "abajo")
+    motor = MotorAlertas()
+    motor.agregar(Regla(simbolos[i], c, d, float(x), banda=0.5, cooldown=3600)
+                  for i, c, d, x in zip(s, campo, direccion, nivel))
+    motor.procesar_barras(barras.iloc[:100 * _SIMBOLOS_ALERTAS], disparar=False)
+    return motor, barras.iloc[100 * _SIMBOLOS_ALERTAS:100 * _SIMBOLOS_ALERTAS + n].copy()
+
+
+def _run_alertas(motor, barras):
+    motor.procesar_barras(barras)
+    # Corre las fechas para que la próxima repetición no las descarte por viejas
+    barras["Fecha"] += barras["Fecha"].iloc[-1] - barras["Fecha"].iloc[0] + pd.Timedelta(days=1)
+
+
+_VELAS_SWEEP = 2_520  # 10 años diarios por resultado
+
+
+def _setup_metricas(n):
+    # `n` barras repartidas en resultados de 10 años, como las curvas de un sweep
+    rng = np.random.default_rng(0)
+    r = rng.normal(0.0003, 0.01, (max(1, n // _VELAS_SWEEP), min(n, _VELAS_SWEEP)))
+    r[rng.random(r.shape) < 0.4] = 0.0  # fuera de mercado
+    return r, 252
+
+
+BENCHMARKS = [
+    Benchmark("wma", lambda n: (synthetic_ohlcv(n)["Close"], 20), wma, max_size=1_000_000),
+    Benchmark("calc_mavilimw", _setup_ohlcv, calc_mavilimw, max_size=1_000_000),
+    Benchmark("calc_wae", _setup_ohlcv, lambda df: calc_wae(df.copy())),
+    Benchmark("robust_trend_filter", _setup_trend, robust_trend_filter),
+    Benchmark("darvas_wae_kernels", _setup_kernels, darvas_wae_kernels),
+    Benchmark("darvas_pipeline", _setup_ohlcv, compute_darvas_signals),
+    Benchmark("data_quality", lambda n: (synthetic_ohlcv(n), "SPY", "5m"), validar_historia),
+    Benchmark("option_payoff", _setup_options, _run_payoffs),
+    Benchmark("option_delta", _setup_delta, _run_delta, max_size=100_000),
+    Benchmark("payoff_surface", _setup_superficie, superficie_pnl, max_size=1_000_000),
+    Benchmark("volume_screener", _setup_screener, _run_screener, max_size=1_000_000),
+    Benchmark("alert_engine", _setup_alertas, _run_alertas, max_size=100_000),
+    Benchmark("performance_metrics", _setup_metricas, metricas),
+    Benchmark("resample_1h", lambda n: (OHLCV.from_frame(synthetic_ohlcv(n)), "1h"), remuestrear),
+]
+
+
+def _time(fn, args, repeat: int) -> list[float]:
+    tiempos = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        tiempos.append(time.perf_counter() - t0)
+    return tiempos
+
+
+def _profile(bench: Benchmark, args, size: int, out_dir: Path):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    prof = cProfile.Profile()
+    prof.runcall(bench.run, *args)
+    base = out_dir / f"{bench.name}_{size}"
+    prof.dump_stats(str(base) + ".prof")
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(30)
+    Path(str(base) + ".txt").write_text(buf.getvalue())
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, filtro=None, repeat=3, no_cap=False, profile_dir=None) -> dict:
+    results = []
+    for bench in BENCHMARKS:
+        if filtro and not any(f in bench.name for f in filtro):
+            continue
+        for size in sizes:
+            if not no_cap and bench.max_size is not None and size > bench.max_size:
+                print(f"  {bench.name:<22} {size:>10,}  omitido (tope {bench.max_size:,})")
+                continue
+            args = bench.setup(size)
+            tiempos = _time(bench.run, args, repeat)
+            best = min(tiempos)
+            results.append({
+                "name": bench.name,
+                "size": size,
+                "repeat": repeat,
+                "best_s": best,
+                "mean_s": float(np.mean(tiempos)),
+                "ns_per_bar": best / size * 1e9,
+            })
+            print(f"  {bench.name:<22} {size:>10,}  {best:>10.4f} s  {best / size * 1e9:>9.1f} ns/barra")
+            if profile_dir is not None:
+                _profile(bench, args, size, Path(profile_dir))
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare(actual: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Devuelve los casos cuyo ``best_s`` empeoró más que `threshold` (fracción)."""
+    previos = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regresiones = []
+    for r in actual["results"]:
+        prev = previos.get((r["name"], r["size"]))
+        if prev is None or prev["best_s"] <= 0:
+            continue
+        ratio = r["best_s"] / prev["best_s"]
+        if ratio > 1 + threshold:
+            regresiones.append({**r, "baseline_s": prev["best_s"], "ratio": ratio})
+    return regresiones
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de GrowthIA")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--filter", nargs="+", help="Sólo benchmarks cuyo nombre contenga alguno de estos textos")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-cap", action="store_true", help="Ignorar el tamaño máximo por benchmark")
+    parser.add_argument("--out", type=Path, help="Archivo JSON de resultados")
+    parser.add_argument("--compare", type=Path, help="JSON previo contra el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Empeoramiento relativo tolerado antes de marcar regresión")
+    parser.add_argument("--profile", type=Path, metavar="DIR", help="Volcar cProfile por benchmark en DIR")
+    args = parser.parse_args(argv)
+
+    actual = run_suite(args.sizes, args.filter, args.repeat, args.no_cap, args.profile)
+    if args.out:
+        args.out.write_text(json.dumps(actual, indent=2))
+        print(f"Resultados guardados en {args.out}")
+
+    if args.compare:
+        regresiones = compare(actual, json.loads(args.compare.read_text()), args.threshold)
+        for r in regresiones:
+            print(f"REGRESIÓN {r['name']} [{r['size']:,}]: "
+                  f"{r['baseline_s']:.4f} s -> {r['best_s']:.4f} s ({r['ratio']:.2f}x)")
+        if regresiones:
+            return 1
+        print(f"Sin regresiones por encima de {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
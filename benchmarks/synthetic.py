@@ -0,0 +1,87 @@
+"""Generadores de OHLCV sintético para los benchmarks (sin red)."""
+import numpy as np
+import pandas as pd
+
+
+def synthetic_hlc(n_symbols: int, n_bars: int, seed: int = 0) -> tuple[np.ndarray, ...]:
+    """Arrays ``(symbols, time)`` de High, Low y Close con paseo log-normal."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_symbols, n_bars)), axis=1))
+    high = close * (1 + np.abs(rng.normal(0, 0.005, close.shape)))
+    low = close * (1 - np.abs(rng.normal(0, 0.005, close.shape)))
+    return high, low, close
+
+
+def synthetic_ohlcv(n_bars: int, freq: str = "5min", seed: int = 0,
+                    start: str = "2015-01-01") -> pd.DataFrame:
+    """OHLCV de un símbolo con índice de fechas, como lo devuelve ``cargar_precio_historico``."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_bars)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.005, n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.lognormal(12, 0.5, n_bars).round()
+    idx = pd.date_range(start, periods=n_bars, freq=freq, name="Date")
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=idx,
+    )
+
+
+def synthetic_chain(spot: float = 100.0, dias=(10, 40, 70, 130, 400), seed: int = 0) -> pd.DataFrame:
+    """Cadena de opciones con sonrisa de volatilidad, valuada con Black-Scholes (formato fixture)."""
+    from utils.options import bs_price
+
+    rng = np.random.default_rng(seed)
+    strikes = spot * np.arange(0.5, 1.51, 0.025)
+    partes = []
+    for d in dias:
+        T = d / 365
+        iv = 0.25 + 0.3 * np.log(strikes / spot) ** 2 + 0.05 * np.sqrt(T)
+        for tipo in ("CALL", "PUT"):
+            precio = bs_price(spot, strikes, T, 0.04, iv, tipo)
+            partes.append(pd.DataFrame({
+                "dias": d, "tipo": tipo, "strike": strikes,
+                "bid": (precio * 0.97).round(2), "ask": (precio * 1.03 + 0.01).round(2),
+                "impliedVolatility": iv,
+                "openInterest": rng.integers(0, 5_000, len(strikes)),
+            }))
+    return pd.concat(partes, ignore_index=True)
+
+
+def escribir_fixtures(raiz, symbols, n_bars: int = 1_500, intervals=("1d",), opciones: bool = True):
+    """
+    Juego de fixtures para ``GROWTHIA_DATA_PROVIDER=fixture`` (ver
+    ``utils.providers.fixture_provider``): historia sintética por símbolo e
+    intervalo terminando hoy y, opcionalmente, una cadena de opciones
+    alrededor del último cierre.
+    """
+    from utils.providers.fixture_provider import guardar_cadena, guardar_historia
+
+    freqs = {"1d": "B", "1h": "h", "15m": "15min", "5m": "5min"}
+    for i, symbol in enumerate(symbols):
+        for interval in intervals:
+            df = synthetic_ohlcv(n_bars, freq=freqs.get(interval, "B"), seed=i)
+            fin = pd.Timestamp.today().normalize()
+            df.index = fin - (df.index[-1] - df.index)
+            guardar_historia(raiz, symbol, interval, df)
+        if opciones:
+            guardar_cadena(raiz, symbol, synthetic_chain(float(df["Close"].iloc[-1]), seed=i))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Genera fixtures sintéticos para correr la app sin red")
+    parser.add_argument("raiz", help="Directorio de salida (GROWTHIA_FIXTURE_DIR)")
+    parser.add_argument("--symbols", nargs="+", help="Por defecto, el universo local y SPY")
+    parser.add_argument("--bars", type=int, default=1_500)
+    parser.add_argument("--intervals", nargs="+", default=["1d"])
+    args = parser.parse_args()
+
+    from utils.universe import universo
+
+    symbols = args.symbols or sorted(set(universo()) | {"SPY"})
+    escribir_fixtures(args.raiz, symbols, args.bars, args.intervals)
+    print(f"{len(symbols)} símbolos -> {args.raiz}")
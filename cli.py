@@ -0,0 +1,243 @@
+"""
+Línea de comandos de GrowthIA: los cálculos de la app sin Streamlit.
+
+Uso (desde la raíz del repo)::
+
+    python cli.py backtest --symbols AAPL MSFT --start 2020-01-01 --out backtest.parquet
+    python cli.py sweep --symbols SPY --grid darvas_window=5,10,20 fast_ema=12,20 --out sweep.csv
+    python cli.py screen-volume --percentil 0.2 --dias 60 --out volumen.json
+    python cli.py report --out decisiones.csv
+    python cli.py backtest --config nightly.yaml
+
+Con ``--config`` los argumentos salen de un YAML (las claves son los nombres
+de los argumentos, p. ej. ``symbols``, ``interval``, ``darvas_window`` o
+``grid``); lo que se pase en la línea de comandos tiene prioridad.  El
+formato de salida se deduce de la extensión de ``--out`` (``.parquet``,
+``.csv`` o ``.json``); sin ``--out`` la tabla se imprime por pantalla.
+
+``backtest`` y ``sweep`` reparten los símbolos en un pool de procesos
+(``--workers``, 0 = en el proceso actual) e informan el throughput en
+símbolos por segundo.
+"""
+import argparse
+import itertools
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from utils.instrumentation import silenciar_avisos_sin_runtime
+
+# Antes de importar los módulos con cachés: avisan al decorar
+silenciar_avisos_sin_runtime()
+
+from utils.backtest_helpers import DARVAS_DEFAULTS, compute_darvas_signals, metricas_backtest
+from utils.market_data import cargar_precio_historico, descargar_panel
+from utils.screeners import ratio_volumen
+from utils.universe import tickers_sp500, universo
+
+logger = logging.getLogger("growthia.cli")
+
+# El log de decisiones está en la raíz del repo (ver config.ARCHIVO_LOG); no
+# se importa config porque exige los secretos de Streamlit.
+ARCHIVO_LOG = Path(__file__).resolve().parent / "registro_acciones.csv"
+
+
+# ——— Trabajo por símbolo (se ejecuta en los procesos del pool) ——————————
+
+def backtest_simbolo(symbol: str, interval: str, start: str, end: str, grid: list[dict]) -> list[dict]:
+    """Descarga `symbol` una vez y corre el backtest para cada juego de parámetros de `grid`."""
+    df = cargar_precio_historico(symbol, interval, start, end)
+    if df is None or df.empty:
+        return []
+    filas = []
+    for params in grid:
+        df_calc = compute_darvas_signals(df, **params)
+        if len(df_calc) < 2:
+            continue
+        filas.append({"Ticker": symbol, **params, "velas": len(df_calc),
+                      **metricas_backtest(df_calc, interval, symbol)})
+    return filas
+
+
+def _correr(symbols: list[str], args, grid: list[dict]) -> pd.DataFrame:
+    t0 = time.perf_counter()
+    filas, errores = [], 0
+    if args.workers == 0:
+        for s in symbols:
+            try:
+                filas.extend(backtest_simbolo(s, args.interval, args.start, args.end, grid))
+            except Exception as e:
+                errores += 1
+                logger.warning("%s: error %s", s, e)
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futuros = {
+                pool.submit(backtest_simbolo, s, args.interval, args.start, args.end, grid): s
+                for s in symbols
+            }
+            for fut in as_completed(futuros):
+                try:
+                    filas.extend(fut.result())
+                except Exception as e:
+                    errores += 1
+                    logger.warning("%s: error %s", futuros[fut], e)
+    elapsed = time.perf_counter() - t0
+    logger.info("%d símbolos × %d parámetros en %.1f s (%.1f símbolos/s, %d errores)",
+                len(symbols), len(grid), elapsed, len(symbols) / elapsed if elapsed else 0.0, errores)
+    return pd.DataFrame(filas)
+
+
+# ——— Subcomandos ————————————————————————————————————————————————
+
+def _params(args) -> dict:
+    return {name: getattr(args, name) for name in DARVAS_DEFAULTS}
+
+
+def cmd_backtest(args) -> pd.DataFrame:
+    return _correr(args.symbols or universo(), args, [_params(args)])
+
+
+def _parse_grid(grid) -> list[dict]:
+    """``["darvas_window=5,10", ...]`` o un dict de listas (YAML) -> combinaciones."""
+    if isinstance(grid, dict):
+        valores = {k: v if isinstance(v, list) else [v] for k, v in grid.items()}
+    else:
+        valores = {}
+        for item in grid or []:
+            nombre, _, lista = item.partition("=")
+            valores[nombre] = lista.split(",")
+    for nombre in valores:
+        if nombre not in DARVAS_DEFAULTS:
+            raise SystemExit(f"Parámetro desconocido en --grid: {nombre}")
+    tipos = {k: type(v) for k, v in DARVAS_DEFAULTS.items()}
+    valores = {k: [tipos[k](x) for x in v] for k, v in valores.items()}
+    return [dict(zip(valores, combo)) for combo in itertools.product(*valores.values())]
+
+
+def cmd_sweep(args) -> pd.DataFrame:
+    base = _params(args)
+    grid = [{**base, **combo} for combo in _parse_grid(args.grid)]
+    df = _correr(args.symbols or universo(), args, grid)
+    return df.sort_values(["Ticker", "sharpe"], ascending=[True, False]) if not df.empty else df
+
+
+def cmd_screen_volume(args) -> pd.DataFrame:
+    symbols = args.symbols or tickers_sp500()
+    end = datetime.today()
+    start = end - timedelta(days=args.dias)
+    t0 = time.perf_counter()
+    panel = descargar_panel(symbols, start, end)
+    filas = []
+    for symbol, vol in zip(panel["symbols"], panel["volume"]):
+        resultado = ratio_volumen(pd.Series(vol), args.percentil)
+        if resultado is not None:
+            filas.append({"Ticker": symbol, **resultado})
+    logger.info("%d símbolos en %.1f s", len(symbols), time.perf_counter() - t0)
+    df = pd.DataFrame(filas, columns=["Ticker", "Vol_7d", "Percentil_prev", "Ratio"])
+    return df.sort_values("Ratio", ascending=False).reset_index(drop=True)
+
+
+def cmd_report(args) -> pd.DataFrame:
+    """Resumen del log de decisiones por ticker y acción (lo que muestra el dashboard)."""
+    path = Path(args.log)
+    if not path.exists():
+        raise SystemExit(f"No existe el log de decisiones: {path}")
+    df = pd.read_csv(path)
+    if df.empty:
+        return pd.DataFrame(columns=["Ticker", "Acción Tomada", "Decisiones", "Rentabilidad media", "Última"])
+    df["Fecha"] = pd.to_datetime(df["Fecha"])
+    return (
+        df.groupby(["Ticker", "Acción Tomada"])
+        .agg(**{"Decisiones": ("Fecha", "size"),
+                "Rentabilidad media": ("Rentabilidad %", "mean"),
+                "Última": ("Fecha", "max")})
+        .reset_index()
+    )
+
+
+# ——— Entrada/salida ————————————————————————————————————————————————
+
+def escribir(df: pd.DataFrame, out: Path | None):
+    if out is None:
+        print(df.to_string(index=False))
+        return
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    if out.suffix == ".parquet":
+        df.to_parquet(out, index=False)
+    elif out.suffix == ".csv":
+        df.to_csv(out, index=False)
+    elif out.suffix == ".json":
+        df.to_json(out, orient="records", date_format="iso", indent=2, force_ascii=False)
+    else:
+        raise SystemExit(f"Formato de salida no soportado: {out.suffix} (usar .parquet, .csv o .json)")
+    logger.info("%d filas -> %s", len(df), out)
+
+
+def _leer_config(path: Path) -> dict:
+    try:
+        import yaml
+    except ImportError:
+        raise SystemExit("--config requiere PyYAML (pip install pyyaml)")
+    with open(path, encoding="utf-8") as f:
+        return {k.replace("-", "_"): v for k, v in (yaml.safe_load(f) or {}).items()}
+
+
+def _parser() -> tuple[argparse.ArgumentParser, dict[str, argparse.ArgumentParser]]:
+    comun = argparse.ArgumentParser(add_help=False)
+    comun.add_argument("--config", type=Path, help="YAML con los argumentos")
+    comun.add_argument("--out", type=Path, help="Archivo de salida (.parquet, .csv o .json)")
+    comun.add_argument("--symbols", nargs="+", help="Símbolos (por defecto, el universo completo)")
+
+    mercado = argparse.ArgumentParser(add_help=False)
+    mercado.add_argument("--interval", default="1d")
+    mercado.add_argument("--start", default="2018-01-01")
+    mercado.add_argument("--end", default=pd.Timestamp.today().strftime("%Y-%m-%d"))
+    mercado.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (0 = sin pool)")
+    for name, default in DARVAS_DEFAULTS.items():
+        mercado.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+
+    parser = argparse.ArgumentParser(description="GrowthIA por línea de comandos")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    subparsers = {
+        "backtest": sub.add_parser("backtest", parents=[comun, mercado], help="Backtest Darvas por símbolo"),
+        "sweep": sub.add_parser("sweep", parents=[comun, mercado], help="Barrido de parámetros Darvas"),
+        "screen-volume": sub.add_parser("screen-volume", parents=[comun], help="Screener de volumen (Top Volumen)"),
+        "report": sub.add_parser("report", parents=[comun], help="Resumen del log de decisiones"),
+    }
+    subparsers["sweep"].add_argument("--grid", nargs="+", default=[], help="nombre=v1,v2,... por parámetro")
+    subparsers["screen-volume"].add_argument("--percentil", type=float, default=0.2)
+    subparsers["screen-volume"].add_argument("--dias", type=int, default=60)
+    subparsers["report"].add_argument("--log", type=Path, default=ARCHIVO_LOG)
+    return parser, subparsers
+
+
+COMANDOS = {
+    "backtest": cmd_backtest,
+    "sweep": cmd_sweep,
+    "screen-volume": cmd_screen_volume,
+    "report": cmd_report,
+}
+
+
+def main(argv=None) -> int:
+    parser, subparsers = _parser()
+    args = parser.parse_args(argv)
+    if args.config is not None:
+        # Los valores del YAML pasan a ser defaults: la línea de comandos manda
+        subparsers[args.comando].set_defaults(**_leer_config(args.config))
+        args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    df = COMANDOS[args.comando](args)
+    escribir(df, args.out)
+    return 0 if not df.empty else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
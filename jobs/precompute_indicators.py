@@ -0,0 +1,89 @@
+"""
+Job batch: precalcula MavilimW, WAE, caja Darvas y señales para todo el universo.
+
+Uso (desde la raíz del repo)::
+
+    python -m jobs.precompute_indicators --interval 1d --start 2018-01-01 --workers 8
+    python -m jobs.precompute_indicators --symbols AAPL MSFT --darvas-window 10
+
+Por defecto procesa los símbolos de ``data/sp500_constituents.csv`` más los
+activos predefinidos del backtest, en paralelo en varios procesos.  Escribe
+un Parquet por símbolo y un ``estado.parquet`` con la última vela de cada uno
+en ``utils.materialized`` (versionado y separado por intervalo y hash de
+parámetros).  Las secciones leen esos resultados si existen: el backtest,
+la historia de cálculo de cada símbolo, y el screener Darvas, las señales
+de ``estado.parquet`` sin descargar el universo.
+"""
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from utils.backtest_helpers import DARVAS_DEFAULTS, compute_darvas_signals
+from utils.market_data import cargar_precio_historico
+from utils.materialized import DEFAULT_ROOT, directorio, fila_estado, guardar_estado, guardar_indicadores
+from utils.universe import universo
+
+logger = logging.getLogger(__name__)
+
+
+def procesar_simbolo(symbol: str, interval: str, start: str, end: str, params: dict, root) -> dict | None:
+    """Descarga, calcula y materializa un símbolo; devuelve su fila de estado."""
+    df = cargar_precio_historico(symbol, interval, start, end)
+    if df is None or df.empty:
+        return None
+    df_calc = compute_darvas_signals(df, **params)
+    if df_calc.empty:
+        return None
+    guardar_indicadores(symbol, interval, params, df_calc, root=root)
+    return fila_estado(symbol, df_calc)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Precalcula indicadores Darvas/MavilimW/WAE")
+    parser.add_argument("--symbols", nargs="+", help="Símbolos (por defecto S&P 500 + predefinidos)")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--start", default="2018-01-01")
+    parser.add_argument("--end", default=pd.Timestamp.today().strftime("%Y-%m-%d"))
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo")
+    parser.add_argument("--root", default=DEFAULT_ROOT, help="Directorio de resultados materializados")
+    for name, default in DARVAS_DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    params = {name: getattr(args, name) for name in DARVAS_DEFAULTS}
+    symbols = args.symbols or universo()
+    t0 = time.perf_counter()
+    filas, errores = [], 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futuros = {
+            pool.submit(procesar_simbolo, s, args.interval, args.start, args.end, params, args.root): s
+            for s in symbols
+        }
+        for fut in as_completed(futuros):
+            symbol = futuros[fut]
+            try:
+                fila = fut.result()
+            except Exception as e:
+                errores += 1
+                logger.warning("%s: error %s", symbol, e)
+                continue
+            if fila is not None:
+                filas.append(fila)
+
+    guardar_estado(args.interval, params, sorted(filas, key=lambda f: f["Ticker"]), root=args.root)
+    elapsed = time.perf_counter() - t0
+    logger.info(
+        "%d/%d símbolos materializados en %.1f s (%.1f símbolos/s, %d errores) -> %s",
+        len(filas), len(symbols), elapsed, len(symbols) / elapsed, errores,
+        directorio(args.interval, params, args.root),
+    )
+    return 0 if filas else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
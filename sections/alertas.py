@@ -0,0 +1,98 @@
+# sections/alertas.py
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta
+
+from utils.alerts          import CAMPOS, DIRECCIONES, Regla, motor_alertas, resumen_telegram
+from utils.market_data     import cargar_panel
+from utils.instrumentation import timed
+
+TEMPORALIDADES = ["1d", "1h"]
+
+
+def _reglas_csv(archivo) -> list[Regla]:
+    df = pd.read_csv(archivo)
+    df.columns = df.columns.str.strip().str.lower()
+    faltan = {"simbolo", "campo", "direccion", "nivel"} - set(df.columns)
+    if faltan:
+        raise ValueError(f"Faltan columnas: {', '.join(sorted(faltan))}")
+    return [Regla(**{k: v for k, v in fila.items() if k in Regla._fields and pd.notna(v)})
+            for fila in df.to_dict("records")]
+
+
+def alertas():
+    st.header("🔔 Alertas de precio e indicadores")
+    motor = motor_alertas()
+
+    # 1) Alta de reglas: una por formulario o miles desde CSV
+    with st.expander("➕ Nueva regla", expanded=not len(motor)):
+        with st.form("alerta_nueva"):
+            col1, col2, col3, col4 = st.columns(4)
+            simbolo = col1.text_input("Ticker", key="alerta_simbolo")
+            campo = col2.selectbox("Campo", list(CAMPOS), format_func=CAMPOS.get, key="alerta_campo")
+            direccion = col3.selectbox("Cruza hacia", list(DIRECCIONES), key="alerta_direccion")
+            nivel = col4.number_input("Nivel", value=0.0, key="alerta_nivel")
+            col5, col6, col7, col8 = st.columns(4)
+            banda = col5.number_input("Histéresis (rearma al volver a nivel ∓ banda)", min_value=0.0,
+                                      value=0.0, key="alerta_banda")
+            horas = col6.number_input("Cooldown (horas)", min_value=0.0, value=24.0, key="alerta_cooldown")
+            mensaje = col7.text_input("Mensaje (opcional)", key="alerta_mensaje")
+            intervalo = col8.selectbox("Temporalidad", TEMPORALIDADES, key="alerta_intervalo")
+            if st.form_submit_button("Agregar") and simbolo.strip():
+                motor.agregar([Regla(simbolo, campo, direccion, nivel, banda, horas * 3600, mensaje, intervalo)])
+                st.success(f"Regla agregada para {simbolo.strip().upper()}.")
+        archivo = st.file_uploader("O subí un CSV (simbolo, campo, direccion, nivel[, banda, cooldown, mensaje, intervalo])",
+                                   type=["csv"], key="alerta_csv")
+        if archivo is not None and st.button("Importar reglas", key="alerta_importar"):
+            try:
+                ids = motor.agregar(_reglas_csv(archivo))
+                st.success(f"{len(ids)} reglas importadas.")
+            except Exception as e:
+                st.error(f"No se pudo importar el CSV: {e}")
+
+    # 2) Reglas activas
+    reglas = motor.reglas()
+    st.caption(f"{len(reglas)} reglas activas en {reglas['simbolo'].nunique()} tickers.")
+    if reglas.empty:
+        return
+    with st.expander("📋 Reglas activas"):
+        with timed("st.dataframe", kind="render"):
+            st.dataframe(reglas.head(1000), use_container_width=True, hide_index=True)
+        borrar = st.multiselect("Borrar reglas (id)", reglas["id"].tolist(), key="alerta_borrar")
+        if borrar and st.button("🗑️ Borrar", key="alerta_borrar_btn"):
+            motor.quitar(borrar)
+            st.rerun()
+
+    # 3) Evaluación de las últimas velas
+    col1, col2, col3 = st.columns(3)
+    timeframe = col1.selectbox("Temporalidad", TEMPORALIDADES, key="alerta_tf")
+    velas = col2.slider("Evaluar las últimas N velas", 1, 10, 1, key="alerta_velas",
+                        help="Al evaluar un ticker por primera vez; después disparan todas las velas nuevas.")
+    avisar = col3.checkbox("Enviar por Telegram", value=True, key="alerta_telegram")
+    simbolos = reglas.loc[reglas["intervalo"] == timeframe, "simbolo"].unique()
+    if st.button("🔔 Evaluar alertas", key="alerta_evaluar"):
+        if not len(simbolos):
+            st.info(f"No hay reglas en {timeframe}.")
+            return
+        end = datetime.today()
+        start = end - timedelta(days=365 if timeframe == "1d" else 60)
+        with st.spinner(f"Descargando {len(simbolos)} tickers..."):
+            try:
+                panel = cargar_panel(tuple(sorted(simbolos)), start.strftime("%Y-%m-%d"),
+                                     end.strftime("%Y-%m-%d"), timeframe)
+            except Exception as e:
+                st.error(f"No se pudieron descargar los precios: {e}")
+                return
+        disparos = motor.evaluar_panel(panel, velas=velas, intervalo=timeframe)
+        motor.guardar()
+        if disparos.empty:
+            st.info("Ninguna regla se disparó en las velas nuevas.")
+        else:
+            st.success(f"{len(disparos)} alerta(s) disparada(s).")
+            st.dataframe(disparos, use_container_width=True, hide_index=True)
+            if avisar:
+                from utils.telegram_helpers import send_telegram_message
+                send_telegram_message(resumen_telegram(disparos))
+
+    with st.expander("🕑 Historial de disparos"):
+        st.dataframe(motor.historial(), use_container_width=True, hide_index=True)
@@ -2,23 +2,21 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 
-from utils.market_data import cargar_precio_historico
-from utils.indicators   import calc_mavilimw, calc_wae
+from utils.backtest_helpers import metricas_backtest, retornos_estrategia
+from utils.performance      import factor_anual, sharpe_movil, tabla_mensual, volatilidad_movil
+from utils.instrumentation import timed
+from utils.charting         import grafico_darvas, mostrar_tabla_paginada
+from utils.data_quality     import resumen as resumen_calidad
+from utils.materialized     import leer_indicadores
+from utils.universe         import ACTIVOS_PREDEF
+from utils.pipeline_cache   import pipeline_cache
 
 def backtest_darvas():
     st.header("📦 Backtesting Estrategia Darvas Box")
 
     # 1) Parámetros UI
-    activos_predef = {
-        "BTC/USD":        "BTC-USD",
-        "ETH/USD":        "ETH-USD",
-        "Apple (AAPL)":   "AAPL",
-        "Tesla (TSLA)":   "TSLA",
-        "Amazon (AMZN)":  "AMZN",
-        "S&P500 ETF (SPY)":"SPY"
-    }
+    activos_predef = ACTIVOS_PREDEF
     activo_nombre = st.selectbox("Elige activo para backtesting", list(activos_predef.keys()))
     activo        = activos_predef[activo_nombre]
 
@@ -31,9 +29,6 @@ def backtest_darvas():
         min_value=1, max_value=50, value=5, step=1, key="darvas_window"
     )
 
-    if not st.button("Ejecutar Backtest Darvas", key="run_darvas"):
-        return
-
     # 2) Parámetros fijos
     SENSITIVITY = 150
     FAST_EMA    = 20
@@ -41,104 +36,61 @@ def backtest_darvas():
     CHANNEL_LEN = 20
     BB_MULT     = 2.0
 
-    # 3) Descarga de históricos
-    st.info("Descargando datos históricos...")
-    df = cargar_precio_historico(activo, timeframe, start, end)
-    if df is None or df.empty:
-        st.error("No se encontraron datos para esa configuración.")
-        return
-    st.success(f"Datos descargados: {len(df)} filas")
-
-    # 4) Preparo tabla histórica
-    df_hist = df.reset_index().rename(columns={'index':'Date'})
-    df_hist['Date'] = pd.to_datetime(df_hist['Date']).dt.tz_localize(None)
-
-    # FORZAMOS columnas numéricas (¡esto es lo importante!)
-    numeric_cols_hist = ['Open', 'High', 'Low', 'Close', 'Volume']
-    for col in numeric_cols_hist:
-        if col in df_hist.columns:
-            df_hist[col] = pd.to_numeric(df_hist[col], errors='coerce')
-
-    st.dataframe(
-        df_hist,
-        use_container_width=True,
-        column_config={
-            'Date':   st.column_config.DateColumn('Fecha',format='DD/MM/YYYY'),
-            'Open':   st.column_config.NumberColumn('Apertura'),
-            'High':   st.column_config.NumberColumn('Máximo'),
-            'Low':    st.column_config.NumberColumn('Mínimo'),
-            'Close':  st.column_config.NumberColumn('Cierre'),
-            'Volume': st.column_config.NumberColumn('Volumen')
-        }
-    )
+    params = {
+        "darvas_window": DARVAS_WINDOW,
+        "sensitivity":   SENSITIVITY,
+        "fast_ema":      FAST_EMA,
+        "slow_ema":      SLOW_EMA,
+        "channel_len":   CHANNEL_LEN,
+        "bb_mult":       BB_MULT,
+    }
 
-    # 5) Cálculos Darvas & filtros
-    df_calc = df.copy().reset_index(drop=False).rename(columns={'index':'Date'})
-    df_calc['Date'] = pd.to_datetime(df_calc['Date']).dt.tz_localize(None)
-    df_calc = df_calc.dropna(subset=['Close','High','Low'])
-
-    # Darvas Box
-    df_calc['darvas_high'] = df_calc['High'].rolling(DARVAS_WINDOW).max()
-    df_calc['darvas_low']  = df_calc['Low'].rolling(DARVAS_WINDOW).min()
-    df_calc['prev_dh']     = df_calc['darvas_high'].shift(1)
-    df_calc['prev_dl']     = df_calc['darvas_low'].shift(1)
-    df_calc['prev_c']      = df_calc['Close'].shift(1)
-
-    # Señales Darvas
-    df_calc['buy_signal']  = (df_calc['Close'] > df_calc['prev_dh']) & (df_calc['prev_c'] <= df_calc['prev_dh'])
-    df_calc['sell_signal'] = (df_calc['Close'] < df_calc['prev_dl']) & (df_calc['prev_c'] >= df_calc['prev_dl'])
-
-    # Tendencia MavilimW
-    df_calc['mavilimw']   = calc_mavilimw(df_calc)
-    df_calc['trend_up']   = df_calc['Close'] > df_calc['mavilimw'].shift(2)
-    df_calc['trend_down'] = df_calc['Close'] < df_calc['mavilimw'].shift(2)
-
-    # Fuerza WAE
-    df_calc = calc_wae(
-        df_calc,
-        sensitivity=SENSITIVITY,
-        fastLength=FAST_EMA,
-        slowLength=SLOW_EMA,
-        channelLength=CHANNEL_LEN,
-        mult=BB_MULT
-    )
-    fast = df_calc['Close'].ewm(span=FAST_EMA, adjust=False).mean()
-    slow = df_calc['Close'].ewm(span=SLOW_EMA, adjust=False).mean()
-    macd = fast - slow
-    t1   = (macd - macd.shift(1)) * SENSITIVITY
-    df_calc['wae_trendDown'] = np.where(t1 < 0, -t1, 0)
-
-    df_calc['wae_filter_buy']  = (df_calc['wae_trendUp']   > df_calc['wae_e1']) & (df_calc['wae_trendUp']   > df_calc['wae_deadzone'])
-    df_calc['wae_filter_sell'] = (df_calc['wae_trendDown'] > df_calc['wae_e1']) & (df_calc['wae_trendDown'] > df_calc['wae_deadzone'])
-
-   # Estado de tendencia: 1 alcista, -1 bajista, 0 lateral
-    df_calc['trend_state'] = np.select(
-        [df_calc['trend_up'], df_calc['trend_down']],
-        [1, -1],
-        default=0
-    )
+    # El botón sólo es True en el rerun del click: se recuerda la corrida
+    # para que expandir secciones o paginar tablas no la descarte.  Los
+    # resultados salen de la caché del pipeline, no se recalculan.
+    corrida = (activo, timeframe, str(start), str(end), tuple(params.items()))
+    if st.button("Ejecutar Backtest Darvas", key="run_darvas"):
+        st.session_state["darvas_corrida"] = corrida
+    elif st.session_state.get("darvas_corrida") != corrida:
+        return
 
-     # Señales finales: primera señal tras lateralidad o cambio de tendencia
-    df_calc['buy_final'] = (
-        df_calc['buy_signal']
-        & df_calc['trend_up']
-        & df_calc['wae_filter_buy']
-        & (
-            (~df_calc['trend_up'].shift(1) & ~df_calc['trend_down'].shift(1))
-            | df_calc['trend_down'].shift(1)
-        )
-    )
-    df_calc['sell_final'] = (
-        df_calc['sell_signal']
-        & df_calc['trend_down']
-        & df_calc['wae_filter_sell']
-        & (
-            (~df_calc['trend_up'].shift(1) & ~df_calc['trend_down'].shift(1))
-            | df_calc['trend_up'].shift(1)
+    # 3) Resultados precalculados (jobs.precompute_indicators) si cubren el rango
+    df_calc = leer_indicadores(activo, timeframe, params, start, end)
+    if df_calc is not None:
+        st.success(f"Usando indicadores precalculados: {len(df_calc)} filas "
+                   "(calentados con toda la historia del job)")
+        df_hist = df_calc[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+    else:
+        # Datos, indicadores y señales por capas (utils.pipeline_cache):
+        # cambiar sólo el Darvas Window reutiliza descarga y MavilimW/WAE
+        cache = pipeline_cache()
+        with st.spinner("Descargando datos históricos..."):
+            resultado = cache.backtest(activo, timeframe, start, end, params)
+        if resultado is None:
+            st.error("No se encontraron datos para esa configuración.")
+            return
+        df_hist, df_calc = resultado
+        st.success(f"Datos descargados: {len(df_hist)} filas")
+        if df_hist.attrs.get("calidad"):
+            st.caption(resumen_calidad(df_hist.attrs["calidad"]))
+
+    # 4) Tabla histórica
+    with timed("st.dataframe", kind="render"):
+        mostrar_tabla_paginada(
+            df_hist,
+            key="darvas_hist",
+            use_container_width=True,
+            column_config={
+                'Date':   st.column_config.DateColumn('Fecha',format='DD/MM/YYYY'),
+                'Open':   st.column_config.NumberColumn('Apertura'),
+                'High':   st.column_config.NumberColumn('Máximo'),
+                'Low':    st.column_config.NumberColumn('Mínimo'),
+                'Close':  st.column_config.NumberColumn('Cierre'),
+                'Volume': st.column_config.NumberColumn('Volumen')
+            }
         )
-    )
 
-    # 6) Preparo tabla de señales
+    # 5) Preparo tabla de señales
     cols = [
         'Date','Close','darvas_high','darvas_low','mavilimw',
         'wae_trendUp','wae_e1','wae_deadzone','wae_trendDown',
@@ -147,16 +99,10 @@ def backtest_darvas():
     ]
     df_signals = df_calc.loc[df_calc['buy_final'] | df_calc['sell_final'], cols]
 
-    # FORZAMOS columnas numéricas para las señales
-    numeric_cols_signals = ['Close', 'darvas_high', 'darvas_low', 'mavilimw',
-                            'wae_trendUp', 'wae_e1', 'wae_deadzone', 'wae_trendDown']
-    for col in numeric_cols_signals:
-        if col in df_signals.columns:
-            df_signals[col] = pd.to_numeric(df_signals[col], errors='coerce')
-
     st.success(f"Número de señales detectadas: {len(df_signals)}")
-    st.dataframe(
+    mostrar_tabla_paginada(
         df_signals,
+        key="darvas_signals",
         use_container_width=True,
         column_config={
             'Date':             st.column_config.DateColumn('Fecha',format='DD/MM/YYYY'),
@@ -172,30 +118,12 @@ def backtest_darvas():
         }
     )
 
-    # 7) Gráfico
-    fig, ax = plt.subplots(figsize=(12, 5))
-    ax.plot(df_calc['Date'], df_calc['Close'],      color='black', label='Cierre', zorder=1)
-    ax.plot(df_calc['Date'], df_calc['darvas_high'], linestyle='--', label='Darvas High', zorder=1)
-    ax.plot(df_calc['Date'], df_calc['darvas_low'],  linestyle='--', label='Darvas Low',  zorder=1)
-    ax.plot(df_calc['Date'], df_calc['mavilimw'],    linewidth=2, label='MavilimW',    zorder=2)
-    ax.scatter(
-        df_calc.loc[df_calc['buy_final'],'Date'],
-        df_calc.loc[df_calc['buy_final'],'Close'],
-        marker='^', color='green', s=100, label='Señal Compra', zorder=3
-    )
-    ax.scatter(
-        df_calc.loc[df_calc['sell_final'],'Date'],
-        df_calc.loc[df_calc['sell_final'],'Close'],
-        marker='v', color='red',   s=100, label='Señal Venta',  zorder=3
-    )
-    ax.set_title(f"Darvas Box Backtest – {activo_nombre} [{timeframe}]")
-    ax.set_xlabel("Fecha")
-    ax.set_ylabel("Precio")
-    ax.legend()
-    plt.xticks(rotation=20)
-    st.pyplot(fig)
-
-    # 8) Explicación de señales
+    # 6) Gráfico (reducido al ancho en píxeles y cacheado)
+    png = grafico_darvas(df_calc, f"Darvas Box Backtest – {activo_nombre} [{timeframe}]")
+    with timed("st.image", kind="render"):
+        st.image(png, use_container_width=True)
+
+    # 7) Explicación de señales
     with st.expander("ℹ️ Interpretación de las señales"):
         st.markdown("""  
         - 🔼 **Señal de compra**: se genera cuando el precio cierra por encima de la Darvas High del día anterior, la tendencia (MavilimW) es alcista y la fuerza (WAE) supera el umbral.  
@@ -204,7 +132,7 @@ def backtest_darvas():
         - 📊 **Cantidad de señales**: compras y ventas detectadas en el periodo seleccionado.
         """)
 
-    # 9) Perfil del backtest
+    # 8) Perfil del backtest
     with st.expander("📈 Perfil del Backtest"):
         # calculamos algunos KPIs básicos
         total_ops = len(df_signals)
@@ -218,34 +146,50 @@ def backtest_darvas():
         - ⚙️ **Parámetros**: Darvas Window = {DARVAS_WINDOW}, EMA rápida = {FAST_EMA}, EMA lenta = {SLOW_EMA}
         """)
 
-     # métricas de rentabilidad y riesgo
+     # métricas de rentabilidad y riesgo (anualizadas según temporalidad y activo)
     if len(df_calc) > 1:
-        df_calc["ret"] = df_calc["Close"].pct_change().fillna(0)
-        df_calc["signal"] = np.where(df_calc["buy_final"], 1,
-                                     np.where(df_calc["sell_final"], 0, np.nan))
-        df_calc["position"] = df_calc["signal"].ffill().fillna(0)
-        df_calc["strategy_ret"] = df_calc["position"].shift(1) * df_calc["ret"]
-        df_calc["equity"] = (1 + df_calc["strategy_ret"]).cumprod()
-        total_ret = df_calc["equity"].iloc[-1] - 1
-        max_dd = (df_calc["equity"] / df_calc["equity"].cummax() - 1).min()
-        factor = {"1d": 252, "1h": 24*252, "15m": 96*252, "5m": 288*252}.get(timeframe, 252)
-        sharpe = 0.0
-        if df_calc["strategy_ret"].std() != 0:
-            sharpe = (df_calc["strategy_ret"].mean() / df_calc["strategy_ret"].std()) * np.sqrt(factor)
-
-        col1, col2, col3 = st.columns(3)
+        m = metricas_backtest(df_calc, timeframe, activo)
+
+        col1, col2, col3, col4 = st.columns(4)
         col1.metric(
             "💰 Rentabilidad acumulada",
-            f"{total_ret:.2%}",
+            f"{m['total_ret']:.2%}",
             help="Ganancia total obtenida siguiendo todas las señales"
         )
-        col2.metric(
+        col2.metric("📆 CAGR", f"{m['cagr']:.2%}", help="Rentabilidad anual compuesta")
+        col3.metric(
             "📉 Máx Drawdown",
-            f"{max_dd:.2%}",
+            f"{m['max_dd']:.2%}",
             help="Caída porcentual más pronunciada desde un máximo"
         )
-        col3.metric(
+        col4.metric(
             "⚖️ Sharpe ratio",
-            f"{sharpe:.2f}",
+            f"{m['sharpe']:.2f}",
             help="Rentabilidad ajustada por volatilidad"
         )
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("🛡️ Sortino", f"{m['sortino']:.2f}", help="Rentabilidad ajustada sólo por la volatilidad a la baja")
+        col2.metric("🏔️ Calmar", f"{m['calmar']:.2f}", help="CAGR dividido por el máximo drawdown")
+        col3.metric("🎯 Win rate", f"{m['win_rate']:.0%}", help=f"Operaciones ganadoras de {m['operaciones']}")
+        col4.metric("📊 Profit factor", f"{m['profit_factor']:.2f}", help="Ganancias de las operaciones ganadoras / pérdidas de las perdedoras")
+        recuperacion = "sin recuperar" if np.isnan(m["dd_recuperacion"]) else f"{m['dd_recuperacion']:.0f} velas"
+        st.caption(
+            f"Volatilidad anual {m['volatilidad']:.2%} · exposición {m['exposicion']:.0%} · "
+            f"drawdown más largo {m['dd_duracion']} velas · recuperación del máximo drawdown: {recuperacion}"
+        )
+
+        with st.expander("📈 Sharpe móvil y retornos mensuales"):
+            r, _ = retornos_estrategia(df_calc)
+            fechas = pd.DatetimeIndex(df_calc["Date"]).tz_localize(None)[1:]
+            factor = factor_anual(timeframe, activo)
+            ventana = int(min(max(20, factor // 4), len(r)))
+            st.line_chart(pd.DataFrame({
+                "Sharpe": sharpe_movil(r, ventana, factor),
+                "Volatilidad": volatilidad_movil(r, ventana, factor),
+            }, index=fechas))
+            st.caption(f"Ventana móvil de {ventana} velas.")
+            with timed("st.dataframe", kind="render"):
+                st.dataframe(tabla_mensual(r, fechas).style.format("{:.2%}", na_rep=""), use_container_width=True)
+
+    with st.expander("🗃️ Caché del pipeline"):
+        st.dataframe(pipeline_cache().stats().round(2), hide_index=True, use_container_width=True)
@@ -0,0 +1,121 @@
+# sections/darvas_screener.py
+import streamlit as st
+from datetime import datetime, timedelta
+
+from utils.backtest_helpers import DARVAS_DEFAULTS
+from utils.market_data     import cargar_panel
+from utils.materialized    import VENTANA_VOL, leer_estado
+from utils.screeners       import screen_darvas, senales_desde_estado
+from utils.universe        import TTL_SP500, tickers_sp500_compartido
+from utils.instrumentation import contar_miss, instrumented, timed
+
+
+@instrumented("_cargar_universo_darvas", kind="cache")
+@st.cache_data(show_spinner=False, ttl=TTL_SP500)
+def _cargar_universo() -> list[str]:
+    contar_miss("_cargar_universo_darvas")
+    return tickers_sp500_compartido()
+
+
+def darvas_screener():
+    st.header("🔎 Screener Darvas S&P 500")
+
+    # 1) Parámetros
+    timeframe = st.selectbox("Temporalidad", ["1d", "1h"], key="screener_tf")
+    dias_hist = st.slider(
+        "Días de historial (warm-up de indicadores)",
+        min_value=120, max_value=720, value=365, step=30, key="screener_dias",
+    )
+    darvas_window = st.slider(
+        "Largo del Darvas Box (boxp)",
+        min_value=1, max_value=50, value=5, step=1, key="screener_darvas_window",
+    )
+    velas = st.slider(
+        "Señales de las últimas N velas",
+        min_value=1, max_value=10, value=1, step=1, key="screener_velas",
+    )
+    ventana_vol = st.slider(
+        "Velas para el volumen medio de confirmación",
+        min_value=5, max_value=60, value=20, step=5, key="screener_ventana_vol",
+    )
+
+    # 2) Universo
+    try:
+        tickers = _cargar_universo()
+    except Exception as e:
+        st.error(f"No se pudo obtener la lista del S&P500: {e}")
+        return
+
+    # 3) Estado precalculado (jobs.precompute_indicators) si está al día y
+    #    usa los mismos parámetros: sin descargar el universo
+    end = datetime.today()
+    params = {**DARVAS_DEFAULTS, "darvas_window": darvas_window}
+    estado = leer_estado(timeframe, params, end) if ventana_vol == VENTANA_VOL else None
+    if estado is not None:
+        estado = estado[estado["Ticker"].isin(tickers)]
+        df_senales = senales_desde_estado(estado, velas=velas)
+        fecha = estado["Date"].max().strftime("%Y-%m-%d" if timeframe == "1d" else "%Y-%m-%d %H:%M")
+        st.caption(
+            f"Señales precalculadas al {fecha} · {len(estado)} tickers · "
+            f"{len(df_senales)} con señal en las últimas {velas} vela(s)"
+        )
+    else:
+        # 4) Descarga masiva (cacheada; el intradía sale del almacén local y
+        #    sólo se baja lo que falta; Yahoo lo limita a ~730 días)
+        start = end - timedelta(days=dias_hist)
+        with st.spinner(f"Descargando {len(tickers)} tickers..."):
+            try:
+                panel = cargar_panel(
+                    tuple(tickers), start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), timeframe
+                )
+            except Exception as e:
+                st.error(f"No se pudo descargar información de Yahoo Finance: {e}")
+                return
+        if not panel["symbols"]:
+            st.error(
+                "No se pudo descargar información de Yahoo Finance. "
+                "Verificá tu conexión a internet o intenta más tarde."
+            )
+            return
+
+        # Darvas + MavilimW + WAE sobre todo el universo en una pasada
+        df_senales = screen_darvas(panel, velas=velas, ventana_vol=ventana_vol, **params)
+        st.caption(
+            f"{len(panel['symbols'])} tickers × {len(panel['ts'])} velas · "
+            f"{len(df_senales)} con señal en las últimas {velas} vela(s)"
+        )
+        calidad = panel.get("calidad")
+        if calidad is not None:
+            corregidos = calidad[calidad[["duplicadas", "faltantes", "picos", "incoherentes", "huecos"]].any(axis=1)]
+            with st.expander(f"🩺 Calidad de datos: {len(corregidos)} tickers con correcciones"):
+                st.dataframe(corregidos, use_container_width=True)
+    if df_senales.empty:
+        st.warning("Ningún ticker tiene señales nuevas con estos parámetros.")
+        return
+
+    # 5) Ranking por ruptura y confirmación de volumen
+    column_config = {
+        "Fecha":     st.column_config.DatetimeColumn("Fecha"),
+        "Cierre":    st.column_config.NumberColumn("Cierre", format="%.2f"),
+        "Ruptura %": st.column_config.NumberColumn("Ruptura %", format="%.2f"),
+        "Vol ratio": st.column_config.NumberColumn("Vol ratio", format="%.2f"),
+        "Puntaje":   st.column_config.NumberColumn("Puntaje", format="%.2f"),
+    }
+    compras = df_senales[df_senales["Señal"] == "Compra"].reset_index(drop=True)
+    ventas = df_senales[df_senales["Señal"] == "Venta"].reset_index(drop=True)
+    with timed("st.dataframe", kind="render"):
+        st.subheader(f"🟢 Compras ({len(compras)})")
+        st.dataframe(compras, use_container_width=True, hide_index=True, column_config=column_config)
+        st.subheader(f"🔴 Ventas ({len(ventas)})")
+        st.dataframe(ventas, use_container_width=True, hide_index=True, column_config=column_config)
+
+    st.download_button(
+        "Descargar señales (CSV)",
+        data=df_senales.to_csv(index=False).encode("utf-8"),
+        file_name=f"senales_darvas_{timeframe}_{end:%Y%m%d}.csv",
+        mime="text/csv",
+    )
+
+
+if __name__ == "__main__":
+    darvas_screener()
@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+from utils.attribution import HORIZONTES, atribuir_historial, efectividad_cobertura, valor_por_regla
 from utils.data_io import cargar_historial
 from utils.telegram_helpers import generar_y_enviar_resumen_telegram
 
@@ -41,7 +42,25 @@ def dashboard():
         df_filtrado.set_index('Fecha')['Rentabilidad %']
     )
 
-    # 6) Botón para enviar resumen por Telegram
+    # 6) Resultados posteriores de cada decisión
+    with st.expander("🎯 Atribución: ¿qué reglas agregan valor?"):
+        with st.spinner("Uniendo decisiones con precios posteriores..."):
+            atrib = atribuir_historial(df_filtrado)
+        if atrib["Cierre ref"].isna().all():
+            st.info("Sin precios para las decisiones registradas.")
+        else:
+            tabla = valor_por_regla(atrib)
+            h = st.selectbox("Horizonte", HORIZONTES, index=2, format_func=lambda x: f"{x} días", key="dash_horizonte")
+            st.bar_chart(tabla[f"Valor {h}d"] * 100)
+            st.caption(
+                "Valor (%): P&L del PUT de referencia en 'Comprar PUT', prima ahorrada en "
+                "'Ignorado' y retorno del subyacente en el resto."
+            )
+            st.dataframe(tabla, use_container_width=True)
+            st.markdown("**Efectividad de la cobertura (Comprar PUT)**")
+            st.dataframe(efectividad_cobertura(atrib), use_container_width=True)
+
+    # 7) Botón para enviar resumen por Telegram
     if st.button("📤 Enviar resumen a Telegram", key="dash_resumen"):
         generar_y_enviar_resumen_telegram()
         st.success("📤 Resumen enviado por Telegram!")
@@ -3,8 +3,239 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
 from utils.portfolio        import registrar_accion
 from utils.telegram_helpers import generar_y_enviar_resumen_telegram
+from utils.instrumentation import timed
+from utils.market_data      import cargar_cadena_opciones, cargar_panel
+from utils.hedging          import MONEYNESS, candidatos_put, escenarios_montecarlo, optimizar_coberturas
+from utils.risk             import (
+    BENCHMARK, ESCENARIOS_CRISIS, analizar_riesgo, escenario_historico,
+    posiciones_desde_excel, posiciones_desde_schwab, retornos,
+)
+
+
+def _posiciones_schwab() -> pd.Series:
+    from utils.schwab_api import SchwabAPI
+
+    cuentas = SchwabAPI().get_accounts()
+    sa = cuentas[0].get("securitiesAccount", {}) if cuentas else {}
+    return posiciones_desde_schwab(sa.get("positions"))
+
+
+def _ultimo_valido(close: np.ndarray) -> np.ndarray:
+    valido = ~np.isnan(close)
+    ultimo = close.shape[1] - 1 - np.argmax(valido[:, ::-1], axis=1)
+    return close[np.arange(len(close)), ultimo]
+
+
+def _cadenas(tickers: list[str]) -> dict[str, pd.DataFrame]:
+    def _una(t):
+        try:
+            return t, cargar_cadena_opciones(t)
+        except Exception:
+            return t, None
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        return {t: c for t, c in pool.map(_una, tickers) if c is not None}
+
+
+def rentabilidad_operaciones() -> pd.Series | None:
+    """
+    Sincroniza las operaciones de Schwab con el libro local y muestra el
+    P&L realizado y no realizado por lotes.  Devuelve la rentabilidad de
+    cada posición abierta para reemplazar la del Excel, o ``None``.
+    """
+    from utils.ledger import METODOS, Ledger, sincronizar
+    from utils.schwab_api import SchwabAPI
+
+    col1, col2 = st.columns(2)
+    metodo = col1.radio("Imputación de lotes", METODOS, horizontal=True, key="ledger_metodo")
+    ledger = Ledger()
+    try:
+        api = SchwabAPI()
+        cuenta = st.session_state.get("ledger_cuenta")
+        if cuenta is None:
+            cuenta = st.session_state["ledger_cuenta"] = api.get_account_numbers()[0]["hashValue"]
+        if col2.button("🔄 Sincronizar operaciones", key="ledger_sync"):
+            with st.spinner("Descargando transacciones de Schwab..."):
+                r = sincronizar(api, cuenta, ledger)
+            st.success(f"{r['nuevas']} operaciones nuevas ({r['ventanas']} ventanas desde {r['desde']:%Y-%m-%d}).")
+    except Exception as e:
+        st.error(f"No se pudieron sincronizar las operaciones de Schwab: {e}")
+        return None
+
+    cursor = ledger.cursor(cuenta)
+    if cursor is None:
+        st.info("Todavía no hay operaciones sincronizadas.")
+        return None
+    ledger.actualizar_pnl(cuenta, metodo)
+    # Las opciones (símbolo OCC con espacios) quedan sin precio de mercado
+    acciones = [t for t in ledger.lotes(cuenta, metodo)["simbolo"].unique() if " " not in t]
+    end = datetime.today()
+    try:
+        panel = cargar_panel(tuple(acciones), (end - timedelta(days=10)).strftime("%Y-%m-%d"),
+                             end.strftime("%Y-%m-%d"))
+        precios = pd.Series(_ultimo_valido(panel["close"]), index=panel["symbols"])
+    except Exception:
+        precios = pd.Series(dtype=np.float64)
+    rend = ledger.rendimiento(cuenta, metodo, precios)
+
+    st.caption(f"Sincronizado hasta {cursor:%Y-%m-%d %H:%M} UTC · P&L realizado total "
+               f"${rend['P&L realizado'].sum():,.0f}")
+    st.dataframe(rend.round(2), hide_index=True, use_container_width=True)
+    return rend[rend["Cantidad"] != 0].set_index("Ticker")["Rentabilidad"].dropna()
+
+
+def optimizador_coberturas(usados: list[str], cantidades: np.ndarray, close: np.ndarray,
+                           close_bench: np.ndarray):
+    """Sugiere strike, vencimiento y contratos de PUT por posición (o sobre SPY)."""
+    col1, col2, col3 = st.columns(3)
+    piso = col1.slider("Pérdida máxima tolerada (% del portafolio)", 2, 30, 10, 1, key="cob_piso") / 100
+    horizonte = col2.slider("Horizonte (días)", 7, 120, 30, 1, key="cob_horizonte")
+    proxy = col3.checkbox(f"Cubrir con PUTs de {BENCHMARK}", key="cob_proxy")
+    if not st.button("Optimizar cobertura", key="cob_run"):
+        return
+
+    spots = np.append(_ultimo_valido(close), _ultimo_valido(close_bench[None, :]))
+    valores = np.append(cantidades * spots[:-1], 0.0)
+    ratios = escenarios_montecarlo(retornos(np.vstack([close, close_bench])), horizonte)
+
+    if proxy:
+        # Contratos de SPY equivalentes al valor del portafolio ajustado por beta
+        beta = analizar_riesgo(valores[:-1], retornos(close), retornos(close_bench))["beta"]
+        subyacentes = {len(usados): BENCHMARK}
+        topes = {len(usados): int(np.nan_to_num(beta, nan=1.0) @ valores[:-1] / spots[-1] // 100)}
+    else:
+        subyacentes = dict(enumerate(usados))
+        topes = {i: int(q // 100) for i, q in enumerate(cantidades)}
+
+    with st.spinner("Descargando cadenas de opciones..."):
+        cadenas = _cadenas([t for c, t in subyacentes.items() if topes.get(c, 0) > 0])
+    partes = [
+        candidatos_put(cadenas[t], spots[c], horizonte).assign(col=c, Subyacente=t)
+        for c, t in subyacentes.items() if t in cadenas
+    ]
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        st.warning("No hay PUTs cotizando para cubrir (cada cobertura necesita al menos 100 acciones equivalentes).")
+        return
+
+    res = optimizar_coberturas(
+        valores, ratios, spots, pd.concat(partes, ignore_index=True), topes,
+        piso=piso, horizonte=horizonte,
+    )
+    m1, m2, m3 = st.columns(3)
+    m1.metric("Pérdida sin cobertura", f"${res['perdida_inicial']:,.0f}")
+    m2.metric("Pérdida con cobertura", f"${res['perdida_final']:,.0f}",
+              delta=f"{res['perdida_final'] - res['perdida_inicial']:,.0f}", delta_color="inverse")
+    m3.metric("Prima total", f"${res['prima']:,.0f}")
+    if res["politica"] is not None:
+        st.caption(f"Strikes cerca del {MONEYNESS[res['politica']['m_idx']]:.0%} del precio actual, "
+                   f"vencimiento #{res['politica']['venc_idx'] + 1} posterior al horizonte.")
+    if res["cumple"]:
+        st.success(f"La cobertura deja la pérdida (95%, {horizonte} días) bajo el "
+                   f"objetivo de ${res['objetivo']:,.0f}.")
+    else:
+        st.warning(f"Ni cubriendo todo se llega al objetivo de ${res['objetivo']:,.0f}: "
+                   "se muestra la cobertura que más reduce la pérdida.")
+    st.dataframe(res["coberturas"].round({"Prima": 2, "Costo total": 2}), hide_index=True, use_container_width=True)
+
+
+def riesgo_portafolio(posiciones: pd.Series) -> pd.Series | None:
+    """
+    Panel de riesgo (VaR/CVaR, contribuciones, betas, correlaciones y
+    estrés).  Devuelve la fracción del VaR que aporta cada ticker, o
+    ``None`` si no se pudo calcular.
+    """
+    st.subheader("🛡️ Riesgo del portafolio")
+    col1, col2, col3, col4 = st.columns(4)
+    nivel = col1.selectbox("Confianza", [0.95, 0.99], format_func=lambda x: f"{x:.0%}", key="riesgo_nivel")
+    horizonte = col2.number_input("Horizonte (días)", min_value=1, max_value=20, value=1, key="riesgo_horizonte")
+    mult_vol = col3.slider("Shock de volatilidad (x)", 1.0, 3.0, 1.0, 0.25, key="riesgo_mult_vol")
+    shock_corr = col4.slider("Shock de correlación", 0.0, 1.0, 0.0, 0.1, key="riesgo_shock_corr")
+
+    tickers = sorted(posiciones.index)
+    end = datetime.today()
+    start = end - timedelta(days=730)
+    try:
+        panel = cargar_panel(
+            tuple(dict.fromkeys(tickers + [BENCHMARK])),
+            start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"),
+        )
+    except Exception as e:
+        st.warning(f"No se pudieron descargar precios para el análisis de riesgo: {e}")
+        return None
+
+    fila = {t: i for i, t in enumerate(panel["symbols"])}
+    if BENCHMARK not in fila:
+        st.warning(f"No hay precios de {BENCHMARK} para calcular betas.")
+        return None
+    usados = [t for t in tickers if t in fila]
+    faltan = [t for t in tickers if t not in fila]
+    if faltan:
+        st.caption(f"Sin precios (excluidos del riesgo): {', '.join(faltan)}")
+    if not usados:
+        return None
+
+    idx = [fila[t] for t in usados]
+    close = panel["close"][idx]
+    valores = posiciones[usados].to_numpy(dtype=np.float64) * _ultimo_valido(close)
+    r = analizar_riesgo(
+        valores, retornos(close), retornos(panel["close"][fila[BENCHMARK]]),
+        nivel=nivel, horizonte=int(horizonte), mult_vol=mult_vol, shock_corr=shock_corr,
+    )
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("VaR histórico", f"${r['var_hist']:,.0f}")
+    m2.metric("CVaR histórico", f"${r['cvar_hist']:,.0f}")
+    m3.metric("VaR paramétrico", f"${r['var_param']:,.0f}")
+    m4.metric("CVaR paramétrico", f"${r['cvar_param']:,.0f}")
+    st.caption(f"Valor total: ${valores.sum():,.0f} · horizonte {int(horizonte)} día(s) · "
+               f"{len(usados)} posiciones · desvío ${r['sigma']:,.0f}")
+
+    df_riesgo = pd.DataFrame({
+        "Ticker": usados,
+        "Valor": valores,
+        f"Beta {BENCHMARK}": r["beta"],
+        "Contrib. VaR": r["contrib"],
+        "% VaR": r["contrib_pct"] * 100,
+    }).sort_values("% VaR", ascending=False)
+    st.dataframe(df_riesgo.round(2), hide_index=True, use_container_width=True)
+
+    with st.expander("Matriz de correlación"):
+        st.dataframe(pd.DataFrame(r["corr"], index=usados, columns=usados).round(2))
+
+    with st.expander("Escenarios de estrés históricos"):
+        if st.button("Repetir crisis sobre el portafolio actual", key="riesgo_estres"):
+            filas = []
+            for nombre, (ini, fin) in ESCENARIOS_CRISIS.items():
+                try:
+                    p = cargar_panel(tuple(usados + [BENCHMARK]), ini, fin)
+                except Exception:
+                    continue
+                pos = {t: i for i, t in enumerate(p["symbols"])}
+                if BENCHMARK not in pos:
+                    continue
+                close_esc = np.vstack([
+                    p["close"][pos[t]] if t in pos else np.full(len(p["ts"]), np.nan) for t in usados
+                ])
+                pnl = escenario_historico(valores, close_esc, p["close"][pos[BENCHMARK]], r["beta"])
+                filas.append({"Escenario": nombre, "Desde": ini, "Hasta": fin,
+                              "P&L USD": pnl.sum(), "P&L %": pnl.sum() / valores.sum() * 100})
+            if filas:
+                st.dataframe(pd.DataFrame(filas).round(2), hide_index=True, use_container_width=True)
+            else:
+                st.warning("No se pudieron descargar los precios de los escenarios.")
+
+    with st.expander("🛡️ Optimizar coberturas con PUTs"):
+        optimizador_coberturas(usados, posiciones[usados].to_numpy(dtype=np.float64),
+                               close, panel["close"][fila[BENCHMARK]])
+
+    return pd.Series(r["contrib_pct"], index=usados)
+
 
 def gestor_portfolio():
     st.subheader("📊 Análisis de Posiciones")
@@ -16,28 +247,65 @@ def gestor_portfolio():
         return
 
     # Lectura y limpieza
-    df = pd.read_excel(archivo, sheet_name="Inversiones")
+    with timed("pd.read_excel", kind="io"):
+        df = pd.read_excel(archivo, sheet_name="Inversiones")
     df.columns = df.columns.str.strip()
     if 'Ticker' not in df.columns or 'Cantidad' not in df.columns:
         st.error("El Excel debe tener columnas 'Ticker' y 'Cantidad'.")
         return
     df = df[df['Ticker'].notnull() & df['Cantidad'].notnull()]
 
+    # Rentabilidad: columna del Excel o lotes de las operaciones de Schwab
+    origen = st.radio("Rentabilidad desde", ["Excel", "Operaciones Schwab"], horizontal=True,
+                      key="rentab_origen")
+    if origen == "Operaciones Schwab":
+        with st.expander("📒 Libro de operaciones (P&L por lotes)", expanded=True):
+            rentab_ops = rentabilidad_operaciones()
+        if rentab_ops is not None:
+            tickers = df["Ticker"].astype(str).str.strip()
+            df["Rentabilidad"] = tickers.map(rentab_ops).where(tickers.isin(rentab_ops.index),
+                                                               df.get("Rentabilidad"))
+
     # Show summary table
     st.dataframe(df)
 
+    # Riesgo: posiciones del Excel o de la cuenta Schwab
+    fuente = st.radio("Posiciones para el análisis de riesgo", ["Excel", "Schwab"],
+                      horizontal=True, key="riesgo_fuente")
+    try:
+        posiciones = posiciones_desde_excel(df) if fuente == "Excel" else _posiciones_schwab()
+    except Exception as e:
+        st.error(f"No se pudieron obtener las posiciones: {e}")
+        posiciones = pd.Series(dtype=np.float64)
+    contrib = riesgo_portafolio(posiciones) if len(posiciones) else None
+
+    criterios = ["Contribución al riesgo", "Rentabilidad ≥ 20%"] if contrib is not None else ["Rentabilidad ≥ 20%"]
+    criterio = st.radio("Criterio para recomendar PUT", criterios, horizontal=True, key="criterio_put")
+    if criterio == "Contribución al riesgo":
+        umbral_contrib = st.slider("Cubrir posiciones que aportan al VaR más de", 0.05, 0.5, 0.15, 0.05,
+                                   format="%.2f", key="umbral_contrib")
+
     # Lógica de recomendaciones
     for _, row in df.iterrows():
         ticker = row["Ticker"]
         rentab = row.get("Rentabilidad", np.nan)
+        if criterio == "Contribución al riesgo":
+            aporte = contrib.get(str(ticker).strip(), np.nan)
+            cubrir = pd.notna(aporte) and aporte >= umbral_contrib
+        else:
+            aporte = np.nan
+            cubrir = pd.notna(rentab) and rentab >= 0.2
 
         st.markdown(f"### ▶ {ticker}: " +
-                    (f"{rentab*100:.2f}%" if pd.notna(rentab) else "—"))
+                    (f"{rentab*100:.2f}%" if pd.notna(rentab) else "—") +
+                    (f" · {aporte*100:.1f}% del VaR" if pd.notna(aporte) else ""))
 
-        if pd.isna(rentab):
+        if pd.isna(rentab) and not cubrir:
             st.write("🔍 Revisión: Datos incompletos o mal formateados.")
-        elif rentab >= 0.2:
-            st.write("🔒 Recomendación: Comprar PUT para proteger ganancias.")
+        elif cubrir:
+            motivo = ("concentra riesgo del portafolio" if criterio == "Contribución al riesgo"
+                      else "proteger ganancias")
+            st.write(f"🔒 Recomendación: Comprar PUT ({motivo}).")
             col1, col2 = st.columns(2)
             with col1:
                 if st.button(f"✅ Ejecutar PUT {ticker}", key=f"put_{ticker}"):
@@ -0,0 +1,109 @@
+# sections/income_scanner.py
+import streamlit as st
+import pandas as pd
+
+from utils.income_scanner import DIAS_MAX, ESTRATEGIAS, escanear
+from utils.universe import TTL_SP500, tickers_sp500_compartido
+from utils.instrumentation import contar_miss, instrumented, timed
+
+
+@instrumented("_cargar_universo_ingresos", kind="cache")
+@st.cache_data(show_spinner=False, ttl=TTL_SP500)
+def _cargar_universo() -> list[str]:
+    contar_miss("_cargar_universo_ingresos")
+    return tickers_sp500_compartido()
+
+
+def _tickers_excel() -> list[str]:
+    archivo = st.session_state.get("global_excel")
+    if archivo is None:
+        return []
+    with timed("pd.read_excel", kind="io"):
+        df = pd.read_excel(archivo, sheet_name="Inversiones")
+    df.columns = df.columns.str.strip()
+    return df["Ticker"].dropna().astype(str).str.strip().unique().tolist()
+
+
+def income_scanner():
+    st.header("💰 Escáner de ingresos con opciones")
+    st.caption(
+        "Covered calls (vender CALLs OTM sobre acciones que tenés) y cash-secured puts "
+        "(vender PUTs OTM con el efectivo para comprar), ordenados por rendimiento anualizado, "
+        "probabilidad de terminar OTM y liquidez."
+    )
+
+    # 1) Watchlist
+    fuente = st.radio("Watchlist", ["Tenencias del Excel", "S&P 500"], horizontal=True, key="ingresos_fuente")
+    if fuente == "Tenencias del Excel":
+        tickers = _tickers_excel()
+        if not tickers:
+            st.info("Subí el archivo Excel para escanear tus tenencias, o elegí S&P 500.")
+            return
+    else:
+        try:
+            tickers = _cargar_universo()
+        except Exception as e:
+            st.error(f"No se pudo obtener la lista del S&P500: {e}")
+            return
+
+    # 2) Filtros
+    estrategias = st.multiselect("Estrategias", list(ESTRATEGIAS), default=list(ESTRATEGIAS), key="ingresos_estrategias")
+    col1, col2 = st.columns(2)
+    dias = col1.slider("Días al vencimiento", 1, DIAS_MAX, (7, 60), key="ingresos_dias")
+    otm = col2.slider("Distancia OTM del strike (%)", 0, 40, (2, 15), key="ingresos_otm")
+    col3, col4, col5 = st.columns(3)
+    prob_min = col3.slider("Prob. OTM mínima (%)", 0, 99, 60, key="ingresos_prob")
+    oi_min = col4.number_input("Interés abierto mínimo", 0, 100_000, 10, step=10, key="ingresos_oi")
+    spread_max = col5.slider("Spread máximo (% del mid)", 1, 100, 50, key="ingresos_spread")
+    mejor = st.checkbox("Sólo el mejor contrato por ticker", value=True, key="ingresos_mejor")
+
+    if not estrategias:
+        st.warning("Elegí al menos una estrategia.")
+        return
+
+    # 3) Cadenas (en paralelo y cacheadas) + ranking
+    if not st.button("🔍 Escanear", key="ingresos_run") and not st.session_state.get("ingresos_listo"):
+        st.caption(f"{len(tickers)} tickers en la watchlist.")
+        return
+    st.session_state["ingresos_listo"] = True
+    with st.spinner(f"Bajando cadenas de {len(tickers)} tickers..."):
+        try:
+            ranking = escanear(
+                tickers, estrategias=tuple(estrategias),
+                otm=(otm[0] / 100, otm[1] / 100), dias=dias, prob_otm_min=prob_min / 100,
+                oi_min=int(oi_min), spread_max=spread_max / 100,
+            )
+        except Exception as e:
+            st.error(f"No se pudieron descargar las cadenas de opciones: {e}")
+            return
+    if mejor:
+        ranking = ranking.drop_duplicates(subset=["Ticker", "Estrategia"]).reset_index(drop=True)
+
+    st.caption(f"{len(ranking)} contratos candidatos en {ranking['Ticker'].nunique()} tickers.")
+    if ranking.empty:
+        st.warning("Ningún contrato cumple los filtros.")
+        return
+
+    column_config = {
+        "Vencimiento":   st.column_config.DateColumn("Vencimiento"),
+        "Spot":          st.column_config.NumberColumn("Spot", format="%.2f"),
+        "Strike":        st.column_config.NumberColumn("Strike", format="%.2f"),
+        "OTM %":         st.column_config.NumberColumn("OTM %", format="%.1f"),
+        "Prima":         st.column_config.NumberColumn("Prima", format="%.2f"),
+        "Rend. anual %": st.column_config.NumberColumn("Rend. anual %", format="%.1f"),
+        "Prob. OTM %":   st.column_config.NumberColumn("Prob. OTM %", format="%.1f"),
+        "Spread %":      st.column_config.NumberColumn("Spread %", format="%.1f"),
+        "Puntaje":       st.column_config.NumberColumn("Puntaje", format="%.2f"),
+    }
+    with timed("st.dataframe", kind="render"):
+        for estrategia in estrategias:
+            tabla = ranking[ranking["Estrategia"] == estrategia].drop(columns="Estrategia")
+            st.subheader(f"{estrategia} ({len(tabla)})")
+            st.dataframe(tabla, use_container_width=True, hide_index=True, column_config=column_config)
+
+    st.download_button(
+        "Descargar candidatos (CSV)",
+        data=ranking.to_csv(index=False).encode("utf-8"),
+        file_name="escaner_ingresos.csv",
+        mime="text/csv",
+    )
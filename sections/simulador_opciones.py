@@ -4,14 +4,18 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
-import yfinance as yf
 
-from utils.market_data import cargar_precio_historico
+from utils.market_data import cargar_cadena_opciones
 from utils.options import (
+    bs_price,
     calcular_payoff_call as payoff_call,
     calcular_payoff_put  as payoff_put,
     calcular_delta_call_put as calc_delta
 )
+from utils.vol_surface import cargar_superficie
+from utils.payoff import SHIFTS_IV, Pata, cargar_superficie_pnl, resolucion_grilla
+from utils.charting import ancho_grafico, figura_superficie_pnl
+from utils.instrumentation import timed
 
 def simulador_opciones():
     st.subheader("📈 Simulador de Opciones con Perfil de Riesgo")
@@ -23,7 +27,8 @@ def simulador_opciones():
         return
 
     # Lee el DataFrame
-    df = pd.read_excel(archivo, sheet_name="Inversiones")
+    with timed("pd.read_excel", kind="io"):
+        df = pd.read_excel(archivo, sheet_name="Inversiones")
     df.columns = df.columns.str.strip()
 
     # Selección de ticker
@@ -66,45 +71,53 @@ def simulador_opciones():
     precio_actual = datos["Precio Actual"]
     strike_price = round(precio_actual * (1 + delta_strike / 100), 2)
 
-    ticker_yf = yf.Ticker(selected_ticker)
-    expiraciones = ticker_yf.options
+    with st.spinner("Ajustando superficie de volatilidad..."):
+        try:
+            cadena = cargar_cadena_opciones(selected_ticker)
+        except Exception:
+            cadena = None
     
-    if not expiraciones:
+    if cadena is None or cadena.empty:
         st.warning("⚠️ No se encontraron expiraciones disponibles para este ticker.")
         return
 
-    if expiraciones:
+    if not cadena.empty:
+        expiraciones = cadena["expiry"].drop_duplicates()
         fecha_venc = min(
             expiraciones,
-            key=lambda x: abs((pd.to_datetime(x) - pd.Timestamp.today()).days - dias_a_vencimiento)
+            key=lambda x: abs((x - pd.Timestamp.today()).days - dias_a_vencimiento)
         )
+        T = float(cadena.loc[cadena["expiry"] == fecha_venc, "T"].iloc[0])
+        r = 0.02
 
-        cadena = ticker_yf.option_chain(fecha_venc)
-        tabla_opciones = cadena.calls if tipo_opcion == "CALL" else cadena.puts
-        tabla_opciones = tabla_opciones.dropna(subset=["bid", "ask"])
+        # Volatilidad desde la superficie SVI (suavizada entre strikes y vencimientos)
+        superficie = cargar_superficie(selected_ticker, r)
+        if superficie is not None:
+            sigma = float(superficie.iv(strike_price, T))
+        else:
+            st.caption("Sin superficie de volatilidad para este ticker: se usa 25% anual.")
+            sigma = 0.25
+        premium = float(bs_price(precio_actual, strike_price, T, r, sigma, tipo_opcion))
 
+        tabla_opciones = cadena[(cadena["expiry"] == fecha_venc) & (cadena["tipo"] == tipo_opcion)]
+        tabla_opciones = tabla_opciones.dropna(subset=["bid", "ask"])
         if tabla_opciones.empty:
             st.warning("⚠ No hay opciones válidas para ese strike.")
             return
-        else:
-            fila = tabla_opciones.loc[
-                np.abs(tabla_opciones["strike"] - strike_price).idxmin()
-            ]
-            premium = (fila["bid"] + fila["ask"]) / 2
+
+        fila = tabla_opciones.loc[
+            np.abs(tabla_opciones["strike"] - strike_price).idxmin()
+        ]
 
         st.markdown(f"**Precio actual:** ${precio_actual:.2f}")
         st.markdown(f"**Strike simulado:** ${strike_price}")
+        st.markdown(f"**Volatilidad implícita (superficie):** {sigma*100:.1f}%")
         st.markdown(f"**Prima estimada:** ${premium:.2f}")
-        st.markdown(f"**Vencimiento elegido:** {fecha_venc}")
+        st.caption(f"Referencia de mercado: strike {fila['strike']:.2f}, prima media ${fila['mid']:.2f}")
+        st.markdown(f"**Vencimiento elegido:** {fecha_venc:%Y-%m-%d}")
 
         try:
-            if "delta" in fila and not pd.isna(fila["delta"]):
-                delta = fila["delta"]
-            else:
-                T = dias_a_vencimiento / 365
-                r = 0.02
-                sigma = fila.get("impliedVolatility", 0.25)
-                delta = calc_delta(precio_actual, strike_price, T, r, sigma, tipo_opcion)
+            delta = calc_delta(precio_actual, strike_price, T, r, sigma, tipo_opcion)
 
             if delta is not None:
                 prob = abs(delta) * 100
@@ -139,7 +152,32 @@ def simulador_opciones():
         ax.axvline(break_even, color="green", linestyle="--", label="Break-even")
         ax.set_title(f"{tipo_opcion} - {selected_ticker} ({nivel_riesgo})")
         ax.legend()
-        st.pyplot(fig)
+        with timed("st.pyplot", kind="render"):
+            st.pyplot(fig)
+        # pyplot guarda cada figura hasta cerrarla: sin esto, cada rerun deja una
+        plt.close(fig)
+
+        # Valor de mercado antes del vencimiento: precio × días restantes × IV
+        with st.expander("🗺️ Superficie de P&L antes del vencimiento"):
+            dias_T = T * 365
+            pata = Pata(tipo_opcion, float(strike_price), dias_T, 1.0 if rol == "Comprador" else -1.0, premium, sigma)
+            ancho = ancho_grafico()
+            n_precios, n_dias = resolucion_grilla(ancho, int(round(dias_T)))
+            sup = cargar_superficie_pnl((pata,), float(precio_actual), r, n_precios, n_dias)
+            shift = st.select_slider(
+                "Desplazamiento de la volatilidad implícita",
+                options=list(SHIFTS_IV), value=0.0,
+                format_func=lambda x: f"{x*100:+.0f} pts", key="simu_shift_iv",
+            )
+            fig_sup = figura_superficie_pnl(
+                sup, SHIFTS_IV.index(shift), ancho,
+                f"{tipo_opcion} {rol.lower()} - {selected_ticker} (IV {(sigma + shift)*100:.0f}%)",
+                strike=strike_price,
+            )
+            with timed("st.pyplot", kind="render"):
+                st.pyplot(fig_sup)
+            plt.close(fig_sup)
+            st.caption("La línea negra marca el break-even a cada plazo; la punteada, el strike.")
 
         with st.expander("ℹ️ Interpretación del gráfico"):
             if rol == "Comprador" and tipo_opcion == "CALL":
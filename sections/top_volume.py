@@ -1,11 +1,15 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
-from pathlib import Path
 
+from utils.market_data import cargar_panel
+from utils.screeners import ratio_volumen
+from utils.universe import TTL_SP500, tickers_sp500_compartido
+from utils.instrumentation import contar_miss, instrumented
 
-@st.cache_data(show_spinner=False)
+
+@instrumented("_cargar_tickers_sp500", kind="cache")
+@st.cache_data(show_spinner=False, ttl=TTL_SP500)
 def _cargar_tickers_sp500() -> list[str]:
     """Devuelve la lista de símbolos del S&P 500.
 
@@ -13,18 +17,8 @@ def _cargar_tickers_sp500() -> list[str]:
     local con un subconjunto de tickers para funcionar sin conexión.
     """
 
-    url = "https://datahub.io/core/s-and-p-500-companies/r/constituents.csv"
-    local_file = Path(__file__).resolve().parent.parent / "data" / "sp500_constituents.csv"
-
-    try:
-        df_sp = pd.read_csv(url)
-    except Exception:
-        if local_file.exists():
-            df_sp = pd.read_csv(local_file)
-        else:
-            raise
-
-    return df_sp["Symbol"].tolist()
+    contar_miss("_cargar_tickers_sp500")
+    return tickers_sp500_compartido()
 
 def top_volume():
     st.header("📊  Tickers S&P 500 con Volumen 7d > Percentil (previos)")
@@ -60,63 +54,21 @@ def top_volume():
     end = datetime.today()
     start = end - timedelta(days=dias_hist)
 
-    seleccionables = []
-    resultados = []
-    conteo_descargados = 0
-
-    progreso = st.progress(0.0)
-    for idx, tk in enumerate(tickers):
+    # 4. Una sola descarga masiva (cacheada) vía el proveedor de datos
+    with st.spinner(f"Descargando {len(tickers)} tickers..."):
         try:
-            df = yf.download(
-                tk,
-                start=start.strftime("%Y-%m-%d"),
-                end=end.strftime("%Y-%m-%d"),
-                progress=False,
-            )
-            if df.empty:
-                continue
-
-            # Si el DataFrame tiene MultiIndex en columnas, aplanamos
-            if isinstance(df.columns, pd.MultiIndex):
-                df.columns = ['_'.join(col).strip() if isinstance(col, tuple) else col for col in df.columns.values]
-            # Normaliza nombres de columnas
-            cols_norm = [str(col).strip().lower() for col in df.columns]
-            if "volume" not in cols_norm:
-                continue
-            vol_col_name = df.columns[cols_norm.index("volume")]
-            df["Volume"] = pd.to_numeric(df[vol_col_name], errors="coerce")
-            df = df.dropna(subset=["Volume"])
-            conteo_descargados += 1
-
-            # Cortes flexibles
-            if len(df) < 14:  # Necesitamos al menos 14 días para tener 7+7
-                continue
-
-            # Últimos 7 días hábiles (los más recientes)
-            vol_7d = df["Volume"].iloc[-7:]
-            # Todos los días previos a esos 7 (para percentil)
-            vol_prev = df["Volume"].iloc[:-7]
-
-            if len(vol_prev) < 7 or vol_7d.empty:
-                continue
-
-            percentil = vol_prev.quantile(percentil_sel)
-            media_7d = vol_7d.mean()
-
-            if pd.notna(media_7d) and pd.notna(percentil) and percentil > 0:
-                seleccionables.append(tk)
-                resultados.append({
-                    "Ticker": tk,
-                    "Vol_7d": int(media_7d),
-                    "Percentil_prev": int(percentil),
-                    "Ratio": round(media_7d / percentil, 2) if percentil > 0 else None
-                })
+            panel = cargar_panel(tuple(tickers), start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
         except Exception:
-            continue
+            panel = {"symbols": [], "volume": []}
+    conteo_descargados = len(panel["symbols"])
 
-        progreso.progress((idx + 1) / len(tickers))
-
-    progreso.empty()
+    seleccionables = []
+    resultados = []
+    for tk, vol in zip(panel["symbols"], panel["volume"]):
+        resultado = ratio_volumen(pd.Series(vol), percentil_sel)
+        if resultado is not None:
+            seleccionables.append(tk)
+            resultados.append({"Ticker": tk, **resultado})
 
     if not seleccionables:
         if conteo_descargados == 0:
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_hlc
+from utils.alerts import MotorAlertas, Regla
+from utils.backtest_helpers import darvas_signals_from_kernels
+from utils.kernels import darvas_wae_kernels, mavilimw
+
+
+def _barras(close, high=None, low=None, simbolo="AAA"):
+    return pd.DataFrame({
+        "Ticker": simbolo, "Fecha": pd.date_range("2024-01-01", periods=len(close)),
+        "Close": close, "High": close if high is None else high, "Low": close if low is None else low,
+    })
+
+
+def test_indices_equivalen_a_recorrer_todas_las_reglas():
+    rng = np.random.default_rng(7)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 300)))
+    reglas = [Regla("AAA", "precio", rng.choice(["arriba", "abajo"]), float(rng.uniform(70, 140)),
+                    banda=float(rng.choice([0.0, 2.0])), cooldown=float(rng.choice([0, 5 * 86400])))
+              for _ in range(400)]
+    motor = MotorAlertas()
+    motor.agregar(reglas)
+    disparos = motor.procesar_barras(_barras(close))
+
+    # Referencia: cada vela contra cada regla
+    esperados = []
+    armada, ultimo = [True] * len(reglas), [-np.inf] * len(reglas)
+    for t in range(1, len(close)):
+        for i, r in enumerate(reglas):
+            antes, ahora = close[t - 1], close[t]
+            if r.direccion == "arriba":
+                rearma = antes > r.nivel - r.banda >= ahora
+                cruza = antes <= r.nivel < ahora
+            else:
+                rearma = antes < r.nivel + r.banda <= ahora
+                cruza = antes >= r.nivel > ahora
+            armada[i] |= rearma
+            if cruza and armada[i] and t - ultimo[i] >= r.cooldown / 86400:
+                armada[i], ultimo[i] = False, t
+                esperados.append((i + 1, t))
+    obtenidos = set(zip(disparos["id"], (disparos["Fecha"] - pd.Timestamp("2024-01-01")).dt.days))
+    assert obtenidos == set(esperados) and len(disparos) == len(esperados)
+
+    # Darvas y MavilimW: mismos cruces que los kernels (el primero de cada racha)
+    high, low, close = (a[0] for a in synthetic_hlc(1, 600, seed=2))
+    motor = MotorAlertas()
+    motor.agregar([Regla("BBB", "darvas_techo", "arriba", 0.0), Regla("BBB", "mavilimw", "arriba", 0.0)])
+    d = motor.procesar_barras(_barras(close, high, low, "BBB"))
+    buy = darvas_signals_from_kernels(close, darvas_wae_kernels(high, low, close))["buy_signal"]
+    mav = mavilimw(close)
+    arriba = close > mav
+    dias = lambda m: set(np.flatnonzero(m).tolist())
+    caso = lambda campo: set((d.loc[d["Campo"] == campo, "Fecha"] - pd.Timestamp("2024-01-01")).dt.days)
+    assert caso("darvas_techo") == dias(buy & ~np.r_[False, buy[:-1]])
+    assert caso("mavilimw") == dias(arriba & ~np.r_[True, arriba[:-1]] & ~np.isnan(np.r_[np.nan, mav[:-1]]))
+
+
+def test_estado_de_disparo_persiste_entre_reinicios(tmp_path):
+    ruta = tmp_path / "alertas.sqlite"
+    motor = MotorAlertas(ruta)
+    with pytest.raises(ValueError):
+        motor.agregar([Regla("AAA", "rsi", "arriba", 70)])
+    motor.agregar([Regla("aaa", "precio", "arriba", 101, banda=1, mensaje="AAA sobre 101"),
+                   Regla("AAA", "precio", "abajo", 99)])
+    close = np.array([100, 102, 100.5, 102, 99.5, 102, 98.0])
+
+    assert motor.procesar_barras(_barras(close[:3]))["id"].tolist() == [1]
+    assert motor.guardar() == 1
+
+    # Tras reiniciar la regla sigue desarmada: volver a 102 sin bajar de 100 no dispara
+    motor = MotorAlertas(ruta)
+    assert motor.reglas().set_index("id").loc[1, "armada"] == False  # noqa: E712
+    motor.procesar_barras(_barras(close[:3]), disparar=False)
+    d = motor.procesar_barras(_barras(close))
+    assert list(zip(d["id"], d["Fecha"].dt.day)) == [(1, 6), (2, 7)]
+    motor.guardar()
+    assert MotorAlertas(ruta).historial()["id"].tolist() == [2, 1, 1]
+
+    motor.quitar([2])
+    assert MotorAlertas(ruta).reglas()["id"].tolist() == [1]
+
+
+def test_motor_sin_reglas_no_dispara():
+    motor = MotorAlertas()
+    assert motor.procesar("AAA", "2024-01-01", 10.0).empty
+    assert motor.procesar_barras(_barras(np.array([10.0, 11.0, 12.0]))).empty
+    panel = {"symbols": ["AAA"], "ts": pd.date_range("2024-02-01", periods=3).as_unit("ns").asi8,
+             **{f: np.array([[10.0, 11.0, 12.0]]) for f in ("open", "high", "low", "close", "volume")}}
+    assert motor.evaluar_panel(panel).empty and len(motor) == 0
+
+
+def test_temporalidades_con_buffers_y_reglas_separados(tmp_path):
+    def _panel(fechas, close):
+        return {"symbols": ["AAA"], "ts": pd.DatetimeIndex(fechas).as_unit("ns").asi8,
+                **{f: np.array([close], dtype=float) for f in ("open", "high", "low", "close", "volume")}}
+
+    motor = MotorAlertas(tmp_path / "alertas.sqlite")
+    motor.agregar([Regla("AAA", "precio", "arriba", 105), Regla("AAA", "precio", "arriba", 105, intervalo="1h")])
+    dias = pd.date_range("2024-03-01", periods=5)
+    assert motor.evaluar_panel(_panel(dias[:4], [100, 101, 102, 103])).empty
+
+    # Las velas de 1h (más nuevas que la última diaria) sólo tocan las reglas de 1h...
+    horas = pd.date_range("2024-03-05 09:30", periods=4, freq="h")
+    d = motor.evaluar_panel(_panel(horas, [103, 104, 106, 107]), velas=4, intervalo="1h")
+    assert d["id"].tolist() == [2]
+    # ...y no esconden la vela diaria siguiente, anterior a ellas
+    d = motor.evaluar_panel(_panel(dias, [100, 101, 102, 103, 106]))
+    assert list(zip(d["id"], d["Fecha"])) == [(1, dias[-1])]
+    assert MotorAlertas(tmp_path / "alertas.sqlite").reglas()["intervalo"].tolist() == ["1d", "1h"]
+
+
+def test_evaluar_panel_dispara_en_todas_las_velas_nuevas():
+    def _panel(n, close):
+        return {"symbols": ["AAA"], "ts": pd.date_range("2024-03-01", periods=n).as_unit("ns").asi8,
+                **{f: np.array([close[:n]], dtype=float) for f in ("open", "high", "low", "close", "volume")}}
+
+    close = [100, 101, 102, 103, 106, 103, 104, 107, 108]
+    motor = MotorAlertas()
+    motor.agregar([Regla("AAA", "precio", "arriba", 105, banda=2)])
+    # Primera vez: lo anterior a la última vela sólo precalienta (el cruce del día 5 no dispara)
+    assert motor.evaluar_panel(_panel(6, close)).empty
+    # La página no se abrió durante 3 velas: el cruce del día 8 dispara aunque no sea la última
+    d = motor.evaluar_panel(_panel(9, close))
+    assert d["Fecha"].dt.day.tolist() == [8]
+    assert motor.evaluar_panel(_panel(9, close)).empty
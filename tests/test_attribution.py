@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from utils.attribution import atribuir_decisiones, efectividad_cobertura, valor_por_regla
+
+
+def _panel():
+    ts = pd.bdate_range("2024-01-01", periods=100).as_unit("ns")
+    # Zigzag para que la volatilidad realizada (y la prima) no sea nula
+    zigzag = 1 + 0.01 * (-1) ** np.arange(100)
+    sube = 100 * 1.01 ** np.arange(100) * zigzag
+    cae = 100 * 0.99 ** np.arange(100) * zigzag
+    cae[30] = np.nan  # hueco: se usa el último cierre
+    return {"symbols": ["UP", "DOWN"], "ts": ts.asi8, "close": np.vstack([sube, cae])}
+
+
+def test_retornos_forward_usan_el_ultimo_cierre_conocido():
+    decisiones = pd.DataFrame({
+        "Fecha": ["2024-01-10 10:00:00", "2024-01-10 17:00:00", "2024-05-10 10:00:00", "2024-01-10 10:00:00"],
+        "Ticker": ["UP", "UP", "UP", "XXX"],
+        "Acción Tomada": ["Mantener"] * 4,
+    })
+    panel = _panel()
+    up = panel["close"][0]
+    out = atribuir_decisiones(decisiones, panel)
+    # A las 10:00 todavía no cerró el 10/01: la referencia es el cierre del 09/01 (t=6)
+    assert out["Cierre ref"].iloc[0] == up[6]
+    assert out["Cierre ref"].iloc[1] == up[7]
+    np.testing.assert_allclose(out["Ret 5d"].iloc[:2], [up[11] / up[6] - 1, up[12] / up[7] - 1])
+    # Horizonte que aún no pasó y ticker sin precios -> NaN
+    assert np.isnan(out["Ret 60d"].iloc[2]) and not np.isnan(out["Ret 1d"].iloc[2])
+    assert out.iloc[3].drop(["Fecha", "Ticker", "Acción Tomada"]).isna().all()
+
+
+def test_cobertura_suma_en_caidas_y_cuesta_en_subas():
+    n = 40
+    fechas = pd.bdate_range("2024-02-01", periods=n).strftime("%Y-%m-%d 12:00:00")
+    decisiones = pd.DataFrame({
+        "Fecha": np.tile(fechas, 2),
+        "Ticker": ["DOWN"] * n + ["UP"] * n,
+        "Acción Tomada": ["Comprar PUT"] * n + ["Ignorado"] * n,
+    })
+    out = atribuir_decisiones(decisiones, _panel())
+    assert (out.loc[out["Ticker"] == "DOWN", "Cubierto 20d"] > out.loc[out["Ticker"] == "DOWN", "Ret 20d"]).all()
+    tabla = valor_por_regla(out)
+    # Cubrir la caída sumó y no cubrir la suba ahorró la prima
+    assert tabla.loc["Comprar PUT", "Valor 20d"] > 0
+    assert tabla.loc["Ignorado", "Valor 20d"] > 0
+    assert tabla.loc["Comprar PUT", "Aciertos 20d"] == 0
+    assert tabla["Decisiones"].tolist() == [n, n]
+    ef = efectividad_cobertura(out).set_index("Horizonte")
+    assert 0 < ef.loc["20d", "Pérdida compensada"] <= 1
@@ -11,3 +11,21 @@ def test_robust_trend_filter_initial_trend():
     expected = pd.Series([False, False, True, True, True])
     result = robust_trend_filter(df)
     assert_series_equal(result, expected)
+
+
+def test_compute_darvas_signals_on_datetime_index():
+    import numpy as np
+    from utils.backtest_helpers import compute_darvas_signals
+
+    rng = np.random.default_rng(1)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 300)))
+    idx = pd.date_range("2024-01-01", periods=300, freq="h", name="Datetime")
+    df = pd.DataFrame({
+        'Open': close, 'High': close * 1.01, 'Low': close * 0.99,
+        'Close': close, 'Volume': 1000.0,
+    }, index=idx)
+    result = compute_darvas_signals(df, darvas_window=5)
+    assert list(result['Date']) == list(idx)
+    assert_series_equal(result['darvas_high'], result['High'].rolling(5).max(), check_names=False)
+    assert result['buy_final'].dtype == bool
+    assert not (result['buy_final'] & result['sell_final']).any()
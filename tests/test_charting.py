@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+from utils.charting import downsample_indices, lttb_indices, minmax_indices
+
+
+def test_minmax_indices_keeps_extremes():
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=10_000)
+    idx = minmax_indices(y, 100)
+    assert len(idx) <= 202
+    assert y.argmax() in idx and y.argmin() in idx
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+
+
+def test_lttb_and_signals_are_kept():
+    n = 5_000
+    df = pd.DataFrame({"Close": np.sin(np.linspace(0, 20, n))})
+    keep = np.zeros(n, dtype=bool)
+    keep[[17, 2500, 4999]] = True
+    idx = lttb_indices(np.arange(n), df["Close"].to_numpy(), 300)
+    assert len(idx) == 300 and np.all(np.diff(idx) > 0)
+    out = downsample_indices(df, ["Close"], 150, keep=keep, method="lttb")
+    assert set(np.flatnonzero(keep)) <= set(out)
@@ -0,0 +1,31 @@
+import pandas as pd
+
+import cli
+from benchmarks.synthetic import synthetic_ohlcv
+
+
+def test_parse_grid_lista_y_yaml():
+    grid = cli._parse_grid(["darvas_window=5,10", "bb_mult=1.5,2"])
+    assert len(grid) == 4
+    assert {"darvas_window": 10, "bb_mult": 1.5} in grid
+    assert cli._parse_grid({"fast_ema": [12, 20], "slow_ema": 40}) == [
+        {"fast_ema": 12, "slow_ema": 40}, {"fast_ema": 20, "slow_ema": 40},
+    ]
+
+
+def test_sweep_con_config_yaml(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        cli, "cargar_precio_historico",
+        lambda symbol, interval, start, end: synthetic_ohlcv(400, freq="D", seed=len(symbol)),
+    )
+    config = tmp_path / "sweep.yaml"
+    config.write_text("symbols: [AAPL, KO]\nworkers: 0\ngrid:\n  darvas_window: [5, 10, 20]\n")
+    out = tmp_path / "sweep.csv"
+
+    # La línea de comandos tiene prioridad sobre el YAML
+    assert cli.main(["sweep", "--config", str(config), "--symbols", "SPY", "--out", str(out)]) == 0
+
+    df = pd.read_csv(out)
+    assert set(df["Ticker"]) == {"SPY"}
+    assert sorted(df["darvas_window"]) == [5, 10, 20]
+    assert {"total_ret", "max_dd", "sharpe", "compras", "ventas"} <= set(df.columns)
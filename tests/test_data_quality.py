@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from utils.data_quality import huecos_de_sesion, validar_historia, validar_panel
+
+
+def _historia(fechas, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(fechas))))
+    return pd.DataFrame({
+        "Open": close, "High": close * 1.01, "Low": close * 0.99,
+        "Close": close, "Volume": rng.lognormal(12, 0.3, len(fechas)),
+    }, index=pd.DatetimeIndex(fechas, name="Date"))
+
+
+def test_repara_historia_y_reporta_por_simbolo():
+    # Días hábiles de NYSE alrededor del 4 de julio (feriado: no es un hueco)
+    fechas = pd.bdate_range("2024-06-03", "2024-08-30").drop(pd.Timestamp("2024-07-04"))
+    df = _historia(fechas)
+    sucio = df.copy()
+    sucio.iloc[20, sucio.columns.get_loc("Close")] *= 1.8    # bad print aislado
+    sucio.iloc[30, sucio.columns.get_loc("Volume")] = 0      # vela de relleno
+    sucio.iloc[35, sucio.columns.get_loc("High")] = np.nan
+    sucio.iloc[40, sucio.columns.get_loc("High")] = sucio["Low"].iloc[40] * 0.99  # High < Low
+    sucio = sucio.drop(fechas[45])                           # hueco de sesión
+    sucio = pd.concat([sucio, sucio.iloc[[10]] * 1.0001])  # repetida al final: desordenada
+
+    out = validar_historia(sucio, "AAPL", "1d")
+    r = out.attrs["calidad"]
+    assert (r["duplicadas"], r["desordenado"], r["picos"], r["volumen_cero"]) == (1, True, 1, 1)
+    assert (r["faltantes"], r["huecos"], r["hueco_max"], r["descartadas"]) == (2, 1, 1, 2)
+    assert out.index.is_monotonic_increasing and out.index.is_unique
+    assert out.loc[fechas[10], "Close"] == sucio["Close"].iloc[-1]  # queda la última recibida
+    assert abs(out.loc[fechas[20], "Close"] / df["Close"].iloc[20] - 1) < 0.05
+    assert (out["High"] >= out[["Open", "Close", "Low"]].max(axis=1)).all()
+    assert not out.isna().any().any() and len(out) == len(fechas) - 3
+
+    # Relleno: vela plana al último cierre, también en el hueco de sesión
+    lleno = validar_historia(sucio, "AAPL", "1d", relleno="huecos")
+    assert len(lleno) == len(fechas) and lleno.attrs["calidad"]["rellenadas"] == 3
+    assert lleno.loc[fechas[45], ["Open", "High", "Low", "Close"]].eq(lleno.loc[fechas[44], "Close"]).all()
+    assert lleno.loc[fechas[45], "Volume"] == 0
+
+    # Un salto que se sostiene no es un pico; cripto opera los fines de semana
+    salto = _historia(pd.bdate_range("2024-01-02", periods=60))
+    salto.iloc[30:, :4] *= 1.4
+    assert validar_historia(salto, "MSFT").attrs["calidad"]["picos"] == 0
+    faltan, _ = huecos_de_sesion(salto.index.as_unit("ns").asi8, "1d", "cripto")
+    assert len(faltan) == (salto.index[-1] - salto.index[0]).days + 1 - 60
+
+
+def test_panel_equivale_a_validar_cada_simbolo():
+    fechas = pd.bdate_range("2023-01-03", periods=300)
+    fechas = fechas[~fechas.isin(pd.to_datetime(["2023-01-16", "2023-02-20"]))]  # MLK y Presidentes
+    historias = [_historia(fechas, seed=s) for s in range(4)]
+    historias[1].iloc[100, 3] *= 0.3
+    historias[2].iloc[150:153] = np.nan
+    historias[3].iloc[:40] = np.nan  # cotiza desde más tarde
+    panel = {
+        "symbols": ["A", "B", "C", "D"],
+        "ts": fechas.as_unit("ns").asi8,
+        **{f: np.stack([h[c].to_numpy() for h in historias])
+           for f, c in zip(("open", "high", "low", "close", "volume"), ("Open", "High", "Low", "Close", "Volume"))},
+    }
+
+    out = validar_panel(panel, "1d", relleno="valores")
+    for i, h in enumerate(historias):
+        ref = validar_historia(h, panel["symbols"][i], "1d", relleno="valores")
+        np.testing.assert_allclose(out["close"][i, -len(ref):], ref["Close"].to_numpy())
+        np.testing.assert_allclose(out["high"][i, -len(ref):], ref["High"].to_numpy())
+        assert out["calidad"].loc[panel["symbols"][i], "picos"] == ref.attrs["calidad"]["picos"]
+    assert out["calidad"]["picos"].tolist() == [0, 1, 0, 0]
+    assert out["calidad"]["huecos"].tolist() == [0, 0, 3, 0]
+    assert out["calidad"]["rellenadas"].tolist() == [0, 0, 3, 0]
+    assert np.isnan(out["close"][3, :40]).all() and out["calidad"].loc["D", "velas"] == len(fechas) - 40
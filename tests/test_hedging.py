@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from utils.hedging import candidatos_put, escenarios_montecarlo, optimizar_coberturas
+from utils.options import bs_price
+
+
+def _cadena(spot):
+    filas = []
+    for dias in (20, 45, 90):
+        T = dias / 365
+        for K in np.arange(0.6 * spot, 1.2 * spot, 1.0):
+            p = float(bs_price(spot, K, T, 0.04, 0.3, "PUT"))
+            filas.append({"tipo": "PUT", "expiry": pd.Timestamp("2030-01-01") + pd.Timedelta(days=dias),
+                          "T": T, "strike": K, "bid": p * 0.98, "ask": p * 1.02, "mid": p,
+                          "impliedVolatility": 0.3})
+    return pd.DataFrame(filas)
+
+
+def test_optimizar_coberturas_cumple_piso_con_menos_prima_que_cobertura_total():
+    rng = np.random.default_rng(0)
+    rets = rng.normal(0, 0.02, (3, 500)) + rng.normal(0, 0.01, 500)
+    ratios = escenarios_montecarlo(rets, 30)
+    spots = np.array([100.0, 50.0, 200.0])
+    cantidades = np.array([1000, 2000, 500])
+    valores = spots * cantidades
+    cand = pd.concat([
+        candidatos_put(_cadena(s), s, 30).assign(col=i, Subyacente=f"S{i}") for i, s in enumerate(spots)
+    ], ignore_index=True)
+    assert set(cand["T"] * 365) == {45, 90}  # el vencimiento de 20 días no llega al horizonte
+
+    res = optimizar_coberturas(valores, ratios, spots, cand, {i: q // 100 for i, q in enumerate(cantidades)},
+                               piso=0.08, horizonte=30)
+    assert res["cumple"] and res["perdida_final"] <= res["objetivo"] < res["perdida_inicial"]
+    total = (cand.groupby("col")["mid"].max() * cantidades).sum()
+    assert 0 < res["prima"] < total
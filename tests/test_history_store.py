@@ -0,0 +1,154 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+from utils import market_data
+from utils.history_store import STRIDE, HistoryStore
+from utils.ohlcv import OHLCV
+
+
+def _data(n, start="2024-01-01"):
+    idx = pd.date_range(start, periods=n, freq="min")
+    close = np.arange(n, dtype=float)
+    df = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close,
+                       "Volume": close}, index=idx)
+    return OHLCV.from_frame(df), idx
+
+
+def test_append_only_and_range_queries(tmp_path):
+    store = HistoryStore(tmp_path)
+    data, idx = _data(3 * STRIDE + 10)
+    assert store.append("BTC-USD", "1m", data[:STRIDE + 5]) == STRIDE + 5
+    # solapado: sólo se agregan las velas posteriores a la última guardada
+    assert store.append("BTC-USD", "1m", data[STRIDE:]) == len(data) - STRIDE - 5
+
+    got = store.read("BTC-USD", "1m", idx[2 * STRIDE + 3], idx[2 * STRIDE + 9])
+    np.testing.assert_array_equal(got.close, np.arange(2 * STRIDE + 3, 2 * STRIDE + 10))
+    assert isinstance(got.close.base, np.memmap)
+    assert store.bounds("BTC-USD", "1m") == (idx[0].value, idx[-1].value)
+    assert len(store.read("BTC-USD", "1m")) == len(data)
+
+
+def test_empty_store(tmp_path):
+    store = HistoryStore(tmp_path)
+    assert store.bounds("AAPL", "5m") is None
+    assert len(store.read("AAPL", "5m", "2024-01-01", "2024-02-01")) == 0
+
+
+def test_sincronizar_reintenta_si_la_descarga_falla(tmp_path, monkeypatch):
+    store = HistoryStore(tmp_path)
+    data, idx = _data(100)
+    store.append("AAPL", "1m", data[:50])
+    pedidos = []
+
+    def _descargar(ticker, intervalo, start, end):
+        pedidos.append(start)
+        if len(pedidos) == 1:
+            raise ConnectionError("sin red")
+        return data[50:].to_frame().set_index("Date")
+
+    monkeypatch.setattr(market_data, "_descargar", _descargar)
+    monkeypatch.setattr(market_data, "MAX_COLAS", 2)
+    monkeypatch.setattr(market_data, "_ultima_cola", OrderedDict())
+    with pytest.raises(ConnectionError):
+        market_data.sincronizar_store("AAPL", "1m", "2024-01-01", store)
+    market_data.sincronizar_store("AAPL", "1m", "2024-01-01", store)  # la falla no frena el reintento
+    market_data.sincronizar_store("AAPL", "1m", "2024-01-01", store)  # ya sincronizado: no repite
+    assert len(pedidos) == 2 and store.bounds("AAPL", "1m")[1] == idx[-1].value
+
+    for t in ("MSFT", "NVDA"):
+        store.append(t, "1m", data[:50])
+        market_data.sincronizar_store(t, "1m", "2024-01-01", store)
+    assert list(market_data._ultima_cola) == [(str(tmp_path), t, "1m") for t in ("MSFT", "NVDA")]
+
+
+
+def test_la_ultima_vela_guardada_se_corrige(tmp_path):
+    from utils.resample import _Series
+
+    store = HistoryStore(tmp_path)
+    data, idx = _data(120)
+    en_formacion = data[:61].to_frame().set_index("Date").copy()
+    en_formacion.iloc[60, 1:] = [59.5, 59.0, 59.5, 7.0]  # la vela de las 01:00, a medias
+    store.append("SPY", "1m", OHLCV.from_frame(en_formacion))
+    series = _Series()
+    assert series.obtener(("SPY",), store.read("SPY", "1m"), "1h", "cripto").close.tolist() == [59, 59.5]
+
+    # La sincronización siguiente la trae de nuevo, ya cerrada: se reescribe y no se duplica
+    assert store.append("SPY", "1m", data[60:61]) == 0
+    assert series.obtener(("SPY",), store.read("SPY", "1m"), "1h", "cripto").close.tolist() == [59, 60]
+    assert store.append("SPY", "1m", data[60:]) == 59
+    got = store.read("SPY", "1m")
+    for f in ("open", "high", "low", "close", "volume"):
+        np.testing.assert_array_equal(getattr(got, f), getattr(data, f))
+
+
+def test_sincronizaciones_simultaneas_descargan_una_vez(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    fcntl = pytest.importorskip("fcntl")
+
+    store = HistoryStore(tmp_path)
+    data, idx = _data(100)
+    store.append("AAPL", "1m", data[:50])
+    pedidos = []
+
+    def _descargar(ticker, intervalo, start, end):
+        pedidos.append(start)
+        time.sleep(0.2)
+        return data[50:].to_frame().set_index("Date")
+
+    monkeypatch.setattr(market_data, "_descargar", _descargar)
+    monkeypatch.setattr(market_data, "_ultima_cola", OrderedDict())
+    hilos = [threading.Thread(target=market_data.sincronizar_store, args=("AAPL", "1m", "2024-01-01", store))
+             for _ in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert len(pedidos) == 1 and len(store.read("AAPL", "1m")) == 100
+
+    # Otro proceso (otra descripción del archivo) no obtiene el bloqueo mientras se sostiene
+    with store.bloqueo("AAPL", "1m"), store.bloqueo("AAPL", "1m"):
+        with open(tmp_path / "AAPL" / "1m" / ".lock", "a+b") as f, pytest.raises(BlockingIOError):
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_panel_intradia_se_arma_desde_el_almacen(tmp_path, monkeypatch):
+    from benchmarks.synthetic import synthetic_ohlcv
+    from utils.providers.base import historia_masiva
+
+    # Tres días de velas de 5m en sesión; C empieza a cotizar el segundo día
+    base = synthetic_ohlcv(3 * 288, freq="5min", seed=4, start="2024-03-04")
+    minuto = base.index.hour * 60 + base.index.minute
+    base = base[(minuto >= 570) & (minuto < 960)]
+    fuente = {"A": base, "B": base * 1.1, "C": base.loc["2024-03-05":] * 0.9}
+    hasta = {"valor": pd.Timestamp("2024-03-06 12:00")}
+    pedidos = []
+
+    class _Proveedor:
+        def llamar(self, metodo, simbolos, intervalo, start, end):
+            pedidos.append((tuple(simbolos), pd.Timestamp(start)))
+            return historia_masiva({s: fuente[s].loc[start:hasta["valor"]] for s in simbolos})
+
+    monkeypatch.setattr(market_data, "get_provider", _Proveedor)
+    monkeypatch.setattr(market_data, "_ultima_cola", OrderedDict())
+    store = HistoryStore(tmp_path)
+    panel = market_data.descargar_panel(["A", "B", "C"], "2024-03-04", "2024-03-06", "5m", store=store)
+    assert pedidos == [(("A", "B", "C"), pd.Timestamp("2024-03-04"))]
+    assert panel["symbols"] == ["A", "B", "C"] and pd.Timestamp(panel["ts"][-1]) == hasta["valor"]
+    assert np.isnan(panel["close"][2, :78]).all() and not np.isnan(panel["close"][:2]).any()
+
+    # Sin cola nueva (sincronizado hace poco) no se descarga nada
+    market_data.descargar_panel(["A", "B", "C"], "2024-03-04", "2024-03-06", "5m", store=store)
+    assert len(pedidos) == 1
+    # Pasado el refresco: A y B bajan sólo la cola desde el último día guardado; C, que
+    # no cubre el inicio pedido, el rango completo
+    market_data._ultima_cola.clear()
+    hasta["valor"] = pd.Timestamp("2024-03-06 15:55")
+    panel = market_data.descargar_panel(["A", "B", "C"], "2024-03-04", "2024-03-06", "5m", store=store)
+    assert pedidos[1:] == [(("C",), pd.Timestamp("2024-03-04")), (("A", "B"), pd.Timestamp("2024-03-06"))]
+    assert len(panel["ts"]) == 3 * 78
+    np.testing.assert_allclose(panel["close"][1], base["Close"].to_numpy() * 1.1)
@@ -0,0 +1,108 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import providers
+from utils.income_scanner import IndiceCadenas, candidatos, cargar_cadenas, indice_cadenas
+from utils.options import bs_delta, calcular_delta_call_put
+from utils.pipeline_cache import CacheLRU
+from utils.providers.base import MarketDataProvider
+
+HOY = pd.Timestamp.today().normalize()
+
+
+def _cadena(strikes, dias, bid=1.0, ask=1.1, iv=0.3, oi=500):
+    partes = []
+    for d in dias:
+        for tipo in ("PUT", "CALL"):
+            partes.append(pd.DataFrame({
+                "expiry": HOY + pd.Timedelta(days=d), "T": d / 365, "tipo": tipo,
+                "strike": strikes, "bid": bid, "ask": ask, "mid": (bid + ask) / 2,
+                "impliedVolatility": iv, "openInterest": oi,
+            }))
+    # Desordenada a propósito: el índice ordena
+    return pd.concat(partes, ignore_index=True).sample(frac=1, random_state=0)
+
+
+def test_indice_busca_strikes_y_rankea_por_rendimiento():
+    indice = IndiceCadenas({
+        "AAA": _cadena(np.arange(80, 121, 5.0), [14, 35]),
+        "BBB": _cadena(np.arange(180, 221, 5.0), [35], oi=np.r_[[5000] * 8, [0]]),
+    })
+    assert len(indice.grupos) == 6 and (np.diff(indice._clave) >= 0).all()
+    g = indice.grupos.index[(indice.grupos["ticker"] == "BBB") & (indice.grupos["tipo"] == "PUT")]
+    ini, fin = indice.rango(g, [185.0], [200.0])
+    np.testing.assert_array_equal(indice.strike[ini[0]:fin[0]], [185, 190, 195, 200])
+
+    spot = pd.Series({"AAA": 100.0, "BBB": 200.0})
+    out = candidatos(indice, spot, otm=(0.02, 0.15), dias=(7, 60), prob_otm_min=0.0, oi_min=10)
+    assert set(out["Estrategia"]) == {"Covered call", "Cash-secured put"}
+    assert out["OTM %"].between(2 - 1e-9, 15 + 1e-9).all()
+    assert (out["Puntaje"].diff().dropna() <= 0).all()
+    # La misma prima rinde más en el vencimiento corto y sobre el spot más chico
+    assert out.iloc[0]["Ticker"] == "AAA" and out.iloc[0]["Días"] == 14
+    cc = out[(out["Ticker"] == "AAA") & (out["Estrategia"] == "Covered call") & (out["Días"] == 14)].iloc[0]
+    assert np.isclose(cc["Rend. anual %"], 1.0 / 100 * 365 / 14 * 100)
+    delta = calcular_delta_call_put(100, cc["Strike"], 14 / 365, 0.04, 0.3, "CALL")
+    assert np.isclose(cc["Prob. OTM %"], (1 - delta) * 100)
+    assert np.isclose(bs_delta(100, 110, 14 / 365, 0.04, 0.3, "PUT"),
+                      calcular_delta_call_put(100, 110, 14 / 365, 0.04, 0.3, "PUT"))
+    # Sin interés abierto (BBB 220) no entra
+    assert not ((out["Ticker"] == "BBB") & (out["Strike"] == 220)).any()
+
+
+class _Cadenas(MarketDataProvider):
+    nombre = "cadenas"
+
+    def __init__(self):
+        super().__init__(max_concurrencia=4)
+        self.pedidos = []
+        self.en_vuelo = self.pico = 0
+
+    def _bajar(self):
+        self.en_vuelo += 1
+        self.pico = max(self.pico, self.en_vuelo)
+        time.sleep(0.01)
+        self.en_vuelo -= 1
+
+    async def _history(self, symbol, interval, start, end):
+        raise NotImplementedError
+
+    async def _option_expiries(self, symbol):
+        if symbol == "ROTO":
+            raise RuntimeError("sin opciones")
+        return [(HOY + pd.Timedelta(days=d)).strftime("%Y-%m-%d") for d in (7, 14, 21)]
+
+    async def _option_chain(self, symbol, expiry):
+        self.pedidos.append((symbol, expiry))
+        await self.en_hilo(self._bajar)
+        return pd.DataFrame({"tipo": ["CALL", "PUT"], "strike": [100.0, 95.0], "bid": 1.0, "ask": 1.2,
+                             "impliedVolatility": 0.3, "openInterest": 100})
+
+
+def test_cargar_cadenas_en_paralelo_acotado_y_cacheado():
+    p = _Cadenas()
+    providers.set_provider(p)
+    try:
+        cache = CacheLRU("cadenas_test", 2**26, ttl=60)
+        tickers = [f"T{i}" for i in range(20)] + ["ROTO"]
+        cadenas = cargar_cadenas(tickers, 30, cache=cache, limite=5)
+        assert sorted(cadenas) == sorted(tickers[:-1])
+        assert len(p.pedidos) == 60 and 1 < p.pico <= p.max_concurrencia
+        assert len(cadenas["T0"]) == 6
+        # Segundo escaneo: sólo lo que no estaba (el ticker que falló) vuelve a pedirse
+        cargar_cadenas(tickers + ["T20"], 30, cache=cache)
+        assert len(p.pedidos) == 63
+
+        # El índice no depende de los filtros: otro rango de días sólo re-rankea
+        antes = len(p.pedidos)
+        indice = indice_cadenas(["U1", "U0"])
+        assert indice_cadenas(["U0", "U1", "U0"]) is indice and len(p.pedidos) == antes + 6
+        spot = pd.Series({"U0": 97.5, "U1": 97.5})
+        cortos = candidatos(indice, spot, dias=(1, 10), prob_otm_min=0.0)
+        largos = candidatos(indice, spot, dias=(10, 30), prob_otm_min=0.0)
+        assert cortos["Días"].max() <= 10 and largos["Días"].min() >= 10
+        assert len(cortos) + len(largos) == 12
+    finally:
+        providers.set_provider(None)
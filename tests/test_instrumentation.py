@@ -0,0 +1,42 @@
+import json
+from utils import instrumentation as inst
+
+
+def test_disabled_is_passthrough():
+    inst.begin_rerun(enabled=False)
+
+    @inst.instrumented("f")
+    def f(x):
+        return x + 1
+
+    assert f(1) == 2
+    with inst.timed("bloque") as span:
+        pass
+    assert span is inst._NOOP
+    assert inst.end_rerun() == []
+
+
+def test_spans_counters_and_cache_hits():
+    inst.begin_rerun(enabled=True)
+    cache = {}
+
+    @inst.instrumented("cargar", kind="cache")
+    def cargar(k):
+        if k not in cache:
+            inst.contar_miss("cargar")
+            cache[k] = k
+        return cache[k]
+
+    cargar("a")
+    cargar("a")
+    with inst.timed("yf.download", kind="network"):
+        pass
+
+    filas, counters, _ = inst.resumen()
+    assert {f["Bloque"]: f["Llamadas"] for f in filas} == {"cargar": 2, "yf.download": 1}
+    assert counters["cache_hits"] == 1 and counters["cache_misses"] == 1
+    assert counters["network_calls"] == 1
+
+    lines = inst.to_jsonl(inst.end_rerun()).splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["cargar", "cargar", "yf.download"]
+    inst.begin_rerun(enabled=False)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from utils import kernels
+from utils.indicators import calc_mavilimw, calc_wae
+
+
+def _ohlc(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.005, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.005, n)))
+    return pd.DataFrame({"High": high, "Low": low, "Close": close})
+
+
+def test_rolling_extremes_match_pandas():
+    df = _ohlc()
+    for w in (1, 5, 7, 20):
+        np.testing.assert_array_equal(kernels.rolling_max(df["High"], w), df["High"].rolling(w).max())
+        np.testing.assert_array_equal(kernels.rolling_min(df["Low"], w), df["Low"].rolling(w).min())
+
+
+def test_rolling_mean_std_and_mavilimw_match_pandas():
+    df = _ohlc()
+    np.testing.assert_allclose(kernels.rolling_mean(df["Close"], 20), df["Close"].rolling(20).mean(), rtol=1e-12)
+    np.testing.assert_allclose(kernels.rolling_std(df["Close"], 20), df["Close"].rolling(20).std(ddof=0), rtol=1e-9)
+    np.testing.assert_allclose(kernels.mavilimw(df["Close"]), calc_mavilimw(df), rtol=1e-12)
+
+
+def test_darvas_wae_kernels_2d_matches_per_symbol_pandas():
+    frames = [_ohlc(seed=s) for s in range(3)]
+    high = np.vstack([f["High"] for f in frames])
+    low = np.vstack([f["Low"] for f in frames])
+    close = np.vstack([f["Close"] for f in frames])
+    out = kernels.darvas_wae_kernels(high, low, close, darvas_window=5)
+    for i, f in enumerate(frames):
+        ref = calc_wae(f.copy())
+        np.testing.assert_array_equal(out["darvas_high"][i], f["High"].rolling(5).max())
+        np.testing.assert_allclose(out["wae_trendUp"][i], ref["wae_trendUp"], rtol=1e-12)
+        np.testing.assert_allclose(out["wae_e1"][i], ref["wae_e1"], rtol=1e-9)
+        np.testing.assert_allclose(out["wae_deadzone"][i], ref["wae_deadzone"], rtol=1e-12)
@@ -0,0 +1,88 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.fake_schwab import HASH, FakeSchwab, transacciones_sinteticas
+from utils.ledger import Ledger, imputar, sincronizar, transaccion_a_filas
+from utils.schwab_api import SchwabAPI
+
+
+def _tx(i, fecha, simbolo, cant, precio, comision=0.0, tipo="EQUITY"):
+    mult = 100 if tipo == "OPTION" else 1
+    return {
+        "activityId": i, "time": f"{fecha}T15:00:00+0000", "type": "TRADE",
+        "transferItems": [
+            {"instrument": {"assetType": "CURRENCY", "symbol": "CURRENCY_USD"}, "amount": 0.0, "cost": -comision},
+            {"instrument": {"assetType": tipo, "symbol": simbolo}, "amount": float(abs(cant)),
+             "cost": -cant * precio * mult, "price": precio},
+        ],
+    }
+
+
+def test_lotes_fifo_lifo_con_comisiones_y_cortos(tmp_path):
+    lotes = deque()
+    assert imputar(lotes, 10, 100.0, 1.0, 1.0, "FIFO", "d1", 1) == []
+    imputar(lotes, 10, 120.0, 1.0, 1.0, "FIFO", "d2", 2)
+    # Venta de 15 @ 130: cierra 10 del primer lote y 5 del segundo
+    (q1, c1, p1), (q2, c2, p2) = imputar(lotes, -15, 130.0, 1.5, 1.0, "FIFO", "d3", 3)
+    assert (q1, q2) == (10, 5) and np.isclose(c1, 100.1) and np.isclose(c2, 120.1)
+    assert np.isclose(p1, (130 - 100.1) * 10 - 1.0) and np.isclose(p2, (130 - 120.1) * 5 - 0.5)
+    # Se da vuelta: vende 10 más y queda corto 5
+    imputar(lotes, -10, 125.0, 0.0, 1.0, "FIFO", "d4", 4)
+    assert [l[2] for l in lotes] == [-5]
+
+    led = Ledger(tmp_path / "l.sqlite")
+    txs = [_tx(1, "2024-01-02", "AAA", 10, 100.0), _tx(2, "2024-01-03", "AAA", 10, 120.0),
+           _tx(3, "2024-01-04", "AAA", -10, 130.0), _tx(4, "2024-01-05", "AAPL  240119P00150000", -2, 3.0, 1.3, "OPTION"),
+           _tx(5, "2024-01-08", "AAPL  240119P00150000", 2, 1.0, 1.3, "OPTION")]
+    led.insertar([f for t in txs for f in transaccion_a_filas(t, "C")])
+    fifo = led.rendimiento("C", "FIFO", precios=pd.Series({"AAA": 110.0})).set_index("Ticker")
+    lifo = led.rendimiento("C", "LIFO").set_index("Ticker")
+    assert fifo.loc["AAA", "P&L realizado"] == 300 and lifo.loc["AAA", "P&L realizado"] == 100
+    assert fifo.loc["AAA", "Costo base"] == 1200 and lifo.loc["AAA", "Costo base"] == 1000
+    assert np.isclose(fifo.loc["AAA", "Rentabilidad"], -100 / 1200)
+    # PUT vendida a 3 y recomprada a 1, 2 contratos, 2.6 de comisiones
+    assert np.isclose(fifo.loc["AAPL  240119P00150000", "P&L realizado"], 400 - 2.6)
+
+
+@pytest.fixture
+def fake():
+    txs = transacciones_sinteticas(years=4, por_dia=3, fin="2026-01-01", seed=1)
+    with FakeSchwab(txs) as f:
+        yield f, txs
+
+
+def test_sincronizacion_incremental_contra_schwab_falso(tmp_path, fake):
+    fake, txs = fake
+    api = SchwabAPI(base_url=fake.url, access_token="token")
+    led = Ledger(tmp_path / "ledger.sqlite")
+    corte = pd.Timestamp("2025-06-01")
+    fake.publicar([t for t in txs if t["time"] < "2025-06-01"])
+
+    r = sincronizar(api, HASH, led, hasta=corte)
+    assert r["nuevas"] == len(fake.transacciones) and r["ventanas"] > 12
+    assert len(led.transacciones(HASH)) == len(fake.transacciones)
+    assert led.actualizar_pnl(HASH, "FIFO") == r["nuevas"]
+
+    # Una ventana falla: error y el cursor no avanza
+    fake.publicar(txs)
+    fake.fallar = 1
+    with pytest.raises(Exception):
+        sincronizar(api, HASH, led, hasta="2026-01-01")
+    assert led.cursor(HASH) == corte
+
+    # Reintento: sólo se piden ventanas desde el cursor (menos el solape)
+    fake.pedidos.clear()
+    r = sincronizar(api, HASH, led, hasta="2026-01-01")
+    assert min(p[0] for p in fake.pedidos).tz_localize(None) == corte - pd.Timedelta(days=2)
+    assert len(led.transacciones(HASH)) == len(txs)
+    assert led.actualizar_pnl(HASH, "FIFO") == r["nuevas"]
+
+    # Una operación que llega tarde con fecha vieja rehace sólo su símbolo
+    led.insertar(transaccion_a_filas(_tx(1, "2023-03-01", "KO", 7, 55.0), HASH))
+    led.actualizar_pnl(HASH, "FIFO")
+    completo = Ledger(tmp_path / "completo.sqlite")
+    completo.insertar(led.transacciones(HASH).drop(columns="seq").to_dict("records"))
+    pd.testing.assert_frame_equal(led.rendimiento(HASH, "FIFO"), completo.rendimiento(HASH, "FIFO"))
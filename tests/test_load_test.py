@@ -0,0 +1,44 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.load_test import compare, percentiles, techo
+
+
+def _nivel(n, p95, rps):
+    return {"sessions": n, "p95_s": p95, "throughput_rps": rps}
+
+
+def test_techo_y_regresiones():
+    assert percentiles([])["p95_s"] is None
+    assert percentiles([1.0] * 99 + [101.0])["p50_s"] == 1.0
+
+    base = [_nivel(1, 0.10, 10.0), _nivel(2, 0.12, 18.0), _nivel(4, 0.30, 19.0), _nivel(8, 0.70, 17.0)]
+    assert techo(base) == {"throughput_rps": 19.0, "sessions": 4, "saturacion": 2}
+    assert techo(base[:2])["saturacion"] is None
+
+    baseline = {"results": base, "ceiling": techo(base)}
+    igual = {"results": [dict(r, p95_s=r["p95_s"] * 1.2) for r in base], "ceiling": techo(base)}
+    assert compare(igual, baseline, threshold=0.25) == []
+    peor = [_nivel(1, 0.10, 10.0), _nivel(2, 0.20, 12.0), _nivel(16, 2.0, 11.0)]
+    regresiones = compare({"results": peor, "ceiling": techo(peor)}, baseline, threshold=0.25)
+    assert [r["caso"] for r in regresiones] == ["p95 con 2 sesiones", "techo de throughput (reruns/s)"]
+
+
+def test_sesiones_simultaneas_sin_red(tmp_path):
+    # En un proceso aparte: las rutas de la app se leen de variables de entorno al importar
+    out = tmp_path / "carga.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_test", "--sessions", "1", "3", "--reruns", "1",
+         "--scenarios", "backtest", "simulador", "alertas", "--workdir", str(tmp_path / "trabajo"), "--out", str(out)],
+        cwd=Path(__file__).resolve().parent.parent, check=True, capture_output=True, timeout=600,
+    )
+    resultado = json.loads(out.read_text())
+    assert [r["sessions"] for r in resultado["results"]] == [1, 3]
+    for r in resultado["results"]:
+        assert r["errores"] == []
+        assert r["reruns"] == 3 * r["sessions"]
+        assert set(r["por_escenario"]) == {"backtest", "simulador", "alertas"}
+        assert r["p50_s"] <= r["p95_s"] <= r["p99_s"] and r["cpu_s_por_sesion"] > 0
+    assert resultado["meta"]["telegram_envios"] > 0
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+from utils.backtest_helpers import compute_darvas_signals
+from utils.materialized import guardar_indicadores, leer_indicadores, param_hash, tolerancia_de
+
+PARAMS = {"darvas_window": 5, "sensitivity": 150}
+
+
+def _calc():
+    dates = pd.date_range("2024-01-01", periods=30, freq="D")
+    return pd.DataFrame({"Date": dates, "Close": range(30), "buy_final": False, "sell_final": False})
+
+
+def test_param_hash_is_order_independent():
+    assert param_hash({"a": 1, "b": 2}) == param_hash({"b": 2, "a": 1})
+    assert param_hash({"a": 1}) != param_hash({"a": 2})
+
+
+def test_leer_indicadores_respeta_cobertura(tmp_path):
+    guardar_indicadores("AAPL", "1d", PARAMS, _calc(), root=tmp_path)
+    df = leer_indicadores("AAPL", "1d", PARAMS, "2024-01-05", "2024-01-10", root=tmp_path)
+    assert list(df["Close"]) == [4, 5, 6, 7, 8, 9]
+    # rango que empieza antes de lo materializado -> cálculo en vivo
+    assert leer_indicadores("AAPL", "1d", PARAMS, "2023-12-01", "2024-01-10", root=tmp_path) is None
+    assert leer_indicadores("AAPL", "1d", {**PARAMS, "darvas_window": 9}, root=tmp_path) is None
+
+
+def test_tolerancia_en_velas_del_intervalo(tmp_path):
+    # 1h de bolsa hasta el martes 9/1: el miércoles ya está desactualizado
+    horas = pd.date_range("2024-01-08 09:30", periods=7, freq="h")
+    calc = pd.DataFrame({"Date": horas.append(horas + pd.Timedelta(days=1)), "Close": range(14)})
+    guardar_indicadores("AAPL", "1h", PARAMS, calc, root=tmp_path)
+    assert len(leer_indicadores("AAPL", "1h", PARAMS, "2024-01-08", "2024-01-09", root=tmp_path)) == 14
+    assert leer_indicadores("AAPL", "1h", PARAMS, "2024-01-08", "2024-01-10", root=tmp_path) is None
+    assert tolerancia_de("1h") == pd.Timedelta(hours=3) and tolerancia_de("1d") == pd.Timedelta(days=4)
+    # Fin de semana: la última sesión es la del viernes
+    viernes = pd.date_range("2024-01-12 09:30", periods=7, freq="h")
+    guardar_indicadores("AAPL", "1h", PARAMS, pd.DataFrame({"Date": viernes, "Close": range(7)}), root=tmp_path)
+    assert len(leer_indicadores("AAPL", "1h", PARAMS, "2024-01-12", "2024-01-14", root=tmp_path)) == 7
+
+
+def test_materializado_llega_calentado_y_converge_con_el_calculo_en_vivo(tmp_path):
+    rng = np.random.default_rng(0)
+    fechas = pd.bdate_range("2022-01-03", periods=500, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, 500)))
+    df = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99,
+                       "Close": close, "Volume": rng.lognormal(12, 0.3, 500)}, index=fechas)
+    guardar_indicadores("AAPL", "1d", PARAMS, compute_darvas_signals(df, **PARAMS), root=tmp_path)
+
+    start = fechas[300]
+    mat = leer_indicadores("AAPL", "1d", PARAMS, start, fechas[-1], root=tmp_path)
+    vivo = compute_darvas_signals(df.loc[start:], **PARAMS)
+    assert len(mat) == len(vivo) == 200
+    # Al principio de la ventana sólo el materializado tiene valores...
+    assert mat[["darvas_high", "mavilimw"]].notna().all().all()
+    assert vivo["darvas_high"].iloc[:4].isna().all() and vivo["mavilimw"].iloc[:50].isna().all()
+    # ...y pasado el calentamiento Darvas y MavilimW son idénticos
+    for col in ("darvas_high", "darvas_low", "mavilimw"):
+        np.testing.assert_array_equal(mat[col].iloc[100:], vivo[col].iloc[100:])
+
+
+def test_estado_da_las_mismas_senales_que_el_screener(tmp_path):
+    from benchmarks.synthetic import synthetic_hlc
+    from utils.backtest_helpers import DARVAS_DEFAULTS
+    from utils.materialized import fila_estado, guardar_estado, leer_estado
+    from utils.screeners import screen_darvas, senales_desde_estado
+
+    high, low, close = synthetic_hlc(30, 300, seed=3)
+    volume = np.random.default_rng(1).lognormal(14, 0.5, close.shape)
+    fechas = pd.bdate_range("2023-01-02", periods=300, name="Date")
+    simbolos = [f"S{i}" for i in range(30)]
+    filas = [fila_estado(s, compute_darvas_signals(pd.DataFrame(
+                {"Open": close[i], "High": high[i], "Low": low[i], "Close": close[i], "Volume": volume[i]},
+                index=fechas))) for i, s in enumerate(simbolos)]
+    guardar_estado("1d", DARVAS_DEFAULTS, filas, root=tmp_path)
+
+    estado = leer_estado("1d", DARVAS_DEFAULTS, root=tmp_path)
+    panel = {"symbols": simbolos, "ts": fechas.as_unit("ns").asi8, "open": close,
+             "high": high, "low": low, "close": close, "volume": volume}
+    esperado = screen_darvas(panel, velas=5)
+    assert len(esperado) > 3
+    pd.testing.assert_frame_equal(senales_desde_estado(estado, velas=5), esperado)
+    # Desactualizado respecto de `end`: el screener calcula en vivo
+    assert leer_estado("1d", DARVAS_DEFAULTS, end="2024-06-03", root=tmp_path) is None
+    assert leer_estado("1d", DARVAS_DEFAULTS, end=fechas[-1] + pd.Timedelta(days=1), root=tmp_path) is not None
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from utils.ohlcv import OHLCV
+
+
+def _frame(n=10):
+    idx = pd.date_range("2024-01-01", periods=n, freq="D", name="Date")
+    close = np.arange(1.0, n + 1)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1,
+                         "Close": close, "Volume": np.arange(n) * 10}, index=idx)
+
+
+def test_roundtrip_and_zero_copy_slices():
+    df = _frame()
+    data = OHLCV.from_frame(df)
+    assert data.volume.dtype == np.int64
+    out = data.to_frame()
+    assert list(out["Date"]) == list(df.index)
+    pd.testing.assert_series_equal(out["Close"], df["Close"].reset_index(drop=True))
+
+    view = data.between("2024-01-03", "2024-01-05")
+    assert len(view) == 3 and view.close[0] == 3.0
+    assert np.shares_memory(view.close, data.close)
+
+
+def test_derived_is_computed_once_and_sliced():
+    data = OHLCV.from_frame(_frame())
+    calls = []
+
+    def doble(d):
+        calls.append(1)
+        return {"x2": d.close * 2}
+
+    assert data.derived("x2", doble)["x2"][-1] == 20.0
+    data.derived("x2", doble)
+    assert len(calls) == 1
+    np.testing.assert_array_equal(data[2:4].derived("x2", doble)["x2"], [6.0, 8.0])
+    assert len(calls) == 1
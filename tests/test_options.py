@@ -28,3 +28,14 @@ def test_calcular_payoff_put():
     S = np.array([90, 100, 110])
     result = calcular_payoff_put(S, 100, premium=5)
     np.testing.assert_array_equal(result, np.array([5, -5, -5]))
+
+def test_bs_price_paridad_y_broadcasting():
+    from utils.options import bs_price
+
+    K = np.array([[90.0], [100.0], [110.0]])
+    T = np.array([0.1, 0.5, 1.0])
+    call = bs_price(100, K, T, 0.03, 0.25, "CALL")
+    put = bs_price(100, K, T, 0.03, 0.25, "PUT")
+    assert call.shape == (3, 3)
+    np.testing.assert_allclose(call - put, 100 - K * np.exp(-0.03 * T))
+    np.testing.assert_array_equal(bs_price(np.array([90.0, 110.0]), 100, 0, 0.03, 0.25, "PUT"), [10.0, 0.0])
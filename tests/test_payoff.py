@@ -0,0 +1,43 @@
+import numpy as np
+
+from utils.options import bs_price
+from utils.payoff import Pata, resolucion_grilla, superficie_pnl
+
+
+def _condor(spot=100.0, dias=45, r=0.04):
+    T = dias / 365
+    patas = []
+    for tipo, strike, cantidad, iv in (("PUT", 90, 1, 0.30), ("PUT", 95, -1, 0.28),
+                                       ("CALL", 105, -1, 0.25), ("CALL", 110, 1, 0.24)):
+        prima = float(bs_price(spot, strike, T, r, iv, tipo))
+        patas.append(Pata(tipo, strike, dias, cantidad, prima, iv))
+    return tuple(patas)
+
+
+def test_superficie_pnl_de_cero_a_payoff_al_vencimiento():
+    patas = _condor()
+    sup = superficie_pnl(patas, 100.0, 0.04, n_precios=401, n_dias=90)
+    assert sup["pnl"].shape == (5, 90, 401)
+    i0 = list(sup["shifts_iv"]).index(0.0)
+    centro = int(np.argmin(np.abs(sup["precios"] - 100)))
+    # Hoy, sin desplazar la IV, la estrategia vale lo que se pagó/cobró
+    np.testing.assert_allclose(sup["pnl"][i0, 0, centro], 0.0, atol=1e-10)
+    # Al vencimiento es el payoff intrínseco neto de primas
+    S = sup["precios"]
+    intrinseco = sum(
+        p.cantidad * (np.maximum(S - p.strike, 0) if p.tipo == "CALL" else np.maximum(p.strike - S, 0))
+        for p in patas
+    ) - sum(p.cantidad * p.prima for p in patas)
+    for i in range(len(sup["shifts_iv"])):
+        np.testing.assert_allclose(sup["pnl"][i, -1], intrinseco, atol=1e-9)
+    # Más volatilidad perjudica al cóndor vendido (vega neta negativa) en el centro
+    assert np.all(np.diff(sup["pnl"][:, 0, centro]) < 0)
+
+
+def test_superficie_suma_patas_y_resolucion_por_ancho():
+    patas = _condor()
+    total = superficie_pnl(patas, 100.0, 0.04, 120, 30)["pnl"]
+    por_pata = sum(superficie_pnl((p,), 100.0, 0.04, 120, 30)["pnl"] for p in patas)
+    np.testing.assert_allclose(total, por_pata, atol=1e-9)
+    assert resolucion_grilla(1200, 30) == (500, 30)
+    assert resolucion_grilla(480, 200) == (240, 90)
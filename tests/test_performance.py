@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from utils.performance import factor_anual, metricas, sharpe_movil, tabla_mensual, volatilidad_movil
+
+
+def test_metricas_2d_equivalen_a_pandas_por_serie():
+    rng = np.random.default_rng(3)
+    r = rng.normal(0.0004, 0.01, (4, 600))
+    posicion = (rng.random((4, 600)) < 0.6).astype(float)
+    r *= posicion
+    m = metricas(r, 252, posicion)
+
+    for i in range(4):
+        s = pd.Series(r[i])
+        equity = (1 + s).cumprod()
+        dd = equity / equity.cummax().clip(lower=1) - 1
+        assert np.isclose(m["sharpe"][i], s.mean() / s.std() * np.sqrt(252))
+        assert np.isclose(m["sortino"][i], s.mean() / np.sqrt((s.clip(upper=0) ** 2).mean()) * np.sqrt(252))
+        assert np.isclose(m["max_dd"][i], dd.min())
+        assert np.isclose(m["cagr"][i], equity.iloc[-1] ** (252 / 600) - 1)
+        assert np.isclose(m["calmar"][i], m["cagr"][i] / -dd.min())
+        assert m["exposicion"][i] == posicion[i].mean()
+
+        # Drawdown más largo y recuperación del valle, recorriendo vela a vela
+        largo = actual = 0
+        for v in dd:
+            actual = actual + 1 if v < 0 else 0
+            largo = max(largo, actual)
+        assert m["dd_duracion"][i] == largo
+        valle = int(dd.to_numpy().argmin())
+        recupera = np.flatnonzero(dd.to_numpy()[valle:] >= 0)
+        assert (np.isnan(m["dd_recuperacion"][i]) if not len(recupera) else m["dd_recuperacion"][i] == recupera[0])
+
+        # Operaciones: tramos continuos comprado
+        tramos = (pd.Series(posicion[i]).diff().fillna(posicion[i][0]) == 1).cumsum()[posicion[i] == 1]
+        ret_ops = (1 + s[posicion[i] == 1]).groupby(tramos).prod() - 1
+        assert m["operaciones"][i] == len(ret_ops)
+        assert np.isclose(m["win_rate"][i], (ret_ops > 0).mean())
+        assert np.isclose(m["profit_factor"][i], ret_ops[ret_ops > 0].sum() / -ret_ops[ret_ops < 0].sum())
+
+    # Una serie 1-D da escalares; sin volatilidad los cocientes son NaN
+    plano = metricas(np.zeros(50), 252)
+    assert plano["total_ret"] == 0 and np.isnan(plano["sharpe"]) and plano["operaciones"] == 0
+
+
+def test_anualizacion_moviles_y_tabla_mensual():
+    assert factor_anual("1d") == 252 and factor_anual("1d", "BTC-USD") == 365
+    assert factor_anual("1h", "AAPL") == 7 * 252 and factor_anual("1h", "ETH-USD") == 24 * 365
+    assert factor_anual("5m") == 78 * 252 and factor_anual("1wk", "BTC-USD") == 52
+    assert factor_anual("1h", "EURUSD=X") == 24 * 260 and factor_anual("1d", "EURUSD=X") == 260
+
+    rng = np.random.default_rng(0)
+    r = rng.normal(0, 0.01, 300)
+    s = pd.Series(r)
+    np.testing.assert_allclose(sharpe_movil(r, 40, 365), s.rolling(40).mean() / s.rolling(40).std() * np.sqrt(365))
+    np.testing.assert_allclose(volatilidad_movil(r, 40, 365), s.rolling(40).std() * np.sqrt(365))
+
+    fechas = pd.date_range("2023-12-15", periods=300)
+    tabla = tabla_mensual(r, fechas)
+    esperado = (1 + s).groupby(fechas.to_period("M")).prod() - 1
+    assert np.isclose(tabla.loc[2024, "Feb"], esperado[pd.Period("2024-02")])
+    assert np.isclose(tabla.loc[2023, "Año"], esperado[pd.Period("2023-12")])
+    assert np.isnan(tabla.loc[2023, "Ene"]) and list(tabla.index) == [2023, 2024]
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_ohlcv
+from utils import pipeline_cache as pc
+from utils.backtest_helpers import compute_darvas_signals
+
+
+def test_cambiar_darvas_window_reutiliza_datos_e_indicadores(monkeypatch):
+    df = synthetic_ohlcv(2_000, freq="h", seed=4)
+    descargas = []
+    monkeypatch.setattr(pc, "cargar_temporalidad", lambda *a: descargas.append(a) or df)
+    cache = pc.PipelineCache(64 * 2**20)
+
+    for w in (5, 10, 5):
+        _, df_calc = cache.backtest("SPY", "1h", "2024-01-01", "2024-06-01", {"darvas_window": w})
+        ref = compute_darvas_signals(df, darvas_window=w)
+        pd.testing.assert_frame_equal(df_calc, ref)
+
+    assert len(descargas) == 1
+    assert len(cache.indicadores_lru) == 1
+    assert len(cache.senales_lru) == 2
+    assert cache.senales_lru.hits >= 1
+
+
+def test_lru_acotado_por_bytes():
+    lru = pc.CacheLRU("prueba", max_bytes=3 * 8_000)
+    for i in range(4):
+        lru.put(i, np.zeros(1_000))
+    assert lru.get(0) is None
+    assert lru.get(3) is not None
+    assert lru.bytes <= lru.max_bytes and lru.desalojos == 1
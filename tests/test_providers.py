@@ -0,0 +1,65 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import escribir_fixtures
+from utils import providers
+from utils.providers.base import MarketDataProvider
+from utils.providers.fixture_provider import FixtureProvider
+
+
+class _Contador(MarketDataProvider):
+    nombre = "contador"
+
+    def __init__(self):
+        super().__init__(max_concurrencia=2)
+        self.llamadas = []
+
+    async def _history(self, symbol, interval, start, end):
+        self.llamadas.append(symbol)
+        await asyncio.sleep(0.05)
+        return pd.DataFrame({"Close": [1.0]})
+
+    async def _option_expiries(self, symbol):
+        return []
+
+    async def _option_chain(self, symbol, expiry):
+        return pd.DataFrame()
+
+
+def test_pedidos_identicos_en_vuelo_comparten_descarga():
+    p = _Contador()
+
+    async def pedir():
+        return await asyncio.gather(*(p.history(s, "1d", "2024-01-01", "2024-02-01") for s in ["A"] * 5 + ["B"]))
+
+    resultados = p.run(pedir())
+    assert sorted(p.llamadas) == ["A", "B"]
+    assert p.coalescidas == 4
+    assert all(r is resultados[0] for r in resultados[:5])
+
+
+@pytest.fixture
+def fixture_provider(tmp_path):
+    escribir_fixtures(tmp_path, ["AAA", "BBB"], n_bars=300)
+    providers.set_provider(FixtureProvider(tmp_path))
+    yield
+    providers.set_provider(None)
+
+
+def test_market_data_sin_red_con_fixtures(fixture_provider):
+    from utils.market_data import cargar_cadena_opciones, cargar_precio_historico, descargar_panel
+
+    fin = pd.Timestamp.today().normalize()
+    df = cargar_precio_historico("AAA", "1d", fin - pd.Timedelta(days=30), fin)
+    assert list(df.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert df.index.min() >= fin - pd.Timedelta(days=30) and df.index.max() == fin
+
+    panel = descargar_panel(["AAA", "BBB", "NOPE"], fin - pd.Timedelta(days=60), fin)
+    assert panel["symbols"] == ["AAA", "BBB"] and panel["close"].shape[0] == 2
+
+    cargar_cadena_opciones.__wrapped__.clear()
+    cadena = cargar_cadena_opciones("AAA")
+    assert set(cadena["tipo"]) == {"CALL", "PUT"} and (cadena["T"] > 0).all()
+    assert cadena["expiry"].nunique() == 5
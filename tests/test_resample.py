@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_ohlcv
+from utils import market_data, resample
+from utils.history_store import HistoryStore
+from utils.ohlcv import OHLCV
+
+_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def _sesion_bolsa(n=20_000, freq="min"):
+    df = synthetic_ohlcv(n, freq=freq, seed=2)
+    minuto = df.index.hour * 60 + df.index.minute
+    return df[(minuto >= 570) & (minuto < 960) & (df.index.dayofweek < 5)]
+
+
+def test_remuestrear_coincide_con_pandas_y_alinea_la_sesion():
+    df = _sesion_bolsa()
+    data = OHLCV.from_frame(df)
+    for intervalo, regla, sesion, offset in [
+        ("15m", "15min", "bolsa", None), ("1h", "1h", "bolsa", "30min"),
+        ("1h", "1h", "forex", None), ("1d", "1D", "bolsa", None),
+    ]:
+        ref = df.resample(regla, offset=offset).agg(_AGG).dropna(subset=["Close"])
+        ref.index = ref.index.as_unit("ns").rename("Date")
+        got = resample.remuestrear(data, intervalo, sesion).to_frame().set_index("Date")
+        pd.testing.assert_frame_equal(got, ref, check_freq=False)
+    assert pd.Timestamp(resample.remuestrear(data, "1h").ts[0]).minute == 30
+
+
+def test_cargar_temporalidad_reduce_desde_el_almacen(tmp_path, monkeypatch):
+    df = _sesion_bolsa(60_000, freq="5min")
+    store = HistoryStore(tmp_path)
+    store.append("SPY", "5m", OHLCV.from_frame(df.iloc[:-500]))
+
+    def _sin_red(*args, **kwargs):
+        raise AssertionError("no debería descargar")
+
+    monkeypatch.setattr(market_data, "_descargar", _sin_red)
+    # Días completos ya guardados: el almacén cubre el rango y no hay cola que bajar
+    inicio = df.index[1000]
+    fin = df.index[-501].normalize() - pd.Timedelta(days=1)
+    got = resample.cargar_temporalidad("SPY", "1h", inicio, fin, store=store)
+    ref = resample.remuestrear(store.read("SPY", "5m"), "1h").between(inicio, fin + pd.Timedelta(days=1))
+    pd.testing.assert_frame_equal(got, ref.to_frame().set_index("Date"))
+
+    # Llegan velas nuevas: se reduce sólo la cola y el resultado es el mismo que desde cero
+    store.append("SPY", "5m", OHLCV.from_frame(df.iloc[-500:]))
+    fin = df.index[-1].normalize() - pd.Timedelta(days=1)
+    got = resample.cargar_temporalidad("SPY", "1h", inicio, fin, store=store)
+    completo = resample.remuestrear(OHLCV.from_frame(df), "1h").between(inicio, fin + pd.Timedelta(days=1))
+    np.testing.assert_array_equal(got["Close"].to_numpy(), completo.close)
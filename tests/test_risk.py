@@ -0,0 +1,24 @@
+import numpy as np
+from utils.risk import analizar_riesgo, escenario_historico, var_historico
+
+
+def test_contribuciones_suman_var_parametrico():
+    rng = np.random.default_rng(0)
+    rets = rng.multivariate_normal([0, 0, 0], [[4, 1, 0], [1, 2, 0.5], [0, 0.5, 1]], 1000).T * 1e-4
+    valores = np.array([1000.0, 2000.0, 500.0])
+    r = analizar_riesgo(valores, rets, rets_bench=rets[0])
+
+    media = valores @ rets.mean(axis=1)
+    assert np.isclose(r["contrib"].sum(), r["var_param"] + media)
+    assert np.isclose(r["contrib_pct"].sum(), 1.0)
+    assert np.isclose(r["beta"][0], 1.0)
+    assert r["cvar_hist"] >= r["var_hist"] > 0
+
+
+def test_var_historico_y_escenario_con_beta():
+    var, cvar = var_historico(np.arange(-50.0, 50.0), nivel=0.95)
+    assert np.isclose(var, 45.05) and cvar > var
+
+    close = np.array([[100.0, 90.0], [np.nan, np.nan]])
+    pnl = escenario_historico([1000.0, 1000.0], close, np.array([100.0, 80.0]), np.array([1.0, 0.5]))
+    assert np.allclose(pnl, [-100.0, -100.0])
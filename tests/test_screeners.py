@@ -0,0 +1,70 @@
+import pandas as pd
+from utils.screeners import ratio_volumen
+
+
+def test_ratio_volumen_basico():
+    vol = pd.Series([100.0] * 10 + [300.0] * 7)
+    result = ratio_volumen(vol, 0.5)
+    assert result == {"Vol_7d": 300, "Percentil_prev": 100, "Ratio": 3.0}
+
+
+def test_ratio_volumen_historia_insuficiente():
+    assert ratio_volumen(pd.Series([100.0] * 13), 0.5) is None
+
+
+def test_screen_darvas_coincide_con_backtest_por_simbolo():
+    import numpy as np
+    from benchmarks.synthetic import synthetic_hlc
+    from utils.backtest_helpers import darvas_signal_arrays
+    from utils.ohlcv import OHLCV
+    from utils.screeners import screen_darvas
+
+    high, low, close = synthetic_hlc(40, 300, seed=3)
+    volume = np.random.default_rng(1).lognormal(14, 0.5, close.shape)
+    ts = np.arange(300, dtype=np.int64) * 86_400 * 10**9
+    panel = {"symbols": [f"S{i}" for i in range(40)], "ts": ts, "open": close,
+             "high": high, "low": low, "close": close, "volume": volume}
+
+    result = screen_darvas(panel, velas=5)
+
+    esperados = set()
+    for i in range(40):
+        s = darvas_signal_arrays(OHLCV(ts, close[i], high[i], low[i], close[i], volume[i]))
+        if (s["buy_final"][-5:] | s["sell_final"][-5:]).any():
+            esperados.add(f"S{i}")
+    assert set(result["Ticker"]) == esperados
+    assert result["Puntaje"].is_monotonic_decreasing
+
+
+def test_screen_darvas_con_huecos_coincide_con_compute_darvas_signals():
+    import numpy as np
+    from benchmarks.synthetic import synthetic_hlc
+    from utils.backtest_helpers import compute_darvas_signals
+    from utils.screeners import screen_darvas
+
+    n = 300
+    high, low, close = synthetic_hlc(3, n, seed=6)
+    volume = np.random.default_rng(2).lognormal(14, 0.5, close.shape)
+    fechas = pd.bdate_range("2023-01-02", periods=n)
+    for a in (high, low, close, volume):
+        a[0, 240] = np.nan                 # una vela faltante
+        a[1, 230:233] = np.nan             # tres seguidas
+        a[2, :60] = np.nan                 # cotiza desde más tarde
+    panel = {"symbols": ["A", "B", "C"], "ts": fechas.as_unit("ns").asi8, "open": close,
+             "high": high, "low": low, "close": close, "volume": volume}
+
+    velas = 50
+    result = screen_darvas(panel, velas=velas).set_index("Ticker")
+    # Con NaN en las ventanas, A y B no darían ninguna señal después del hueco
+    assert set(result.index) == {"A", "B", "C"}
+    for i, s in enumerate(panel["symbols"]):
+        ok = ~np.isnan(close[i])
+        df = pd.DataFrame({"Open": close[i], "High": high[i], "Low": low[i], "Close": close[i],
+                           "Volume": volume[i]}, index=fechas)[ok]
+        ref = compute_darvas_signals(df)
+        senales = ref[(ref["buy_final"] | ref["sell_final"]) & (ref["Date"] >= fechas[-velas])]
+        assert (s in result.index) == (not senales.empty)
+        if not senales.empty:
+            ultima = senales.iloc[-1]
+            assert result.loc[s, "Fecha"] == ultima["Date"]
+            assert result.loc[s, "Señal"] == ("Compra" if ultima["buy_final"] else "Venta")
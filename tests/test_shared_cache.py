@@ -0,0 +1,58 @@
+import multiprocessing
+import time
+
+import pandas as pd
+
+from utils.shared_cache import SharedCache
+
+
+def test_ttl_serializacion_e_invalidacion_entre_instancias(tmp_path):
+    ruta = tmp_path / "cache.sqlite"
+    a, b = SharedCache(ruta), SharedCache(ruta)  # dos procesos sobre el mismo archivo
+    df = pd.DataFrame({"Ticker": ["AAPL", "KO"], "Rentabilidad %": [0.25, None]})
+
+    assert a.obtener("historial", "csv", lambda: df) is df
+    pd.testing.assert_frame_equal(b.get("historial", "csv"), df)
+    assert b.obtener("historial", "csv", lambda: 1 / 0).equals(df)
+    assert b.obtener("universo", "sp500", lambda: ["AAPL", "MSFT"]) == ["AAPL", "MSFT"]
+    assert (a.misses, b.hits) == (1, 1)
+
+    # La invalidación de `b` la ve `a`, y un valor calculado con la generación vieja no vale
+    gen = a.generacion("historial")
+    assert b.invalidar("historial") == gen + 1
+    assert a.get("historial", "csv") is None
+    a.put("historial", "csv", df, generacion=gen)
+    assert b.get("historial", "csv") is None
+    assert b.get("universo", "sp500") == ["AAPL", "MSFT"]
+
+    a.put("corta", "x", ["y"], ttl=0.05)
+    time.sleep(0.1)
+    assert b.get("corta", "x") is None
+
+
+def _lento(ruta, salida, i):
+    cache = SharedCache(ruta, espera=0.01)
+
+    def calcular():
+        with open(salida, "a") as f:
+            f.write(f"{i}\n")
+        time.sleep(0.3)
+        return [f"calculado por {i}"]
+
+    return cache.obtener("universo", "sp500", calcular)
+
+
+def test_un_solo_proceso_calcula_la_clave_fria(tmp_path):
+    ruta, salida = tmp_path / "cache.sqlite", tmp_path / "calculos.txt"
+    SharedCache(ruta)
+    with multiprocessing.get_context("fork").Pool(6) as pool:
+        resultados = pool.starmap(_lento, [(ruta, salida, i) for i in range(6)])
+    calculos = salida.read_text().split()
+    assert len(calculos) == 1
+    assert all(r == [f"calculado por {calculos[0]}"] for r in resultados)
+
+    # Un lease vencido (dueño caído) no bloquea para siempre
+    cache = SharedCache(ruta, lease=0.1)
+    assert cache._tomar("universo", "otra", "caido")
+    time.sleep(0.15)
+    assert cache.obtener("universo", "otra", lambda: ["ok"]) == ["ok"]
@@ -0,0 +1,27 @@
+import sqlite3
+
+import pytest
+
+from utils.sqlite_db import DIRECTORIO_DATOS, conectar, ruta_datos
+
+
+def test_ruta_datos_por_defecto_y_desde_el_entorno(monkeypatch, tmp_path):
+    monkeypatch.delenv("GROWTHIA_PRUEBA", raising=False)
+    assert ruta_datos("GROWTHIA_PRUEBA", "prueba.sqlite") == DIRECTORIO_DATOS / "prueba.sqlite"
+    monkeypatch.setenv("GROWTHIA_PRUEBA", str(tmp_path / "otra.sqlite"))
+    assert ruta_datos("GROWTHIA_PRUEBA", "prueba.sqlite") == tmp_path / "otra.sqlite"
+
+
+def test_conectar_confirma_o_revierte_y_cierra(tmp_path):
+    ruta = tmp_path / "x.sqlite"
+    with conectar(ruta, wal=True) as con:
+        con.execute("CREATE TABLE t (v INTEGER)")
+        con.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(sqlite3.ProgrammingError):
+        con.execute("SELECT 1")  # cerrada al salir
+    with pytest.raises(ZeroDivisionError), conectar(ruta) as con:
+        con.execute("INSERT INTO t VALUES (2)")
+        1 / 0
+    with conectar(ruta) as con:
+        assert con.execute("SELECT v FROM t").fetchall() == [(1,)]
+        assert con.execute("PRAGMA journal_mode").fetchone() == ("wal",)
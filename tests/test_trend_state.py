@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal, assert_series_equal
+from utils.trend_state import robust_trend, trend_state
+
+
+def test_robust_trend_datetime_index():
+    idx = pd.date_range("2024-01-01", periods=5, freq="D")
+    close = pd.Series([1, 2, 3, 4, 5], index=idx, dtype=float)
+    mav = pd.Series([None, None, 2, 3, 4], index=idx, dtype=float)
+    expected = pd.Series([False, False, True, True, True], index=idx)
+    assert_series_equal(robust_trend(close, mav), expected)
+
+
+def test_robust_trend_columnwise_and_confirm():
+    close = pd.DataFrame({"A": [1, 3, 3, 4, 5.0], "B": [5, 1, 3, 3, 5.0]})
+    mav = pd.DataFrame({"A": [np.nan, np.nan, np.nan, 2, 3], "B": [np.nan, np.nan, np.nan, 2, 6]})
+    expected = pd.DataFrame({
+        "A": [False, True, True, True, True],   # 3 velas previas sobre 2
+        "B": [False, False, True, True, False],  # la vela 1 (1 < 2) corta la racha
+    })
+    assert_frame_equal(robust_trend(close, mav, confirm=4), expected)
+
+
+def test_trend_state_lag():
+    close = np.array([1.0, 2.0, 3.0, 1.0])
+    mav = np.array([2.0, 2.0, 2.0, 2.0])
+    np.testing.assert_array_equal(trend_state(close, mav, lag=2), [0, 0, 1, -1])
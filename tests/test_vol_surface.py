@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from utils.options import bs_price
+from utils.vol_surface import VolSurface, fit_svi, superficie_desde_cadena
+
+
+def test_fit_svi_recupera_sonrisa_por_vencimiento():
+    reales = np.array([[0.01, 0.10, -0.4, 0.05, 0.20], [0.03, 0.15, -0.2, -0.05, 0.30]])
+    k = np.tile(np.linspace(-0.5, 0.4, 40), (2, 1))
+    k[0, 30:] = np.nan  # vencimientos con distinta cantidad de strikes
+    a, b, rho, m, s = reales.T[:, :, None]
+    w = a + b * (rho * (k - m) + np.sqrt((k - m) ** 2 + s**2))
+
+    superficie = VolSurface([0.1, 0.5], [100.0, 100.0], fit_svi(k, w))
+    ajuste = superficie.total_variance(100 * np.exp(k), np.array([[0.1], [0.5]]))
+    np.testing.assert_allclose(ajuste[np.isfinite(w)], w[np.isfinite(w)], rtol=1e-2)
+
+
+def test_superficie_desde_cadena_interpola_en_varianza_total():
+    filas = []
+    for T, iv in ((0.25, 0.20), (1.0, 0.30)):
+        for K in np.arange(70.0, 131.0, 5.0):
+            for tipo in ("CALL", "PUT"):
+                p = float(bs_price(100, K, T, 0.04, iv, tipo))
+                filas.append({"expiry": pd.Timestamp("2030-01-01") + pd.Timedelta(days=int(T * 365)), "T": T,
+                              "tipo": tipo, "strike": K, "bid": p, "ask": p, "mid": p, "impliedVolatility": iv})
+    superficie = superficie_desde_cadena(pd.DataFrame(filas), r=0.04)
+
+    np.testing.assert_allclose(superficie.forward, 100 * np.exp(0.04 * np.array([0.25, 1.0])))
+    np.testing.assert_allclose(superficie.iv(100.0, [0.25, 1.0]), [0.20, 0.30], rtol=1e-3)
+    w_medio = (0.20**2 * 0.25 + 0.30**2 * 1.0) / 2
+    np.testing.assert_allclose(superficie.iv(100 * np.exp(0.04 * 0.625), 0.625), np.sqrt(w_medio / 0.625), rtol=1e-2)
@@ -0,0 +1,478 @@
+"""
+Motor de alertas de precio e indicadores para miles de reglas.
+
+Cada regla compara un campo de la vela con un nivel y dispara cuando el
+campo lo cruza, en su dirección, entre la vela anterior y la actual:
+
+- ``precio``: cierre.
+- ``volumen_pct``: percentil del volumen de la vela entre las
+  ``VENTANA_VOL`` anteriores (0-100).
+- ``darvas_techo`` / ``darvas_piso``: distancia % del cierre al máximo /
+  mínimo de la caja Darvas previa (cruzar 0 es la ruptura de
+  ``screen_darvas``).
+- ``mavilimw``: distancia % del cierre a la MavilimW.
+
+Cada regla vale para una temporalidad (``intervalo``, por defecto
+``"1d"``): los buffers de cada ``(símbolo, intervalo)`` se llevan aparte,
+así evaluar velas de 1h no mezcla sus fechas ni sus indicadores con las
+diarias.  Las reglas se agrupan por ``(símbolo, intervalo, campo,
+dirección)`` en índices
+ordenados por nivel, así cada vela busca con ``bisect`` sólo el tramo de
+niveles entre el valor anterior y el actual en lugar de recorrer todas:
+con 100 mil reglas el costo por vela depende de cuántas cruza, no del
+total.  Una regla disparada queda desarmada hasta que el campo vuelva a
+cruzar ``nivel ∓ banda`` (histéresis), y ``cooldown`` impone un mínimo de
+segundos entre disparos.  Las reglas, su estado (armada, último disparo)
+y el registro de disparos se guardan en SQLite con ``guardar``; la ruta
+se cambia con ``GROWTHIA_ALERTAS`` (por defecto ``data/alertas.sqlite``).
+"""
+import operator
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.backtest_helpers import DARVAS_DEFAULTS
+from utils.instrumentation import instrumented
+from utils.sqlite_db import conectar, ruta_datos
+
+ARCHIVO_ALERTAS = ruta_datos("GROWTHIA_ALERTAS", "alertas.sqlite")
+VENTANA_VOL = 20
+CAMPOS = {
+    "precio": "Cierre",
+    "volumen_pct": "Percentil del volumen",
+    "darvas_techo": "Cierre vs. techo Darvas (%)",
+    "darvas_piso": "Cierre vs. piso Darvas (%)",
+    "mavilimw": "Cierre vs. MavilimW (%)",
+}
+DIRECCIONES = {"arriba": 1, "abajo": -1}
+COLUMNAS_DISPAROS = ["id", "Ticker", "Fecha", "Campo", "Dirección", "Nivel", "Valor", "Mensaje"]
+_NUNCA = -(2**62)  # "último disparo" de una regla que nunca disparó (ns)
+_NAN = float("nan")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS reglas (
+    id INTEGER PRIMARY KEY,
+    simbolo TEXT NOT NULL,
+    campo TEXT NOT NULL,
+    direccion INTEGER NOT NULL,
+    nivel REAL NOT NULL,
+    banda REAL NOT NULL,
+    cooldown REAL NOT NULL,
+    mensaje TEXT NOT NULL,
+    intervalo TEXT NOT NULL DEFAULT '1d',
+    armada INTEGER NOT NULL DEFAULT 1,
+    ultimo INTEGER
+);
+CREATE TABLE IF NOT EXISTS disparos (
+    regla INTEGER NOT NULL,
+    simbolo TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    campo TEXT NOT NULL,
+    nivel REAL NOT NULL,
+    valor REAL NOT NULL,
+    mensaje TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_disparos_fecha ON disparos (fecha);
+"""
+
+
+class Regla(NamedTuple):
+    """`direccion` es ``"arriba"`` o ``"abajo"``; `cooldown` en segundos; `intervalo` la temporalidad."""
+    simbolo: str
+    campo: str
+    direccion: str
+    nivel: float
+    banda: float = 0.0
+    cooldown: float = 0.0
+    mensaje: str = ""
+    intervalo: str = "1d"
+
+
+def _largos_mavilimw(fmal: int = 3, smal: int = 5) -> tuple[int, ...]:
+    # Misma cadena de WMAs que ``calc_mavilimw``
+    tmal = fmal + smal
+    Fmal = smal + tmal
+    Ftmal = tmal + Fmal
+    return fmal, smal, tmal, Fmal, Ftmal, Fmal + Ftmal
+
+
+def _ns(ts) -> int:
+    return ts if isinstance(ts, (int, np.integer)) else pd.Timestamp(ts).value
+
+
+class _Serie:
+    """Buffers de un ``(símbolo, intervalo)`` para calcular los campos vela a vela."""
+    __slots__ = ("ts", "close", "highs", "lows", "vols", "cadena", "ultimos")
+
+    def __init__(self, darvas_window: int, ventana_vol: int, largos: tuple[int, ...]):
+        self.ts = None
+        self.close = _NAN
+        self.highs = deque(maxlen=darvas_window)
+        self.lows = deque(maxlen=darvas_window)
+        self.vols = deque(maxlen=ventana_vol)
+        self.cadena = [(deque(maxlen=n), range(1, n + 1), n * (n + 1) / 2) for n in largos]
+        self.ultimos = dict.fromkeys(CAMPOS, _NAN)
+
+    def _mavilimw(self, close: float) -> float:
+        m = close
+        for ventana, pesos, denom in self.cadena:
+            ventana.append(m)
+            if len(ventana) < ventana.maxlen:
+                return _NAN
+            m = sum(map(operator.mul, ventana, pesos)) / denom
+        return m
+
+    def avanzar(self, close: float, high: float, low: float, volume: float) -> dict[str, tuple[float, float, float]]:
+        """
+        ``(anterior, actual, último)`` de cada campo con la vela nueva.  El
+        cruce que dispara compara `anterior` y `actual`; el rearmado compara
+        `último` (el valor de la vela previa) y `actual`.  Sólo difieren en
+        la caja Darvas, donde el cierre previo se mide contra la caja actual
+        como ``prev_c <= prev_dh`` en ``darvas_signals_from_kernels``.
+        """
+        prev = self.close
+        actuales = {"precio": (prev, close)}
+        if len(self.highs) == self.highs.maxlen:
+            # Caja de las `darvas_window` velas previas, como ``prev_dh``/``prev_dl``
+            techo, piso = max(self.highs), min(self.lows)
+            actuales["darvas_techo"] = ((prev / techo - 1) * 100, (close / techo - 1) * 100)
+            actuales["darvas_piso"] = ((prev / piso - 1) * 100, (close / piso - 1) * 100)
+        if volume == volume:
+            pct = (100.0 * sum(v < volume for v in self.vols) / len(self.vols)
+                   if len(self.vols) == self.vols.maxlen else _NAN)
+            actuales["volumen_pct"] = (self.ultimos["volumen_pct"], pct)
+            self.vols.append(volume)
+        dist = (close / self._mavilimw(close) - 1) * 100
+        actuales["mavilimw"] = (self.ultimos["mavilimw"], dist)
+
+        campos = {}
+        for campo, (antes, ahora) in actuales.items():
+            campos[campo] = (antes, ahora, self.ultimos[campo])
+            self.ultimos[campo] = ahora
+        self.close = close
+        self.highs.append(high if high == high else close)
+        self.lows.append(low if low == low else close)
+        return campos
+
+
+class MotorAlertas:
+    """
+    Reglas, índices por nivel y estado de disparo.  Con `path` las reglas
+    se leen y escriben en SQLite; sin él todo queda en memoria.
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        darvas_window: int = DARVAS_DEFAULTS["darvas_window"],
+        ventana_vol: int = VENTANA_VOL,
+    ):
+        self.path = Path(path) if path is not None else None
+        self.darvas_window = darvas_window
+        self.ventana_vol = ventana_vol
+        self._largos = _largos_mavilimw()
+        self._lock = threading.RLock()
+        self._series: dict[tuple[str, str], _Serie] = {}
+        self._indices: dict[tuple[str, str, str, int], tuple] = {}
+        self._por_serie: dict[tuple[str, str], list[tuple]] = {}
+        self._cambios: list[np.ndarray] = []
+        self._pendientes: list[tuple] = []
+
+        # Una fila por regla (posición = fila); las borradas quedan inactivas
+        self._tabla = pd.DataFrame({
+            "id": pd.Series(dtype=np.int64), "simbolo": pd.Series(dtype=object),
+            "campo": pd.Series(dtype=object), "direccion": pd.Series(dtype=np.int64),
+            "nivel": pd.Series(dtype=np.float64), "banda": pd.Series(dtype=np.float64),
+            "cooldown": pd.Series(dtype=np.float64), "mensaje": pd.Series(dtype=object),
+            "intervalo": pd.Series(dtype=object),
+        })
+        self._activa = np.zeros(0, dtype=bool)
+        self._armada = np.zeros(0, dtype=bool)
+        self._ultimo = np.zeros(0, dtype=np.int64)
+        self._cooldown_ns = np.zeros(0, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._niveles = np.zeros(0, dtype=np.float64)
+        self._mensajes = np.zeros(0, dtype=object)
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with conectar(self.path) as con:
+                con.executescript(_ESQUEMA)
+                if "intervalo" not in {c[1] for c in con.execute("PRAGMA table_info(reglas)")}:
+                    # Bases anteriores a las reglas por temporalidad: todas eran diarias
+                    con.execute("ALTER TABLE reglas ADD COLUMN intervalo TEXT NOT NULL DEFAULT '1d'")
+                guardadas = pd.read_sql_query("SELECT * FROM reglas ORDER BY id", con)
+            ultimo = guardadas.pop("ultimo").fillna(_NUNCA).astype(np.int64).to_numpy()
+            armada = guardadas.pop("armada").astype(bool).to_numpy()
+            self._anexar(guardadas, armada, ultimo)
+
+    # ——— Reglas ————————————————————————————————————————————————————
+    def _anexar(self, nuevas: pd.DataFrame, armada: np.ndarray, ultimo: np.ndarray) -> None:
+        nuevas = nuevas[self._tabla.columns].astype(self._tabla.dtypes.to_dict())
+        self._tabla = (pd.concat([self._tabla, nuevas], ignore_index=True) if len(self._tabla)
+                       else nuevas.reset_index(drop=True))
+        self._activa = np.concatenate([self._activa, np.ones(len(nuevas), dtype=bool)])
+        self._armada = np.concatenate([self._armada, armada])
+        self._ultimo = np.concatenate([self._ultimo, ultimo])
+        self._cooldown_ns = (self._tabla["cooldown"].to_numpy() * 1e9).astype(np.int64)
+        self._ids = self._tabla["id"].to_numpy()
+        self._niveles = self._tabla["nivel"].to_numpy()
+        self._mensajes = self._tabla["mensaje"].to_numpy()
+        self._reconstruir()
+
+    def _reconstruir(self) -> None:
+        # Un índice ordenado por nivel (y otro por nivel de rearmado) por clave
+        pos = np.flatnonzero(self._activa)
+        t = self._tabla.iloc[pos]
+        rearme = (t["nivel"] - t["direccion"] * t["banda"]).to_numpy()
+        niveles = t["nivel"].to_numpy()
+        self._indices = {}
+        for clave, filas in t.groupby(["simbolo", "intervalo", "campo", "direccion"], sort=False).indices.items():
+            o = filas[np.argsort(niveles[filas], kind="stable")]
+            r = filas[np.argsort(rearme[filas], kind="stable")]
+            self._indices[clave] = (niveles[o].tolist(), pos[o], rearme[r].tolist(), pos[r])
+        self._por_serie = {}
+        for (simbolo, intervalo, campo, d), indice in self._indices.items():
+            self._por_serie.setdefault((simbolo, intervalo), []).append((campo, d, *indice))
+
+    def agregar(self, reglas: Iterable[Regla]) -> np.ndarray:
+        """Agrega reglas (armadas) y devuelve sus ids."""
+        nuevas = pd.DataFrame(list(reglas), columns=list(Regla._fields))
+        if nuevas.empty:
+            return np.zeros(0, dtype=np.int64)
+        nuevas["simbolo"] = nuevas["simbolo"].astype(str).str.strip().str.upper()
+        malos = set(nuevas["campo"]) - set(CAMPOS)
+        if malos:
+            raise ValueError(f"Campos desconocidos: {sorted(malos)}")
+        malas = set(nuevas["direccion"]) - set(DIRECCIONES)
+        if malas:
+            raise ValueError(f"Direcciones desconocidas: {sorted(malas)}")
+        nuevas["direccion"] = nuevas["direccion"].map(DIRECCIONES).astype(np.int64)
+        for col in ("nivel", "banda", "cooldown"):
+            nuevas[col] = nuevas[col].astype(np.float64)
+        nuevas["mensaje"] = nuevas["mensaje"].fillna("").astype(str)
+        nuevas["intervalo"] = nuevas["intervalo"].fillna("1d").astype(str).str.strip()
+
+        with self._lock:
+            inicio = int(self._tabla["id"].max()) + 1 if len(self._tabla) else 1
+            if self.path is not None:
+                with conectar(self.path) as con:
+                    inicio = max(inicio, con.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM reglas").fetchone()[0])
+            nuevas.insert(0, "id", np.arange(inicio, inicio + len(nuevas), dtype=np.int64))
+            if self.path is not None:
+                cols = list(self._tabla.columns)
+                with conectar(self.path) as con:
+                    con.executemany(
+                        f"INSERT INTO reglas ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                        nuevas[cols].itertuples(index=False, name=None),
+                    )
+            self._anexar(nuevas, np.ones(len(nuevas), dtype=bool), np.full(len(nuevas), _NUNCA, dtype=np.int64))
+        return nuevas["id"].to_numpy()
+
+    def quitar(self, ids: Iterable[int]) -> None:
+        ids = list(map(int, ids))
+        with self._lock:
+            self._activa &= ~self._tabla["id"].isin(ids).to_numpy()
+            if self.path is not None:
+                with conectar(self.path) as con:
+                    con.executemany("DELETE FROM reglas WHERE id = ?", [(i,) for i in ids])
+            self._reconstruir()
+
+    def reglas(self) -> pd.DataFrame:
+        """Reglas activas con su estado."""
+        with self._lock:
+            t = self._tabla.assign(armada=self._armada, ultimo=self._ultimo)[self._activa]
+        inversa = {v: k for k, v in DIRECCIONES.items()}
+        return t.assign(
+            direccion=t["direccion"].map(inversa),
+            ultimo=pd.to_datetime(t["ultimo"].where(t["ultimo"] != _NUNCA), unit="ns"),
+        ).reset_index(drop=True)
+
+    def __len__(self) -> int:
+        return int(self._activa.sum())
+
+    # ——— Evaluación ————————————————————————————————————————————————
+    def _disparos(self, grupos: list[tuple]) -> pd.DataFrame:
+        # Cada grupo: (posiciones, símbolo, ts, campo, dirección, valor)
+        if not grupos:
+            grupos = [(np.zeros(0, dtype=np.int64), "", 0, "", 1, _NAN)]  # vacía pero con dtypes
+        pos = np.concatenate([g[0] for g in grupos])
+        n = [len(g[0]) for g in grupos]
+        _, simbolos, ts, campos, dirs, valores = zip(*grupos)
+        return pd.DataFrame({
+            "id": self._ids[pos],
+            "Ticker": np.repeat(simbolos, n),
+            "Fecha": pd.to_datetime(np.repeat(np.array(ts, dtype=np.int64), n), unit="ns"),
+            "Campo": np.repeat(campos, n),
+            "Dirección": np.repeat(np.where(np.array(dirs) == 1, "arriba", "abajo"), n),
+            "Nivel": self._niveles[pos],
+            "Valor": np.repeat(valores, n),
+            "Mensaje": self._mensajes[pos],
+        })
+
+    def procesar(self, simbolo: str, ts, close: float, high: float = _NAN, low: float = _NAN,
+                 volume: float = _NAN, disparar: bool = True, intervalo: str = "1d") -> pd.DataFrame:
+        """
+        Incorpora una vela de `simbolo` en `intervalo` y devuelve los
+        disparos.  Las velas con fecha no posterior a la última procesada se
+        ignoran; con ``disparar=False`` sólo se actualizan los buffers
+        (precalentamiento).
+        """
+        with self._lock:
+            return self._disparos(self._procesar(simbolo, intervalo, _ns(ts), close, high, low, volume, disparar))
+
+    def _procesar(self, simbolo, intervalo, ts, close, high, low, volume, disparar) -> list[tuple]:
+        # Sin lock: lo toman ``procesar`` y ``procesar_barras``
+        clave = (simbolo, intervalo)
+        serie = self._series.get(clave)
+        if serie is None:
+            serie = self._series[clave] = _Serie(self.darvas_window, self.ventana_vol, self._largos)
+        elif ts <= serie.ts:
+            return []
+        serie.ts = ts
+        valores = serie.avanzar(close, high, low, volume)
+        indices = self._por_serie.get(clave)
+        if not disparar or not indices:
+            return []
+
+        disparos = []
+        for campo, d, niveles, pos, rearmes, pos_r in indices:
+            antes, ahora, ultimo = valores.get(campo, (_NAN, _NAN, _NAN))
+            # Rearma las que el campo cruzó de vuelta por nivel ∓ banda
+            if d == 1 and ahora < ultimo:
+                lo, hi = bisect_left(rearmes, ahora), bisect_left(rearmes, ultimo)
+            elif d == -1 and ahora > ultimo:
+                lo, hi = bisect_right(rearmes, ultimo), bisect_right(rearmes, ahora)
+            else:
+                lo = hi = 0
+            if lo < hi:
+                r = pos_r[lo:hi]
+                r = r[~self._armada[r]]
+                self._armada[r] = True
+                if self.path is not None:
+                    self._cambios.append(r)
+
+            # arriba: antes <= nivel < ahora; abajo: antes >= nivel > ahora
+            if d == 1 and antes < ahora:
+                lo, hi = bisect_left(niveles, antes), bisect_left(niveles, ahora)
+            elif d == -1 and antes > ahora:
+                lo, hi = bisect_right(niveles, ahora), bisect_right(niveles, antes)
+            else:
+                continue
+            if lo >= hi:
+                continue
+            c = pos[lo:hi]
+            c = c[self._armada[c] & (ts - self._ultimo[c] >= self._cooldown_ns[c])]
+            if not len(c):
+                continue
+            self._armada[c] = False
+            self._ultimo[c] = ts
+            if self.path is not None:
+                self._cambios.append(c)
+            disparos.append((c, simbolo, ts, campo, d, ahora))
+        if self.path is not None:
+            self._pendientes.extend(disparos)
+        return disparos
+
+    @instrumented("MotorAlertas.procesar_barras")
+    def procesar_barras(self, barras: pd.DataFrame, disparar: bool = True, intervalo: str = "1d") -> pd.DataFrame:
+        """
+        Procesa en orden las velas de `barras` (``Ticker``, ``Fecha``,
+        ``Close`` y opcionalmente ``High``, ``Low``, ``Volume``), todas de
+        la temporalidad `intervalo`.
+        """
+        n = len(barras)
+        nan = np.full(n, np.nan)
+        columnas = [barras[c].to_numpy(dtype=np.float64) if c in barras else nan
+                    for c in ("Close", "High", "Low", "Volume")]
+        fechas = barras["Fecha"].to_numpy(dtype="datetime64[ns]").view(np.int64).tolist()
+        disparos = []
+        with self._lock:
+            for s, ts, c, h, l, v in zip(barras["Ticker"].tolist(), fechas, *(x.tolist() for x in columnas)):
+                disparos.extend(self._procesar(s, intervalo, ts, c, h, l, v, disparar))
+            return self._disparos(disparos)
+
+    def evaluar_panel(self, panel: dict, velas: int = 1, intervalo: str = "1d") -> pd.DataFrame:
+        """
+        Evalúa las velas de cada símbolo del panel (``cargar_panel`` en
+        `intervalo`) que el motor todavía no procesó: si ya conoce la serie,
+        todas las posteriores a su última vela disparan, así no se pierden
+        cruces aunque la página no se abriera durante varias velas.  La
+        primera vez sólo disparan las últimas `velas`; las anteriores
+        precalientan los buffers.
+        """
+        fechas = panel["ts"].view("datetime64[ns]")
+        partes = []
+        for i, simbolo in enumerate(panel["symbols"]):
+            close = panel["close"][i]
+            ok = np.flatnonzero(~np.isnan(close))
+            if not len(ok):
+                continue
+            barras = pd.DataFrame({
+                "Ticker": simbolo, "Fecha": fechas[ok], "Close": close[ok],
+                **{c.capitalize(): panel[c][i, ok] for c in ("high", "low", "volume") if c in panel},
+            })
+            with self._lock:
+                vista = (simbolo, intervalo) in self._series
+            if not vista:
+                self.procesar_barras(barras.iloc[:-velas], disparar=False, intervalo=intervalo)
+                barras = barras.iloc[-velas:]
+            # Las velas ya procesadas se ignoran en ``_procesar``
+            partes.append(self.procesar_barras(barras, intervalo=intervalo))
+        partes = [p for p in partes if len(p)]
+        return pd.concat(partes, ignore_index=True) if partes else self._disparos([])
+
+    # ——— Persistencia ——————————————————————————————————————————————
+    def guardar(self) -> int:
+        """Persiste el estado de las reglas que cambiaron y los disparos nuevos."""
+        if self.path is None:
+            return 0
+        with self._lock:
+            cambios = np.unique(np.concatenate(self._cambios)) if self._cambios else np.zeros(0, dtype=np.int64)
+            nuevos = self._disparos(self._pendientes)
+            self._cambios, self._pendientes = [], []
+            ultimo = self._ultimo[cambios]
+            estado = zip(self._armada[cambios].tolist(),
+                         np.where(ultimo == _NUNCA, None, ultimo).tolist(), self._ids[cambios].tolist())
+            filas = zip(nuevos["id"].tolist(), nuevos["Ticker"], nuevos["Fecha"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+                        nuevos["Campo"], nuevos["Nivel"].tolist(), nuevos["Valor"].tolist(), nuevos["Mensaje"])
+            with conectar(self.path) as con:
+                con.executemany("UPDATE reglas SET armada = ?, ultimo = ? WHERE id = ?", estado)
+                con.executemany(
+                    "INSERT INTO disparos (regla, simbolo, fecha, campo, nivel, valor, mensaje) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", filas,
+                )
+        return len(nuevos)
+
+    def historial(self, n: int = 200) -> pd.DataFrame:
+        """Últimos `n` disparos guardados."""
+        if self.path is None:
+            return pd.DataFrame(columns=COLUMNAS_DISPAROS)
+        with conectar(self.path) as con:
+            return pd.read_sql_query(
+                "SELECT regla AS id, simbolo AS Ticker, fecha AS Fecha, campo AS Campo, nivel AS Nivel, "
+                "valor AS Valor, mensaje AS Mensaje FROM disparos ORDER BY fecha DESC LIMIT ?",
+                con, params=(n,), parse_dates=["Fecha"],
+            )
+
+
+@st.cache_resource(show_spinner=False)
+def motor_alertas() -> MotorAlertas:
+    """Motor único por proceso sobre ``ARCHIVO_ALERTAS``, compartido por las sesiones."""
+    return MotorAlertas(ARCHIVO_ALERTAS)
+
+
+def resumen_telegram(disparos: pd.DataFrame, max_lineas: int = 20) -> str:
+    """Un solo mensaje con los disparos (hasta `max_lineas`)."""
+    lineas = [f"🔔 *{len(disparos)} alerta(s)*"]
+    for d in disparos.head(max_lineas).itertuples(index=False):
+        texto = d.Mensaje or f"{CAMPOS[d.Campo]} cruzó {d.Dirección} {d.Nivel:g}"
+        lineas.append(f"`{d.Ticker}` {texto} ({d.Valor:.2f})")
+    if len(disparos) > max_lineas:
+        lineas.append(f"... y {len(disparos) - max_lineas} más")
+    return "\n".join(lineas)
@@ -0,0 +1,159 @@
+"""
+Atribución de resultados del log de decisiones (``registro_acciones.csv``).
+
+Cada decisión se une con ``pd.merge_asof`` al último cierre conocido en el
+momento en que se tomó (la vela diaria de la fecha ``D`` recién se conoce a
+las 16:00 de ``D``), y desde ahí se leen los retornos a 1/5/20/60 velas con
+indexado NumPy sobre el panel ``(símbolos, tiempo)`` de
+``market_data.cargar_panel``: una sola pasada vectorizada para todas las
+decisiones, sin bucles por ticker.
+
+Para las acciones sobre PUTs se valúa una cobertura de referencia: un PUT
+`MONEYNESS_PUT` del spot con vencimiento en el horizonte, comprado a
+Black-Scholes con la volatilidad realizada de las 20 velas previas.  Su
+P&L neto de prima (en fracción de la posición) mide cuánto agregó cubrir
+("Comprar PUT") o cuánto se ahorró al no hacerlo ("Ignorado").
+"""
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import instrumented
+from utils.kernels import rolling_std
+from utils.market_data import cargar_panel
+from utils.options import bs_price
+
+HORIZONTES = (1, 5, 20, 60)
+MONEYNESS_PUT = 0.95
+VENTANA_VOL = 20
+HORA_CIERRE = pd.Timedelta(hours=16)
+ACCIONES_PUT = ("Comprar PUT", "Ignorado")
+# Días corridos previos a la primera decisión para la volatilidad realizada
+MARGEN_VOL = 45
+
+
+def _ffill(close: np.ndarray) -> np.ndarray:
+    # Último cierre válido a lo largo del tiempo (huecos de un símbolo)
+    n = close.shape[1]
+    idx = np.where(np.isnan(close), 0, np.arange(n))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    out = np.take_along_axis(close, idx, axis=1)
+    return out
+
+
+@instrumented("atribuir_decisiones")
+def atribuir_decisiones(
+    decisiones: pd.DataFrame,
+    panel: dict,
+    horizontes: tuple[int, ...] = HORIZONTES,
+    r: float = 0.04,
+) -> pd.DataFrame:
+    """
+    Agrega a `decisiones` (columnas ``Fecha``, ``Ticker``, ``Acción
+    Tomada``) el cierre de referencia y, por horizonte ``h``:
+
+    - ``Ret {h}d``: retorno del subyacente ``h`` velas después;
+    - ``PUT {h}d``: P&L neto del PUT de referencia (fracción de la
+      posición); sólo en las acciones de ``ACCIONES_PUT``;
+    - ``Cubierto {h}d``: ``Ret + PUT``.
+
+    NaN si el ticker no está en el panel o el horizonte todavía no pasó.
+    """
+    out = decisiones.copy()
+    out["Fecha"] = pd.to_datetime(out["Fecha"])
+    fechas = out["Fecha"].to_numpy(dtype="datetime64[ns]")
+    orden = np.argsort(fechas, kind="stable")
+    izq = pd.DataFrame({"Fecha": fechas[orden], "fila": orden})
+
+    ts = pd.to_datetime(np.asarray(panel["ts"])).as_unit("ns")
+    der = pd.DataFrame({"Fecha": ts + HORA_CIERRE, "t": np.arange(len(ts))})
+    unido = pd.merge_asof(izq, der, on="Fecha", direction="backward")
+    t = np.full(len(out), -1, dtype=np.int64)
+    t[unido["fila"].to_numpy()] = unido["t"].fillna(-1).to_numpy(dtype=np.int64)
+
+    pos = {s: i for i, s in enumerate(panel["symbols"])}
+    s = out["Ticker"].astype(str).str.strip().map(pos).fillna(-1).to_numpy(dtype=np.int64)
+    ok = (s >= 0) & (t >= 0)
+
+    close = _ffill(np.asarray(panel["close"], dtype=np.float64))
+    n = close.shape[1]
+    s0, t0 = np.where(ok, s, 0), np.where(ok, t, 0)
+    spot = np.where(ok, close[s0, t0], np.nan)
+    out["Cierre ref"] = spot
+
+    # Volatilidad realizada anualizada al momento de la decisión
+    log_r = np.diff(np.log(close), axis=1, prepend=np.nan)
+    vol = rolling_std(log_r, VENTANA_VOL, ddof=1) * np.sqrt(252)
+    sigma = np.where(ok, vol[s0, t0], np.nan)
+    es_put = out["Acción Tomada"].isin(ACCIONES_PUT).to_numpy()
+    strike = spot * MONEYNESS_PUT
+
+    for h in horizontes:
+        th = t0 + h
+        valido = ok & (th < n)
+        futuro = np.where(valido, close[s0, np.minimum(th, n - 1)], np.nan)
+        ret = futuro / spot - 1
+        out[f"Ret {h}d"] = ret
+        con_put = valido & es_put & np.isfinite(sigma)
+        prima = bs_price(spot, strike, h / 252, r, np.where(con_put, sigma, 0.0), "PUT")
+        pnl_put = np.where(con_put, (np.maximum(strike - futuro, 0.0) - prima) / spot, np.nan)
+        out[f"PUT {h}d"] = pnl_put
+        out[f"Cubierto {h}d"] = ret + pnl_put
+    return out
+
+
+def valor_por_regla(atribucion: pd.DataFrame, horizontes: tuple[int, ...] = HORIZONTES) -> pd.DataFrame:
+    """
+    Una fila por ``Acción Tomada`` con la cantidad de decisiones y, por
+    horizonte, el retorno medio, el % de aciertos y el valor agregado:
+
+    - "Comprar PUT": P&L medio de la cobertura (positivo = cubrir sumó);
+    - "Ignorado": menos ese P&L (positivo = no cubrir ahorró prima);
+    - el resto: el retorno medio de mantener la posición.
+    """
+    df = atribucion
+    signo = np.select([df["Acción Tomada"] == "Comprar PUT", df["Acción Tomada"] == "Ignorado"], [1.0, -1.0], 0.0)
+    cols = {}
+    for h in horizontes:
+        ret, put = df[f"Ret {h}d"], df[f"PUT {h}d"]
+        cols[f"Ret {h}d"] = ret
+        cols[f"Aciertos {h}d"] = (ret > 0).where(ret.notna())
+        cols[f"Valor {h}d"] = np.where(signo != 0, signo * put, ret)
+    tabla = pd.DataFrame(cols, index=df.index).groupby(df["Acción Tomada"]).mean()
+    tabla.insert(0, "Decisiones", df.groupby("Acción Tomada").size())
+    return tabla
+
+
+def efectividad_cobertura(atribucion: pd.DataFrame, horizontes: tuple[int, ...] = HORIZONTES) -> pd.DataFrame:
+    """
+    Para las decisiones "Comprar PUT" con caída del subyacente: fracción de
+    la pérdida compensada por el PUT (``1 - pérdida cubierta / pérdida``)
+    y costo medio de la prima cuando el subyacente subió.
+    """
+    df = atribucion[atribucion["Acción Tomada"] == "Comprar PUT"]
+    filas = []
+    for h in horizontes:
+        ret, cub = df[f"Ret {h}d"], df[f"Cubierto {h}d"]
+        cae = ret < 0
+        perdida = -ret[cae].sum()
+        filas.append({
+            "Horizonte": f"{h}d",
+            "Con caída": int(cae.sum()),
+            "Pérdida compensada": 1 - (-cub[cae]).clip(lower=0).sum() / perdida if perdida > 0 else np.nan,
+            "Costo medio (sube)": -df.loc[ret >= 0, f"PUT {h}d"].mean(),
+        })
+    return pd.DataFrame(filas)
+
+
+def atribuir_historial(decisiones: pd.DataFrame, hoy=None) -> pd.DataFrame:
+    """
+    ``atribuir_decisiones`` con el panel diario de todos los tickers del
+    log, bajado en una sola llamada (``cargar_panel``, cacheada una hora).
+    """
+    if decisiones.empty:
+        return atribuir_decisiones(decisiones, {"symbols": [], "ts": np.array([], dtype=np.int64),
+                                                 "close": np.empty((0, 0))})
+    fechas = pd.to_datetime(decisiones["Fecha"])
+    tickers = tuple(sorted(decisiones["Ticker"].astype(str).str.strip().unique()))
+    inicio = (fechas.min() - pd.Timedelta(days=MARGEN_VOL)).strftime("%Y-%m-%d")
+    fin = pd.Timestamp(hoy or pd.Timestamp.today()).strftime("%Y-%m-%d")
+    return atribuir_decisiones(decisiones, cargar_panel(tickers, inicio, fin))
@@ -1,9 +1,75 @@
+import re
+
+import numpy as np
 import pandas as pd
-from yfinance import Ticker
 from utils.indicators import calc_mavilimw, calc_wae
+from utils.kernels import darvas_wae_kernels, shift
+from utils.ohlcv import OHLCV
+from utils.performance import factor_anual, metricas
+from utils.trend_state import robust_trend, trend_state
+from utils.instrumentation import instrumented
+from utils.providers import get_provider
+
+# Parámetros fijos de la estrategia (los mismos que usa la sección Darvas)
+DARVAS_DEFAULTS = {
+    "darvas_window": 5,
+    "sensitivity": 150,
+    "fast_ema": 20,
+    "slow_ema": 40,
+    "channel_len": 20,
+    "bb_mult": 2.0,
+}
+
+def retornos_estrategia(df_calc: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ``(retornos, posicion)`` por vela de seguir las señales finales (comprado
+    desde ``buy_final`` hasta ``sell_final``).  La posición es la que se
+    tenía al empezar cada vela: la señal de hoy rinde desde mañana.
+    """
+    close = df_calc["Close"].to_numpy(dtype=np.float64)
+    ret = np.zeros(len(close))
+    ret[1:] = close[1:] / close[:-1] - 1
+    signal = np.where(df_calc["buy_final"], 1, np.where(df_calc["sell_final"], 0, np.nan))
+    position = pd.Series(signal).ffill().fillna(0).to_numpy()
+    posicion = shift(position, 1)
+    return (posicion * ret)[1:], posicion[1:]
+
+
+def metricas_backtest(df_calc: pd.DataFrame, timeframe: str = "1d", symbol: str | None = None) -> dict:
+    """
+    Métricas de ``utils.performance`` de seguir las señales finales, más la
+    cantidad de compras y ventas.  `symbol` ajusta la anualización (las
+    cripto operan 24/7).
+    """
+    r, posicion = retornos_estrategia(df_calc)
+    m = metricas(r, factor_anual(timeframe, symbol), posicion)
+    m = {k: (float(v) if isinstance(v, np.floating) else int(v)) for k, v in m.items()}
+    # Sin variación (nunca compró) el Sharpe se informa como 0, como antes
+    m["sharpe"] = 0.0 if np.isnan(m["sharpe"]) else m["sharpe"]
+    return {
+        **m,
+        "compras": int(df_calc["buy_final"].sum()),
+        "ventas": int(df_calc["sell_final"].sum()),
+    }
+
+
+_UNIDADES_PERIODO = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+
+def _inicio_periodo(period: str, fin: pd.Timestamp) -> pd.Timestamp | None:
+    # Períodos de yfinance ('5d', '6mo', '1y', 'ytd', 'max') -> fecha de inicio
+    if period == "max":
+        return None
+    if period == "ytd":
+        return fin.replace(month=1, day=1)
+    n, unidad = re.fullmatch(r"(\d+)(d|wk|mo|y)", period).groups()
+    return fin - pd.DateOffset(**{_UNIDADES_PERIODO[unidad]: int(n)})
+
 
 def run_darvas_backtest(symbol, period='6mo'):
-    df = Ticker(symbol).history(period=period)
+    fin = pd.Timestamp.today().normalize()
+    inicio = _inicio_periodo(period, fin)
+    df = get_provider().llamar("history", symbol, "1d", inicio, None if inicio is None else fin)
     df['mav'] = calc_mavilimw(df)
     df = calc_wae(df)
     df['prev_close'] = df['Close'].shift(1)
@@ -14,25 +80,133 @@ def run_darvas_backtest(symbol, period='6mo'):
     df['sell_signal'] = (df['Close']<df['darvas_low'].shift(1))&(df['prev_close']>=df['darvas_low'].shift(1))
     return df
 
-def robust_trend_filter(df):
-    trend = pd.Series(False, index=df.index)
-    # Cuando hay valor en mavilimw, tendencia alcista si close > mavilimw (igual que antes)
-    trend[df['mavilimw'].notna()] = (
-        df.loc[df['mavilimw'].notna(), 'Close'] >
-        df.loc[df['mavilimw'].notna(), 'mavilimw']
+def robust_trend_filter(df, confirm: int = 3):
+    """
+    Tendencia alcista Close vs. mavilimw con confirmación de las primeras
+    velas (ver ``utils.trend_state.robust_trend``).  Funciona con cualquier
+    tipo de índice.
+    """
+    return robust_trend(df['Close'], df['mavilimw'], confirm=confirm)
+
+
+def _shift_bool(a: np.ndarray) -> np.ndarray:
+    # La primera vela no tiene tendencia previa: se toma como lateral (False)
+    out = np.zeros_like(a)
+    out[..., 1:] = a[..., :-1]
+    return out
+
+
+def darvas_signals_from_kernels(close: np.ndarray, k: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    Señales Darvas + MavilimW + WAE a partir de la salida de
+    ``darvas_wae_kernels``.  `close` es 1-D o ``(símbolos, tiempo)``, igual
+    que los kernels.
+    """
+    # Darvas Box: ruptura del máximo/mínimo de la vela anterior
+    prev_dh = shift(k['darvas_high'], 1)
+    prev_dl = shift(k['darvas_low'], 1)
+    prev_c = shift(close, 1)
+    buy_signal = (close > prev_dh) & (prev_c <= prev_dh)
+    sell_signal = (close < prev_dl) & (prev_c >= prev_dl)
+
+    # Estado de tendencia MavilimW: 1 alcista, -1 bajista, 0 lateral
+    # (trend_state trabaja con el tiempo en el eje 0)
+    state = trend_state(np.asarray(close).T, k['mavilimw'].T, lag=2).T
+    trend_up = state == 1
+    trend_down = state == -1
+
+    # Fuerza WAE
+    wae_filter_buy = (k['wae_trendUp'] > k['wae_e1']) & (k['wae_trendUp'] > k['wae_deadzone'])
+    wae_filter_sell = (k['wae_trendDown'] > k['wae_e1']) & (k['wae_trendDown'] > k['wae_deadzone'])
+
+    # Señales finales: primera señal tras lateralidad o cambio de tendencia
+    prev_up = _shift_bool(trend_up)
+    prev_down = _shift_bool(trend_down)
+    lateral = ~prev_up & ~prev_down
+    return {
+        'darvas_high': k['darvas_high'],
+        'darvas_low': k['darvas_low'],
+        'prev_dh': prev_dh,
+        'prev_dl': prev_dl,
+        'prev_c': prev_c,
+        'buy_signal': buy_signal,
+        'sell_signal': sell_signal,
+        'mavilimw': k['mavilimw'],
+        'trend_state': state,
+        'trend_up': trend_up,
+        'trend_down': trend_down,
+        'wae_trendUp': k['wae_trendUp'],
+        'wae_e1': k['wae_e1'],
+        'wae_deadzone': k['wae_deadzone'],
+        'wae_trendDown': k['wae_trendDown'],
+        'wae_filter_buy': wae_filter_buy,
+        'wae_filter_sell': wae_filter_sell,
+        'buy_final': buy_signal & trend_up & wae_filter_buy & (lateral | prev_down),
+        'sell_final': sell_signal & trend_down & wae_filter_sell & (lateral | prev_up),
+    }
+
+
+def darvas_signal_arrays(
+    data: OHLCV,
+    darvas_window: int = 5,
+    sensitivity: float = 150,
+    fast_ema: int = 20,
+    slow_ema: int = 40,
+    channel_len: int = 20,
+    bb_mult: float = 2.0,
+) -> dict[str, np.ndarray]:
+    """
+    Columnas Darvas + MavilimW + WAE y señales finales como arrays NumPy.
+
+    Los kernels y las señales se guardan como derivados de `data`: pedir de
+    nuevo los mismos parámetros no recalcula nada.  `data` no debe tener
+    velas con High/Low/Close NaN: las descargas ya llegan así
+    (``utils.data_quality``); para otros orígenes, ``OHLCV.dropna``.
+    """
+    params = (darvas_window, sensitivity, fast_ema, slow_ema, channel_len, bb_mult)
+
+    def _kernels(d: OHLCV):
+        return darvas_wae_kernels(
+            d.high, d.low, d.close,
+            darvas_window=darvas_window,
+            sensitivity=sensitivity,
+            fastLength=fast_ema,
+            slowLength=slow_ema,
+            channelLength=channel_len,
+            mult=bb_mult,
+        )
+
+    def _signals(d: OHLCV):
+        k = d.derived(("darvas_wae_kernels",) + params, _kernels)
+        return darvas_signals_from_kernels(d.close, k)
+
+    return data.derived(("darvas_signals",) + params, _signals)
+
+
+@instrumented("compute_darvas_signals")
+def compute_darvas_signals(
+    df: pd.DataFrame,
+    darvas_window: int = 5,
+    sensitivity: float = 150,
+    fast_ema: int = 20,
+    slow_ema: int = 40,
+    channel_len: int = 20,
+    bb_mult: float = 2.0,
+) -> pd.DataFrame:
+    """
+    Pipeline completo Darvas + MavilimW + WAE sobre un OHLCV con índice de fechas.
+
+    Envoltorio DataFrame de ``darvas_signal_arrays``: devuelve el DataFrame
+    de cálculo con columna ``Date`` y las señales ``buy_final`` / ``sell_final``.
+    """
+    data = OHLCV.from_frame(df)
+    cols = darvas_signal_arrays(
+        data,
+        darvas_window=darvas_window,
+        sensitivity=sensitivity,
+        fast_ema=fast_ema,
+        slow_ema=slow_ema,
+        channel_len=channel_len,
+        bb_mult=bb_mult,
     )
-    # Para primeras señales: si las últimas 3 velas (incluida la actual) 
-    # están por arriba de la primera mavilimw válida
-    first_valid = df['mavilimw'].first_valid_index()
-    if first_valid is not None and first_valid >= 2:
-        for i in range(first_valid - 2, first_valid + 1):
-            if (
-                i >= 0 and
-                all(
-                    df.loc[j, 'Close'] > df.loc[first_valid, 'mavilimw']
-                    for j in range(i, first_valid + 1)
-                )
-            ):
-                trend.iloc[i] = True
-
-    return trend
+    return data.to_frame(cols)
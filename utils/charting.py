@@ -0,0 +1,208 @@
+"""
+Gráficos de series largas: reducción al ancho en píxeles y caché del render.
+
+Un backtest intradía de varios años tiene cientos de miles de velas, pero un
+gráfico de 1200 px no puede mostrar más de ~2 puntos por píxel.  Antes de
+dibujar se eligen los índices a conservar con min/max por bucket (conserva
+exactamente picos y valles) o LTTB, y siempre se agregan las velas con
+señal.  La imagen resultante se cachea por un hash de los datos y de los
+parámetros, así los reruns que no cambian nada no vuelven a dibujar.
+"""
+import hashlib
+import io
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.instrumentation import instrumented
+
+DPI = 100
+ANCHO_MOVIL = 480
+
+
+def minmax_indices(values: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Índices del mínimo y máximo de cada bucket, para una o varias series
+    (array 1-D o ``(series, tiempo)``).  Ignora NaN.
+    """
+    y = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    n = y.shape[1]
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    pad = n_buckets * size - n
+    lo = np.pad(np.where(np.isnan(y), np.inf, y), ((0, 0), (0, pad)), constant_values=np.inf)
+    hi = np.pad(np.where(np.isnan(y), -np.inf, y), ((0, 0), (0, pad)), constant_values=-np.inf)
+    base = np.arange(n_buckets) * size
+    idx_min = lo.reshape(len(y), n_buckets, size).argmin(axis=2) + base
+    idx_max = hi.reshape(len(y), n_buckets, size).argmax(axis=2) + base
+    idx = np.concatenate([idx_min.ravel(), idx_max.ravel(), [0, n - 1]])
+    return np.unique(idx[idx < n])
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: elige `n_out` puntos que conservan la
+    forma visual de la serie.  El bucle es por bucket (``n_out`` pasos) y
+    cada bucket se evalúa vectorizado.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean() if nxt_hi > nxt_lo else x[-1]
+        avg_y = np.nanmean(y[nxt_lo:nxt_hi]) if nxt_hi > nxt_lo else y[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.nanargmax(area)) if np.isfinite(area).any() else lo
+        out[i + 1] = a
+    return out
+
+
+def downsample_indices(
+    df: pd.DataFrame,
+    y_cols: list[str],
+    width_px: int,
+    keep: np.ndarray | None = None,
+    method: str = "minmax",
+    x_col: str | None = None,
+) -> np.ndarray:
+    """
+    Posiciones de `df` a dibujar para un gráfico de `width_px` píxeles.
+    `keep` es una máscara booleana de filas que siempre se conservan
+    (p. ej. las señales de compra/venta).
+    """
+    n = len(df)
+    if method == "lttb":
+        x = (df[x_col].to_numpy().astype("datetime64[ns]").astype(np.int64)
+             if x_col else np.arange(n))
+        idx = lttb_indices(x, df[y_cols[0]].to_numpy(), 2 * width_px)
+    elif method == "minmax":
+        idx = minmax_indices(df[y_cols].to_numpy().T, width_px)
+    else:
+        raise ValueError(f"Método de reducción desconocido: {method}")
+    if keep is not None:
+        idx = np.union1d(idx, np.flatnonzero(np.asarray(keep, dtype=bool)))
+    return idx
+
+
+def fingerprint(df: pd.DataFrame, cols: list[str], *params) -> str:
+    """Hash estable de las columnas `cols` de `df` y de los parámetros dados."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pd.util.hash_pandas_object(df[cols], index=False).to_numpy().tobytes())
+    h.update(repr(params).encode())
+    return h.hexdigest()
+
+
+_DARVAS_COLS = ['Date', 'Close', 'darvas_high', 'darvas_low', 'mavilimw', 'buy_final', 'sell_final']
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _render_darvas_png(key: str, _df: pd.DataFrame, title: str, width_px: int, method: str) -> bytes:
+    # `_df` no lo hashea Streamlit: `key` ya resume datos y parámetros.
+    keep = (_df['buy_final'] | _df['sell_final']).to_numpy()
+    idx = downsample_indices(
+        _df, ['Close', 'darvas_high', 'darvas_low', 'mavilimw'], width_px,
+        keep=keep, method=method, x_col='Date',
+    )
+    d = _df.iloc[idx]
+
+    with matplotlib.rc_context({"path.simplify": True}):
+        fig, ax = plt.subplots(figsize=(width_px / DPI, 5), dpi=DPI)
+        ax.plot(d['Date'], d['Close'],       color='black', label='Cierre', zorder=1)
+        ax.plot(d['Date'], d['darvas_high'], linestyle='--', label='Darvas High', zorder=1)
+        ax.plot(d['Date'], d['darvas_low'],  linestyle='--', label='Darvas Low',  zorder=1)
+        ax.plot(d['Date'], d['mavilimw'],    linewidth=2, label='MavilimW',    zorder=2)
+        ax.scatter(
+            d.loc[d['buy_final'], 'Date'], d.loc[d['buy_final'], 'Close'],
+            marker='^', color='green', s=100, label='Señal Compra', zorder=3
+        )
+        ax.scatter(
+            d.loc[d['sell_final'], 'Date'], d.loc[d['sell_final'], 'Close'],
+            marker='v', color='red', s=100, label='Señal Venta', zorder=3
+        )
+        ax.set_title(title)
+        ax.set_xlabel("Fecha")
+        ax.set_ylabel("Precio")
+        ax.legend()
+        ax.tick_params(axis='x', labelrotation=20)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight")
+        plt.close(fig)
+    return buf.getvalue()
+
+
+@instrumented("grafico_darvas", kind="render")
+def grafico_darvas(df_calc: pd.DataFrame, title: str, width_px: int = 1200, method: str = "minmax") -> bytes:
+    """
+    PNG del backtest Darvas (cierre, caja Darvas, MavilimW y señales),
+    reducido a `width_px` y cacheado por hash de datos + parámetros.
+    """
+    key = fingerprint(df_calc, _DARVAS_COLS, title, width_px, method)
+    return _render_darvas_png(key, df_calc[_DARVAS_COLS], title, width_px, method)
+
+
+def ancho_grafico(ancho_px: int = 1200) -> int:
+    """`ancho_px`, o ``ANCHO_MOVIL`` si el navegador se identifica como móvil."""
+    try:
+        agente = st.context.headers.get("User-Agent", "")
+    except Exception:
+        agente = ""
+    return ANCHO_MOVIL if "Mobi" in agente else ancho_px
+
+
+@instrumented("figura_superficie_pnl", kind="render")
+def figura_superficie_pnl(sup: dict, i_shift: int, width_px: int, title: str, strike: float | None = None):
+    """
+    Mapa de calor P&L (precio × días restantes) con la curva de break-even.
+    Quien la muestra la cierra después (``plt.close``).
+    """
+    pnl = sup["pnl"][i_shift]
+    x, y = sup["precios"], sup["dias"]
+    lim = float(np.nanmax(np.abs(pnl))) or 1.0
+    fig, ax = plt.subplots(figsize=(width_px / DPI, 4), dpi=DPI)
+    img = ax.pcolormesh(x, y, pnl, cmap="RdYlGn", shading="auto",
+                        norm=matplotlib.colors.TwoSlopeNorm(0.0, -lim, lim))
+    if pnl.min() < 0 < pnl.max():
+        ax.contour(x, y, pnl, levels=[0.0], colors="black", linewidths=1)
+    if strike is not None:
+        ax.axvline(strike, color="gray", linestyle="--", linewidth=1)
+    fig.colorbar(img, ax=ax, label="P&L por acción (USD)")
+    ax.set_xlabel("Precio del subyacente (USD)")
+    ax.set_ylabel("Días restantes")
+    ax.set_title(title)
+    return fig
+
+
+def mostrar_tabla_paginada(df: pd.DataFrame, key: str, page_size: int = 500, **dataframe_kwargs):
+    """
+    Muestra `df` con ``st.dataframe`` de a `page_size` filas: sólo la página
+    visible viaja al navegador.  Las tablas chicas se muestran completas.
+    """
+    n = len(df)
+    if n <= page_size:
+        st.dataframe(df, **dataframe_kwargs)
+        return
+    n_pages = -(-n // page_size)
+    page = st.number_input(
+        f"Página (de {n_pages})", min_value=1, max_value=n_pages, value=n_pages,
+        step=1, key=f"{key}_page",
+    )
+    start = (int(page) - 1) * page_size
+    stop = min(start + page_size, n)
+    st.caption(f"Filas {start + 1:,}–{stop:,} de {n:,}")
+    st.dataframe(df.iloc[start:stop], **dataframe_kwargs)
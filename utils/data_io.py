@@ -2,9 +2,14 @@ import pandas as pd
 import streamlit as st
 from pathlib import Path
 from config import ARCHIVO_LOG
+from utils.instrumentation import contar_miss, instrumented
+from utils.shared_cache import shared_cache
 
-@st.cache_data(show_spinner=False)
-def cargar_historial() -> pd.DataFrame:
+# Espacio de la caché compartida: guardar_historial lo invalida en todos los procesos
+ESPACIO_HISTORIAL = "historial"
+
+
+def _leer_historial() -> pd.DataFrame:
     if ARCHIVO_LOG.exists():
         try:
             return pd.read_csv(ARCHIVO_LOG)
@@ -18,10 +23,21 @@ def cargar_historial() -> pd.DataFrame:
         columns=["Fecha", "Ticker", "Acción Tomada", "Rentabilidad %"]
     )
 
+@instrumented("cargar_historial", kind="cache")
+def cargar_historial() -> pd.DataFrame:
+    return _cargar_historial(shared_cache().generacion(ESPACIO_HISTORIAL))
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def _cargar_historial(generacion: int) -> pd.DataFrame:
+    # `generacion` cambia cuando cualquier proceso guarda el historial
+    contar_miss("cargar_historial")
+    return shared_cache().obtener(ESPACIO_HISTORIAL, str(ARCHIVO_LOG), _leer_historial)
+
 def guardar_historial(df: pd.DataFrame):
     """
-    Guarda el DataFrame en CSV y limpia la caché para que
-    cargar_historial recargue los datos actualizados.
+    Guarda el DataFrame en CSV e invalida el historial en la caché
+    compartida, así cargar_historial recarga en todos los procesos.
     """
     df.to_csv(ARCHIVO_LOG, index=False)
-    st.cache_data.clear()
+    shared_cache().invalidar(ESPACIO_HISTORIAL)
+    _cargar_historial.clear()
@@ -0,0 +1,375 @@
+"""
+Validación y reparación de OHLCV al ingresar.
+
+Cada descarga del proveedor pasa por aquí una sola vez, antes de llegar al
+almacén local (``utils.history_store``) o a las cachés (``cargar_panel``,
+la capa de datos de ``utils.pipeline_cache``): el resto de la app recibe
+velas ordenadas, sin duplicados ni precios rotos, y no repite
+``to_numeric``/``dropna`` por su cuenta.
+
+Igual que ``utils.kernels``, todo opera sobre arrays ``(símbolos, tiempo)``:
+una historia es un panel de un símbolo.  Los pasos:
+
+1. Índice: si no es creciente se ordena, y de los timestamps repetidos
+   queda la última vela (Yahoo repite la vela en curso).
+2. Velas inválidas: algún precio NaN o <= 0, o volumen 0 en un símbolo que
+   sí informa volumen (suspensiones, velas de relleno de Yahoo).  Se
+   tratan como faltantes.
+3. Picos (*bad prints*): filtro de Hampel por campo con una mediana móvil
+   centrada de ``VENTANA_PICOS`` velas.  Un precio a más de
+   ``UMBRAL_PICOS`` desvíos robustos (MAD) *y* a más de ``PICO_MIN`` de la
+   mediana se reemplaza por la mediana.  Un salto que se sostiene (un gap
+   por resultados) mueve la mediana y no se toca; las últimas velas, sin
+   ventana completa, no se juzgan: sin velas posteriores un pico y una
+   ruptura real son iguales.
+4. Coherencia: High y Low se llevan al máximo y mínimo de la vela.
+5. Huecos según la sesión del símbolo: en diario, los días hábiles de NYSE
+   (con sus feriados) para acciones, los de semana para forex y todos para
+   cripto; en intradía, las velas que faltan dentro de una misma sesión (en
+   cripto, en cualquier momento).
+6. Relleno (``RELLENOS``, por defecto ``GROWTHIA_RELLENO``): ``"no"``
+   descarta las velas faltantes (en un panel quedan NaN), ``"valores"`` las
+   reemplaza por una vela plana al último cierre con volumen 0 y
+   ``"huecos"`` además inserta así las velas de sesión que no llegaron (en
+   un panel, que comparte las fechas, equivale a ``"valores"``).
+
+Cada símbolo lleva su reporte (columnas ``REPORTE``): en una historia va en
+``df.attrs["calidad"]`` y en un panel en ``panel["calidad"]``, una fila por
+símbolo, y se cachea junto con los datos.
+"""
+import os
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+
+from utils.instrumentation import instrumented
+from utils.ohlcv import FIELDS
+from utils.sesiones import sesion_de
+
+RELLENOS = ("no", "valores", "huecos")
+RELLENO = os.getenv("GROWTHIA_RELLENO", "no")
+VENTANA_PICOS = 11
+UMBRAL_PICOS = 8.0
+PICO_MIN = 0.15  # desvío mínimo respecto de la mediana (15%)
+REPORTE = (
+    "velas", "duplicadas", "desordenado", "faltantes", "volumen_cero", "picos",
+    "incoherentes", "huecos", "hueco_max", "rellenadas", "descartadas",
+)
+
+_NS = 10**9
+_DIA = 86_400 * _NS
+_MAD = 1.4826  # MAD -> desvío estándar con datos normales
+_PRECIOS = ("open", "high", "low", "close")
+_COLUMNAS = ("Open", "High", "Low", "Close", "Volume")
+_BLOQUE = 1 << 22  # valores por bloque de ventanas en la mediana móvil
+_TEXTOS = {
+    "duplicadas": "duplicadas",
+    "faltantes": "inválidas",
+    "volumen_cero": "con volumen 0",
+    "picos": "picos corregidos",
+    "incoherentes": "High/Low corregidos",
+    "huecos": "faltantes en la sesión",
+    "rellenadas": "rellenadas",
+    "descartadas": "descartadas",
+}
+
+
+class FeriadosNYSE(AbstractHolidayCalendar):
+    """Feriados de la Bolsa de Nueva York (los cierres extraordinarios no se incluyen)."""
+
+    rules = [
+        Holiday("Año Nuevo", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday("Juneteenth", month=6, day=19, start_date="2022-01-01", observance=nearest_workday),
+        Holiday("Independencia", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Navidad", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+_FERIADOS = FeriadosNYSE()
+
+
+def _paso(intervalo: str) -> int | None:
+    # Semanal, mensual y multi-día: sin control de huecos
+    m = re.fullmatch(r"(\d+)(m|h|d)", intervalo)
+    if m is None or (m.group(2) == "d" and m.group(1) != "1"):
+        return None
+    return int(m.group(1)) * {"m": 60, "h": 3_600, "d": 86_400}[m.group(2)] * _NS
+
+
+def _dias_sesion(inicio: int, fin: int, sesion: str) -> np.ndarray:
+    inicio, fin = pd.Timestamp(inicio).normalize(), pd.Timestamp(fin).normalize()
+    if sesion == "cripto":
+        dias = pd.date_range(inicio, fin, freq="D")
+    elif sesion == "forex":
+        dias = pd.bdate_range(inicio, fin)
+    else:
+        dias = pd.bdate_range(inicio, fin, freq="C", holidays=_FERIADOS.holidays(inicio, fin))
+    return dias.as_unit("ns").asi8
+
+
+def _racha_max(posiciones: np.ndarray) -> int:
+    # Tramo más largo de posiciones consecutivas (ordenadas)
+    if not len(posiciones):
+        return 0
+    cortes = np.flatnonzero(np.diff(posiciones) != 1)
+    return int(np.diff(np.r_[-1, cortes, len(posiciones) - 1]).max())
+
+
+def huecos_de_sesion(ts, intervalo: str, sesion: str = "bolsa") -> tuple[np.ndarray, int]:
+    """
+    Timestamps (ns) de las velas de sesión que faltan entre la primera y la
+    última de `ts` (ordenado), y el tramo más largo de velas faltantes
+    seguidas.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    paso = _paso(intervalo)
+    if paso is None or len(ts) < 2:
+        return np.empty(0, np.int64), 0
+    if paso == _DIA:
+        dias = _dias_sesion(ts[0], ts[-1], sesion)
+        presentes = np.isin(dias, ts - ts % _DIA)
+        return dias[~presentes], _racha_max(np.flatnonzero(~presentes))
+
+    # Intradía: velas que caben entre dos consecutivas del mismo día de sesión
+    n = np.maximum(np.diff(ts) // paso - 1, 0)
+    if sesion != "cripto":
+        n[ts[1:] // _DIA != ts[:-1] // _DIA] = 0
+    k = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n) + 1
+    faltan = np.repeat(ts[:-1], n) + k * paso
+    return faltan, _racha_max(faltan // paso)
+
+
+def _mediana(v: np.ndarray) -> np.ndarray:
+    # Mediana del último eje: ``partition`` (sin NaN) y ``nanmedian`` sólo
+    # en las ventanas que tienen NaN
+    m = v.shape[-1] // 2
+    out = np.partition(v, m, axis=-1)[..., m]
+    con_nan = np.isnan(v).any(axis=-1)
+    if con_nan.any():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # ventanas enteras NaN
+            out[con_nan] = np.nanmedian(v[con_nan], axis=-1)
+    return out
+
+
+def mediana_movil(x: np.ndarray, ventana: int = VENTANA_PICOS) -> np.ndarray:
+    """
+    Mediana centrada de `ventana` velas (impar) a lo largo del último eje de
+    `x` ``(series, tiempo)``, ignorando NaN.  Donde la ventana no entra
+    completa (las primeras y últimas ``ventana // 2`` velas) es NaN.
+    """
+    k, n = x.shape
+    m = ventana // 2
+    out = np.full(x.shape, np.nan)
+    if n < ventana or k == 0:
+        return out
+    vistas = np.lib.stride_tricks.sliding_window_view(x, ventana, axis=1)
+    bloque = max(1, _BLOQUE // (k * ventana))
+    for i in range(0, vistas.shape[1], bloque):
+        v = vistas[:, i:i + bloque]
+        out[:, m + i:m + i + v.shape[1]] = _mediana(v)
+    return out
+
+
+def _picos(x: np.ndarray, med: np.ndarray) -> np.ndarray:
+    """
+    Filtro de Hampel: el MAD de la ventana se calcula sólo donde el precio
+    ya se aparta más de ``PICO_MIN`` de la mediana (pocas velas).
+    """
+    desvio = np.abs(x - med)
+    with np.errstate(invalid="ignore"):
+        filas, cols = np.nonzero(desvio > PICO_MIN * med)
+    pico = np.zeros(x.shape, bool)
+    if len(filas):
+        ventanas = np.lib.stride_tricks.sliding_window_view(desvio, VENTANA_PICOS, axis=1)
+        mad = _mediana(ventanas[filas, cols - VENTANA_PICOS // 2])
+        pico[filas, cols] = desvio[filas, cols] > UMBRAL_PICOS * _MAD * mad
+    return pico
+
+
+def _ordenar(ts: np.ndarray, campos: dict[str, np.ndarray]):
+    """Ordena por tiempo y deja la última vela de cada timestamp repetido."""
+    desordenado = bool(len(ts) > 1 and np.any(np.diff(ts) < 0))
+    if desordenado:
+        orden = np.argsort(ts, kind="stable")
+        ts, campos = ts[orden], {f: a[:, orden] for f, a in campos.items()}
+    ultima = np.r_[ts[1:] != ts[:-1], True] if len(ts) else np.ones(0, bool)
+    duplicadas = int((~ultima).sum())
+    if duplicadas:
+        ts, campos = ts[ultima], {f: a[:, ultima] for f, a in campos.items()}
+    return ts, campos, desordenado, duplicadas
+
+
+def _reparar(campos: dict[str, np.ndarray], presente: np.ndarray, rellenar: bool):
+    """
+    Pasos 2 a 4 (y el relleno de ``"valores"``) sobre arrays ``(símbolos,
+    tiempo)``.  `presente` marca las velas que llegaron (alguna columna no
+    NaN).  Devuelve los campos reparados y los conteos por símbolo.
+    """
+    o, h, l, c, v = (campos[f] for f in FIELDS)
+    precios_ok = (o > 0) & (h > 0) & (l > 0) & (c > 0)
+    volumen_cero = presente & precios_ok & (v == 0)
+    con_volumen = (v > 0).sum(axis=1) > presente.sum(axis=1) / 2
+    faltante = presente & (~precios_ok | (volumen_cero & con_volumen[:, None]))
+    vacio = ~presente | faltante
+    out = {f: np.where(vacio, np.nan, campos[f]) for f in FIELDS}
+
+    picos = np.zeros(vacio.shape, bool)
+    for f in _PRECIOS:
+        med = mediana_movil(out[f])
+        pico = _picos(out[f], med)
+        out[f] = np.where(pico, med, out[f])
+        picos |= pico
+
+    o, h, l, c = (out[f] for f in _PRECIOS)
+    alto = np.maximum.reduce([o, h, l, c])
+    bajo = np.minimum.reduce([o, h, l, c])
+    incoherentes = (h < alto) | (l > bajo)
+    out["high"], out["low"] = alto, bajo
+
+    rellenadas = np.zeros(vacio.shape, bool)
+    if rellenar:
+        # Vela plana al último cierre válido (las previas a la primera quedan NaN)
+        n = vacio.shape[1]
+        ultimo = np.where(vacio, -1, np.arange(n))
+        np.maximum.accumulate(ultimo, axis=1, out=ultimo)
+        rellenadas = vacio & (ultimo >= 0)
+        previo = np.take_along_axis(out["close"], np.maximum(ultimo, 0), axis=1)
+        for f in _PRECIOS:
+            out[f] = np.where(rellenadas, previo, out[f])
+        out["volume"] = np.where(rellenadas, 0.0, out["volume"])
+
+    cuenta = {
+        "faltantes": faltante.sum(axis=1),
+        "volumen_cero": volumen_cero.sum(axis=1),
+        "picos": picos.sum(axis=1),
+        "incoherentes": incoherentes.sum(axis=1),
+        "rellenadas": rellenadas.sum(axis=1),
+    }
+    return out, cuenta
+
+
+def _validar_relleno(relleno: str) -> None:
+    if relleno not in RELLENOS:
+        raise ValueError(f"Relleno desconocido: {relleno} (opciones: {', '.join(RELLENOS)})")
+
+
+@instrumented("validar_historia")
+def validar_historia(
+    df: pd.DataFrame,
+    symbol: str = "",
+    intervalo: str = "1d",
+    relleno: str = RELLENO,
+) -> pd.DataFrame:
+    """
+    Historia de `symbol` (índice de fechas, columnas Open..Volume) validada
+    y reparada, con el reporte en ``attrs["calidad"]`` (ver el docstring
+    del módulo).  Las columnas quedan en float64 y el índice como ``Date``.
+    """
+    _validar_relleno(relleno)
+    idx = pd.DatetimeIndex(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    campos = {f: df[c].to_numpy(dtype=np.float64)[None, :] for f, c in zip(FIELDS, _COLUMNAS)}
+    ts, campos, desordenado, duplicadas = _ordenar(idx.as_unit("ns").asi8, campos)
+    presente = ~np.all([np.isnan(a[0]) for a in campos.values()], axis=0)
+
+    faltan, hueco_max = huecos_de_sesion(ts[presente], intervalo, sesion_de(symbol))
+    if relleno == "huecos" and len(faltan):
+        nuevos = np.setdiff1d(faltan, ts)
+        orden = np.argsort(np.concatenate([ts, nuevos]), kind="stable")
+        ts = np.concatenate([ts, nuevos])[orden]
+        presente = np.concatenate([presente, np.zeros(len(nuevos), bool)])[orden]
+        campos = {f: np.concatenate([a, np.full((1, len(nuevos)), np.nan)], axis=1)[:, orden]
+                  for f, a in campos.items()}
+
+    campos, cuenta = _reparar(campos, presente[None, :], relleno != "no")
+    queda = ~np.isnan(campos["close"][0])
+    out = pd.DataFrame(
+        {c: campos[f][0, queda] for f, c in zip(FIELDS, _COLUMNAS)},
+        index=pd.DatetimeIndex(ts[queda].view("datetime64[ns]"), name="Date"),
+    )
+    out.attrs["calidad"] = {
+        "simbolo": symbol,
+        "intervalo": intervalo,
+        "relleno": relleno,
+        "velas": int(queda.sum()),
+        "duplicadas": duplicadas,
+        "desordenado": desordenado,
+        **{k: int(v[0]) for k, v in cuenta.items()},
+        "huecos": len(faltan),
+        "hueco_max": hueco_max,
+        "descartadas": int((~queda).sum()),
+    }
+    return out
+
+
+@instrumented("validar_panel")
+def validar_panel(panel: dict, intervalo: str = "1d", relleno: str = RELLENO) -> dict:
+    """
+    Panel ``(símbolos, tiempo)`` de ``market_data.panel_desde_frame``
+    validado y reparado en una pasada para todos los símbolos, con el
+    reporte en ``panel["calidad"]``.  Las fechas son comunes: las que le
+    faltan a un símbolo entre su primera y última vela cuentan como huecos
+    suyos, además de los días de sesión que no trae ningún símbolo.
+    """
+    _validar_relleno(relleno)
+    campos = {f: np.asarray(panel[f], dtype=np.float64) for f in FIELDS}
+    ts, campos, desordenado, duplicadas = _ordenar(np.asarray(panel["ts"], dtype=np.int64), campos)
+    presente = ~np.all([np.isnan(a) for a in campos.values()], axis=0)
+
+    # Huecos propios de cada símbolo dentro de las fechas del panel
+    t = np.arange(len(ts))
+    desde = np.maximum.accumulate(presente, axis=1)
+    hasta = np.maximum.accumulate(presente[:, ::-1], axis=1)[:, ::-1]
+    interior = ~presente & desde & hasta
+    ultimo_presente = np.maximum.accumulate(np.where(interior, -1, t), axis=1)
+    racha = np.where(interior, t - ultimo_presente, 0).max(axis=1, initial=0)
+    sesiones = [sesion_de(s) for s in panel["symbols"]]
+    comunes = {s: huecos_de_sesion(ts, intervalo, s) for s in set(sesiones)}
+
+    campos, cuenta = _reparar(campos, presente, relleno != "no")
+    validas = ~np.isnan(campos["close"])
+    calidad = pd.DataFrame(
+        {
+            "velas": validas.sum(axis=1),
+            "duplicadas": duplicadas,
+            "desordenado": desordenado,
+            **cuenta,
+            "huecos": interior.sum(axis=1) + np.array([len(comunes[s][0]) for s in sesiones], dtype=int),
+            "hueco_max": np.maximum(racha, np.array([comunes[s][1] for s in sesiones], dtype=int)),
+            "descartadas": (presente & ~validas).sum(axis=1),
+        },
+        index=pd.Index(panel["symbols"], name="simbolo"),
+    )[list(REPORTE)]
+    return {**panel, **{f: np.ascontiguousarray(a) for f, a in campos.items()}, "ts": ts, "calidad": calidad}
+
+
+def resumen(reporte) -> str:
+    """Una línea con las correcciones de un reporte (dict o fila de ``panel["calidad"]``)."""
+    partes = [f"{int(reporte[c])} {texto}" for c, texto in _TEXTOS.items() if reporte.get(c)]
+    if reporte.get("hueco_max", 0) > 1:
+        partes.append(f"hasta {int(reporte['hueco_max'])} velas seguidas sin datos")
+    if reporte.get("desordenado"):
+        partes.append("índice reordenado")
+    return "Calidad de datos: " + (" · ".join(partes) if partes else "sin correcciones")
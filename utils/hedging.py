@@ -0,0 +1,197 @@
+"""
+Optimizador de coberturas con PUTs para el portafolio.
+
+Busca la combinación de PUTs (vencimiento, strike, contratos por posición)
+más barata que deja la pérdida del portafolio a `horizonte` días, en el
+cuantil `nivel` de escenarios Monte Carlo, por debajo de un piso (fracción
+del valor total).  Cada PUT candidato se valúa al horizonte en todos los
+escenarios de una vez con ``bs_price`` (matriz escenarios × candidatos).
+
+La búsqueda recorre la grilla (vencimiento, moneyness): para cada punto
+encuentra por bisección la menor fracción cubierta de cada posición que
+cumple el piso, se queda con el punto más barato y después retira, de a
+una, las coberturas cuyo ahorro de prima no rompe el piso (las posiciones
+que menos aportan a la cola).  Todo con tiempo acotado por `tiempo_max`.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import instrumented
+from utils.options import bs_price
+
+CONTRATO = 100  # acciones por contrato
+
+
+def escenarios_montecarlo(rets: np.ndarray, horizonte: int, n_sims: int = 4000, seed: int = 0) -> np.ndarray:
+    """
+    Relaciones de precio ``S_h / S_0`` ``(escenarios, símbolos)`` a
+    `horizonte` velas, log-normales con la media y covarianza diarias de
+    `rets` ``(símbolos, tiempo)``.
+    """
+    log = np.log1p(np.atleast_2d(rets))
+    mu = log.mean(axis=1) * horizonte
+    cov = np.atleast_2d(np.cov(log)) * horizonte
+    rng = np.random.default_rng(seed)
+    return np.exp(rng.multivariate_normal(mu, cov, size=n_sims, method="eigh"))
+
+
+MONEYNESS = (0.80, 0.85, 0.90, 0.95, 1.00)
+
+
+def candidatos_put(
+    cadena: pd.DataFrame,
+    spot: float,
+    horizonte: int,
+    moneyness: tuple[float, ...] = MONEYNESS,
+    max_vencimientos: int = 3,
+) -> pd.DataFrame:
+    """
+    PUTs de `cadena` (formato ``cargar_cadena_opciones``) para la grilla de
+    búsqueda: en cada uno de los `max_vencimientos` vencimientos más
+    cercanos posteriores al horizonte, el strike más próximo a cada
+    ``moneyness * spot``.  Agrega ``venc_idx`` y ``m_idx`` (posición en la
+    grilla).
+    """
+    c = cadena[(cadena["tipo"] == "PUT") & (cadena["T"] * 365 >= horizonte)]
+    c = c[(c["bid"] > 0) & (c["ask"] >= c["bid"]) & (c["impliedVolatility"] > 0)]
+    partes = []
+    for e_idx, e in enumerate(np.sort(c["expiry"].unique())[:max_vencimientos]):
+        v = c[c["expiry"] == e]
+        objetivos = np.asarray(moneyness) * spot
+        pos = np.abs(v["strike"].to_numpy()[:, None] - objetivos).argmin(axis=0)
+        fila = v.iloc[pos].copy()
+        fila["venc_idx"] = e_idx
+        fila["m_idx"] = np.arange(len(objetivos))
+        partes.append(fila)
+    return pd.concat(partes, ignore_index=True) if partes else c.iloc[:0].assign(venc_idx=0, m_idx=0)
+
+
+def _perdida(pnl: np.ndarray, k: int) -> np.ndarray:
+    # Pérdida en el cuantil: k-ésimo peor P&L (a lo largo del eje 0)
+    return -np.partition(pnl, k, axis=0)[k]
+
+
+@instrumented("optimizar_coberturas")
+def optimizar_coberturas(
+    valores: np.ndarray,
+    ratios: np.ndarray,
+    spots: np.ndarray,
+    candidatos: pd.DataFrame,
+    tope_contratos: dict[int, int],
+    piso: float = 0.10,
+    nivel: float = 0.95,
+    horizonte: int = 30,
+    r: float = 0.04,
+    tiempo_max: float = 5.0,
+) -> dict:
+    """
+    Coberturas que llevan la pérdida al cuantil `nivel` por debajo de
+    ``piso * valores.sum()`` gastando la menor prima posible.
+
+    - `valores`: USD por columna de `ratios` (0 para un proxy como SPY).
+    - `ratios`: ``S_h / S_0`` por escenario (``escenarios_montecarlo``).
+    - `candidatos`: salida de ``candidatos_put`` más las columnas ``col``
+      (columna de `ratios` del subyacente) y ``Subyacente``.
+    - `tope_contratos`: máximo de contratos por columna (cubrir el 100%
+      de la posición, sin sobrecubrir).
+
+    Devuelve ``coberturas`` (DataFrame), ``perdida_inicial``,
+    ``perdida_final``, ``objetivo``, ``prima`` (USD), ``cumple`` y
+    ``politica`` (``venc_idx``/``m_idx`` del punto de grilla elegido).  La pérdida final ya
+    descuenta la prima pagada.
+    """
+    t0 = time.perf_counter()
+    valores = np.asarray(valores, dtype=np.float64)
+    k = int(np.floor((1 - nivel) * ratios.shape[0]))
+    objetivo = piso * valores.sum()
+
+    pnl0 = (ratios - 1) @ valores
+    perdida_inicial = float(_perdida(pnl0, k))
+    vacio = {
+        "coberturas": pd.DataFrame(columns=["Subyacente", "Vencimiento", "Strike", "Contratos", "Prima", "Costo total"]),
+        "perdida_inicial": perdida_inicial, "perdida_final": perdida_inicial, "objetivo": float(objetivo),
+        "prima": 0.0, "cumple": perdida_inicial <= objetivo, "politica": None,
+    }
+    if perdida_inicial <= objetivo or candidatos.empty:
+        return vacio
+
+    col = candidatos["col"].to_numpy()
+    # Valor de cada PUT al horizonte en cada escenario (escenarios × candidatos)
+    valor_h = bs_price(
+        spots[col] * ratios[:, col], candidatos["strike"].to_numpy(),
+        candidatos["T"].to_numpy() - horizonte / 365, r,
+        candidatos["impliedVolatility"].to_numpy(), "PUT",
+    ) * CONTRATO
+    costo = candidatos["mid"].to_numpy() * CONTRATO
+    resultado = valor_h - costo
+    tope = np.array([tope_contratos.get(c, 0) for c in col], dtype=np.float64)
+
+    def _evaluar(filas: np.ndarray, h: float):
+        q = np.floor(h * tope[filas])
+        pnl = pnl0 + resultado[:, filas] @ q
+        return float(_perdida(pnl, k)), float(costo[filas] @ q), q
+
+    # 1) Grilla (vencimiento, moneyness) + bisección de la fracción cubierta
+    mejor = None
+    for (e, m), grupo in candidatos.groupby(["venc_idx", "m_idx"]):
+        if time.perf_counter() - t0 > tiempo_max:
+            break
+        filas = grupo.index.to_numpy()
+        perdida, prima, q = _evaluar(filas, 1.0)
+        if perdida > objetivo:
+            if mejor is None or (not mejor["cumple"] and perdida < mejor["perdida"]):
+                mejor = {"filas": filas, "q": q, "perdida": perdida, "prima": prima, "cumple": False, "grilla": (e, m)}
+            continue
+        lo, hi = 0.0, 1.0
+        for _ in range(12):
+            h = (lo + hi) / 2
+            if _evaluar(filas, h)[0] <= objetivo:
+                hi = h
+            else:
+                lo = h
+        perdida, prima, q = _evaluar(filas, hi)
+        if mejor is None or not mejor["cumple"] or prima < mejor["prima"]:
+            mejor = {"filas": filas, "q": q, "perdida": perdida, "prima": prima, "cumple": True, "grilla": (e, m)}
+
+    if mejor is None:
+        return vacio
+
+    # 2) Retirar coberturas prescindibles, la de mayor prima primero
+    filas, q = mejor["filas"], mejor["q"].copy()
+    pnl = pnl0 + resultado[:, filas] @ q
+    while mejor["cumple"] and time.perf_counter() - t0 < tiempo_max:
+        activas = np.flatnonzero(q > 0)
+        if not len(activas):
+            break
+        sin = pnl[:, None] - resultado[:, filas[activas]] * q[activas]
+        ok = _perdida(sin, k) <= objetivo
+        if not ok.any():
+            break
+        ahorro = np.where(ok, costo[filas[activas]] * q[activas], -np.inf)
+        i = int(np.argmax(ahorro))
+        pnl = sin[:, i]
+        q[activas[i]] = 0
+
+    perdida = float(_perdida(pnl, k))
+    usadas = q > 0
+    sel = candidatos.loc[filas[usadas]]
+    prima_total = costo[filas[usadas]] * q[usadas]
+    coberturas = pd.DataFrame({
+        "Subyacente": sel["Subyacente"].to_numpy(),
+        "Vencimiento": sel["expiry"].to_numpy(),
+        "Strike": sel["strike"].to_numpy(),
+        "Contratos": q[usadas].astype(np.int64),
+        "Prima": sel["mid"].to_numpy(),
+        "Costo total": prima_total,
+    })
+    return {
+        "coberturas": coberturas.sort_values("Costo total", ascending=False).reset_index(drop=True),
+        "perdida_inicial": perdida_inicial,
+        "perdida_final": perdida,
+        "objetivo": float(objetivo),
+        "prima": float(prima_total.sum()),
+        "cumple": bool(perdida <= objetivo),
+        "politica": {"venc_idx": int(mejor["grilla"][0]), "m_idx": int(mejor["grilla"][1])},
+    }
@@ -0,0 +1,175 @@
+"""
+Almacén en disco de históricos intradía con archivos memory-mapped.
+
+Cada símbolo/intervalo/campo es un archivo binario de ancho fijo
+(``<root>/<símbolo>/<intervalo>/<campo>.bin``): ``ts`` en int64 (ns) y
+``open``/``high``/``low``/``close``/``volume`` en float64.  Sólo se agregan
+velas al final (append-only), salvo la última guardada, que se reescribe si
+vuelve a llegar: una sincronización en horario de mercado guarda la vela
+todavía en formación y la siguiente la corrige.  Un índice ralo ``ts.sidx``
+guarda el
+timestamp de una de cada ``STRIDE`` velas, así una consulta por rango
+ubica el tramo pedido tocando sólo unas pocas páginas del archivo.
+
+``read`` devuelve un ``OHLCV`` cuyos arrays son vistas sobre los memmaps:
+abrir un año de velas de 1m no lee el archivo, y la memoria residente sólo
+crece con las páginas del tramo que efectivamente se usa.
+
+Las escrituras de un símbolo/intervalo se serializan con ``bloqueo``: un
+``RLock`` por directorio entre los hilos del proceso y ``flock`` sobre
+``.lock`` entre procesos.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.ohlcv import FIELDS, OHLCV
+
+try:
+    import fcntl
+except ImportError:  # Windows: sólo se excluyen los hilos del proceso
+    fcntl = None
+
+STRIDE = 4096
+_DTYPES = {"ts": np.int64, **{f: np.float64 for f in FIELDS}}
+DEFAULT_ROOT = Path(
+    os.getenv("GROWTHIA_STORE_DIR", Path(__file__).resolve().parent.parent / "data" / "store")
+)
+
+
+_locks: dict[str, threading.RLock] = {}
+_locks_guard = threading.Lock()
+_tomados = threading.local()
+
+
+def _safe(name: str) -> str:
+    return name.replace("/", "_").replace("\\", "_")
+
+
+class HistoryStore:
+    def __init__(self, root: Path | str = DEFAULT_ROOT):
+        self.root = Path(root)
+
+    def _dir(self, symbol: str, interval: str) -> Path:
+        return self.root / _safe(symbol) / _safe(interval)
+
+    def _len(self, d: Path) -> int:
+        # Los campos se escriben antes que `ts`: el largo válido es el mínimo,
+        # así una escritura interrumpida no deja velas a medias visibles.
+        sizes = []
+        for name, dtype in _DTYPES.items():
+            path = d / f"{name}.bin"
+            if not path.exists():
+                return 0
+            sizes.append(path.stat().st_size // np.dtype(dtype).itemsize)
+        return min(sizes)
+
+    def _map(self, d: Path, name: str, n: int) -> np.ndarray:
+        if n == 0:
+            return np.empty(0, dtype=_DTYPES[name])
+        return np.memmap(d / f"{name}.bin", dtype=_DTYPES[name], mode="r", shape=(n,))
+
+    def symbols(self) -> list[str]:
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.exists() else []
+
+    def bounds(self, symbol: str, interval: str) -> tuple[int, int] | None:
+        """Primer y último timestamp (ns) guardados, o ``None`` si no hay datos."""
+        d = self._dir(symbol, interval)
+        n = self._len(d)
+        if n == 0:
+            return None
+        ts = self._map(d, "ts", n)
+        return int(ts[0]), int(ts[-1])
+
+    def _locate(self, d: Path, ts: np.ndarray, t: int, side: str) -> int:
+        sidx_path = d / "ts.sidx"
+        if not sidx_path.exists():
+            return int(np.searchsorted(ts, t, side))
+        sidx = np.fromfile(sidx_path, dtype=np.int64)
+        # Bloque candidato por el índice ralo; luego búsqueda sólo en ese bloque
+        block = max(int(np.searchsorted(sidx, t, side)) - 1, 0)
+        lo = block * STRIDE
+        hi = min(lo + 2 * STRIDE, len(ts))
+        return min(lo + int(np.searchsorted(ts[lo:hi], t, side)), len(ts))
+
+    def read(self, symbol: str, interval: str, start=None, end=None) -> OHLCV:
+        """Velas con ``start <= fecha <= end`` como vistas sobre los memmaps."""
+        d = self._dir(symbol, interval)
+        n = self._len(d)
+        ts = self._map(d, "ts", n)
+        lo = 0 if start is None or n == 0 else self._locate(d, ts, pd.Timestamp(start).value, "left")
+        hi = n if end is None or n == 0 else self._locate(d, ts, pd.Timestamp(end).value, "right")
+        cols = {f: self._map(d, f, n)[lo:hi] for f in FIELDS}
+        return OHLCV(ts[lo:hi], **cols)
+
+    @contextmanager
+    def bloqueo(self, symbol: str, interval: str):
+        """
+        Exclusión sobre las escrituras de `symbol`/`interval` entre hilos y
+        procesos.  Es reentrante en el mismo hilo, así se puede sostener
+        durante una secuencia leer límites → descargar → ``append``.
+        """
+        d = self._dir(symbol, interval)
+        d.mkdir(parents=True, exist_ok=True)
+        clave = str(d.resolve())
+        with _locks_guard:
+            lock = _locks.setdefault(clave, threading.RLock())
+        with lock:
+            tomados = _tomados.__dict__.setdefault("claves", set())
+            if fcntl is None or clave in tomados:
+                yield
+                return
+            with open(d / ".lock", "a+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)  # se libera al cerrar el archivo
+                tomados.add(clave)
+                try:
+                    yield
+                finally:
+                    tomados.discard(clave)
+
+    def append(self, symbol: str, interval: str, data: OHLCV) -> int:
+        """
+        Agrega al final las velas de `data` posteriores a la última guardada
+        y reescribe esa última si `data` la trae (pudo guardarse en
+        formación); las anteriores se ignoran.  Devuelve la cantidad de velas
+        agregadas.
+        """
+        with self.bloqueo(symbol, interval):
+            return self._agregar(self._dir(symbol, interval), data)
+
+    def _agregar(self, d: Path, data: OHLCV) -> int:
+        n = self._len(d)
+        last = int(self._map(d, "ts", n)[-1]) if n else None
+        i = 0 if last is None else int(np.searchsorted(data.ts, last, "left"))
+        if last is not None and i < len(data) and data.ts[i] == last:
+            for name in FIELDS:
+                itemsize = np.dtype(_DTYPES[name]).itemsize
+                with open(d / f"{name}.bin", "r+b") as f:
+                    f.seek((n - 1) * itemsize)
+                    f.write(np.asarray(getattr(data, name)[i], dtype=_DTYPES[name]).tobytes())
+            i += 1
+        nuevo = data[i:]
+        if len(nuevo) == 0:
+            return 0
+        if np.any(np.diff(nuevo.ts) <= 0):
+            raise ValueError("Los timestamps a agregar deben ser estrictamente crecientes")
+
+        for name in FIELDS + ("ts",):
+            path = d / f"{name}.bin"
+            # Descarta colas de una escritura interrumpida antes de agregar
+            if path.exists() and path.stat().st_size != n * np.dtype(_DTYPES[name]).itemsize:
+                with open(path, "r+b") as f:
+                    f.truncate(n * np.dtype(_DTYPES[name]).itemsize)
+            with open(path, "ab") as f:
+                f.write(np.ascontiguousarray(getattr(nuevo, name), dtype=_DTYPES[name]).tobytes())
+
+        posiciones = np.arange(n, n + len(nuevo))
+        marcas = posiciones % STRIDE == 0
+        if marcas.any():
+            with open(d / "ts.sidx", "ab") as f:
+                f.write(nuevo.ts[marcas].astype(np.int64).tobytes())
+        return len(nuevo)
@@ -0,0 +1,259 @@
+"""
+Escáner de ingresos con opciones: covered calls y cash-secured puts sobre
+una lista de tickers (las tenencias del Excel o el S&P 500).
+
+- ``cargar_cadenas`` baja las cadenas de todos los tickers a la vez en el
+  loop del proveedor: a lo sumo ``CONCURRENCIA_TICKERS`` tickers en vuelo
+  (acota la memoria) y el semáforo del proveedor acota las llamadas al
+  backend.  Cada cadena queda en un ``CacheLRU`` por proceso durante
+  ``TTL_CADENAS`` segundos, así un segundo escaneo (o uno que comparte
+  tickers) no vuelve a la red.
+- ``IndiceCadenas`` junta todas las cadenas en un bloque ordenado por
+  ``(ticker, vencimiento, tipo, strike)``; la clave ``grupo + strike/escala``
+  es creciente, así que los strikes de cualquier grupo en un rango salen de
+  un solo ``np.searchsorted`` vectorizado para todos los grupos.  El
+  índice de cada watchlist también se cachea (``indice_cadenas``).  Las
+  cadenas se piden siempre hasta ``DIAS_MAX`` días y el rango de días se
+  filtra en ``candidatos``: con las cadenas en caché, cambiar cualquier
+  filtro (también los días) sólo re-rankea.
+- ``candidatos`` valúa los contratos en rango con ``bs_delta`` vectorizada
+  y los ordena por rendimiento anualizado × probabilidad OTM × liquidez.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.instrumentation import instrumented, timed
+from utils.market_data import CADENA_COLS, _cadena_completa, cargar_panel
+from utils.options import bs_delta
+from utils.pipeline_cache import CacheLRU
+from utils.providers import get_provider
+
+TTL_CADENAS = 300  # igual que cargar_cadena_opciones
+DIAS_MAX = 120  # horizonte fijo de las cadenas (el máximo del filtro de días)
+CACHE_MB = float(os.getenv("GROWTHIA_CADENAS_CACHE_MB", "128"))
+CONCURRENCIA_TICKERS = 32
+# Interés abierto a partir del cual la liquidez no penaliza
+OI_REFERENCIA = 1_000
+
+ESTRATEGIAS = {"Covered call": "CALL", "Cash-secured put": "PUT"}
+COLUMNAS = [
+    "Ticker", "Estrategia", "Vencimiento", "Días", "Spot", "Strike", "OTM %", "Prima",
+    "Rend. anual %", "Prob. OTM %", "Spread %", "OI", "Puntaje",
+]
+
+
+@st.cache_resource
+def cache_cadenas() -> CacheLRU:
+    """Cadenas por ``(ticker, dias_max)``, compartidas por todas las sesiones."""
+    return CacheLRU("cadenas", CACHE_MB * 2**20, ttl=TTL_CADENAS)
+
+
+@st.cache_resource
+def cache_indices() -> CacheLRU:
+    """``IndiceCadenas`` por watchlist; vence junto con las cadenas."""
+    return CacheLRU("indices", CACHE_MB * 2**20, ttl=TTL_CADENAS)
+
+
+async def _cadenas(provider, tickers: list[str], dias_max: int, limite: int) -> list:
+    semaforo = asyncio.Semaphore(limite)
+
+    async def una(ticker):
+        async with semaforo:
+            try:
+                return await _cadena_completa(provider, ticker, dias_max)
+            except Exception:
+                return None  # sin opciones o error del backend: se omite
+
+    return await asyncio.gather(*(una(t) for t in tickers))
+
+
+@instrumented("cargar_cadenas", kind="data")
+def cargar_cadenas(
+    tickers: list[str],
+    dias_max: int = DIAS_MAX,
+    cache: CacheLRU | None = None,
+    limite: int = CONCURRENCIA_TICKERS,
+) -> dict[str, pd.DataFrame]:
+    """
+    Cadena de cada ticker (columnas ``CADENA_COLS``), desde el caché o
+    descargando en paralelo sólo las que faltan.  Los tickers sin cadena
+    no aparecen en el resultado.
+    """
+    cache = cache if cache is not None else cache_cadenas()
+    out, faltan = {}, []
+    with timed("pipeline.cadenas", kind="cache"):
+        for t in dict.fromkeys(tickers):
+            df = cache.get((t, dias_max))
+            if df is None:
+                faltan.append(t)
+            else:
+                out[t] = df
+    if faltan:
+        provider = get_provider()
+        with timed(f"{provider.nombre}.option_chain", kind=provider.kind):
+            cadenas = provider.run(_cadenas(provider, faltan, dias_max, limite))
+        for t, df in zip(faltan, cadenas):
+            if df is None:
+                continue
+            # Las cadenas vacías también se guardan: no se vuelven a pedir hasta el TTL
+            cache.put((t, dias_max), df)
+            out[t] = df
+    return {t: df for t, df in out.items() if not df.empty}
+
+
+def spots(tickers: list[str]) -> pd.Series:
+    """Último cierre de cada ticker (panel diario cacheado de la última semana)."""
+    end = datetime.today()
+    panel = cargar_panel(
+        tuple(sorted(tickers)), (end - timedelta(days=10)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    )
+    close = pd.DataFrame(panel["close"].T, columns=panel["symbols"])
+    return close.ffill().iloc[-1] if len(close) else pd.Series(dtype=np.float64)
+
+
+class IndiceCadenas:
+    """
+    Cadenas de varios tickers ordenadas por ``(ticker, vencimiento, tipo,
+    strike)``.  ``grupos`` tiene una fila por ``(ticker, vencimiento, tipo)``
+    con sus posiciones ``[inicio, fin)`` dentro de ``contratos``.
+    """
+
+    def __init__(self, cadenas: dict[str, pd.DataFrame]):
+        partes = [df.assign(ticker=t) for t, df in cadenas.items() if not df.empty]
+        if partes:
+            df = pd.concat(partes, ignore_index=True)
+        else:
+            df = pd.DataFrame(columns=["ticker"] + CADENA_COLS)
+        df = df.dropna(subset=["strike"]).sort_values(["ticker", "expiry", "tipo", "strike"], kind="stable")
+        self.contratos = df.reset_index(drop=True)
+
+        claves = self.contratos[["ticker", "expiry", "tipo"]]
+        nuevo = (claves != claves.shift()).any(axis=1).to_numpy()
+        self.grupo = np.cumsum(nuevo) - 1
+        inicios = np.flatnonzero(nuevo)
+        self.grupos = claves.iloc[inicios].reset_index(drop=True)
+        self.grupos["T"] = self.contratos["T"].to_numpy()[inicios] if len(inicios) else []
+        self.grupos["inicio"] = inicios
+        self.grupos["fin"] = np.append(inicios[1:], len(self.contratos)).astype(np.int64)
+
+        self.strike = self.contratos["strike"].to_numpy(dtype=np.float64)
+        self._escala = 2.0 * (self.strike.max() if len(self.strike) else 1.0)
+        self._clave = self.grupo + self.strike / self._escala
+
+    def __len__(self) -> int:
+        return len(self.contratos)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.contratos.memory_usage(deep=False).sum() + self.grupos.memory_usage(deep=False).sum()
+                   + self.grupo.nbytes + self.strike.nbytes + self._clave.nbytes)
+
+    def rango(self, grupos: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Posiciones ``[ini, fin)`` de los strikes en ``[lo, hi]`` de cada grupo (búsqueda binaria)."""
+        grupos = np.asarray(grupos, dtype=np.float64)
+        ini = np.searchsorted(self._clave, grupos + np.asarray(lo) / self._escala, "left")
+        fin = np.searchsorted(self._clave, grupos + np.asarray(hi) / self._escala, "right")
+        return ini, np.maximum(fin, ini)
+
+
+def _expandir(ini: np.ndarray, fin: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Concatena los rangos [ini, fin) sin bucles; devuelve posiciones y el rango de cada una
+    largos = fin - ini
+    total = int(largos.sum())
+    rango = np.repeat(np.arange(len(ini)), largos)
+    pos = np.arange(total) - np.repeat(np.cumsum(largos) - largos, largos) + np.repeat(ini, largos)
+    return pos, rango
+
+
+@instrumented("candidatos_ingreso")
+def candidatos(
+    indice: IndiceCadenas,
+    spot: pd.Series,
+    estrategias: tuple[str, ...] = tuple(ESTRATEGIAS),
+    otm: tuple[float, float] = (0.02, 0.15),
+    dias: tuple[int, int] = (7, 60),
+    prob_otm_min: float = 0.6,
+    oi_min: int = 10,
+    spread_max: float = 0.5,
+    r: float = 0.04,
+) -> pd.DataFrame:
+    """
+    Contratos a vender ordenados por ``Puntaje`` = rendimiento anualizado ×
+    probabilidad OTM (``1 - |delta|``) × liquidez (``1 - spread`` relativo,
+    escalado por ``min(1, OI / OI_REFERENCIA)``).
+
+    El rendimiento se mide sobre el spot en las covered calls y sobre el
+    strike (la garantía) en los cash-secured puts, cobrando el bid.  `otm`
+    es la distancia mínima/máxima del strike al spot como fracción.
+    """
+    g = indice.grupos
+    s = g["ticker"].map(spot).to_numpy(dtype=np.float64)
+    dias_g = g["T"].to_numpy(dtype=np.float64) * 365
+    tipos = [ESTRATEGIAS[e] for e in estrategias]
+    usar = g["tipo"].isin(tipos).to_numpy() & np.isfinite(s) & (dias_g >= dias[0]) & (dias_g <= dias[1])
+    es_call = (g["tipo"] == "CALL").to_numpy()
+    lo = np.where(es_call, s * (1 + otm[0]), s * (1 - otm[1]))
+    hi = np.where(es_call, s * (1 + otm[1]), s * (1 - otm[0]))
+    sel = np.flatnonzero(usar)
+    ini, fin = indice.rango(sel, lo[sel], hi[sel])
+    pos, rango = _expandir(ini, fin)
+    if len(pos) == 0:
+        return pd.DataFrame(columns=COLUMNAS)
+
+    c = indice.contratos.iloc[pos]
+    gi = sel[rango]
+    S, K = s[gi], indice.strike[pos]
+    T = c["T"].to_numpy(dtype=np.float64)
+    call = es_call[gi]
+    bid = c["bid"].to_numpy(dtype=np.float64)
+    ask = c["ask"].to_numpy(dtype=np.float64)
+    iv = c["impliedVolatility"].to_numpy(dtype=np.float64)
+    oi = c["openInterest"].fillna(0).to_numpy(dtype=np.float64)
+    mid = (bid + ask) / 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prob = 1 - np.abs(bs_delta(S, K, T, r, iv, call))
+        spread = (ask - bid) / mid
+        rend = bid / np.where(call, S, K) * 365 / (T * 365)
+    liquidez = np.clip(1 - spread, 0, 1) * np.minimum(1.0, oi / OI_REFERENCIA)
+    ok = (bid > 0) & np.isfinite(iv) & (iv > 0) & (prob >= prob_otm_min) & (oi >= oi_min) & (spread <= spread_max)
+
+    out = pd.DataFrame({
+        "Ticker": c["ticker"].to_numpy(),
+        "Estrategia": np.where(call, "Covered call", "Cash-secured put"),
+        "Vencimiento": c["expiry"].to_numpy(),
+        "Días": np.round(T * 365).astype(int),
+        "Spot": S,
+        "Strike": K,
+        "OTM %": np.abs(K / S - 1) * 100,
+        "Prima": bid,
+        "Rend. anual %": rend * 100,
+        "Prob. OTM %": prob * 100,
+        "Spread %": spread * 100,
+        "OI": oi.astype(int),
+        "Puntaje": rend * prob * liquidez * 100,
+    })[ok]
+    return out.sort_values("Puntaje", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def indice_cadenas(tickers: list[str]) -> IndiceCadenas:
+    """
+    ``IndiceCadenas`` de `tickers` hasta ``DIAS_MAX`` días, cacheado por la
+    watchlist (sin importar el orden): no depende de ningún filtro.
+    """
+    return cache_indices().obtener(
+        tuple(sorted(set(tickers))), lambda: IndiceCadenas(cargar_cadenas(tickers, DIAS_MAX))
+    )
+
+
+def escanear(tickers: list[str], **kwargs) -> pd.DataFrame:
+    """Cadenas + spots + índice + ranking para `tickers` (ver ``candidatos``)."""
+    indice = indice_cadenas(tickers)
+    if len(indice) == 0:
+        return pd.DataFrame(columns=COLUMNAS)
+    return candidatos(indice, spots(indice.grupos["ticker"].unique().tolist()), **kwargs)
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from utils.instrumentation import instrumented
+
 def wma(series: pd.Series, length: int) -> pd.Series:
     """
     Weighted Moving Average (WMA) implementation matching TradingView's wma().
@@ -12,6 +14,7 @@ def wma(series: pd.Series, length: int) -> pd.Series:
     # Apply rolling WMA
     return series.rolling(length).apply(lambda x: np.dot(x, weights) / denom, raw=True)
 
+@instrumented("calc_mavilimw")
 def calc_mavilimw(df: pd.DataFrame, fmal: int = 3, smal: int = 5) -> pd.Series:
     """
     Nested WMA chain replicating the MavilimW indicator from TradingView.
@@ -33,6 +36,7 @@ def calc_mavilimw(df: pd.DataFrame, fmal: int = 3, smal: int = 5) -> pd.Series:
     return MAVW
 
 
+@instrumented("calc_wae")
 def calc_wae(df: pd.DataFrame, sensitivity: float = 150, fastLength: int = 20,
              slowLength: int = 40, channelLength: int = 20, mult: float = 2.0) -> pd.DataFrame:
     # existing implementation unchanged
@@ -0,0 +1,262 @@
+"""
+Instrumentación liviana de los caminos calientes de la app.
+
+- ``timed(nombre, kind=...)``: context manager que mide un bloque.
+- ``instrumented(nombre, kind=...)``: el mismo timing como decorador.
+- ``contar(nombre)``: contadores (llamadas de red, misses de caché, ...).
+
+Cada hilo de ejecución (en Streamlit, cada rerun de una sesión) tiene su
+propio registro, que se reinicia con ``begin_rerun`` y se muestra con
+``panel_rendimiento`` en la barra lateral.  Con la instrumentación apagada,
+``timed`` devuelve un objeto no-op compartido y los decoradores llaman
+directamente a la función: el coste es una búsqueda de atributo por llamada.
+
+Se activa desde el panel o con la variable de entorno ``GROWTHIA_PROFILE=1``.
+Si ``GROWTHIA_TRACE_FILE`` apunta a un archivo, al cerrar cada rerun se
+agregan allí las trazas como JSON lines para análisis offline.
+
+Los puntos de entrada fuera de ``streamlit run`` (CLI, benchmarks, prueba
+de carga) llaman a ``silenciar_avisos_sin_runtime``.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_ENV_ENABLED = os.getenv("GROWTHIA_PROFILE", "").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("GROWTHIA_TRACE_FILE")
+
+_local = threading.local()
+
+
+def _peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _Recorder:
+    __slots__ = ("run_id", "enabled", "spans", "counters", "depth", "t0")
+
+    def __init__(self, enabled: bool):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.enabled = enabled
+        self.spans: list[dict] = []
+        self.counters: Counter = Counter()
+        self.depth = 0
+        self.t0 = time.perf_counter()
+
+
+def _recorder() -> _Recorder | None:
+    rec = getattr(_local, "rec", None)
+    if rec is None and _ENV_ENABLED:
+        rec = _local.rec = _Recorder(True)
+    return rec if rec is not None and rec.enabled else None
+
+
+class _Span:
+    __slots__ = ("rec", "name", "kind", "start", "peak0", "misses0")
+
+    def __init__(self, rec: _Recorder, name: str, kind: str):
+        self.rec = rec
+        self.name = name
+        self.kind = kind
+
+    def __enter__(self):
+        self.rec.depth += 1
+        self.peak0 = _peak_rss_mb()
+        self.misses0 = self.rec.counters["cache_miss." + self.name] if self.kind == "cache" else 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        rec = self.rec
+        rec.depth -= 1
+        peak = _peak_rss_mb()
+        rec.spans.append({
+            "run": rec.run_id,
+            "name": self.name,
+            "kind": self.kind,
+            "ts": time.time(),
+            "ms": elapsed * 1000,
+            "depth": rec.depth,
+            "peak_rss_mb": peak,
+            "peak_rss_delta_mb": None if peak is None else peak - self.peak0,
+            "error": None if exc_type is None else exc_type.__name__,
+        })
+        if self.kind == "network":
+            rec.counters["network_calls"] += 1
+        elif self.kind == "cache":
+            if rec.counters["cache_miss." + self.name] > self.misses0:
+                rec.counters["cache_misses"] += 1
+            else:
+                rec.counters["cache_hits"] += 1
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def timed(name: str, kind: str = "compute"):
+    """
+    Mide el bloque ``with``.  `kind` agrupa los tiempos en el panel:
+    ``network``, ``io``, ``compute``, ``render``, ``data`` o ``cache``.
+    Los spans ``network`` suman al contador de llamadas de red; los
+    ``cache`` cuentan hit/miss según si la función marcó ``contar_miss``.
+    """
+    rec = _recorder()
+    if rec is None:
+        return _NOOP
+    return _Span(rec, name, kind)
+
+
+def instrumented(name: str | None = None, kind: str = "compute"):
+    """Decorador equivalente a envolver la función en ``timed``."""
+    def decorator(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rec = _recorder()
+            if rec is None:
+                return fn(*args, **kwargs)
+            with _Span(rec, label, kind):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def contar(name: str, n: int = 1):
+    rec = _recorder()
+    if rec is not None:
+        rec.counters[name] += n
+
+
+def contar_miss(name: str):
+    """Llamar dentro de una función cacheada: sólo se ejecuta en un miss."""
+    contar("cache_miss." + name)
+
+
+# Loggers que avisan cuando no hay runtime de Streamlit
+_AVISOS_SIN_RUNTIME = (
+    "streamlit.runtime.caching.cache_data_api",
+    "streamlit.runtime.scriptrunner_utils.script_run_context",
+)
+
+
+def _solo_errores(record: logging.LogRecord) -> bool:
+    return record.levelno >= logging.ERROR
+
+
+def silenciar_avisos_sin_runtime() -> None:
+    """
+    Fuera de `streamlit run` los cachés y los hilos sin contexto avisan que
+    no hay runtime: es esperado.  Es un filtro y no un nivel porque AppTest
+    vuelve a fijar el nivel de los loggers en cada corrida.
+    """
+    import streamlit.logger
+
+    for nombre in _AVISOS_SIN_RUNTIME:
+        logger = streamlit.logger.get_logger(nombre)
+        if _solo_errores not in logger.filters:
+            logger.addFilter(_solo_errores)
+
+
+def begin_rerun(enabled: bool | None = None) -> _Recorder:
+    """Reinicia el registro del hilo actual (inicio de cada rerun)."""
+    rec = _local.rec = _Recorder(_ENV_ENABLED if enabled is None else enabled)
+    return rec
+
+
+def end_rerun() -> list[dict]:
+    """Cierra el rerun: exporta las trazas a ``TRACE_FILE`` si está definido."""
+    rec = getattr(_local, "rec", None)
+    if rec is None or not rec.enabled:
+        return []
+    spans = list(rec.spans)
+    if TRACE_FILE and spans:
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(to_jsonl(spans, rec))
+    return spans
+
+
+def to_jsonl(spans: list[dict], rec: _Recorder | None = None) -> str:
+    lines = [json.dumps(s, ensure_ascii=False) for s in spans]
+    if rec is not None:
+        lines.append(json.dumps({
+            "run": rec.run_id,
+            "name": "rerun",
+            "kind": "summary",
+            "ts": time.time(),
+            "ms": (time.perf_counter() - rec.t0) * 1000,
+            "counters": dict(rec.counters),
+            "peak_rss_mb": _peak_rss_mb(),
+        }, ensure_ascii=False))
+    return "".join(line + "\n" for line in lines)
+
+
+def resumen() -> tuple[list[dict], dict, float]:
+    """Spans agregados por nombre, contadores y duración del rerun actual (ms)."""
+    rec = getattr(_local, "rec", None)
+    if rec is None:
+        return [], {}, 0.0
+    agg: dict[str, dict] = {}
+    for s in rec.spans:
+        a = agg.setdefault(s["name"], {"Bloque": s["name"], "Tipo": s["kind"],
+                                       "Llamadas": 0, "Total ms": 0.0, "Máx ms": 0.0})
+        a["Llamadas"] += 1
+        a["Total ms"] += s["ms"]
+        a["Máx ms"] = max(a["Máx ms"], s["ms"])
+    filas = sorted(agg.values(), key=lambda a: a["Total ms"], reverse=True)
+    return filas, dict(rec.counters), (time.perf_counter() - rec.t0) * 1000
+
+
+def panel_rendimiento(key: str = "perf_enabled"):
+    """Panel colapsable de la barra lateral con el desglose del rerun actual."""
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=False):
+        st.checkbox("Medir tiempos", key=key, value=_ENV_ENABLED)
+        rec = getattr(_local, "rec", None)
+        if rec is None or not rec.enabled:
+            st.caption("Activá la medición para ver el desglose del próximo rerun.")
+            return
+
+        filas, counters, total_ms = resumen()
+        st.metric("Rerun", f"{total_ms:,.0f} ms")
+        if filas:
+            st.dataframe(pd.DataFrame(filas).round(1), hide_index=True, use_container_width=True)
+        peak = _peak_rss_mb()
+        st.caption(
+            f"🌐 Llamadas de red: {counters.get('network_calls', 0)} · "
+            f"🗃️ Caché hits/misses: {counters.get('cache_hits', 0)}/{counters.get('cache_misses', 0)}"
+            + (f" · 🧠 RSS máx: {peak:,.0f} MB" if peak is not None else "")
+        )
+        st.download_button(
+            "Exportar trazas (JSONL)",
+            data=to_jsonl(rec.spans, rec),
+            file_name=f"trazas_{rec.run_id}.jsonl",
+            mime="application/json",
+        )
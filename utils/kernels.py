@@ -0,0 +1,273 @@
+"""
+Vectorised rolling-statistic kernels for the Darvas / MavilimW / WAE stack.
+
+Every function accepts a 1-D array (one series) or a 2-D array shaped
+``(symbols, time)`` and works along the last axis, so a whole universe can be
+processed in one call.  Results match the pandas calls used in
+``utils.indicators`` and ``sections.backtest_darvas`` (``rolling(...).max()``,
+``.min()``, ``.mean()``, ``.std(ddof=0)``, ``ewm(adjust=False)`` and the WMA
+chain), including the leading NaN warm-up.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import instrumented
+
+# Tamaño máximo (en columnas de tiempo) de cada bloque al usar ventanas
+# deslizantes, para acotar la memoria temporal a ~CHUNK * window valores.
+_CHUNK = 1 << 16
+
+
+def _as_2d(a) -> tuple[np.ndarray, bool]:
+    arr = np.ascontiguousarray(a, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[None, :], True
+    if arr.ndim != 2:
+        raise ValueError("Se esperaba un array 1-D o 2-D (símbolos × tiempo)")
+    return arr, False
+
+
+def _restore(out: np.ndarray, squeeze: bool) -> np.ndarray:
+    return out[0] if squeeze else out
+
+
+def _prefix_suffix(x: np.ndarray, window: int, fill: float, ufunc):
+    n_sym, n = x.shape
+    n_blocks = -(-n // window)
+    padded = np.full((n_sym, n_blocks * window), fill)
+    padded[:, :n] = x
+    blocks = padded.reshape(n_sym, n_blocks, window)
+    # Forma explícita (no -1): con 0 símbolos reshape no puede inferirla
+    prefix = ufunc.accumulate(blocks, axis=2).reshape(padded.shape)[:, :n]
+    suffix = ufunc.accumulate(blocks[:, :, ::-1], axis=2)[:, :, ::-1].reshape(padded.shape)[:, :n]
+    return prefix, suffix
+
+
+def _blocked(x: np.ndarray, window: int, fill: float, ufunc) -> np.ndarray:
+    """
+    Block decomposition (van Herk / Gil-Werman) of a sliding ``ufunc``.
+
+    The time axis is cut into blocks of ``window`` bars; a prefix and a suffix
+    accumulation inside each block give every window as ``suffix[i-w+1] op
+    prefix[i]``.  This is the branch-free equivalent of the monotonic deque:
+    O(n) with a constant number of operations per bar and no Python loop.
+    NaNs propagate exactly when they fall inside the window, like pandas.
+    """
+    n = x.shape[1]
+    prefix, suffix = _prefix_suffix(x, window, fill, ufunc)
+    out = np.full(x.shape, np.nan)
+    if n >= window:
+        out[:, window - 1:] = ufunc(suffix[:, :n - window + 1], prefix[:, window - 1:])
+    return out
+
+
+def rolling_max(a, window: int) -> np.ndarray:
+    """Equivalent of ``Series.rolling(window).max()`` along the last axis."""
+    x, squeeze = _as_2d(a)
+    return _restore(_blocked(x, window, -np.inf, np.maximum), squeeze)
+
+
+def rolling_min(a, window: int) -> np.ndarray:
+    """Equivalent of ``Series.rolling(window).min()`` along the last axis."""
+    x, squeeze = _as_2d(a)
+    return _restore(_blocked(x, window, np.inf, np.minimum), squeeze)
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    # Sumas por bloques: cada ventana combina a lo sumo dos sumas parciales de
+    # `window` valores, así el error de redondeo no crece con la longitud de
+    # la serie (a diferencia de un cumsum global).
+    n = x.shape[1]
+    prefix, suffix = _prefix_suffix(x, window, 0.0, np.add)
+    out = np.full(x.shape, np.nan)
+    if n >= window:
+        out[:, window - 1:] = suffix[:, :n - window + 1] + prefix[:, window - 1:]
+        # Si la ventana coincide con un bloque completo, prefix y suffix cubren
+        # el mismo bloque: la suma es directamente el prefix.
+        aligned = np.arange(window - 1, n, window)
+        out[:, aligned] = prefix[:, aligned]
+    return out
+
+
+def rolling_mean(a, window: int) -> np.ndarray:
+    """Equivalent of ``Series.rolling(window).mean()`` along the last axis."""
+    x, squeeze = _as_2d(a)
+    return _restore(_rolling_sum(x, window) / window, squeeze)
+
+
+def _windows(x: np.ndarray, window: int):
+    """Yield ``(start, view)`` chunks of the sliding windows of ``x``."""
+    views = np.lib.stride_tricks.sliding_window_view(x, window, axis=1)
+    for start in range(0, views.shape[1], _CHUNK):
+        yield start, views[:, start:start + _CHUNK]
+
+
+def rolling_std(a, window: int, ddof: int = 0, mean: np.ndarray | None = None) -> np.ndarray:
+    """
+    Equivalent of ``Series.rolling(window).std(ddof=ddof)``.
+
+    Uses the two-pass formula ``sqrt(sum((x - mean)**2) / (w - ddof))`` on
+    each window, which has no catastrophic cancellation.  ``mean`` may be
+    passed when the rolling mean was already computed.
+    """
+    x, squeeze = _as_2d(a)
+    n = x.shape[1]
+    if mean is None:
+        mean = _rolling_sum(x, window) / window
+    else:
+        mean = _as_2d(mean)[0]
+    out = np.full_like(x, np.nan)
+    if n >= window:
+        for start, view in _windows(x, window):
+            m = mean[:, window - 1 + start: window - 1 + start + view.shape[1]]
+            dev = view - m[..., None]
+            out[:, window - 1 + start: window - 1 + start + view.shape[1]] = (
+                np.einsum("ijk,ijk->ij", dev, dev) / (window - ddof)
+            )
+    np.sqrt(out, out=out)
+    return _restore(out, squeeze)
+
+
+def wma(a, length: int) -> np.ndarray:
+    """Equivalent of ``utils.indicators.wma`` (TradingView ``wma()``)."""
+    x, squeeze = _as_2d(a)
+    weights = np.arange(1, length + 1, dtype=np.float64)
+    denom = weights.sum()
+    out = np.full_like(x, np.nan)
+    if x.shape[1] >= length:
+        for start, view in _windows(x, length):
+            out[:, length - 1 + start: length - 1 + start + view.shape[1]] = (view @ weights) / denom
+    return _restore(out, squeeze)
+
+
+def mavilimw(close, fmal: int = 3, smal: int = 5) -> np.ndarray:
+    """Equivalent of ``utils.indicators.calc_mavilimw`` on a close array."""
+    tmal = fmal + smal
+    Fmal = smal + tmal
+    Ftmal = tmal + Fmal
+    Smal = Fmal + Ftmal
+    m = close
+    for length in (fmal, smal, tmal, Fmal, Ftmal, Smal):
+        m = wma(m, length)
+    return m
+
+
+def ema(a, span: int) -> np.ndarray:
+    """
+    Equivalent of ``Series.ewm(span=span, adjust=False).mean()``.
+
+    The recursion has no closed vectorised form, so it runs through pandas'
+    compiled ``ewm`` on the transposed block (one column per symbol).
+    """
+    x, squeeze = _as_2d(a)
+    out = pd.DataFrame(x.T).ewm(span=span, adjust=False).mean().to_numpy().T
+    return _restore(np.ascontiguousarray(out), squeeze)
+
+
+def shift(a, periods: int = 1) -> np.ndarray:
+    """Equivalent of ``Series.shift(periods)`` for float arrays."""
+    x, squeeze = _as_2d(a)
+    out = np.full_like(x, np.nan)
+    if periods >= 0:
+        out[:, periods:] = x[:, : x.shape[1] - periods]
+    else:
+        out[:, :periods] = x[:, -periods:]
+    return _restore(out, squeeze)
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """True range as computed in ``calc_wae`` (first bar is NaN)."""
+    h, squeeze = _as_2d(high)
+    lo, _ = _as_2d(low)
+    prev_c = shift(_as_2d(close)[0], 1)
+    tr = np.maximum(h - lo, np.maximum(np.abs(h - prev_c), np.abs(lo - prev_c)))
+    return _restore(tr, squeeze)
+
+
+def mavilimw_wae_kernels(
+    high,
+    low,
+    close,
+    sensitivity: float = 150,
+    fastLength: int = 20,
+    slowLength: int = 40,
+    channelLength: int = 20,
+    mult: float = 2.0,
+    deadzoneLength: int = 100,
+    fmal: int = 3,
+    smal: int = 5,
+) -> dict[str, np.ndarray]:
+    """
+    MavilimW and WAE statistics of the Darvas strategy (everything except the
+    box itself, so they can be reused when only ``darvas_window`` changes).
+
+    The fast/slow EMAs and the MACD delta are computed once and shared by
+    ``wae_trendUp`` and ``wae_trendDown``; the Bollinger mean is reused by the
+    standard deviation.
+    """
+    h, squeeze = _as_2d(high)
+    lo, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+
+    ema_fast = ema(c, fastLength)
+    ema_slow = ema(c, slowLength)
+    macd = ema_fast - ema_slow
+    t1 = (macd - shift(macd, 1)) * sensitivity
+
+    basis = _rolling_sum(c, channelLength) / channelLength
+    dev = rolling_std(c, channelLength, ddof=0, mean=basis) * mult
+    e1 = (basis + dev) - (basis - dev)
+
+    tr = true_range(h, lo, c)
+    deadzone = _rolling_sum(tr, deadzoneLength) / deadzoneLength
+    deadzone = np.where(np.isnan(deadzone), 0.0, deadzone) * 3.7
+
+    out = {
+        "mavilimw": mavilimw(c, fmal, smal),
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "macd": macd,
+        "wae_t1": t1,
+        "wae_trendUp": np.where(t1 >= 0, t1, 0.0),
+        "wae_trendDown": np.where(t1 < 0, -t1, 0.0),
+        "wae_e1": e1,
+        "wae_deadzone": deadzone,
+    }
+    return {k: _restore(v, squeeze) for k, v in out.items()}
+
+
+@instrumented("darvas_wae_kernels")
+def darvas_wae_kernels(
+    high,
+    low,
+    close,
+    darvas_window: int = 5,
+    sensitivity: float = 150,
+    fastLength: int = 20,
+    slowLength: int = 40,
+    channelLength: int = 20,
+    mult: float = 2.0,
+    deadzoneLength: int = 100,
+    fmal: int = 3,
+    smal: int = 5,
+) -> dict[str, np.ndarray]:
+    """
+    Compute every rolling statistic of the Darvas strategy in one call: the
+    Darvas box plus ``mavilimw_wae_kernels``.  Inputs are 1-D or
+    ``(symbols, time)`` arrays and the returned arrays keep that shape.
+    """
+    return {
+        "darvas_high": rolling_max(high, darvas_window),
+        "darvas_low": rolling_min(low, darvas_window),
+        **mavilimw_wae_kernels(
+            high, low, close,
+            sensitivity=sensitivity,
+            fastLength=fastLength,
+            slowLength=slowLength,
+            channelLength=channelLength,
+            mult=mult,
+            deadzoneLength=deadzoneLength,
+            fmal=fmal,
+            smal=smal,
+        ),
+    }
@@ -0,0 +1,358 @@
+"""
+Libro local de operaciones de Schwab y P&L realizado por lotes.
+
+``sincronizar`` baja las transacciones ``TRADE`` de una cuenta en ventanas
+de ``VENTANA_DIAS`` días, pedidas en paralelo, desde el cursor (high-water
+mark) de la última sincronización menos ``SOLAPE`` (Schwab puede publicar
+una operación con horas de atraso).  Las filas se guardan en SQLite con
+clave ``(activity_id, pata)``, así repetir una ventana no duplica nada, y
+el cursor sólo avanza cuando todas las ventanas llegaron bien.
+
+``Ledger.actualizar_pnl`` imputa las operaciones a lotes FIFO o LIFO y
+persiste los lotes abiertos y los cierres: cada llamada procesa sólo las
+filas ingresadas desde la anterior.  Si llega una operación con fecha
+anterior a lo ya procesado, se rehace sólo ese símbolo.  Las comisiones
+se suman al costo del lote al abrir y se descuentan del P&L al cerrar;
+las opciones usan multiplicador 100.
+
+La ruta del archivo se cambia con ``GROWTHIA_LEDGER`` (por defecto
+``data/ledger.sqlite``).
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import instrumented, timed
+from utils.sqlite_db import conectar, ruta_datos
+
+ARCHIVO_LEDGER = ruta_datos("GROWTHIA_LEDGER", "ledger.sqlite")
+VENTANA_DIAS = 30
+SOLAPE = pd.Timedelta(days=2)
+HISTORIA_INICIAL = pd.Timedelta(days=5 * 365)
+WORKERS = 4
+METODOS = ("FIFO", "LIFO")
+MULTIPLICADOR = {"OPTION": 100.0}
+_EPS = 1e-9
+_FMT = "%Y-%m-%dT%H:%M:%S"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS transacciones (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    activity_id INTEGER NOT NULL,
+    pata INTEGER NOT NULL,
+    cuenta TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    simbolo TEXT NOT NULL,
+    tipo_activo TEXT NOT NULL,
+    cantidad REAL NOT NULL,
+    precio REAL NOT NULL,
+    comisiones REAL NOT NULL,
+    UNIQUE (activity_id, pata)
+);
+CREATE INDEX IF NOT EXISTS ix_tx_cuenta_simbolo ON transacciones (cuenta, simbolo, fecha);
+CREATE TABLE IF NOT EXISTS cursores (
+    cuenta TEXT PRIMARY KEY,
+    hasta TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pnl_estado (
+    cuenta TEXT NOT NULL,
+    metodo TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    PRIMARY KEY (cuenta, metodo)
+);
+CREATE TABLE IF NOT EXISTS lotes (
+    cuenta TEXT NOT NULL,
+    metodo TEXT NOT NULL,
+    simbolo TEXT NOT NULL,
+    orden INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    cantidad REAL NOT NULL,
+    costo REAL NOT NULL,
+    multiplicador REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_lotes ON lotes (cuenta, metodo, simbolo);
+CREATE TABLE IF NOT EXISTS cierres (
+    cuenta TEXT NOT NULL,
+    metodo TEXT NOT NULL,
+    simbolo TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    fecha TEXT NOT NULL,
+    cantidad REAL NOT NULL,
+    costo REAL NOT NULL,
+    precio REAL NOT NULL,
+    pnl REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cierres ON cierres (cuenta, metodo, simbolo);
+"""
+
+
+def _utc(x) -> pd.Timestamp:
+    # Fechas en UTC sin zona, como se guardan en el libro
+    t = pd.Timestamp(x)
+    return t.tz_convert("UTC").tz_localize(None) if t.tzinfo else t
+
+
+def transaccion_a_filas(tx: dict, cuenta: str) -> list[dict]:
+    """
+    Una fila por instrumento operado en una transacción de Schwab.  Las
+    patas ``CURRENCY`` (comisiones y fees) se suman y se asignan a la
+    primera pata operada.  Compra = cantidad positiva (``cost`` negativo).
+    """
+    fecha = _utc(tx["time"]).strftime(_FMT)
+    items = tx.get("transferItems", [])
+    comisiones = sum(abs(float(i.get("cost", 0.0))) for i in items
+                     if i.get("instrument", {}).get("assetType") == "CURRENCY")
+    filas = []
+    for i in items:
+        inst = i.get("instrument", {})
+        if inst.get("assetType") == "CURRENCY" or not inst.get("symbol"):
+            continue
+        cant = abs(float(i.get("amount", 0.0)))
+        if cant == 0:
+            continue
+        costo = float(i.get("cost", 0.0))
+        signo = -np.sign(costo) if costo else np.sign(float(i["amount"]))
+        filas.append({
+            "activity_id": int(tx["activityId"]),
+            "pata": len(filas),
+            "cuenta": cuenta,
+            "fecha": fecha,
+            "simbolo": inst["symbol"],
+            "tipo_activo": inst.get("assetType", "EQUITY"),
+            "cantidad": signo * cant,
+            "precio": float(i.get("price", 0.0)),
+            "comisiones": comisiones if not filas else 0.0,
+        })
+    return filas
+
+
+def ventanas(desde, hasta, dias: int = VENTANA_DIAS) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """Tramos consecutivos ``[inicio, fin)`` de a `dias` días que cubren ``[desde, hasta)``."""
+    desde, hasta = pd.Timestamp(desde), pd.Timestamp(hasta)
+    cortes = list(pd.date_range(desde, hasta, freq=f"{dias}D"))
+    if not cortes or cortes[-1] < hasta:
+        cortes.append(hasta)
+    return list(zip(cortes[:-1], cortes[1:]))
+
+
+def imputar(lotes: deque, cantidad: float, precio: float, comisiones: float, mult: float,
+            metodo: str, fecha: str, orden: int) -> list[tuple[float, float, float]]:
+    """
+    Aplica una operación a los `lotes` abiertos de un símbolo (se modifican
+    en el lugar) y devuelve los cierres ``(cantidad, costo, pnl)``.  Un lote
+    es ``[orden, fecha, cantidad, costo unitario con comisiones]``; los
+    cortos tienen cantidad negativa.
+    """
+    fee_u = comisiones / abs(cantidad)
+    restante = cantidad
+    cierres = []
+    while abs(restante) > _EPS and lotes:
+        lote = lotes[0] if metodo == "FIFO" else lotes[-1]
+        if np.sign(lote[2]) == np.sign(restante):
+            break
+        q = min(abs(restante), abs(lote[2]))
+        s = np.sign(lote[2])
+        cierres.append((s * q, lote[3], (precio - lote[3]) * s * q * mult - fee_u * q))
+        lote[2] -= s * q
+        restante += s * q
+        if abs(lote[2]) <= _EPS:
+            lotes.popleft() if metodo == "FIFO" else lotes.pop()
+    if abs(restante) > _EPS:
+        lotes.append([orden, fecha, restante, precio + np.sign(restante) * fee_u / mult])
+    return cierres
+
+
+class Ledger:
+    """Transacciones, cursores y P&L por lotes en un archivo SQLite."""
+
+    def __init__(self, path: Path | str = ARCHIVO_LEDGER):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with conectar(self.path, wal=True) as con:
+            con.executescript(_ESQUEMA)
+
+    # ——— Ingesta ———————————————————————————————————————————————————
+    def insertar(self, filas: list[dict]) -> int:
+        """Guarda `filas` ignorando las ya presentes; devuelve cuántas eran nuevas."""
+        if not filas:
+            return 0
+        cols = ["activity_id", "pata", "cuenta", "fecha", "simbolo", "tipo_activo", "cantidad", "precio", "comisiones"]
+        with self._lock, conectar(self.path) as con:
+            antes = con.total_changes
+            con.executemany(
+                f"INSERT OR IGNORE INTO transacciones ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                [tuple(f[c] for c in cols) for f in filas],
+            )
+            return con.total_changes - antes
+
+    def cursor(self, cuenta: str) -> pd.Timestamp | None:
+        with conectar(self.path) as con:
+            fila = con.execute("SELECT hasta FROM cursores WHERE cuenta = ?", (cuenta,)).fetchone()
+        return pd.Timestamp(fila[0]) if fila else None
+
+    def avanzar_cursor(self, cuenta: str, hasta) -> None:
+        with self._lock, conectar(self.path) as con:
+            con.execute(
+                "INSERT INTO cursores (cuenta, hasta) VALUES (?, ?) "
+                "ON CONFLICT (cuenta) DO UPDATE SET hasta = MAX(hasta, excluded.hasta)",
+                (cuenta, pd.Timestamp(hasta).strftime(_FMT)),
+            )
+
+    def transacciones(self, cuenta: str | None = None, simbolo: str | None = None) -> pd.DataFrame:
+        sql, params = "SELECT * FROM transacciones WHERE 1=1", []
+        if cuenta is not None:
+            sql, params = sql + " AND cuenta = ?", params + [cuenta]
+        if simbolo is not None:
+            sql, params = sql + " AND simbolo = ?", params + [simbolo]
+        with conectar(self.path) as con:
+            return pd.read_sql_query(sql + " ORDER BY fecha, activity_id, pata", con, params=params)
+
+    # ——— P&L por lotes ——————————————————————————————————————————————
+    @instrumented("Ledger.actualizar_pnl", kind="data")
+    def actualizar_pnl(self, cuenta: str, metodo: str = "FIFO") -> int:
+        """Imputa las filas nuevas desde la última llamada; devuelve cuántas procesó."""
+        if metodo not in METODOS:
+            raise ValueError(f"Método desconocido: {metodo} (opciones: {', '.join(METODOS)})")
+        with self._lock, conectar(self.path) as con:
+            estado = con.execute(
+                "SELECT seq, fecha FROM pnl_estado WHERE cuenta = ? AND metodo = ?", (cuenta, metodo)
+            ).fetchone()
+            seq_max, fecha_max = estado if estado else (0, "")
+            nuevas = pd.read_sql_query(
+                "SELECT * FROM transacciones WHERE cuenta = ? AND seq > ?", con, params=(cuenta, seq_max)
+            )
+            if nuevas.empty:
+                return 0
+
+            # Operaciones que llegaron tarde: su símbolo se rehace desde cero
+            tarde = sorted(set(nuevas.loc[nuevas["fecha"] < fecha_max, "simbolo"]))
+            for tabla in ("lotes", "cierres"):
+                con.executemany(
+                    f"DELETE FROM {tabla} WHERE cuenta = ? AND metodo = ? AND simbolo = ?",
+                    [(cuenta, metodo, s) for s in tarde],
+                )
+            if tarde:
+                rehacer = pd.read_sql_query(
+                    f"SELECT * FROM transacciones WHERE cuenta = ? AND simbolo IN ({', '.join('?' * len(tarde))})",
+                    con, params=[cuenta] + tarde,
+                )
+                nuevas = pd.concat([nuevas[~nuevas["simbolo"].isin(tarde)], rehacer], ignore_index=True)
+
+            simbolos = sorted(set(nuevas["simbolo"]))
+            abiertos: dict[str, deque] = {s: deque() for s in simbolos}
+            for s, orden, fecha, cant, costo in con.execute(
+                f"SELECT simbolo, orden, fecha, cantidad, costo FROM lotes WHERE cuenta = ? AND metodo = ? "
+                f"AND simbolo IN ({', '.join('?' * len(simbolos))}) ORDER BY orden",
+                [cuenta, metodo] + simbolos,
+            ):
+                abiertos[s].append([orden, fecha, cant, costo])
+
+            cierres = []
+            nuevas = nuevas.sort_values(["fecha", "activity_id", "pata"], kind="stable")
+            mults = {}
+            with timed("ledger.imputar", kind="compute"):
+                for seq, fecha, s, tipo, cant, precio, com in nuevas[
+                    ["seq", "fecha", "simbolo", "tipo_activo", "cantidad", "precio", "comisiones"]
+                ].itertuples(index=False):
+                    mult = mults.setdefault(s, MULTIPLICADOR.get(tipo, 1.0))
+                    for q, costo, pnl in imputar(abiertos[s], cant, precio, com, mult, metodo, fecha, int(seq)):
+                        cierres.append((cuenta, metodo, s, int(seq), fecha, q, costo, precio, pnl))
+
+            con.executemany(
+                "DELETE FROM lotes WHERE cuenta = ? AND metodo = ? AND simbolo = ?",
+                [(cuenta, metodo, s) for s in simbolos],
+            )
+            con.executemany(
+                "INSERT INTO lotes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(cuenta, metodo, s, o, f, q, c, mults.get(s, 1.0))
+                 for s, lotes in abiertos.items() for o, f, q, c in lotes],
+            )
+            con.executemany("INSERT INTO cierres VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", cierres)
+            con.execute(
+                "INSERT INTO pnl_estado (cuenta, metodo, seq, fecha) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (cuenta, metodo) DO UPDATE SET seq = excluded.seq, fecha = excluded.fecha",
+                (cuenta, metodo, int(max(seq_max, nuevas["seq"].max())), max(fecha_max, nuevas["fecha"].max())),
+            )
+            return len(nuevas)
+
+    def lotes(self, cuenta: str, metodo: str = "FIFO") -> pd.DataFrame:
+        with conectar(self.path) as con:
+            return pd.read_sql_query(
+                "SELECT simbolo, orden, fecha, cantidad, costo, multiplicador FROM lotes "
+                "WHERE cuenta = ? AND metodo = ? ORDER BY simbolo, orden", con, params=(cuenta, metodo),
+            )
+
+    def cierres(self, cuenta: str, metodo: str = "FIFO") -> pd.DataFrame:
+        with conectar(self.path) as con:
+            return pd.read_sql_query(
+                "SELECT simbolo, seq, fecha, cantidad, costo, precio, pnl FROM cierres "
+                "WHERE cuenta = ? AND metodo = ? ORDER BY fecha, seq", con, params=(cuenta, metodo),
+            )
+
+    def rendimiento(self, cuenta: str, metodo: str = "FIFO", precios: pd.Series | None = None) -> pd.DataFrame:
+        """
+        Una fila por símbolo: posición abierta, costo base (con comisiones),
+        P&L realizado, operaciones cerradas y % ganadoras.  Con `precios`
+        (último precio por símbolo) agrega el P&L no realizado y la
+        ``Rentabilidad`` de la posición abierta como fracción, igual que la
+        columna del Excel.
+        """
+        self.actualizar_pnl(cuenta, metodo)
+        lotes, cierres = self.lotes(cuenta, metodo), self.cierres(cuenta, metodo)
+        lotes["base"] = lotes["cantidad"] * lotes["costo"] * lotes["multiplicador"]
+        abiertos = lotes.groupby("simbolo").agg(
+            Cantidad=("cantidad", "sum"), **{"Costo base": ("base", "sum")}, mult=("multiplicador", "first"),
+        )
+        abiertos["Costo medio"] = abiertos["Costo base"] / (abiertos["Cantidad"] * abiertos["mult"])
+        realizados = cierres.groupby("simbolo").agg(
+            **{"P&L realizado": ("pnl", "sum"), "Cierres": ("pnl", "size"),
+               "% ganadoras": ("pnl", lambda p: (p > 0).mean() * 100)},
+        )
+        out = abiertos.join(realizados, how="outer").rename_axis("Ticker")
+        out[["Cantidad", "Costo base", "P&L realizado", "Cierres"]] = (
+            out[["Cantidad", "Costo base", "P&L realizado", "Cierres"]].fillna(0)
+        )
+        if precios is not None:
+            valor = out["Cantidad"] * out.index.map(precios).astype(float) * out["mult"].fillna(1.0)
+            out["P&L no realizado"] = valor - out["Costo base"]
+            out["Rentabilidad"] = out["P&L no realizado"] / out["Costo base"].abs().replace(0, np.nan)
+        return out.drop(columns="mult").reset_index()
+
+
+@instrumented("sincronizar_transacciones", kind="network")
+def sincronizar(
+    api,
+    cuenta: str,
+    ledger: Ledger,
+    hasta=None,
+    ventana_dias: int = VENTANA_DIAS,
+    workers: int = WORKERS,
+) -> dict:
+    """
+    Trae las transacciones nuevas de `cuenta` (hash de Schwab) con
+    ``api.get_transactions(cuenta, inicio, fin)``, en ventanas concurrentes
+    desde el cursor, y las guarda en `ledger`.
+    """
+    hasta = _utc(hasta if hasta is not None else pd.Timestamp.now(tz="UTC"))
+    cursor = ledger.cursor(cuenta)
+    desde = cursor - SOLAPE if cursor is not None else hasta - HISTORIA_INICIAL
+    tramos = ventanas(desde, hasta, ventana_dias)
+
+    def _bajar(tramo):
+        filas = []
+        for tx in api.get_transactions(cuenta, *tramo) or []:
+            filas.extend(transaccion_a_filas(tx, cuenta))
+        return filas
+
+    # Si falla una ventana se propaga la excepción y el cursor no avanza
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        lotes = list(pool.map(_bajar, tramos))
+    nuevas = sum(ledger.insertar(filas) for filas in lotes)
+    ledger.avanzar_cursor(cuenta, hasta)
+    return {"ventanas": len(tramos), "recibidas": sum(map(len, lotes)), "nuevas": nuevas, "desde": desde, "hasta": hasta}
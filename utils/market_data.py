@@ -1,44 +1,282 @@
 # utils/market_data.py 
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
+import streamlit as st
 from datetime import timedelta
 
+from utils.data_quality import validar_historia, validar_panel
+from utils.instrumentation import contar_miss, instrumented, timed
+from utils.history_store import HistoryStore
+from utils.ohlcv import FIELDS, OHLCV
+from utils.providers import get_provider
+
+# Temporalidades intradía que se guardan en el almacén local (memmap)
+INTERVALOS_STORE = {"1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h"}
+REFRESCO_COLA = 300  # segundos entre descargas de la cola de un símbolo/intervalo
+MAX_COLAS = 1024     # colas recordadas (LRU por almacén, símbolo e intervalo)
+_ultima_cola: OrderedDict[tuple, float] = OrderedDict()
+_cola_lock = threading.Lock()
+
+
+def _descargar(ticker: str, intervalo: str, start=None, end=None) -> pd.DataFrame:
+    # Con fechas, el rango inclusive; sin fechas, todo el histórico.  El
+    # proveedor (GROWTHIA_DATA_PROVIDER) ya normaliza índice y columnas, y
+    # lo descargado se valida acá, antes de llegar al almacén o a las cachés.
+    df = get_provider().llamar("history", ticker, intervalo, start, end)
+    return validar_historia(df, ticker, intervalo)
+
+
+def _desde_store(data: OHLCV) -> pd.DataFrame:
+    return data.to_frame().set_index("Date")
+
+
+def cubre_inicio(bounds: tuple[int, int] | None, start) -> bool:
+    """
+    Si lo guardado (``HistoryStore.bounds``) cubre desde `start`.  Se compara
+    por día: la primera vela intradía (9:30) es posterior a la medianoche
+    de `start`, y si `start` cae en fin de semana la primera es del lunes.
+    """
+    if bounds is None:
+        return False
+    dia = pd.offsets.BDay().rollforward(pd.Timestamp(start).normalize())
+    return pd.Timestamp(bounds[0]).normalize() <= dia
+
+
+def _sincronizado_hace_poco(clave: tuple) -> bool:
+    with _cola_lock:
+        return time.monotonic() - _ultima_cola.get(clave, -np.inf) < REFRESCO_COLA
+
+
+def _marcar_sincronizado(clave: tuple) -> None:
+    with _cola_lock:
+        _ultima_cola[clave] = time.monotonic()
+        _ultima_cola.move_to_end(clave)
+        while len(_ultima_cola) > MAX_COLAS:
+            _ultima_cola.popitem(last=False)
+
+
+@instrumented("cargar_precio_historico", kind="data")
 def cargar_precio_historico(
     ticker: str,
     intervalo: str,
     start: pd.Timestamp = None,
-    end: pd.Timestamp = None
+    end: pd.Timestamp = None,
+    store: HistoryStore | None = None,
 ) -> pd.DataFrame:
     """
-    Descarga OHLCV para `ticker` en `intervalo`.
-    Si `start` y `end` están, usa yf.download con fechas;
-    si no, descarga TODO el histórico (period='max').
-    """
-    if start is not None and end is not None:
-        # yfinance trata end como exclusivo, así que sumamos un día
-        end_dt = pd.to_datetime(end)
-        df = yf.download(
-            ticker,
-            start=pd.to_datetime(start).strftime("%Y-%m-%d"),
-            end=(end_dt + timedelta(days=1)).strftime("%Y-%m-%d"),
-            interval=intervalo,
-            progress=False,
-        )
-    else:
-        df = yf.download(
-            ticker,
-            period="max",
-            interval=intervalo,
-            progress=False,
-        )
-
-    # 1) Aseguramos índice datetime sin zona horaria
-    df.index = pd.to_datetime(df.index).tz_localize(None)
-
-    # 2) Si vinieran columnas MultiIndex (por ejemplo, nivel0=‘Close’, nivel1=‘BTC-USD’),
-    #    las aplanamos y nos quedamos con el primer nivel:
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = df.columns.get_level_values(0)
-
-    # 3) Devolvemos sólo las columnas que nos interesan
-    return df[["Open", "High", "Low", "Close", "Volume"]]
+    Descarga OHLCV para `ticker` en `intervalo` desde el proveedor de datos.
+    Si `start` y `end` están, pide ese rango; si no, TODO el histórico.
+
+    Las temporalidades intradía pasan por el almacén local: si ya cubre el
+    inicio pedido sólo se descarga la cola que falta, y lo descargado se
+    agrega al almacén para la próxima vez (Yahoo sólo sirve unos pocos
+    meses de velas intradía).
+
+    Lo descargado ya viene validado y reparado (``utils.data_quality``),
+    con el reporte de calidad en ``attrs["calidad"]``.
+    """
+    if intervalo not in INTERVALOS_STORE or start is None or end is None:
+        return _descargar(ticker, intervalo, start, end)
+
+    store = store or HistoryStore()
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end) + timedelta(days=1) - timedelta(microseconds=1)
+    bounds = store.bounds(ticker, intervalo)
+
+    if cubre_inicio(bounds, start_ts):
+        sincronizar_store(ticker, intervalo, end, store)
+        return _desde_store(store.read(ticker, intervalo, start_ts, end_ts))
+
+    df = _descargar(ticker, intervalo, start, end)
+    if not df.empty:
+        store.append(ticker, intervalo, OHLCV.from_frame(df))
+    return df
+
+
+def sincronizar_store(ticker: str, intervalo: str, end, store: HistoryStore) -> None:
+    """
+    Agrega al almacén la cola que falte hasta `end`; la descarga incluye la
+    última vela guardada, que se reescribe si quedó en formación en la
+    sincronización anterior.  La misma cola se pide
+    a lo sumo una vez cada ``REFRESCO_COLA`` segundos: volver a leer el
+    mismo símbolo (otra temporalidad, otro rerun) no repite la descarga.
+    Sólo cuenta una sincronización exitosa: si la descarga falla, el
+    próximo pedido vuelve a intentarla.
+    """
+    fin = pd.Timestamp(end) + timedelta(days=1) - timedelta(microseconds=1)
+    clave = (str(store.root), ticker, intervalo)
+
+    def _pendiente() -> pd.Timestamp | None:
+        # Última vela guardada si falta cola y no se sincronizó hace poco
+        bounds = store.bounds(ticker, intervalo)
+        if bounds is None or pd.Timestamp(bounds[1]) >= fin or _sincronizado_hace_poco(clave):
+            return None
+        return pd.Timestamp(bounds[1])
+
+    if _pendiente() is None:
+        return
+    # Límites → descarga → append bajo un mismo bloqueo (hilos y procesos);
+    # al obtenerlo se vuelve a mirar: otra sesión pudo sincronizar mientras
+    with store.bloqueo(ticker, intervalo):
+        ultimo = _pendiente()
+        if ultimo is None:
+            return
+        cola = _descargar(ticker, intervalo, ultimo.normalize(), end)
+        if not cola.empty:
+            store.append(ticker, intervalo, OHLCV.from_frame(cola))
+        _marcar_sincronizado(clave)
+
+
+# ——— Panel multi-símbolo (screeners) ————————————————————————————————
+
+def panel_desde_frame(df: pd.DataFrame, tickers: list[str]) -> dict:
+    """
+    Convierte una historia masiva del proveedor (columnas ``(campo,
+    ticker)``, el formato de ``yf.download`` con varios tickers) en un
+    panel de arrays ``(símbolos, tiempo)``: ``{"symbols": [...], "ts": int64 ns, "open": ..., ..., "volume": ...}``.
+
+    Se quitan los símbolos sin ningún cierre y las fechas donde ningún
+    símbolo cotiza; los huecos restantes quedan como NaN.
+    """
+    idx = pd.DatetimeIndex(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    campos = {}
+    for f in FIELDS:
+        wide = df[f.capitalize()] if isinstance(df.columns, pd.MultiIndex) else df[[f.capitalize()]]
+        campos[f] = wide.reindex(columns=tickers).to_numpy(dtype=np.float64).T
+    con_datos = ~np.isnan(campos["close"]).all(axis=1)
+    fechas = ~np.isnan(campos["close"][con_datos]).all(axis=0)
+    panel = {f: np.ascontiguousarray(a[con_datos][:, fechas]) for f, a in campos.items()}
+    panel["symbols"] = [t for t, ok in zip(tickers, con_datos) if ok]
+    panel["ts"] = idx.as_unit("ns").asi8[fechas]
+    return panel
+
+
+def panel_desde_series(series: dict[str, OHLCV]) -> dict:
+    """
+    Panel ``(símbolos, tiempo)`` con la unión de las fechas de `series`
+    (una ``OHLCV`` por símbolo) y NaN donde un símbolo no tiene vela.
+    """
+    series = {t: d for t, d in series.items() if len(d)}
+    ts = np.unique(np.concatenate([d.ts for d in series.values()])) if series else np.empty(0, np.int64)
+    panel = {"symbols": list(series), "ts": ts}
+    for f in FIELDS:
+        panel[f] = np.full((len(series), len(ts)), np.nan)
+        for i, d in enumerate(series.values()):
+            panel[f][i, np.searchsorted(ts, d.ts)] = getattr(d, f)
+    return panel
+
+
+def _sincronizar_panel(tickers: list[str], intervalo: str, start, end, store: HistoryStore) -> dict[str, OHLCV]:
+    """
+    Trae al almacén lo que falta de `tickers` con a lo sumo dos historias
+    masivas: la completa de los símbolos que no cubre desde `start` y la
+    cola (desde el día más viejo que falte) de los demás.  Devuelve lo
+    bajado completo: el almacén no agrega velas anteriores a su primera.
+    """
+    fin = pd.Timestamp(end) + timedelta(days=1) - timedelta(microseconds=1)
+    nuevos, colas = [], {}
+    for t in tickers:
+        bounds = store.bounds(t, intervalo)
+        if _sincronizado_hace_poco((str(store.root), t, intervalo)):
+            continue
+        if not cubre_inicio(bounds, start):
+            nuevos.append(t)
+        elif pd.Timestamp(bounds[1]) < fin:
+            colas[t] = pd.Timestamp(bounds[1]).normalize()
+    completos = {}
+    for grupo, desde in ((nuevos, start), (list(colas), min(colas.values(), default=None))):
+        if not grupo:
+            continue
+        df = get_provider().llamar("bulk_history", grupo, intervalo, desde, end)
+        bajado = validar_panel(panel_desde_frame(df, grupo), intervalo, relleno="no")
+        for i, t in enumerate(bajado["symbols"]):
+            ok = ~np.isnan(bajado["close"][i])
+            data = OHLCV(bajado["ts"][ok], *(bajado[f][i, ok] for f in FIELDS))
+            store.append(t, intervalo, data)
+            if grupo is nuevos:
+                completos[t] = data
+        for t in grupo:
+            _marcar_sincronizado((str(store.root), t, intervalo))
+    return completos
+
+
+@instrumented("descargar_panel", kind="data")
+def descargar_panel(tickers: list[str], start, end, intervalo: str = "1d",
+                    store: HistoryStore | None = None) -> dict:
+    """
+    Descarga OHLCV de todos los `tickers` con una sola historia masiva del
+    proveedor y la devuelve como panel ``(símbolos, tiempo)`` (ver
+    ``panel_desde_frame``), validado y con el reporte de calidad por
+    símbolo en ``panel["calidad"]`` (``utils.data_quality.validar_panel``).
+
+    Las temporalidades intradía pasan por el almacén local, como en
+    ``cargar_precio_historico``: sólo se descarga lo que falta (símbolos
+    nuevos y colas) y el panel se lee del almacén.
+    """
+    tickers = list(tickers)
+    if intervalo in INTERVALOS_STORE:
+        store = store or HistoryStore()
+        completos = _sincronizar_panel(tickers, intervalo, start, end, store)
+        fin = pd.Timestamp(end) + timedelta(days=1) - timedelta(microseconds=1)
+        series = {t: completos[t] if t in completos else store.read(t, intervalo, start, fin) for t in tickers}
+        return validar_panel(panel_desde_series(series), intervalo)
+    df = get_provider().llamar("bulk_history", tickers, intervalo, start, end)
+    return validar_panel(panel_desde_frame(df, tickers), intervalo)
+
+
+@instrumented("cargar_panel", kind="cache")
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=16)
+def cargar_panel(tickers: tuple[str, ...], start: str, end: str, intervalo: str = "1d") -> dict:
+    """``descargar_panel`` cacheado una hora por (tickers, fechas, intervalo)."""
+    contar_miss("cargar_panel")
+    return descargar_panel(list(tickers), start, end, intervalo)
+
+
+# ——— Cadenas de opciones ——————————————————————————————————————————
+
+CADENA_COLS = ["expiry", "T", "tipo", "strike", "bid", "ask", "mid", "impliedVolatility", "openInterest"]
+
+
+def _cadena_vencimiento(cadena: pd.DataFrame, expiry: str, hoy: pd.Timestamp) -> pd.DataFrame:
+    df = cadena.copy()
+    df["expiry"] = pd.Timestamp(expiry)
+    # Vencimiento al cierre del día (16:00 NY ≈ 21:00 UTC) en años
+    df["T"] = ((df["expiry"] + pd.Timedelta(hours=21)) - hoy).dt.total_seconds() / (365 * 86400)
+    df["mid"] = (df["bid"] + df["ask"]) / 2
+    return df
+
+
+async def _cadena_completa(provider, ticker: str, dias_max: int) -> pd.DataFrame:
+    expiraciones = await provider.option_expiries(ticker)
+    hoy = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    expiraciones = [e for e in expiraciones if (pd.Timestamp(e) - hoy).days <= dias_max]
+    if not expiraciones:
+        return pd.DataFrame(columns=CADENA_COLS)
+    # Todos los vencimientos en paralelo (acotado por el proveedor)
+    cadenas = await asyncio.gather(*(provider.option_chain(ticker, e) for e in expiraciones))
+    df = pd.concat(
+        [_cadena_vencimiento(c, e, hoy) for c, e in zip(cadenas, expiraciones)], ignore_index=True
+    )[CADENA_COLS]
+    return df[df["T"] > 0].sort_values(["tipo", "expiry", "strike"]).reset_index(drop=True)
+
+
+@instrumented("cargar_cadena_opciones", kind="cache")
+@st.cache_data(show_spinner=False, ttl=300, max_entries=256)
+def cargar_cadena_opciones(ticker: str, dias_max: int = 400) -> pd.DataFrame:
+    """
+    Cadena completa de `ticker` (calls y puts de todos los vencimientos
+    hasta `dias_max` días), una fila por contrato con columnas
+    ``CADENA_COLS``.  Los vencimientos se piden en paralelo y el resultado
+    queda cacheado 5 minutos.
+    """
+    contar_miss("cargar_cadena_opciones")
+    provider = get_provider()
+    with timed(f"{provider.nombre}.option_chain", kind=provider.kind):
+        return provider.run(_cadena_completa(provider, ticker, dias_max))
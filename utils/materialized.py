@@ -0,0 +1,189 @@
+"""
+Resultados materializados de indicadores (MavilimW, WAE, Darvas) por símbolo.
+
+Los escribe el job ``jobs.precompute_indicators`` y los leen las secciones
+cuando existen.  Estructura en disco (Parquet, columnar)::
+
+    <root>/v<VERSION>/<intervalo>/<hash de parámetros>/
+        params.json        parámetros y fecha de generación
+        <símbolo>.parquet  DataFrame de cálculo completo (Date, OHLCV, señales)
+        estado.parquet     una fila por símbolo con el estado de la última vela
+                           y su última señal (lo que muestra el screener)
+
+``VERSION`` se incrementa cuando cambia el cálculo, así los resultados
+viejos quedan ignorados en lugar de mezclarse con los nuevos.
+
+El job calcula sobre toda la historia descargada (``--start``) y la lectura
+recorta la ventana pedida, así que sus indicadores llegan ya calentados a
+la primera vela.  El cálculo en vivo arranca en `start`: sus primeras velas
+tienen NaN (Darvas, MavilimW) o EMAs todavía sin converger (WAE).  Pasado
+el calentamiento, Darvas y MavilimW coinciden exactamente.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from utils.sesiones import sesion_de
+
+VERSION = 2
+DEFAULT_ROOT = Path(
+    os.getenv("GROWTHIA_MATERIALIZED_DIR", Path(__file__).resolve().parent.parent / "data" / "materialized")
+)
+
+# Atraso aceptado de la última vela materializada: en intradía, unas velas
+# del intervalo; en diario o más, fines de semana y feriados
+VELAS_TOLERANCIA = 3
+_TOLERANCIA_LARGA = {
+    "1d": pd.Timedelta(days=4), "5d": pd.Timedelta(days=8), "1wk": pd.Timedelta(days=11),
+    "1mo": pd.Timedelta(days=35), "3mo": pd.Timedelta(days=95),
+}
+_CIERRE_BOLSA = pd.Timedelta(hours=16)
+
+# Columnas del resumen diario de señales (estado.parquet)
+ESTADO_COLS = [
+    "Ticker", "Date", "Close", "Volume", "darvas_high", "darvas_low", "mavilimw",
+    "trend_state", "buy_final", "sell_final", "ultima_senal", "tipo_ultima_senal",
+    "velas_desde_senal", "cierre_senal", "ruptura_pct", "vol_ratio",
+]
+# Velas del volumen medio de `vol_ratio` (el valor por defecto del screener)
+VENTANA_VOL = 20
+
+
+def param_hash(params: dict) -> str:
+    """Hash corto y estable de un diccionario de parámetros."""
+    raw = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def _safe(name: str) -> str:
+    return name.replace("/", "_").replace("\\", "_")
+
+
+def directorio(interval: str, params: dict, root: Path = DEFAULT_ROOT) -> Path:
+    return Path(root) / f"v{VERSION}" / _safe(interval) / param_hash(params)
+
+
+def guardar_indicadores(symbol: str, interval: str, params: dict, df_calc: pd.DataFrame,
+                        root: Path = DEFAULT_ROOT) -> Path:
+    d = directorio(interval, params, root)
+    d.mkdir(parents=True, exist_ok=True)
+    meta = d / "params.json"
+    if not meta.exists():
+        meta.write_text(json.dumps({"version": VERSION, "interval": interval, "params": params}, indent=2))
+    path = d / f"{_safe(symbol)}.parquet"
+    tmp = path.with_suffix(".parquet.tmp")
+    df_calc.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def tolerancia_de(interval: str) -> pd.Timedelta:
+    """Atraso aceptado de la última vela para `interval` (``VELAS_TOLERANCIA`` velas en intradía)."""
+    if interval in _TOLERANCIA_LARGA:
+        return _TOLERANCIA_LARGA[interval]
+    return VELAS_TOLERANCIA * pd.Timedelta(interval)
+
+
+def _fin_esperado(symbol: str, interval: str, end) -> pd.Timestamp:
+    # Diario o más: el día de `end`.  Intradía: el cierre de la última sesión
+    # hasta `end` (o ahora, si todavía no cerró)
+    dia = pd.Timestamp(end).normalize()
+    if interval in _TOLERANCIA_LARGA:
+        return dia
+    sesion = sesion_de(symbol)
+    if sesion != "cripto":
+        dia = pd.offsets.BDay().rollback(dia)
+    cierre = dia + (_CIERRE_BOLSA if sesion == "bolsa" else pd.Timedelta(days=1))
+    return min(cierre, pd.Timestamp.now())
+
+
+def leer_indicadores(symbol: str, interval: str, params: dict, start=None, end=None,
+                     root: Path = DEFAULT_ROOT, tolerancia: pd.Timedelta | None = None):
+    """
+    DataFrame de cálculo materializado entre `start` y `end`, o ``None`` si
+    no existe o no cubre el rango.  Se acepta que la última vela llegue
+    hasta `tolerancia` (por defecto ``tolerancia_de(interval)``) antes del
+    final esperado de `end`.  Los indicadores vienen calentados con toda la
+    historia del job: las primeras velas no coinciden con el cálculo en vivo
+    desde `start` (ver el docstring del módulo).
+    """
+    path = directorio(interval, params, root) / f"{_safe(symbol)}.parquet"
+    if not path.exists():
+        return None
+    df = pd.read_parquet(path)
+    if df.empty:
+        return None
+    if start is not None and df["Date"].iloc[0].normalize() > pd.Timestamp(start):
+        return None
+    if tolerancia is None:
+        tolerancia = tolerancia_de(interval)
+    if end is not None and df["Date"].iloc[-1] < _fin_esperado(symbol, interval, end) - tolerancia:
+        return None
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df["Date"] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df["Date"] < pd.Timestamp(end) + pd.Timedelta(days=1)
+    return df.loc[mask].reset_index(drop=True)
+
+
+def fila_estado(symbol: str, df_calc: pd.DataFrame) -> dict:
+    """
+    Resumen de la última vela de `df_calc` para estado.parquet, con la
+    ruptura y el volumen relativo de la última señal medidos como en
+    ``utils.screeners.screen_darvas``.
+    """
+    last = df_calc.iloc[-1]
+    fila = {"Ticker": symbol, **{c: last[c] for c in ESTADO_COLS[1:10]}, **dict.fromkeys(ESTADO_COLS[10:])}
+    senales = (df_calc["buy_final"] | df_calc["sell_final"]).to_numpy().nonzero()[0]
+    if not len(senales):
+        return fila
+    i = senales[-1]
+    ultima = df_calc.iloc[i]
+    compra = bool(ultima["buy_final"])
+    vol_media = df_calc["Volume"].rolling(VENTANA_VOL).mean().shift(1).iloc[i]
+    fila.update({
+        "ultima_senal": ultima["Date"],
+        "tipo_ultima_senal": "compra" if compra else "venta",
+        "velas_desde_senal": len(df_calc) - 1 - i,
+        "cierre_senal": ultima["Close"],
+        "ruptura_pct": (ultima["Close"] / ultima["prev_dh"] - 1 if compra
+                        else 1 - ultima["Close"] / ultima["prev_dl"]) * 100,
+        "vol_ratio": ultima["Volume"] / vol_media,
+    })
+    return fila
+
+
+def guardar_estado(interval: str, params: dict, filas: list[dict], root: Path = DEFAULT_ROOT) -> Path:
+    d = directorio(interval, params, root)
+    d.mkdir(parents=True, exist_ok=True)
+    path = d / "estado.parquet"
+    tmp = path.with_suffix(".parquet.tmp")
+    pd.DataFrame(filas, columns=ESTADO_COLS).to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    meta = json.loads((d / "params.json").read_text()) if (d / "params.json").exists() else {}
+    meta.update({"version": VERSION, "interval": interval, "params": params,
+                 "generado": datetime.now().isoformat(timespec="seconds"), "simbolos": len(filas)})
+    (d / "params.json").write_text(json.dumps(meta, indent=2))
+    return path
+
+
+def leer_estado(interval: str, params: dict, end=None, root: Path = DEFAULT_ROOT) -> pd.DataFrame | None:
+    """
+    Estado de la última vela de todo el universo, o ``None`` si no hay o,
+    con `end`, si la vela más reciente quedó más de ``tolerancia_de``
+    antes del final esperado de `end` (el universo cotiza en bolsa).
+    """
+    path = directorio(interval, params, root) / "estado.parquet"
+    if not path.exists():
+        return None
+    estado = pd.read_parquet(path)
+    if estado.empty:
+        return None
+    if end is not None and estado["Date"].max() < _fin_esperado("", interval, end) - tolerancia_de(interval):
+        return None
+    return estado
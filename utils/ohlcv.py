@@ -0,0 +1,126 @@
+"""
+Contenedor OHLCV compacto para el camino de backtest.
+
+Guarda cada campo como un array NumPy contiguo (float64 para precios,
+int64 o float64 para volumen) y los timestamps como int64 en nanosegundos.
+Rebanar devuelve vistas (sin copiar) y los indicadores/señales derivados se
+calculan la primera vez que se piden y quedan guardados en el propio
+contenedor.  La conversión a DataFrame se hace sólo en el borde de la UI.
+"""
+from typing import Callable, Hashable
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("open", "high", "low", "close", "volume")
+_COLUMNAS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+
+class OHLCV:
+    __slots__ = ("ts", "open", "high", "low", "close", "volume", "_derived")
+
+    def __init__(self, ts, open, high, low, close, volume):
+        self.ts = np.ascontiguousarray(ts, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        volume = np.asarray(volume)
+        self.volume = np.ascontiguousarray(
+            volume, dtype=np.int64 if volume.dtype.kind in "iu" else np.float64
+        )
+        self._derived: dict[Hashable, object] = {}
+        n = len(self.ts)
+        if any(len(getattr(self, f)) != n for f in FIELDS):
+            raise ValueError("Todas las columnas OHLCV deben tener el mismo largo")
+
+    # ——— Conversión con DataFrame (borde de la UI) ————————————————————
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "OHLCV":
+        """
+        Desde un DataFrame con índice de fechas y columnas Open..Volume (el
+        formato de ``cargar_precio_historico``, ya validado al descargar por
+        ``utils.data_quality``).  Las fechas con zona horaria se pasan a hora
+        local sin zona, como hace el resto de la app.
+        """
+        idx = pd.DatetimeIndex(df.index)
+        if idx.tz is not None:
+            idx = idx.tz_localize(None)
+        cols = {f: df[c].to_numpy() for f, c in _COLUMNAS.items()}
+        return cls(idx.as_unit("ns").asi8, **cols)
+
+    def to_frame(self, extra: dict[str, np.ndarray] | None = None, date_col: str = "Date") -> pd.DataFrame:
+        """
+        DataFrame con columna `date_col` y los campos OHLCV, más las columnas
+        de `extra` (arrays del mismo largo).
+        """
+        data = {date_col: self.dates()}
+        data.update({_COLUMNAS[f]: getattr(self, f) for f in FIELDS})
+        if extra:
+            data.update(extra)
+        return pd.DataFrame(data, copy=False)
+
+    def dates(self) -> np.ndarray:
+        return self.ts.view("datetime64[ns]")
+
+    # ——— Vistas ————————————————————————————————————————————————————
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __getitem__(self, key) -> "OHLCV":
+        """
+        ``data[a:b]`` devuelve un OHLCV que comparte memoria con el original.
+        Los derivados ya calculados se rebanan igual (conservan el warm-up
+        calculado sobre toda la historia).
+        """
+        if not isinstance(key, slice):
+            raise TypeError("OHLCV sólo admite rebanadas (data[a:b])")
+        out = OHLCV.__new__(OHLCV)
+        for f in ("ts",) + FIELDS:
+            setattr(out, f, getattr(self, f)[key])
+        out._derived = {k: _slice_derived(v, key) for k, v in self._derived.items()}
+        return out
+
+    def between(self, start=None, end=None) -> "OHLCV":
+        """Vista de las velas con ``start <= fecha <= end``."""
+        lo = 0 if start is None else int(np.searchsorted(self.ts, pd.Timestamp(start).value, "left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.ts, pd.Timestamp(end).value, "right"))
+        return self[lo:hi]
+
+    def dropna(self) -> "OHLCV":
+        """Sin velas con High/Low/Close NaN (devuelve `self` si no hay ninguna)."""
+        bad = np.isnan(self.high) | np.isnan(self.low) | np.isnan(self.close)
+        if not bad.any():
+            return self
+        ok = ~bad
+        return OHLCV(*(getattr(self, f)[ok] for f in ("ts",) + FIELDS))
+
+    # ——— Derivados perezosos ——————————————————————————————————————
+    def derived(self, key: Hashable, compute: Callable[["OHLCV"], object]):
+        """
+        Devuelve el derivado `key`, calculándolo con ``compute(self)`` sólo
+        la primera vez.  `key` debe incluir los parámetros del cálculo.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            value = self._derived[key] = compute(self)
+            return value
+
+    @property
+    def nbytes(self) -> int:
+        total = sum(getattr(self, f).nbytes for f in ("ts",) + FIELDS)
+        for v in self._derived.values():
+            if isinstance(v, dict):
+                total += sum(a.nbytes for a in v.values() if isinstance(a, np.ndarray))
+            elif isinstance(v, np.ndarray):
+                total += v.nbytes
+        return total
+
+
+def _slice_derived(value, key: slice):
+    if isinstance(value, np.ndarray):
+        return value[key]
+    if isinstance(value, dict):
+        return {k: (a[key] if isinstance(a, np.ndarray) else a) for k, a in value.items()}
+    return value
@@ -1,5 +1,6 @@
 import numpy as np
 import math
+from scipy.special import ndtr
 from scipy.stats import norm
 
 def calcular_delta_call_put(S, K, T, r, sigma, tipo="CALL"):
@@ -15,3 +16,46 @@ def calcular_payoff_call(S, K, premium):
 
 def calcular_payoff_put(S, K, premium):
     return np.maximum(K-S,0) - premium
+
+
+def bs_price(S, K, T, r, sigma, tipo="CALL"):
+    """
+    Precio Black-Scholes vectorizado: `S`, `K`, `T` (años), `r`, `sigma` y
+    `tipo` ("CALL"/"PUT" o un array booleano ``es_call``) se combinan por
+    broadcasting de NumPy.  Con ``T <= 0`` o ``sigma <= 0`` devuelve el
+    valor intrínseco (descontado).
+    """
+    S, K, T, r, sigma = (np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma))
+    tipo = np.asarray(tipo)
+    es_call = np.char.upper(tipo.astype(str)) == "CALL" if tipo.dtype.kind in "UO" else tipo.astype(bool)
+    vivo = (T > 0) & (sigma > 0)
+    T_ = np.where(vivo, T, 1.0)
+    sig_ = np.where(vivo, sigma, 1.0)
+    sqrt_t = np.sqrt(T_)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(S / K) + (r + 0.5 * sig_**2) * T_) / (sig_ * sqrt_t)
+    d2 = d1 - sig_ * sqrt_t
+    desc = K * np.exp(-r * np.maximum(T, 0.0))
+    # CALL = S·N(d1) - K·e^(-rT)·N(d2); PUT = -(S·N(-d1) - K·e^(-rT)·N(-d2))
+    signo = np.where(es_call, 1.0, -1.0)
+    precio = signo * (S * ndtr(signo * d1) - desc * ndtr(signo * d2))
+    intrinseco = np.where(es_call, np.maximum(S - desc, 0.0), np.maximum(desc - S, 0.0))
+    return np.where(vivo, precio, intrinseco)
+
+
+def bs_delta(S, K, T, r, sigma, tipo="CALL"):
+    """
+    Delta Black-Scholes vectorizado (mismo broadcasting que ``bs_price``):
+    ``N(d1)`` para CALL y ``N(d1) - 1`` para PUT.  Con ``T <= 0`` o
+    ``sigma <= 0`` es la delta del valor intrínseco (0 o ±1).
+    """
+    S, K, T, r, sigma = (np.asarray(x, dtype=np.float64) for x in (S, K, T, r, sigma))
+    tipo = np.asarray(tipo)
+    es_call = np.char.upper(tipo.astype(str)) == "CALL" if tipo.dtype.kind in "UO" else tipo.astype(bool)
+    vivo = (T > 0) & (sigma > 0)
+    T_ = np.where(vivo, T, 1.0)
+    sig_ = np.where(vivo, sigma, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(S / K) + (r + 0.5 * sig_**2) * T_) / (sig_ * np.sqrt(T_))
+    d1 = np.where(vivo, d1, np.where(S > K, np.inf, -np.inf))
+    return ndtr(d1) - np.where(es_call, 0.0, 1.0)
@@ -0,0 +1,237 @@
+"""
+Métricas de desempeño de curvas de equity: CAGR, volatilidad, Sharpe,
+Sortino, Calmar, drawdowns (profundidad, duración y recuperación), win rate,
+profit factor y exposición, más Sharpe/volatilidad móviles y tablas de
+retornos mensuales.
+
+Igual que ``utils.kernels``, todo acepta una serie 1-D o un array 2-D
+``(series, tiempo)`` de retornos por vela y opera sobre el último eje:
+miles de resultados de un sweep o de portafolios se resumen en una llamada,
+con acumulados (``cumsum``/``accumulate``) de una pasada y sin bucles de
+Python.  Los cocientes con denominador 0 (sin pérdidas, sin volatilidad) son
+NaN.
+
+La anualización depende de la temporalidad y de la sesión del activo
+(``utils.sesiones``): las acciones operan 252 días de 6,5 horas, el forex
+260 días de 24 horas y las cripto 365 días de 24 horas (ver
+``factor_anual``).
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import instrumented
+from utils.kernels import rolling_mean
+from utils.sesiones import sesion_de
+
+DIAS_BURSATILES = 252
+DIAS_FOREX = 260
+DIAS_CRIPTO = 365
+MINUTOS_SESION = 390  # 9:30 a 16:00 (NYSE/Nasdaq)
+
+_VELAS_SEMANA = {"1wk": 52, "1mo": 12, "3mo": 4}
+_MESES = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+
+
+def factor_anual(interval: str = "1d", symbol: str | None = None) -> float:
+    """
+    Velas por año de `interval` para `symbol`.  Intradía, las acciones suman
+    las velas que abre la sesión regular (con la última parcial: 7 de 1h,
+    como devuelve yfinance); forex y cripto, las de 24 horas de cada día
+    que operan.  Semanal y mensual no dependen del activo.
+    """
+    if interval in _VELAS_SEMANA:
+        return _VELAS_SEMANA[interval]
+    sesion = sesion_de(symbol)
+    dias = {"cripto": DIAS_CRIPTO, "forex": DIAS_FOREX}.get(sesion, DIAS_BURSATILES)
+    if interval == "1d":
+        return dias
+    m = re.fullmatch(r"(\d+)(m|h)", interval)
+    if m is None:
+        raise ValueError(f"Temporalidad desconocida: {interval}")
+    minutos = int(m.group(1)) * (60 if m.group(2) == "h" else 1)
+    if sesion != "bolsa":
+        return dias * 24 * 60 / minutos
+    return dias * -(-MINUTOS_SESION // minutos)
+
+
+def _as_2d(a) -> tuple[np.ndarray, bool]:
+    arr = np.asarray(a, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[None, :], True
+    if arr.ndim != 2:
+        raise ValueError("Se esperaba un array 1-D o 2-D (series × tiempo)")
+    return arr, False
+
+
+def _div(num, den) -> np.ndarray:
+    num, den = np.broadcast_arrays(np.asarray(num, dtype=np.float64), np.asarray(den, dtype=np.float64))
+    out = np.full(num.shape, np.nan)
+    np.divide(num, den, out=out, where=den != 0)
+    return out
+
+
+def retornos_desde_equity(equity) -> np.ndarray:
+    """Retornos simples por vela de una curva de equity (el de la primera vela es 0)."""
+    eq, squeeze = _as_2d(equity)
+    r = eq / np.concatenate([eq[:, :1], eq[:, :-1]], axis=1) - 1
+    return r[0] if squeeze else r
+
+
+def drawdowns(r) -> tuple[np.ndarray, np.ndarray]:
+    """
+    ``(drawdown, velas bajo el agua)`` en cada vela.  El drawdown es la
+    caída desde el máximo previo de la equity (empezando en 1: perder desde
+    la primera vela también cuenta); las velas bajo el agua se reinician
+    cada vez que la equity marca un nuevo máximo.
+    """
+    x, squeeze = _as_2d(r)
+    dd, _, bajo_agua = _drawdowns(np.cumprod(1 + x, axis=1))
+    return (dd[0], bajo_agua[0]) if squeeze else (dd, bajo_agua)
+
+
+def _drawdowns(equity: np.ndarray):
+    n = equity.shape[1]
+    pico = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+    dd = equity / pico - 1
+    idx = np.arange(n)
+    # Índice del último máximo (-1: el capital inicial) para cada vela
+    ultimo_pico = np.maximum.accumulate(np.where(dd >= 0, idx, -1), axis=1)
+    return dd, ultimo_pico, idx - ultimo_pico
+
+
+def _operaciones(x: np.ndarray, en_mercado: np.ndarray):
+    """Fila y retorno compuesto de cada operación (tramo continuo en mercado)."""
+    previo = np.concatenate([np.zeros((x.shape[0], 1), bool), en_mercado[:, :-1]], axis=1)
+    siguiente = np.concatenate([en_mercado[:, 1:], np.zeros((x.shape[0], 1), bool)], axis=1)
+    # log(1+r) acumulado con un 0 inicial: el tramo [i, j] rinde L[j+1] - L[i]
+    log = np.concatenate([np.zeros((x.shape[0], 1)), np.cumsum(np.log1p(x), axis=1)], axis=1)
+    filas, inicio = np.nonzero(en_mercado & ~previo)
+    _, fin = np.nonzero(en_mercado & ~siguiente)
+    return filas, np.expm1(log[filas, fin + 1] - log[filas, inicio])
+
+
+@instrumented("metricas_desempeno")
+def metricas(r, factor: float, posicion=None, rf: float = 0.0) -> dict[str, np.ndarray]:
+    """
+    Métricas de cada serie de retornos por vela `r` (1-D o ``(series, tiempo)``).
+
+    `factor` son las velas por año (``factor_anual``) y `rf` la tasa libre de
+    riesgo anual.  `posicion` (misma forma que `r`, alineada: la posición
+    con la que se ganó el retorno de cada vela) define las operaciones para
+    win rate y profit factor y la exposición; sin ella, cada tramo de
+    retornos distintos de 0 cuenta como una operación.  Devuelve un dict de
+    arrays con un valor por serie (escalares si `r` es 1-D); las duraciones
+    están en velas.
+    """
+    x, squeeze = _as_2d(r)
+    k, n = x.shape
+    if posicion is None:
+        en_mercado = x != 0
+    else:
+        en_mercado = _as_2d(posicion)[0] != 0
+    equity = np.cumprod(1 + x, axis=1)
+    final = equity[:, -1] if n else np.ones(k)
+
+    exceso = x - ((1 + rf) ** (1 / factor) - 1)
+    media = exceso.mean(axis=1) if n else np.full(k, np.nan)
+    std = x.std(axis=1, ddof=1) if n > 1 else np.full(k, np.nan)
+    abajo = np.sqrt((np.minimum(exceso, 0) ** 2).mean(axis=1)) if n else np.full(k, np.nan)
+    anios = n / factor
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cagr = np.where(final > 0, final ** (1 / anios) - 1, -1.0) if n else np.full(k, np.nan)
+
+    dd, _, bajo_agua = _drawdowns(equity)
+    max_dd = dd.min(axis=1) if n else np.zeros(k)
+    valle = dd.argmin(axis=1) if n else np.zeros(k, int)
+    # Primera vela en máximos desde cada vela (n: todavía no recuperó)
+    proximo_pico = np.minimum.accumulate(np.where(dd >= 0, np.arange(n), n)[:, ::-1], axis=1)[:, ::-1]
+    filas = np.arange(k)
+    recuperacion = np.full(k, np.nan)
+    if n:
+        recupera = proximo_pico[filas, valle]
+        recuperacion = np.where(recupera < n, recupera - valle, np.nan)
+        recuperacion[max_dd == 0] = 0
+
+    fila_op, ret_op = _operaciones(x, en_mercado)
+    n_ops = np.bincount(fila_op, minlength=k)
+    ganadas = np.bincount(fila_op, weights=ret_op > 0, minlength=k)
+    ganancia = np.bincount(fila_op, weights=np.maximum(ret_op, 0), minlength=k)
+    perdida = np.bincount(fila_op, weights=np.maximum(-ret_op, 0), minlength=k)
+
+    out = {
+        "total_ret": final - 1,
+        "cagr": cagr,
+        "volatilidad": std * np.sqrt(factor),
+        "sharpe": _div(media, std) * np.sqrt(factor),
+        "sortino": _div(media, abajo) * np.sqrt(factor),
+        "max_dd": max_dd,
+        "calmar": _div(cagr, -max_dd),
+        "dd_duracion": bajo_agua.max(axis=1) if n else np.zeros(k, int),
+        "dd_recuperacion": recuperacion,
+        "operaciones": n_ops,
+        "win_rate": _div(ganadas, n_ops),
+        "profit_factor": _div(ganancia, perdida),
+        "exposicion": en_mercado.mean(axis=1) if n else np.zeros(k),
+    }
+    return {m: v[0] for m, v in out.items()} if squeeze else out
+
+
+def resumen(r, factor: float, nombres=None, posicion=None, rf: float = 0.0) -> pd.DataFrame:
+    """``metricas`` como tabla: una fila por serie."""
+    x, _ = _as_2d(r)
+    pos = None if posicion is None else _as_2d(posicion)[0]
+    return pd.DataFrame(metricas(x, factor, pos, rf), index=nombres)
+
+
+def volatilidad_movil(r, ventana: int, factor: float) -> np.ndarray:
+    """Volatilidad anualizada de las últimas `ventana` velas (``ddof=1``), NaN durante el calentamiento."""
+    x, squeeze = _as_2d(r)
+    _, var = _momentos_moviles(x, ventana)
+    out = np.sqrt(var * factor)
+    return out[0] if squeeze else out
+
+
+def sharpe_movil(r, ventana: int, factor: float) -> np.ndarray:
+    """Sharpe anualizado de las últimas `ventana` velas."""
+    x, squeeze = _as_2d(r)
+    media, var = _momentos_moviles(x, ventana)
+    out = _div(media, np.sqrt(var)) * np.sqrt(factor)
+    out[np.isnan(var)] = np.nan
+    return out[0] if squeeze else out
+
+
+def _momentos_moviles(x: np.ndarray, ventana: int):
+    # Medias móviles de r y r² por bloques (O(n)); los retornos tienen media
+    # chica frente a su dispersión, así E[r²] - E[r]² no pierde precisión
+    media = rolling_mean(x, ventana)
+    cuadrados = rolling_mean(x * x, ventana)
+    var = np.maximum(cuadrados - media * media, 0) * ventana / max(ventana - 1, 1)
+    return media, var
+
+
+def retornos_mensuales(r, fechas) -> tuple[np.ndarray, pd.PeriodIndex]:
+    """
+    Retornos compuestos por mes calendario de cada serie: ``(valores, meses)``
+    con valores de forma ``(series, meses)``.  `fechas` son las de cada vela
+    (ordenadas); un mes sin velas no aparece.
+    """
+    x, squeeze = _as_2d(r)
+    meses = pd.DatetimeIndex(fechas).tz_localize(None).to_period("M")
+    codigos = meses.asi8
+    cortes = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]])
+    if not len(x[0]):
+        return (np.empty((x.shape[0], 0)), meses[:0])
+    valores = np.expm1(np.add.reduceat(np.log1p(x), cortes, axis=1))
+    return (valores[0] if squeeze else valores), meses[cortes]
+
+
+def tabla_mensual(r, fechas) -> pd.DataFrame:
+    """Retornos de una serie por año (filas) y mes (columnas), más el total del año."""
+    valores, meses = retornos_mensuales(np.asarray(r, dtype=np.float64), fechas)
+    df = pd.DataFrame({"Año": meses.year, "Mes": meses.month, "r": valores})
+    tabla = df.pivot(index="Año", columns="Mes", values="r").reindex(columns=range(1, 13))
+    tabla.columns = _MESES
+    tabla["Año"] = np.expm1(np.log1p(df["r"]).groupby(df["Año"]).sum())
+    return tabla
@@ -0,0 +1,270 @@
+"""
+Caché en memoria del pipeline Darvas (datos -> indicadores -> señales).
+
+Tres capas LRU independientes, cada una acotada en bytes:
+
+- ``datos``: OHLCV descargado, por ``(símbolo, intervalo, desde, hasta)``.
+- ``indicadores``: MavilimW + WAE (``mavilimw_wae_kernels``), por la clave
+  de datos más los parámetros de tendencia/fuerza.
+- ``senales``: caja Darvas y señales finales, por la clave de indicadores
+  más ``darvas_window``.
+
+Cambiar sólo ``darvas_window`` recalcula la última capa y reutiliza las
+otras dos.  Los resultados son funciones puras de la clave, así que la
+instancia es única por proceso (``st.cache_resource``) y se comparte entre
+sesiones; los arrays se guardan de sólo lectura para que ninguna sesión
+modifique lo que ve otra.  Cada acceso se registra como span ``cache`` en
+la instrumentación y cada capa lleva sus propios hits/misses/desalojos.
+
+El tamaño total se ajusta con ``GROWTHIA_PIPELINE_CACHE_MB`` (256 MB por
+defecto, repartidos 50/30/20 entre datos, indicadores y señales).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.backtest_helpers import DARVAS_DEFAULTS, darvas_signals_from_kernels
+from utils.instrumentation import contar_miss, timed
+from utils.kernels import mavilimw_wae_kernels, rolling_max, rolling_min
+from utils.ohlcv import FIELDS, OHLCV
+from utils.resample import cargar_temporalidad
+
+CACHE_MB = float(os.getenv("GROWTHIA_PIPELINE_CACHE_MB", "256"))
+REPARTO = {"datos": 0.5, "indicadores": 0.3, "senales": 0.2}
+TTL_DATOS = 3600  # igual que cargar_panel: las velas recientes se refrescan cada hora
+
+_PARAMS_TENDENCIA = ("sensitivity", "fast_ema", "slow_ema", "channel_len", "bb_mult")
+
+
+def _nbytes(value) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, OHLCV):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return 64
+
+
+def _congelar(value):
+    # Sólo lectura: la misma instancia la ven todas las sesiones
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, OHLCV):
+        for f in ("ts",) + FIELDS:
+            getattr(value, f).setflags(write=False)
+    elif isinstance(value, dict):
+        for v in value.values():
+            _congelar(v)
+    return value
+
+
+class CacheLRU:
+    """LRU acotado por bytes (no por entradas), seguro entre hilos."""
+
+    def __init__(self, nombre: str, max_bytes: int, ttl: float | None = None):
+        self.nombre = nombre
+        self.max_bytes = int(max_bytes)
+        self.ttl = ttl
+        self._datos: OrderedDict[Hashable, tuple[object, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.desalojos = 0
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._datos and not self._vencido(self._datos[key])
+
+    def _vencido(self, entrada) -> bool:
+        return self.ttl is not None and time.monotonic() - entrada[2] > self.ttl
+
+    def _quitar(self, key):
+        _, size, _ = self._datos.pop(key)
+        self.bytes -= size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entrada = self._datos.get(key)
+            if entrada is None or self._vencido(entrada):
+                if entrada is not None:
+                    self._quitar(key)
+                self.misses += 1
+                return default
+            self._datos.move_to_end(key)
+            self.hits += 1
+            return entrada[0]
+
+    def put(self, key, value) -> None:
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return  # no entra ni vaciando la capa: no se guarda
+        with self._lock:
+            if key in self._datos:
+                self._quitar(key)
+            self._datos[key] = (value, size, time.monotonic())
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._quitar(next(iter(self._datos)))
+                self.desalojos += 1
+
+    def obtener(self, key, calcular: Callable[[], object]):
+        """
+        Valor de `key` o ``calcular()`` en un miss.  El cálculo corre fuera
+        del lock (dos sesiones pueden calcular la misma clave a la vez; gana
+        la última).  ``None`` no se guarda, así un fallo de descarga se
+        reintenta.
+        """
+        with timed(f"pipeline.{self.nombre}", kind="cache"):
+            value = self.get(key, _FALTA)
+            if value is _FALTA:
+                contar_miss(f"pipeline.{self.nombre}")
+                value = calcular()
+                if value is not None:
+                    self.put(key, _congelar(value))
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._datos.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "Capa": self.nombre,
+            "Entradas": len(self._datos),
+            "MB": self.bytes / 2**20,
+            "Máx MB": self.max_bytes / 2**20,
+            "Hits": self.hits,
+            "Misses": self.misses,
+            "Hit rate": self.hits / total if total else 0.0,
+            "Desalojos": self.desalojos,
+        }
+
+
+_FALTA = object()
+
+
+def _clave_datos(symbol: str, intervalo: str, start, end) -> tuple:
+    return (symbol, intervalo, str(pd.Timestamp(start).date()), str(pd.Timestamp(end).date()))
+
+
+class PipelineCache:
+    """Las tres capas del pipeline Darvas (ver el docstring del módulo)."""
+
+    def __init__(self, max_bytes: int):
+        self.datos_lru = CacheLRU("datos", max_bytes * REPARTO["datos"], ttl=TTL_DATOS)
+        self.indicadores_lru = CacheLRU("indicadores", max_bytes * REPARTO["indicadores"])
+        self.senales_lru = CacheLRU("senales", max_bytes * REPARTO["senales"])
+
+    @property
+    def capas(self) -> tuple[CacheLRU, ...]:
+        return self.datos_lru, self.indicadores_lru, self.senales_lru
+
+    def datos(self, symbol: str, intervalo: str, start, end) -> OHLCV | None:
+        """
+        OHLCV validado al descargar (``utils.data_quality``), o ``None`` si
+        no hay datos.  Si el almacén tiene una base intradía más fina, las
+        velas se arman localmente (``utils.resample``).  El reporte de
+        calidad de la descarga queda como derivado ``("calidad",)``.
+        """
+        def _cargar():
+            df = cargar_temporalidad(symbol, intervalo, start, end)
+            if df is None or df.empty:
+                return None
+            data = OHLCV.from_frame(df)
+            data.derived(("calidad",), lambda _: df.attrs.get("calidad"))
+            return data
+
+        return self.datos_lru.obtener(_clave_datos(symbol, intervalo, start, end), _cargar)
+
+    def _limpio(self, symbol: str, intervalo: str, start, end) -> tuple[OHLCV, tuple] | None:
+        # Velas (ya sin NaN) y su versión: si la capa de datos se refresca
+        # (TTL), las claves de las capas de abajo cambian y no se mezclan largos
+        data = self.datos(symbol, intervalo, start, end)
+        if data is None:
+            return None
+        version = (len(data), int(data.ts[-1]) if len(data) else 0)
+        return data, _clave_datos(symbol, intervalo, start, end) + version
+
+    def indicadores(self, symbol: str, intervalo: str, start, end, params: dict) -> dict | None:
+        """MavilimW + WAE sobre las velas sin NaN; no depende de ``darvas_window``."""
+        limpio = self._limpio(symbol, intervalo, start, end)
+        if limpio is None:
+            return None
+        d, clave = limpio
+        p = {**DARVAS_DEFAULTS, **params}
+        return self.indicadores_lru.obtener(
+            clave + tuple(p[k] for k in _PARAMS_TENDENCIA),
+            lambda: mavilimw_wae_kernels(
+                d.high, d.low, d.close,
+                sensitivity=p["sensitivity"],
+                fastLength=p["fast_ema"],
+                slowLength=p["slow_ema"],
+                channelLength=p["channel_len"],
+                mult=p["bb_mult"],
+            ),
+        )
+
+    def senales(self, symbol: str, intervalo: str, start, end, params: dict) -> dict | None:
+        """Columnas de ``darvas_signal_arrays`` para las velas sin NaN."""
+        limpio = self._limpio(symbol, intervalo, start, end)
+        if limpio is None:
+            return None
+        d, clave = limpio
+        p = {**DARVAS_DEFAULTS, **params}
+
+        def _calcular():
+            k = {
+                **self.indicadores(symbol, intervalo, start, end, p),
+                "darvas_high": rolling_max(d.high, p["darvas_window"]),
+                "darvas_low": rolling_min(d.low, p["darvas_window"]),
+            }
+            return darvas_signals_from_kernels(d.close, k)
+
+        return self.senales_lru.obtener(
+            clave + tuple(p[k] for k in _PARAMS_TENDENCIA) + (p["darvas_window"],), _calcular
+        )
+
+    def backtest(self, symbol: str, intervalo: str, start, end, params: dict):
+        """
+        ``(df_hist, df_calc)`` listos para la UI (como en ``backtest_darvas``)
+        o ``None`` si no hay datos.
+        """
+        senales = self.senales(symbol, intervalo, start, end, params)
+        if senales is None:
+            return None
+        data = self.datos(symbol, intervalo, start, end)
+        df_hist = data.to_frame()
+        df_hist.attrs["calidad"] = data.derived(("calidad",), lambda _: None)
+        return df_hist, data.to_frame(senales)
+
+    def stats(self) -> pd.DataFrame:
+        return pd.DataFrame([c.stats() for c in self.capas])
+
+    def clear(self) -> None:
+        for c in self.capas:
+            c.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def pipeline_cache() -> PipelineCache:
+    """Instancia única por proceso, compartida por todas las sesiones."""
+    return PipelineCache(int(CACHE_MB * 2**20))
@@ -0,0 +1,55 @@
+"""
+Proveedores de datos de mercado (historia, historia masiva y cadenas de
+opciones) detrás de una interfaz asíncrona común (ver ``base``).
+
+El backend se elige con ``GROWTHIA_DATA_PROVIDER``: ``yfinance`` (por
+defecto), ``schwab`` o ``fixture`` (archivos locales, para correr la app y
+los benchmarks sin red).  ``get_provider()`` devuelve una instancia única
+por proceso, así la coalescencia y el límite de concurrencia valen para
+todas las sesiones.  ``GROWTHIA_PROVIDER_CONCURRENCIA`` cambia el límite
+de llamadas simultáneas al backend (por defecto, el de cada proveedor).
+"""
+import os
+import threading
+
+from utils.providers.base import CADENA_PROVEEDOR, COLUMNAS, MarketDataProvider
+
+PROVEEDORES = {
+    "yfinance": "utils.providers.yfinance_provider:YFinanceProvider",
+    "schwab": "utils.providers.schwab_provider:SchwabProvider",
+    "fixture": "utils.providers.fixture_provider:FixtureProvider",
+}
+
+_instancia: MarketDataProvider | None = None
+_lock = threading.Lock()
+
+
+def crear_provider(nombre: str, **kwargs) -> MarketDataProvider:
+    """Instancia nueva del backend `nombre` (importa sólo ese backend)."""
+    import importlib
+
+    try:
+        modulo, clase = PROVEEDORES[nombre].split(":")
+    except KeyError:
+        raise ValueError(f"Proveedor desconocido: {nombre} (opciones: {', '.join(PROVEEDORES)})")
+    return getattr(importlib.import_module(modulo), clase)(**kwargs)
+
+
+def get_provider() -> MarketDataProvider:
+    """Proveedor configurado en ``GROWTHIA_DATA_PROVIDER`` (única instancia por proceso)."""
+    global _instancia
+    with _lock:
+        if _instancia is None:
+            kwargs = {}
+            if os.getenv("GROWTHIA_PROVIDER_CONCURRENCIA"):
+                kwargs["max_concurrencia"] = int(os.environ["GROWTHIA_PROVIDER_CONCURRENCIA"])
+            _instancia = crear_provider(os.getenv("GROWTHIA_DATA_PROVIDER", "yfinance").lower(), **kwargs)
+        return _instancia
+
+
+def set_provider(provider: MarketDataProvider | None) -> None:
+    """Reemplaza el proveedor del proceso (tests, harness de carga); ``None`` vuelve al de la variable de entorno."""
+    global _instancia
+    with _lock:
+        _instancia = provider
+
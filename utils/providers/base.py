@@ -0,0 +1,163 @@
+"""
+Interfaz común de los proveedores de datos de mercado.
+
+Cada backend implementa cuatro corrutinas "crudas" (``_history``,
+``_bulk_history``, ``_option_expiries`` y ``_option_chain``) y devuelve
+siempre el mismo formato normalizado:
+
+- historia: DataFrame con índice de fechas sin zona (``Date``) y columnas
+  ``Open, High, Low, Close, Volume``;
+- historia masiva: columnas MultiIndex ``(campo, ticker)`` con los mismos
+  campos (el formato que consume ``market_data.panel_desde_frame``);
+- vencimientos: lista de fechas ``YYYY-MM-DD``;
+- cadena: columnas ``tipo`` (CALL/PUT), ``strike``, ``bid``, ``ask``,
+  ``impliedVolatility`` (decimal) y ``openInterest``.
+
+Los métodos públicos agregan lo que es igual para todos: coalescencia
+(pedidos idénticos en vuelo comparten una sola descarga), un semáforo que
+limita las llamadas bloqueantes concurrentes al backend (``en_hilo``) y un
+event loop propio en un hilo de fondo, compartido por todas las sesiones
+de Streamlit.  El código
+sincrónico llama con ``proveedor.llamar("history", ...)``, que además mide
+la llamada con la instrumentación del hilo que la pide.
+"""
+import abc
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+import numpy as np
+import pandas as pd
+
+from utils.instrumentation import timed
+
+COLUMNAS = ["Open", "High", "Low", "Close", "Volume"]
+CADENA_PROVEEDOR = ["tipo", "strike", "bid", "ask", "impliedVolatility", "openInterest"]
+
+
+def _clave_fecha(x) -> str | None:
+    return None if x is None else str(pd.Timestamp(x))
+
+
+def normalizar_historia(df: pd.DataFrame) -> pd.DataFrame:
+    """Índice de fechas sin zona horaria y sólo las columnas ``COLUMNAS`` (float)."""
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    idx = pd.DatetimeIndex(pd.to_datetime(df.index))
+    df.index = (idx.tz_localize(None) if idx.tz is not None else idx).rename("Date")
+    return df.reindex(columns=COLUMNAS).astype(np.float64)
+
+
+def historia_masiva(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Une historias por símbolo en columnas ``(campo, ticker)``."""
+    frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_product([COLUMNAS, []]))
+    wide = pd.concat(frames, axis=1).sort_index()
+    return wide.swaplevel(0, 1, axis=1).sort_index(axis=1, level=0)
+
+
+class MarketDataProvider(abc.ABC):
+    """Base de los backends (ver el docstring del módulo)."""
+
+    nombre = "base"
+    kind = "network"  # tipo de span en la instrumentación
+
+    def __init__(self, max_concurrencia: int = 8):
+        self.max_concurrencia = max_concurrencia
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrencia,
+                                            thread_name_prefix=f"{self.nombre}-io")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaforo: asyncio.Semaphore | None = None
+        self._en_vuelo: dict[tuple, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.coalescidas = 0
+
+    # ——— Event loop compartido ————————————————————————————————————————
+    def _loop_activo(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, daemon=True,
+                                 name=f"{self.nombre}-loop").start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro: Awaitable):
+        """Ejecuta `coro` en el loop del proveedor y espera el resultado."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop_activo()).result()
+
+    def llamar(self, metodo: str, *args, **kwargs):
+        """Versión sincrónica de ``await self.<metodo>(...)``, medida como span."""
+        with timed(f"{self.nombre}.{metodo}", kind=self.kind):
+            return self.run(getattr(self, metodo)(*args, **kwargs))
+
+    async def en_hilo(self, fn: Callable, *args):
+        """
+        Corre una función bloqueante (HTTP, disco) en el pool del proveedor,
+        con a lo sumo ``max_concurrencia`` llamadas al backend a la vez.
+        """
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+        async with self._semaforo:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # ——— Coalescencia ——————————————————————————————————————————————
+    async def _coalescer(self, clave: tuple, fabrica: Callable[[], Awaitable]):
+        futuro = self._en_vuelo.get(clave)
+        if futuro is not None:
+            self.coalescidas += 1
+            return await asyncio.shield(futuro)
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        try:
+            resultado = await fabrica()
+            futuro.set_result(resultado)
+            return resultado
+        except BaseException as e:
+            futuro.set_exception(e)
+            futuro.exception()  # marcada como leída si nadie más esperaba
+            raise
+        finally:
+            del self._en_vuelo[clave]
+
+    # ——— API pública ——————————————————————————————————————————————
+    async def history(self, symbol: str, interval: str = "1d", start=None, end=None) -> pd.DataFrame:
+        """OHLCV de `symbol` entre `start` y `end` (inclusive); sin fechas, todo el histórico."""
+        clave = ("history", symbol, interval, _clave_fecha(start), _clave_fecha(end))
+        return await self._coalescer(clave, lambda: self._history(symbol, interval, start, end))
+
+    async def bulk_history(self, symbols: list[str], interval: str, start, end) -> pd.DataFrame:
+        """OHLCV de varios símbolos en columnas ``(campo, ticker)``."""
+        clave = ("bulk_history", tuple(symbols), interval, _clave_fecha(start), _clave_fecha(end))
+        return await self._coalescer(clave, lambda: self._bulk_history(list(symbols), interval, start, end))
+
+    async def option_expiries(self, symbol: str) -> list[str]:
+        return await self._coalescer(("option_expiries", symbol), lambda: self._option_expiries(symbol))
+
+    async def option_chain(self, symbol: str, expiry: str) -> pd.DataFrame:
+        """Calls y puts de un vencimiento (columnas ``CADENA_PROVEEDOR``)."""
+        return await self._coalescer(("option_chain", symbol, expiry),
+                                     lambda: self._option_chain(symbol, expiry))
+
+    # ——— A implementar por cada backend ————————————————————————————
+    @abc.abstractmethod
+    async def _history(self, symbol: str, interval: str, start, end) -> pd.DataFrame:
+        ...
+
+    async def _bulk_history(self, symbols: list[str], interval: str, start, end) -> pd.DataFrame:
+        # Por defecto, una historia por símbolo en paralelo (cada una coalescida)
+        frames = await asyncio.gather(
+            *(self.history(s, interval, start, end) for s in symbols), return_exceptions=True
+        )
+        return historia_masiva({s: f for s, f in zip(symbols, frames) if isinstance(f, pd.DataFrame)})
+
+    @abc.abstractmethod
+    async def _option_expiries(self, symbol: str) -> list[str]:
+        ...
+
+    @abc.abstractmethod
+    async def _option_chain(self, symbol: str, expiry: str) -> pd.DataFrame:
+        ...
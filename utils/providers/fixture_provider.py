@@ -0,0 +1,95 @@
+"""
+Backend local: historia y cadenas desde archivos Parquet o CSV, sin red.
+
+Estructura de ``raiz`` (``GROWTHIA_FIXTURE_DIR``, por defecto
+``data/fixtures``)::
+
+    history/<intervalo>/<SIMBOLO>.parquet   # o .csv; índice/columna Date + OHLCV
+    options/<SIMBOLO>.parquet               # o .csv; expiry o dias + CADENA_PROVEEDOR
+
+En las cadenas, una columna ``dias`` (días al vencimiento) en lugar de
+``expiry`` hace que los vencimientos se cuenten desde hoy, así un fixture no
+vence nunca.  ``benchmarks.synthetic.escribir_fixtures`` genera un juego
+completo con datos sintéticos.
+"""
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from utils.providers.base import CADENA_PROVEEDOR, MarketDataProvider, normalizar_historia
+
+FIXTURE_DIR = Path(os.getenv("GROWTHIA_FIXTURE_DIR", Path(__file__).resolve().parents[2] / "data" / "fixtures"))
+
+
+def _leer(base: Path) -> pd.DataFrame | None:
+    for ext, leer in ((".parquet", pd.read_parquet), (".csv", pd.read_csv)):
+        path = base.with_suffix(ext)
+        if path.exists():
+            return leer(path)
+    return None
+
+
+def _escribir(df: pd.DataFrame, path: Path):
+    if path.suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def guardar_historia(raiz: Path, symbol: str, interval: str, df: pd.DataFrame, formato: str = "parquet") -> Path:
+    path = Path(raiz) / "history" / interval / f"{symbol}.{formato}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _escribir(normalizar_historia(df).reset_index(), path)
+    return path
+
+
+def guardar_cadena(raiz: Path, symbol: str, df: pd.DataFrame, formato: str = "parquet") -> Path:
+    path = Path(raiz) / "options" / f"{symbol}.{formato}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _escribir(df, path)
+    return path
+
+
+class FixtureProvider(MarketDataProvider):
+    nombre = "fixture"
+    kind = "io"
+
+    def __init__(self, raiz: Path | str = FIXTURE_DIR, max_concurrencia: int = 8):
+        super().__init__(max_concurrencia)
+        self.raiz = Path(raiz)
+
+    def _historia(self, symbol: str, interval: str) -> pd.DataFrame:
+        df = _leer(self.raiz / "history" / interval / symbol)
+        if df is None:
+            raise FileNotFoundError(f"No hay fixture de {symbol} [{interval}] en {self.raiz}")
+        if "Date" in df.columns:
+            df = df.set_index("Date")
+        return normalizar_historia(df).sort_index()
+
+    async def _history(self, symbol, interval, start, end):
+        df = await self.en_hilo(self._historia, symbol, interval)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)]
+        return df
+
+    def _cadena(self, symbol: str) -> pd.DataFrame:
+        df = _leer(self.raiz / "options" / symbol)
+        if df is None:
+            raise FileNotFoundError(f"No hay cadena de {symbol} en {self.raiz}")
+        if "dias" in df.columns:
+            hoy = pd.Timestamp.today().normalize()
+            df["expiry"] = (hoy + pd.to_timedelta(df["dias"], unit="D")).dt.strftime("%Y-%m-%d")
+        else:
+            df["expiry"] = pd.to_datetime(df["expiry"]).dt.strftime("%Y-%m-%d")
+        return df
+
+    async def _option_expiries(self, symbol):
+        df = await self.en_hilo(self._cadena, symbol)
+        return sorted(df["expiry"].unique())
+
+    async def _option_chain(self, symbol, expiry):
+        df = await self.en_hilo(self._cadena, symbol)
+        return df.loc[df["expiry"] == expiry, CADENA_PROVEEDOR].reset_index(drop=True)
@@ -0,0 +1,109 @@
+"""
+Backend Schwab Market Data (``/marketdata/v1``), con las credenciales de
+``utils.schwab_api``.
+
+Schwab no tiene velas de 1 hora: se piden de 30 minutos y se agregan.  Los
+timestamps vienen en milisegundos UTC y se pasan a hora de Nueva York sin
+zona, como los de Yahoo.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.providers.base import CADENA_PROVEEDOR, COLUMNAS, MarketDataProvider
+
+# intervalo -> (frequencyType, frequency, periodType) de /pricehistory
+_FRECUENCIAS = {
+    "1m": ("minute", 1, "day"),
+    "5m": ("minute", 5, "day"),
+    "15m": ("minute", 15, "day"),
+    "30m": ("minute", 30, "day"),
+    "1h": ("minute", 30, "day"),
+    "60m": ("minute", 30, "day"),
+    "1d": ("daily", 1, "year"),
+    "1wk": ("weekly", 1, "year"),
+}
+_AGREGACION = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+def _ms(x) -> int:
+    return int(pd.Timestamp(x).tz_localize("America/New_York").value // 10**6)
+
+
+def velas_a_frame(candles: list[dict], interval: str) -> pd.DataFrame:
+    """``candles`` de /pricehistory -> DataFrame normalizado."""
+    if not candles:
+        return pd.DataFrame(columns=COLUMNAS, index=pd.DatetimeIndex([], name="Date"), dtype=np.float64)
+    df = pd.DataFrame(candles)
+    idx = pd.to_datetime(df["datetime"], unit="ms", utc=True).dt.tz_convert("America/New_York").dt.tz_localize(None)
+    if interval in ("1d", "1wk"):
+        idx = idx.dt.normalize()
+    df = df.rename(columns=str.capitalize).set_index(pd.DatetimeIndex(idx, name="Date"))[COLUMNAS]
+    df = df.astype(np.float64)
+    if interval in ("1h", "60m"):
+        df = df.resample("1h", offset="30min").agg(_AGREGACION).dropna(subset=["Close"])
+    return df
+
+
+def cadena_a_frame(chain: dict, expiry: str) -> pd.DataFrame:
+    """Contratos de `expiry` en la respuesta de /chains -> columnas ``CADENA_PROVEEDOR``."""
+    filas = []
+    for tipo, mapa in (("CALL", chain.get("callExpDateMap", {})), ("PUT", chain.get("putExpDateMap", {}))):
+        for clave, strikes in mapa.items():
+            if clave.split(":")[0] != expiry:
+                continue
+            for contratos in strikes.values():
+                for c in contratos:
+                    vol = c.get("volatility")
+                    filas.append({
+                        "tipo": tipo,
+                        "strike": float(c.get("strikePrice")),
+                        "bid": c.get("bid"),
+                        "ask": c.get("ask"),
+                        # Schwab informa la volatilidad en % y -999 cuando no hay
+                        "impliedVolatility": vol / 100 if vol is not None and vol > 0 else np.nan,
+                        "openInterest": c.get("openInterest"),
+                    })
+    return pd.DataFrame(filas, columns=CADENA_PROVEEDOR)
+
+
+class SchwabProvider(MarketDataProvider):
+    nombre = "schwab"
+
+    def __init__(self, max_concurrencia: int = 4, api=None):
+        super().__init__(max_concurrencia)
+        self._api = api
+        self._api_lock = threading.Lock()
+
+    def api(self):
+        # Import diferido: utils.schwab_api lee las credenciales al importarse
+        with self._api_lock:
+            if self._api is None:
+                from utils.schwab_api import SchwabAPI
+                self._api = SchwabAPI()
+                self._api.authenticate()
+            return self._api
+
+    async def _history(self, symbol, interval, start, end):
+        if interval not in _FRECUENCIAS:
+            raise ValueError(f"Schwab no ofrece el intervalo {interval}")
+        freq_type, freq, period_type = _FRECUENCIAS[interval]
+        params = {"frequencyType": freq_type, "frequency": freq, "periodType": period_type}
+        if start is not None and end is not None:
+            params["startDate"] = _ms(start)
+            params["endDate"] = _ms(pd.Timestamp(end) + pd.Timedelta(days=1))
+        else:
+            params["period"] = 20 if period_type == "year" else 10
+        data = await self.en_hilo(lambda: self.api().get_price_history(symbol, **params))
+        return velas_a_frame(data.get("candles", []), interval)
+
+    async def _option_expiries(self, symbol):
+        data = await self.en_hilo(lambda: self.api().get_expiration_chain(symbol))
+        return sorted({e["expirationDate"][:10] for e in data.get("expirationList", [])})
+
+    async def _option_chain(self, symbol, expiry):
+        data = await self.en_hilo(lambda: self.api().get_option_chain(
+            symbol, contractType="ALL", fromDate=expiry, toDate=expiry,
+        ))
+        return cadena_a_frame(data, expiry)
@@ -0,0 +1,55 @@
+"""Backend Yahoo Finance (``yfinance``), el proveedor por defecto."""
+from datetime import timedelta
+
+import pandas as pd
+import yfinance as yf
+
+from utils.providers.base import CADENA_PROVEEDOR, COLUMNAS, MarketDataProvider, normalizar_historia
+
+
+def _fechas(start, end) -> dict:
+    if start is None or end is None:
+        return {"period": "max"}
+    # yfinance trata end como exclusivo, así que sumamos un día
+    return {
+        "start": pd.to_datetime(start).strftime("%Y-%m-%d"),
+        "end": (pd.to_datetime(end) + timedelta(days=1)).strftime("%Y-%m-%d"),
+    }
+
+
+class YFinanceProvider(MarketDataProvider):
+    nombre = "yfinance"
+
+    async def _history(self, symbol, interval, start, end):
+        def _descargar():
+            df = yf.download(symbol, interval=interval, progress=False, **_fechas(start, end))
+            return normalizar_historia(df)
+        return await self.en_hilo(_descargar)
+
+    async def _bulk_history(self, symbols, interval, start, end):
+        # Una sola llamada con hilos propios de yfinance
+        def _descargar():
+            df = yf.download(
+                symbols, interval=interval, group_by="column", threads=True, progress=False,
+                **_fechas(start, end),
+            )
+            idx = pd.DatetimeIndex(df.index)
+            df.index = (idx.tz_localize(None) if idx.tz is not None else idx).rename("Date")
+            if not isinstance(df.columns, pd.MultiIndex):
+                df.columns = pd.MultiIndex.from_product([df.columns, symbols[:1]])
+            return df.reindex(columns=COLUMNAS, level=0)
+        return await self.en_hilo(_descargar)
+
+    async def _option_expiries(self, symbol):
+        return await self.en_hilo(lambda: list(yf.Ticker(symbol).options))
+
+    async def _option_chain(self, symbol, expiry):
+        def _descargar():
+            cadena = yf.Ticker(symbol).option_chain(expiry)
+            partes = []
+            for tipo, tabla in (("CALL", cadena.calls), ("PUT", cadena.puts)):
+                t = tabla.reindex(columns=CADENA_PROVEEDOR[1:]).copy()
+                t.insert(0, "tipo", tipo)
+                partes.append(t)
+            return pd.concat(partes, ignore_index=True)
+        return await self.en_hilo(_descargar)
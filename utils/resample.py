@@ -0,0 +1,167 @@
+"""
+Remuestreo local de OHLCV a temporalidades mayores.
+
+Las velas de 15m, 1h o 1d se arman desde la base intradía más fina que ya
+está en el almacén local (``utils.history_store``) en lugar de volver a
+descargarlas: cambiar de temporalidad en la UI cuesta una reducción en
+memoria, no un viaje por la red.
+
+Cada vela base cae en la cubeta ``(ts - desfase) // paso``.  Las fronteras
+entre cubetas salen de una sola comparación vectorizada, y open/high/low/
+close/volume se agregan con ``np.maximum.reduceat``/``np.minimum.reduceat``/
+``np.add.reduceat`` sobre esos inicios: sin ``DataFrame.resample`` ni
+bucles en Python.  La sesión define el desfase: en bolsa (apertura 9:30 de
+Nueva York) las velas de 1h se etiquetan 9:30, 10:30, ... como las de
+Yahoo; en mercados de 24 h (cripto, forex) se alinean a la hora en punto.
+
+``actualizar`` recalcula sólo desde la última vela remuestreada (que puede
+haber quedado incompleta) cuando llegan velas base nuevas, y
+``cargar_temporalidad`` mantiene esos resultados en memoria por símbolo.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.history_store import HistoryStore
+from utils.instrumentation import instrumented
+from utils.market_data import cargar_precio_historico, cubre_inicio, sincronizar_store
+from utils.ohlcv import FIELDS, OHLCV
+from utils.sesiones import sesion_de
+
+_NS = 10**9
+PASOS = {
+    "1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1_800,
+    "1h": 3_600, "60m": 3_600, "90m": 5_400, "1d": 86_400,
+}
+APERTURA_BOLSA = (9 * 3_600 + 30 * 60) * _NS
+# Bases candidatas, de la más fina a la más gruesa
+BASES = ("1m", "2m", "5m", "15m", "30m", "1h")
+MAX_SERIES = 64
+
+
+def _desfase(intervalo: str, sesion: str) -> int:
+    paso = PASOS[intervalo] * _NS
+    # Cripto y forex (24 h) se alinean a la hora en punto
+    if intervalo == "1d" or sesion != "bolsa":
+        return 0
+    return APERTURA_BOLSA % paso
+
+
+def grupos(ts: np.ndarray, intervalo: str, sesion: str = "bolsa") -> tuple[np.ndarray, np.ndarray]:
+    """Posición de la primera vela de cada cubeta y su etiqueta (ns)."""
+    paso = PASOS[intervalo] * _NS
+    desfase = _desfase(intervalo, sesion)
+    cubeta = (np.asarray(ts, dtype=np.int64) - desfase) // paso
+    inicios = np.flatnonzero(np.concatenate(([True], cubeta[1:] != cubeta[:-1])))
+    return inicios, cubeta[inicios] * paso + desfase
+
+
+def remuestrear(data: OHLCV, intervalo: str, sesion: str = "bolsa") -> OHLCV:
+    """
+    Velas de `intervalo` a partir de `data` (de temporalidad menor, tal como
+    queda en el almacén: ordenado y sin velas NaN, ver ``utils.data_quality``).
+    """
+    if len(data) == 0:
+        return data
+    inicios, etiquetas = grupos(data.ts, intervalo, sesion)
+    fines = np.concatenate((inicios[1:], [len(data)])) - 1
+    return OHLCV(
+        etiquetas,
+        data.open[inicios],
+        np.maximum.reduceat(data.high, inicios),
+        np.minimum.reduceat(data.low, inicios),
+        data.close[fines],
+        np.add.reduceat(data.volume, inicios),
+    )
+
+
+def _concatenar(a: OHLCV, b: OHLCV) -> OHLCV:
+    return OHLCV(*(np.concatenate((getattr(a, f), getattr(b, f))) for f in ("ts",) + FIELDS))
+
+
+def actualizar(previo: OHLCV, base: OHLCV, intervalo: str, sesion: str = "bolsa") -> OHLCV:
+    """
+    ``remuestrear(base)`` reutilizando `previo`, el remuestreo de un prefijo
+    de `base`: sólo se reduce de nuevo desde la última vela de `previo`.
+    """
+    if len(previo) == 0:
+        return remuestrear(base, intervalo, sesion)
+    i = int(np.searchsorted(base.ts, previo.ts[-1], "left"))
+    return _concatenar(previo[:-1], remuestrear(base[i:], intervalo, sesion))
+
+
+class _Series:
+    """Remuestreos completos por ``(símbolo, base, intervalo)``, actualizados en forma incremental."""
+
+    def __init__(self, max_series: int = MAX_SERIES):
+        self._datos: OrderedDict[tuple, tuple[int, int, tuple, OHLCV]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_series = max_series
+
+    def obtener(self, clave: tuple, base: OHLCV, intervalo: str, sesion: str) -> OHLCV:
+        with self._lock:
+            previo = self._datos.get(clave)
+        # La última vela base puede reescribirse (``HistoryStore.append``)
+        ultima = tuple(float(getattr(base, f)[-1]) for f in FIELDS) if len(base) else ()
+        if previo is not None and len(base) and previo[0] == base.ts[0] and previo[1] <= base.ts[-1]:
+            # Mismo inicio y la base sólo creció: se reduce la cola
+            if previo[1] == base.ts[-1] and previo[2] == ultima:
+                out = previo[3]
+            else:
+                out = actualizar(previo[3], base, intervalo, sesion)
+        else:
+            out = remuestrear(base, intervalo, sesion)
+        with self._lock:
+            self._datos[clave] = (int(base.ts[0]) if len(base) else 0,
+                                  int(base.ts[-1]) if len(base) else 0, ultima, out)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_series:
+                self._datos.popitem(last=False)
+        return out
+
+
+_series = _Series()
+
+
+def base_para(symbol: str, intervalo: str, start, store: HistoryStore) -> str | None:
+    """
+    La base más fina del almacén que divide a `intervalo` y ya cubre
+    `start`, o ``None`` si ninguna sirve (hay que descargar `intervalo`).
+    """
+    if intervalo not in PASOS:
+        return None
+    for base in BASES:
+        if PASOS[base] >= PASOS[intervalo] or PASOS[intervalo] % PASOS[base]:
+            continue
+        if cubre_inicio(store.bounds(symbol, base), start):
+            return base
+    return None
+
+
+@instrumented("cargar_temporalidad", kind="data")
+def cargar_temporalidad(
+    symbol: str,
+    intervalo: str,
+    start,
+    end,
+    store: HistoryStore | None = None,
+) -> pd.DataFrame:
+    """
+    Igual que ``cargar_precio_historico``, pero si el almacén ya tiene una
+    base más fina que cubre el rango arma las velas localmente: sólo se
+    descarga (si falta) la cola reciente de la base.
+    """
+    store = store or HistoryStore()
+    base = base_para(symbol, intervalo, start, store)
+    if base is None:
+        return cargar_precio_historico(symbol, intervalo, start, end, store=store)
+
+    # Trae la cola que falte de la base (queda en el almacén) y remuestrea todo
+    sincronizar_store(symbol, base, end, store)
+    sesion = sesion_de(symbol)
+    velas = _series.obtener((str(store.root), symbol, base, intervalo), store.read(symbol, base), intervalo, sesion)
+    fin = pd.Timestamp(end) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    return velas.between(start, fin).to_frame().set_index("Date")
+
@@ -0,0 +1,200 @@
+"""
+Motor de riesgo del portafolio: VaR/CVaR histórico y paramétrico,
+contribución marginal por posición, beta contra SPY, correlaciones y
+escenarios de estrés.
+
+Todo opera sobre un panel de retornos ``(símbolos, tiempo)`` (el mismo
+formato de ``utils.market_data.cargar_panel``) y un vector de valores de
+posición en USD, así la matriz de covarianzas se calcula una sola vez y el
+resto son productos matriciales: unos cientos de posiciones se resuelven en
+milisegundos.  Las pérdidas se informan como números positivos (USD).
+"""
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from utils.instrumentation import instrumented
+
+BENCHMARK = "SPY"
+
+# Ventanas de crisis para repetir sobre el portafolio actual (inicio, fin)
+ESCENARIOS_CRISIS = {
+    "Crisis financiera 2008": ("2008-09-12", "2008-11-20"),
+    "Flash crash 2010":       ("2010-04-23", "2010-07-02"),
+    "Volmageddon 2018":       ("2018-01-26", "2018-02-08"),
+    "Q4 2018":                ("2018-10-03", "2018-12-24"),
+    "COVID-19 2020":          ("2020-02-19", "2020-03-23"),
+    "Bajista 2022":           ("2022-01-03", "2022-06-16"),
+}
+
+
+# ——— Posiciones ——————————————————————————————————————————————————
+
+def posiciones_desde_excel(df: pd.DataFrame) -> pd.Series:
+    """Cantidad por ticker desde la hoja ``Inversiones`` (suma duplicados)."""
+    df = df[df["Ticker"].notnull() & df["Cantidad"].notnull()]
+    cantidad = pd.to_numeric(df["Cantidad"], errors="coerce")
+    return cantidad.groupby(df["Ticker"].astype(str).str.strip()).sum()
+
+
+def posiciones_desde_schwab(positions: list[dict]) -> pd.Series:
+    """Cantidad neta (long - short) por símbolo desde ``securitiesAccount.positions``."""
+    cantidades: dict[str, float] = {}
+    for p in positions or []:
+        symbol = (p.get("instrument") or {}).get("symbol")
+        if not symbol:
+            continue
+        neta = float(p.get("longQuantity", 0) or 0) - float(p.get("shortQuantity", 0) or 0)
+        cantidades[symbol] = cantidades.get(symbol, 0.0) + neta
+    return pd.Series(cantidades, dtype=np.float64)
+
+
+# ——— Retornos ——————————————————————————————————————————————————
+
+def retornos(close: np.ndarray) -> np.ndarray:
+    """
+    Retornos simples a lo largo del último eje.  Los huecos (días sin
+    cotización de un símbolo) cuentan como retorno 0.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    r = close[..., 1:] / close[..., :-1] - 1
+    return np.where(np.isfinite(r), r, 0.0)
+
+
+def retornos_horizonte(r: np.ndarray, horizonte: int) -> np.ndarray:
+    """Retornos compuestos de `horizonte` velas superpuestas."""
+    if horizonte <= 1:
+        return r
+    log = np.log1p(r)
+    c = np.concatenate([np.zeros(log.shape[:-1] + (1,)), np.cumsum(log, axis=-1)], axis=-1)
+    return np.expm1(c[..., horizonte:] - c[..., :-horizonte])
+
+
+# ——— VaR / CVaR ————————————————————————————————————————————————
+
+def var_historico(pnl: np.ndarray, nivel: float = 0.95) -> tuple[float, float]:
+    """(VaR, CVaR) de una serie de P&L: pérdida del cuantil `1 - nivel` y media de la cola."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    corte = np.quantile(pnl, 1 - nivel)
+    cola = pnl[pnl <= corte]
+    return -corte, -cola.mean()
+
+
+def var_parametrico(mu: float, sigma: float, nivel: float = 0.95) -> tuple[float, float]:
+    """(VaR, CVaR) normales para un P&L con media `mu` y desvío `sigma`."""
+    z = norm.ppf(1 - nivel)
+    return -(mu + z * sigma), -(mu - sigma * norm.pdf(z) / (1 - nivel))
+
+
+def cov_estresada(cov: np.ndarray, mult_vol: float = 1.0, shock_corr: float = 0.0) -> np.ndarray:
+    """
+    Covarianza con las volatilidades multiplicadas por `mult_vol` y las
+    correlaciones llevadas hacia 1 en la fracción `shock_corr`
+    (``rho' = rho + shock_corr * (1 - rho)``).
+    """
+    vol = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(vol, vol)
+    corr = np.nan_to_num(corr)
+    corr = corr + shock_corr * (1 - corr)
+    np.fill_diagonal(corr, 1.0)
+    vol = vol * mult_vol
+    return corr * np.outer(vol, vol)
+
+
+@instrumented("analizar_riesgo")
+def analizar_riesgo(
+    valores: np.ndarray,
+    rets: np.ndarray,
+    rets_bench: np.ndarray | None = None,
+    nivel: float = 0.95,
+    horizonte: int = 1,
+    mult_vol: float = 1.0,
+    shock_corr: float = 0.0,
+) -> dict:
+    """
+    Riesgo de un portafolio con `valores` (USD por posición) y retornos
+    `rets` ``(posiciones, tiempo)``.
+
+    Devuelve un dict con ``var_hist``, ``cvar_hist``, ``var_param``,
+    ``cvar_param`` y ``sigma`` (USD, a `horizonte` velas), y por posición
+    ``contrib`` (contribución al VaR paramétrico, suma ``var_param`` sin la
+    media), ``contrib_pct``, ``beta`` (contra `rets_bench`, NaN si no se
+    pasa) y ``corr``.  `mult_vol`/`shock_corr` estresan la covarianza
+    del cálculo paramétrico (ver ``cov_estresada``).
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    rets = np.atleast_2d(rets)
+    rh = retornos_horizonte(rets, horizonte)
+
+    # Histórico: P&L del portafolio actual repitiendo cada período
+    pnl = valores @ rh
+    var_hist, cvar_hist = var_historico(pnl, nivel)
+
+    # Paramétrico: una sola covarianza (posiciones × posiciones)
+    mu = rh.mean(axis=1)
+    centrados = rh - mu[:, None]
+    cov = centrados @ centrados.T / max(rh.shape[1] - 1, 1)
+    cov_p = cov_estresada(cov, mult_vol, shock_corr) if (mult_vol != 1.0 or shock_corr) else cov
+    cov_v = cov_p @ valores
+    sigma = float(np.sqrt(max(valores @ cov_v, 0.0)))
+    var_param, cvar_param = var_parametrico(float(valores @ mu), sigma, nivel)
+
+    # Contribución de cada posición (Euler): v_i * (Σv)_i / σ * z
+    z = -norm.ppf(1 - nivel)
+    contrib = valores * cov_v / sigma * z if sigma > 0 else np.zeros_like(valores)
+    total = contrib.sum()
+
+    vol = np.sqrt(np.diag(cov))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.outer(vol, vol)
+        if rets_bench is not None:
+            b = retornos_horizonte(np.asarray(rets_bench, dtype=np.float64), horizonte)
+            b = b - b.mean()
+            beta = centrados @ b / (b @ b)
+        else:
+            beta = np.full(len(valores), np.nan)
+
+    return {
+        "var_hist": float(var_hist),
+        "cvar_hist": float(cvar_hist),
+        "var_param": float(var_param),
+        "cvar_param": float(cvar_param),
+        "sigma": sigma,
+        "contrib": contrib,
+        "contrib_pct": contrib / total if total else np.zeros_like(contrib),
+        "beta": beta,
+        "corr": corr,
+    }
+
+
+# ——— Estrés histórico ————————————————————————————————————————————
+
+def retorno_ventana(close: np.ndarray) -> np.ndarray:
+    """Retorno total de cada fila entre su primer y último cierre válido (NaN si no cotizó)."""
+    close = np.atleast_2d(np.asarray(close, dtype=np.float64))
+    valido = ~np.isnan(close)
+    n = close.shape[1]
+    hay = valido.any(axis=1)
+    primero = np.argmax(valido, axis=1)
+    ultimo = n - 1 - np.argmax(valido[:, ::-1], axis=1)
+    filas = np.arange(close.shape[0])
+    r = close[filas, ultimo] / close[filas, primero] - 1
+    return np.where(hay & (ultimo > primero), r, np.nan)
+
+
+def escenario_historico(
+    valores: np.ndarray,
+    close: np.ndarray,
+    close_bench: np.ndarray,
+    beta: np.ndarray,
+) -> np.ndarray:
+    """
+    P&L (USD) por posición al repetir una ventana de crisis: `close` son los
+    cierres de las posiciones en esa ventana.  Las posiciones que no
+    cotizaban entonces usan ``beta * retorno del benchmark``.
+    """
+    r = retorno_ventana(close)
+    r_bench = retorno_ventana(close_bench)[0]
+    r = np.where(np.isnan(r), np.nan_to_num(beta, nan=1.0) * r_bench, r)
+    return np.asarray(valores, dtype=np.float64) * r
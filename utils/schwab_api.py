@@ -1,11 +1,14 @@
 import os
 import logging
+import pandas as pd
 import requests
 from streamlit import secrets
 import streamlit as st
 from requests.auth import HTTPBasicAuth
 
-SCHWAB_BASE_URL = "https://api.schwabapi.com"
+from utils.instrumentation import instrumented
+
+SCHWAB_BASE_URL = os.getenv("SCHWAB_BASE_URL", "https://api.schwabapi.com")
 
 logger = logging.getLogger(__name__)
 
@@ -23,26 +26,35 @@ def load_refresh_token(filename="refresh_token.txt"):
     except FileNotFoundError:
         return None
 
+def _secreto(nombre: str):
+    # Sin secrets.toml (CLI, tests) Streamlit lanza en vez de devolver None
+    try:
+        return secrets.get(nombre)
+    except Exception:
+        return None
+
 # Busca el refresh_token primero en Streamlit secrets, luego en env, luego en archivo.
 REFRESH_TOKEN = (
-    secrets.get("REFRESH_TOKEN")
+    _secreto("REFRESH_TOKEN")
     or os.getenv("REFRESH_TOKEN")
     or load_refresh_token()
 )
-CLIENT_ID = secrets.get("CLIENT_ID") or os.getenv("CLIENT_ID")
-CLIENT_SECRET = secrets.get("CLIENT_SECRET") or os.getenv("CLIENT_SECRET")
+CLIENT_ID = _secreto("CLIENT_ID") or os.getenv("CLIENT_ID")
+CLIENT_SECRET = _secreto("CLIENT_SECRET") or os.getenv("CLIENT_SECRET")
 
 class SchwabAPI:
-    def __init__(self):
-        self.access_token = None
+    def __init__(self, base_url: str = SCHWAB_BASE_URL, access_token: str | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.access_token = access_token
     
     def _verify_credentials(self):
         if not (CLIENT_ID and CLIENT_SECRET and REFRESH_TOKEN):
             raise RuntimeError("Missing Schwab API credentials")
     
+    @instrumented("SchwabAPI.authenticate", kind="network")
     def authenticate(self):
         self._verify_credentials()
-        url = f"{SCHWAB_BASE_URL}/v1/oauth/token"
+        url = f"{self.base_url}/v1/oauth/token"
         payload = {
             "grant_type": "refresh_token",
             "refresh_token": REFRESH_TOKEN,
@@ -73,8 +85,9 @@ class SchwabAPI:
             self.authenticate()
         return {"Authorization": f"Bearer {self.access_token}"}
 
+    @instrumented("SchwabAPI.get_accounts", kind="network")
     def get_accounts(self):
-        url = f"{SCHWAB_BASE_URL}/trader/v1/accounts"
+        url = f"{self.base_url}/trader/v1/accounts"
         try:
             resp = requests.get(url, headers=self._headers(), timeout=10)
             print("Status code:", resp.status_code)
@@ -86,8 +99,9 @@ class SchwabAPI:
             st.error(f"Error al obtener cuentas de Schwab: {e}")
             raise
 
+    @instrumented("SchwabAPI.get_positions", kind="network")
     def get_positions(self, account_id: str):
-        url = f"{SCHWAB_BASE_URL}/trader/v1/accounts/{account_id}/positions"
+        url = f"{self.base_url}/trader/v1/accounts/{account_id}/positions"
         try:
             resp = requests.get(url, headers=self._headers(), timeout=10)
             print("Status code:", resp.status_code)    # Para debug
@@ -98,3 +112,54 @@ class SchwabAPI:
             logger.error(f"Error getting positions: {e}")
             st.error(f"Error al obtener posiciones de Schwab: {e}")
             raise
+
+    # ——— Market data (los usa utils.providers.schwab_provider) ——————————
+    def _get_marketdata(self, path: str, params: dict) -> dict:
+        url = f"{self.base_url}/marketdata/v1/{path}"
+        try:
+            resp = requests.get(url, headers=self._headers(), params=params, timeout=10)
+            resp.raise_for_status()
+            return resp.json()
+        except requests.exceptions.RequestException as e:
+            # Sin st.error: se llama desde el hilo del proveedor, la sección informa
+            logger.error(f"Error getting {path} from Schwab: {e}")
+            raise
+
+    @instrumented("SchwabAPI.get_price_history", kind="network")
+    def get_price_history(self, symbol: str, **params) -> dict:
+        return self._get_marketdata("pricehistory", {"symbol": symbol, **params})
+
+    @instrumented("SchwabAPI.get_option_chain", kind="network")
+    def get_option_chain(self, symbol: str, **params) -> dict:
+        return self._get_marketdata("chains", {"symbol": symbol, **params})
+
+    @instrumented("SchwabAPI.get_expiration_chain", kind="network")
+    def get_expiration_chain(self, symbol: str) -> dict:
+        return self._get_marketdata("expirationchain", {"symbol": symbol})
+
+    # ——— Transacciones (las usa utils.ledger) ——————————————————————————
+    def _get_trader(self, path: str, params: dict | None = None):
+        url = f"{self.base_url}/trader/v1/{path}"
+        try:
+            resp = requests.get(url, headers=self._headers(), params=params, timeout=30)
+            resp.raise_for_status()
+            return resp.json()
+        except requests.exceptions.RequestException as e:
+            # Sin st.error: se llama desde hilos de sincronización
+            logger.error(f"Error getting {path} from Schwab: {e}")
+            raise
+
+    @instrumented("SchwabAPI.get_account_numbers", kind="network")
+    def get_account_numbers(self) -> list[dict]:
+        """``[{"accountNumber", "hashValue"}]``; los endpoints de cuenta piden el hash."""
+        return self._get_trader("accounts/accountNumbers")
+
+    @instrumented("SchwabAPI.get_transactions", kind="network")
+    def get_transactions(self, account_hash: str, start, end, types: str = "TRADE") -> list[dict]:
+        """Transacciones de la cuenta entre `start` y `end` (Schwab acepta hasta un año por pedido)."""
+        fmt = "%Y-%m-%dT%H:%M:%S.000Z"
+        return self._get_trader(f"accounts/{account_hash}/transactions", {
+            "startDate": pd.Timestamp(start).strftime(fmt),
+            "endDate": pd.Timestamp(end).strftime(fmt),
+            "types": types,
+        })
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from utils.backtest_helpers import DARVAS_DEFAULTS, darvas_signals_from_kernels
+from utils.instrumentation import instrumented
+from utils.kernels import darvas_wae_kernels, rolling_mean, shift
+
+
+def ratio_volumen(volume: pd.Series, percentil: float, ventana: int = 7) -> dict | None:
+    """
+    Compara el volumen medio de las últimas `ventana` velas contra el
+    percentil `percentil` del volumen de las velas previas.
+
+    Devuelve ``None`` si no hay historia suficiente (al menos `ventana`
+    velas recientes y `ventana` previas) o si el percentil no es positivo.
+    """
+    volume = volume.dropna()
+    if len(volume) < 2 * ventana:
+        return None
+
+    # Últimas `ventana` velas (las más recientes) vs. todas las previas
+    vol_reciente = volume.iloc[-ventana:]
+    vol_prev = volume.iloc[:-ventana]
+
+    umbral = vol_prev.quantile(percentil)
+    media = vol_reciente.mean()
+    if not (pd.notna(media) and pd.notna(umbral) and umbral > 0):
+        return None
+
+    return {
+        "Vol_7d": int(media),
+        "Percentil_prev": int(umbral),
+        "Ratio": round(media / umbral, 2),
+    }
+
+
+def _orden_validas(panel: dict) -> tuple[np.ndarray, np.ndarray]:
+    # Por símbolo, las velas con High/Low/Close NaN primero y después las
+    # válidas en orden: las fechas del panel son la unión de todos los
+    # símbolos y un hueco en medio dejaría NaN en las ventanas de los kernels
+    validas = ~(np.isnan(panel["high"]) | np.isnan(panel["low"]) | np.isnan(panel["close"]))
+    return np.argsort(validas, axis=1, kind="stable"), validas
+
+
+def _compactar(a: np.ndarray, orden: np.ndarray, validas: np.ndarray) -> np.ndarray:
+    """Velas válidas de cada símbolo seguidas y alineadas a la derecha (NaN delante)."""
+    return np.where(np.take_along_axis(validas, orden, axis=1),
+                    np.take_along_axis(np.asarray(a, dtype=np.float64), orden, axis=1), np.nan)
+
+
+def _expandir(a: np.ndarray, orden: np.ndarray) -> np.ndarray:
+    """Inversa de ``_compactar``: cada valor vuelve a su fecha del panel."""
+    out = np.empty_like(a)
+    np.put_along_axis(out, orden, a, axis=1)
+    return out
+
+
+@instrumented("screen_darvas")
+def screen_darvas(panel: dict, velas: int = 1, ventana_vol: int = 20, **params) -> pd.DataFrame:
+    """
+    Corre Darvas + MavilimW + WAE sobre todo el panel ``(símbolos, tiempo)``
+    de una sola vez (ver ``utils.market_data.panel_desde_frame``) y devuelve
+    las señales ``buy_final``/``sell_final`` de las últimas `velas` velas,
+    una fila por símbolo (la señal más reciente).  Como en el backtest, los
+    kernels ven sólo las velas válidas de cada símbolo, una tras otra: un
+    hueco no corta las ventanas.
+
+    - ``Ruptura %``: distancia del cierre a la caja Darvas rota (máximo
+      previo en compras, mínimo previo en ventas).
+    - ``Vol ratio``: volumen de la vela de la señal sobre la media de las
+      `ventana_vol` velas anteriores.
+    - ``Puntaje``: ``Ruptura % * Vol ratio``; la tabla viene ordenada por él.
+
+    `params` usa los nombres de ``DARVAS_DEFAULTS``.
+    """
+    p = {**DARVAS_DEFAULTS, **params}
+    close = panel["close"]
+    orden, validas = _orden_validas(panel)
+    alto, bajo, cierre, vol = (_compactar(panel[f], orden, validas) for f in ("high", "low", "close", "volume"))
+    k = darvas_wae_kernels(
+        alto, bajo, cierre,
+        darvas_window=p["darvas_window"],
+        sensitivity=p["sensitivity"],
+        fastLength=p["fast_ema"],
+        slowLength=p["slow_ema"],
+        channelLength=p["channel_len"],
+        mult=p["bb_mult"],
+    )
+    sig = {n: _expandir(a, orden) for n, a in darvas_signals_from_kernels(cierre, k).items()
+           if n in ("buy_final", "sell_final", "prev_dh", "prev_dl")}
+    vol_media = _expandir(shift(rolling_mean(vol, ventana_vol), 1), orden)
+
+    # Sólo la cola de `velas` columnas: la señal más reciente de cada símbolo
+    buy = sig["buy_final"][:, -velas:]
+    sell = sig["sell_final"][:, -velas:]
+    alguna = buy | sell
+    filas = np.flatnonzero(alguna.any(axis=1))
+    cols = alguna.shape[1] - 1 - np.argmax(alguna[filas, ::-1], axis=1)
+    t = close.shape[1] - alguna.shape[1] + cols
+
+    es_compra = buy[filas, cols]
+    c = close[filas, t]
+    ruptura = np.where(
+        es_compra,
+        c / sig["prev_dh"][filas, t] - 1,
+        1 - c / sig["prev_dl"][filas, t],
+    ) * 100
+    vol_ratio = panel["volume"][filas, t] / vol_media[filas, t]
+
+    out = pd.DataFrame({
+        "Ticker": np.asarray(panel["symbols"], dtype=object)[filas],
+        "Señal": np.where(es_compra, "Compra", "Venta"),
+        "Fecha": panel["ts"][t].view("datetime64[ns]"),
+        "Cierre": c,
+        "Ruptura %": ruptura,
+        "Vol ratio": vol_ratio,
+        "Puntaje": ruptura * vol_ratio,
+    })
+    return out.sort_values("Puntaje", ascending=False, na_position="last").reset_index(drop=True)
+
+
+def senales_desde_estado(estado: pd.DataFrame, velas: int = 1) -> pd.DataFrame:
+    """
+    Mismo resultado que ``screen_darvas`` a partir del estado materializado
+    (``utils.materialized.leer_estado``): la última señal de cada símbolo si
+    cayó en sus últimas `velas` velas.  El volumen relativo usa
+    ``utils.materialized.VENTANA_VOL`` velas.
+    """
+    e = estado[estado["velas_desde_senal"] < velas]
+    compra = (e["tipo_ultima_senal"] == "compra").to_numpy()
+    out = pd.DataFrame({
+        "Ticker": e["Ticker"].to_numpy(dtype=object),
+        "Señal": np.where(compra, "Compra", "Venta"),
+        "Fecha": pd.to_datetime(e["ultima_senal"]).to_numpy(dtype="datetime64[ns]"),
+        "Cierre": e["cierre_senal"].to_numpy(dtype=np.float64),
+        "Ruptura %": e["ruptura_pct"].to_numpy(dtype=np.float64),
+        "Vol ratio": e["vol_ratio"].to_numpy(dtype=np.float64),
+    })
+    out["Puntaje"] = out["Ruptura %"] * out["Vol ratio"]
+    return out.sort_values("Puntaje", ascending=False, na_position="last").reset_index(drop=True)
@@ -0,0 +1,26 @@
+"""
+Sesión de mercado de cada símbolo.
+
+Un solo clasificador para todo el paquete: el remuestreo
+(``utils.resample``) alinea las velas a la apertura según la sesión, la
+validación (``utils.data_quality``) decide qué días y horas son huecos y
+las métricas (``utils.performance``) anualizan con las velas que abre cada
+mercado.  Está en un módulo sin dependencias para que lo importen todos sin
+ciclos.
+"""
+import re
+
+_CRIPTO = re.compile(r"^[A-Z0-9]+-(USD|USDT|USDC|EUR|BTC|ETH)$")
+
+
+def sesion_de(symbol: str | None) -> str:
+    """
+    ``"cripto"`` (24/7: ``BTC-USD``, ``ETH-USDT``), ``"forex"`` (24 h de lunes
+    a viernes: ``EURUSD=X``) o ``"bolsa"`` (sesión regular de Nueva York).
+    """
+    s = (symbol or "").upper()
+    if _CRIPTO.match(s):
+        return "cripto"
+    if s.endswith("=X"):
+        return "forex"
+    return "bolsa"
@@ -0,0 +1,208 @@
+"""
+Caché compartida entre procesos (réplicas o workers de Streamlit).
+
+``st.cache_data`` vive en un proceso: con varias réplicas cada una baja y
+calcula lo mismo, y limpiar la caché sólo afecta al proceso que la limpia.
+Esta capa guarda los resultados en un archivo SQLite que ven todos los
+procesos de la máquina (o del volumen compartido):
+
+- Los valores se serializan en Parquet (``DataFrame``, ``Series`` y listas).
+- Cada entrada tiene un vencimiento (TTL) en tiempo de reloj.
+- ``invalidar(espacio)`` incrementa la generación del espacio: las
+  entradas de generaciones anteriores dejan de valer en todos los
+  procesos, y las cachés locales que incluyen ``generacion(espacio)`` en
+  su clave (ver ``utils.data_io.cargar_historial``) se recalculan.
+- Protección contra estampidas: con la clave fría, sólo el proceso que
+  toma el lease calcula; los demás esperan su resultado.  Si el dueño
+  muere, el lease vence a los ``LEASE`` segundos y otro lo toma.
+
+La ruta se cambia con ``GROWTHIA_SHARED_CACHE`` (por defecto
+``data/shared_cache.sqlite``).
+"""
+import io
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from utils.instrumentation import contar, timed
+from utils.sqlite_db import conectar, ruta_datos
+
+ARCHIVO_CACHE = ruta_datos("GROWTHIA_SHARED_CACHE", "shared_cache.sqlite")
+TTL = 3600
+LEASE = 30.0  # segundos que un proceso puede tardar en calcular una clave
+ESPERA = 0.05  # intervalo de sondeo mientras otro proceso calcula
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    espacio TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    generacion INTEGER NOT NULL,
+    expira REAL NOT NULL,
+    formato TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (espacio, clave)
+);
+CREATE TABLE IF NOT EXISTS generaciones (
+    espacio TEXT PRIMARY KEY,
+    generacion INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    espacio TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    dueno TEXT NOT NULL,
+    vence REAL NOT NULL,
+    PRIMARY KEY (espacio, clave)
+);
+"""
+
+_FALTA = object()
+
+
+def serializar(valor) -> tuple[str, bytes]:
+    """``(formato, bytes Parquet)`` de un ``DataFrame``, ``Series`` o lista."""
+    if isinstance(valor, pd.DataFrame):
+        formato, tabla = "frame", pa.Table.from_pandas(valor)
+    elif isinstance(valor, pd.Series):
+        formato, tabla = "serie", pa.Table.from_pandas(valor.to_frame(name=valor.name or "valor"))
+    elif isinstance(valor, (list, tuple)):
+        formato, tabla = "lista", pa.table({"valor": pa.array(list(valor))})
+    else:
+        raise TypeError(f"La caché compartida no serializa {type(valor).__name__}")
+    buf = io.BytesIO()
+    pq.write_table(tabla, buf)
+    return formato, buf.getvalue()
+
+
+def deserializar(formato: str, payload: bytes):
+    tabla = pq.read_table(io.BytesIO(payload))
+    if formato == "lista":
+        return tabla.column("valor").to_pylist()
+    df = tabla.to_pandas()
+    return df.iloc[:, 0] if formato == "serie" else df
+
+
+class SharedCache:
+    """Entradas, generaciones por espacio y leases en un archivo SQLite."""
+
+    def __init__(self, path: Path | str = ARCHIVO_CACHE, lease: float = LEASE, espera: float = ESPERA):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease = lease
+        self.espera = espera
+        self.hits = 0
+        self.misses = 0
+        self.esperas = 0
+        with conectar(self.path, wal=True) as con:
+            con.executescript(_ESQUEMA)
+
+    def generacion(self, espacio: str) -> int:
+        with conectar(self.path) as con:
+            fila = con.execute("SELECT generacion FROM generaciones WHERE espacio = ?", (espacio,)).fetchone()
+        return fila[0] if fila else 0
+
+    def invalidar(self, espacio: str) -> int:
+        """Invalida el espacio en todos los procesos; devuelve la nueva generación."""
+        with conectar(self.path) as con:
+            con.execute(
+                "INSERT INTO generaciones (espacio, generacion) VALUES (?, 1) "
+                "ON CONFLICT (espacio) DO UPDATE SET generacion = generacion + 1",
+                (espacio,),
+            )
+            con.execute("DELETE FROM entradas WHERE espacio = ?", (espacio,))
+            return con.execute("SELECT generacion FROM generaciones WHERE espacio = ?", (espacio,)).fetchone()[0]
+
+    def get(self, espacio: str, clave: str, default=None):
+        with conectar(self.path) as con:
+            fila = con.execute(
+                "SELECT e.formato, e.payload FROM entradas e "
+                "LEFT JOIN generaciones g ON g.espacio = e.espacio "
+                "WHERE e.espacio = ? AND e.clave = ? AND e.expira > ? "
+                "AND e.generacion = COALESCE(g.generacion, 0)",
+                (espacio, clave, time.time()),
+            ).fetchone()
+        return default if fila is None else deserializar(*fila)
+
+    def put(self, espacio: str, clave: str, valor, ttl: float = TTL, generacion: int | None = None) -> None:
+        """
+        Guarda `valor`.  Con `generacion` (la leída antes de calcular) el
+        valor queda vencido si alguien invalidó el espacio mientras tanto.
+        """
+        formato, payload = serializar(valor)
+        ahora = time.time()
+        with conectar(self.path) as con:
+            if generacion is None:
+                fila = con.execute("SELECT generacion FROM generaciones WHERE espacio = ?", (espacio,)).fetchone()
+                generacion = fila[0] if fila else 0
+            con.execute(
+                "INSERT OR REPLACE INTO entradas (espacio, clave, generacion, expira, formato, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (espacio, clave, generacion, ahora + ttl, formato, payload),
+            )
+            con.execute("DELETE FROM entradas WHERE expira <= ?", (ahora,))
+
+    def _tomar(self, espacio: str, clave: str, dueno: str) -> bool:
+        ahora = time.time()
+        with conectar(self.path) as con:
+            cur = con.execute(
+                "INSERT INTO leases (espacio, clave, dueno, vence) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (espacio, clave) DO UPDATE SET dueno = excluded.dueno, vence = excluded.vence "
+                "WHERE leases.vence <= ?",
+                (espacio, clave, dueno, ahora + self.lease, ahora),
+            )
+            return cur.rowcount == 1
+
+    def _soltar(self, espacio: str, clave: str, dueno: str) -> None:
+        with conectar(self.path) as con:
+            con.execute("DELETE FROM leases WHERE espacio = ? AND clave = ? AND dueno = ?", (espacio, clave, dueno))
+
+    def obtener(self, espacio: str, clave: str, calcular: Callable[[], object], ttl: float = TTL):
+        """Valor de la clave; si está fría la calcula un solo proceso a la vez."""
+        with timed(f"shared_cache.{espacio}", kind="cache"):
+            valor = self.get(espacio, clave, _FALTA)
+            if valor is not _FALTA:
+                self.hits += 1
+                contar("shared_cache.hit")
+                return valor
+
+            dueno = f"{os.getpid()}-{threading.get_ident()}-{uuid.uuid4().hex[:8]}"
+            while not self._tomar(espacio, clave, dueno):
+                # Otro proceso la está calculando: esperar su resultado
+                time.sleep(self.espera)
+                valor = self.get(espacio, clave, _FALTA)
+                if valor is not _FALTA:
+                    self.esperas += 1
+                    contar("shared_cache.espera")
+                    return valor
+            try:
+                generacion = self.generacion(espacio)
+                # Pudo llegar entre el primer get y el lease
+                valor = self.get(espacio, clave, _FALTA)
+                if valor is not _FALTA:
+                    self.hits += 1
+                    return valor
+                self.misses += 1
+                contar("shared_cache.miss")
+                valor = calcular()
+                self.put(espacio, clave, valor, ttl, generacion)
+                return valor
+            finally:
+                self._soltar(espacio, clave, dueno)
+
+    def stats(self) -> dict:
+        with conectar(self.path) as con:
+            n, nbytes = con.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM entradas").fetchone()
+        return {"entradas": n, "bytes": nbytes, "hits": self.hits, "misses": self.misses, "esperas": self.esperas}
+
+
+@st.cache_resource(show_spinner=False)
+def shared_cache() -> SharedCache:
+    """Instancia única por proceso sobre ``ARCHIVO_CACHE``."""
+    return SharedCache(ARCHIVO_CACHE)
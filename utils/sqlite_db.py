@@ -0,0 +1,33 @@
+"""
+Archivos SQLite locales del paquete (caché compartida, alertas, libro de
+operaciones).
+
+Cada uno vive por defecto en ``data/`` y su ruta se cambia con una
+variable de entorno (``ruta_datos``).  Se abren con una conexión por
+operación (``conectar``): los usan hilos y procesos distintos, y una
+conexión de ``sqlite3`` no se comparte entre hilos.
+"""
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+DIRECTORIO_DATOS = Path(__file__).resolve().parent.parent / "data"
+
+
+def ruta_datos(variable: str, nombre: str) -> Path:
+    """Ruta de la variable de entorno `variable`, o ``data/<nombre>`` si no está definida."""
+    return Path(os.getenv(variable, DIRECTORIO_DATOS / nombre))
+
+
+@contextmanager
+def conectar(path: Path | str, wal: bool = False):
+    """Conexión a `path` con commit al salir sin error (rollback si no) y cierre siempre."""
+    con = sqlite3.connect(path, timeout=30)
+    try:
+        if wal:
+            con.execute("PRAGMA journal_mode=WAL")
+        with con:
+            yield con
+    finally:
+        con.close()
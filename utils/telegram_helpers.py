@@ -6,9 +6,11 @@ import datetime
 import logging
 from streamlit import secrets
 from config import ARCHIVO_LOG
+from utils.instrumentation import instrumented
 
 logger = logging.getLogger(__name__)
 
+@instrumented("telegram.sendMessage", kind="network")
 def send_telegram_message(text: str):
     token = secrets.get("TELEGRAM_TOKEN")
     chat = secrets.get("TELEGRAM_CHAT_ID")
@@ -26,6 +28,7 @@ def send_telegram_message(text: str):
             response.text,
         )
 
+@instrumented("telegram.resumen", kind="network")
 def generar_y_enviar_resumen_telegram():
     log = ARCHIVO_LOG
     if not os.path.exists(log): return
@@ -65,6 +68,7 @@ def generar_y_enviar_resumen_telegram():
     os.remove(fname)
 
 
+@instrumented("telegram.simulacion", kind="network")
 def enviar_grafico_simulacion_telegram(fig, ticker):
     fname = f"sim_{ticker}_{datetime.datetime.now():%Y%m%d_%H%M%S}.png"
     fig.savefig(fname)
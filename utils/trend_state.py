@@ -0,0 +1,71 @@
+"""
+Estado de tendencia precio vs. media (MavilimW) sobre arrays.
+
+Las funciones trabajan por posición, así que sirven para cualquier índice
+(RangeIndex, DatetimeIndex, ...), y aceptan una serie o una tabla
+``tiempo × símbolos`` (una columna por símbolo) para evaluar muchos activos a
+la vez.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _as_columns(x) -> tuple[np.ndarray, bool]:
+    arr = np.asarray(x, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[:, None], True
+    return arr, False
+
+
+def _wrap(values: np.ndarray, like, squeeze: bool):
+    if squeeze:
+        values = values[:, 0]
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(values, index=like.index, columns=like.columns)
+    if isinstance(like, pd.Series):
+        return pd.Series(values, index=like.index)
+    return values
+
+
+def trend_state(close, mav, lag: int = 0):
+    """
+    1 si ``close > mav`` desplazada `lag` velas, -1 si está por debajo y 0 si
+    no hay media válida (o son iguales).
+    """
+    c, squeeze = _as_columns(close)
+    m, _ = _as_columns(mav)
+    if lag:
+        shifted = np.full_like(m, np.nan)
+        shifted[lag:] = m[:-lag]
+        m = shifted
+    state = np.zeros(c.shape, dtype=np.int8)
+    state[c > m] = 1
+    state[c < m] = -1
+    return _wrap(state, close, squeeze)
+
+
+def robust_trend(close, mav, confirm: int = 3):
+    """
+    Tendencia alcista robusta: ``close > mav`` donde la media es válida y,
+    antes de la primera media válida, se adelanta la señal a las velas cuyo
+    cierre (y el de todas las siguientes hasta esa primera media) ya estaba
+    por encima de ella.  `confirm` es el número de velas evaluadas, incluida
+    la de la primera media válida; sólo se aplica si hay al menos
+    ``confirm - 1`` velas previas.
+    """
+    c, squeeze = _as_columns(close)
+    m, _ = _as_columns(mav)
+    n_rows, n_cols = c.shape
+    trend = c > m  # NaN en la media -> False
+
+    valid = ~np.isnan(m)
+    first = valid.argmax(axis=0)
+    cols = np.flatnonzero(valid.any(axis=0) & (first >= confirm - 1))
+    if confirm > 1 and cols.size:
+        fv = first[cols]
+        # filas fv, fv-1, ..., fv-confirm+1 para cada símbolo
+        rows = fv[None, :] - np.arange(confirm)[:, None]
+        above = c[rows, cols[None, :]] > m[fv, cols][None, :]
+        ok = np.logical_and.accumulate(above, axis=0)
+        trend[rows[ok], np.broadcast_to(cols, rows.shape)[ok]] = True
+    return _wrap(trend, close, squeeze)
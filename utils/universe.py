@@ -0,0 +1,50 @@
+"""Universo de símbolos de la app: activos predefinidos + S&P 500 local."""
+from pathlib import Path
+
+import pandas as pd
+
+from utils.shared_cache import shared_cache
+
+SP500_CSV = Path(__file__).resolve().parent.parent / "data" / "sp500_constituents.csv"
+SP500_URL = "https://datahub.io/core/s-and-p-500-companies/r/constituents.csv"
+TTL_SP500 = 6 * 3600
+
+# Activos ofrecidos en el backtest Darvas (nombre visible -> símbolo Yahoo)
+ACTIVOS_PREDEF = {
+    "BTC/USD":        "BTC-USD",
+    "ETH/USD":        "ETH-USD",
+    "Apple (AAPL)":   "AAPL",
+    "Tesla (TSLA)":   "TSLA",
+    "Amazon (AMZN)":  "AMZN",
+    "S&P500 ETF (SPY)":"SPY"
+}
+
+
+def tickers_sp500_local() -> list[str]:
+    """Símbolos del CSV local de constituyentes del S&P 500."""
+    return pd.read_csv(SP500_CSV)["Symbol"].dropna().astype(str).tolist()
+
+
+def tickers_sp500() -> list[str]:
+    """
+    Símbolos del S&P 500 desde el CSV público; si la descarga falla, desde
+    el CSV local (un subconjunto, para funcionar sin conexión).
+    """
+    try:
+        df_sp = pd.read_csv(SP500_URL)
+    except Exception:
+        if SP500_CSV.exists():
+            df_sp = pd.read_csv(SP500_CSV)
+        else:
+            raise
+    return df_sp["Symbol"].tolist()
+
+
+def tickers_sp500_compartido() -> list[str]:
+    """``tickers_sp500`` a través de la caché compartida: un solo proceso descarga cada `TTL_SP500`."""
+    return shared_cache().obtener("universo", "sp500", tickers_sp500, ttl=TTL_SP500)
+
+
+def universo() -> list[str]:
+    """S&P 500 local más los activos predefinidos, sin duplicados."""
+    return list(dict.fromkeys(tickers_sp500_local() + list(ACTIVOS_PREDEF.values())))
@@ -0,0 +1,168 @@
+"""
+Superficie de volatilidad implícita por símbolo (SVI por vencimiento).
+
+Cada vencimiento se ajusta con la parametrización SVI "raw" en varianza
+total ``w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2))``, con
+``k = log(K / F)`` y ``F`` el forward implícito por paridad put-call.  Para
+`(m, sigma)` fijos el modelo es lineal en ``(a, b*rho, b)``, así que el
+ajuste recorre una grilla de `(m, sigma)` y resuelve los mínimos cuadrados
+de todos los vencimientos y puntos de grilla en un solo ``np.linalg.solve``
+por lotes.  Entre vencimientos se interpola linealmente en varianza total
+(fuera del rango, volatilidad constante).
+
+``cargar_superficie`` cachea la superficie ajustada por símbolo durante
+``TTL_SUPERFICIE`` segundos; consultar ``VolSurface.iv`` es O(1) por punto
+(una búsqueda entre pocos vencimientos y dos evaluaciones SVI).
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.instrumentation import contar_miss, instrumented
+from utils.market_data import cargar_cadena_opciones
+
+TTL_SUPERFICIE = 300
+_GRILLA_M = np.linspace(-0.4, 0.4, 17)
+_GRILLA_SIGMA = np.geomspace(0.01, 1.0, 12)
+_MIN_PUNTOS = 5
+
+
+class VolSurface:
+    """Parámetros SVI ``(a, b, rho, m, sigma)`` por vencimiento ``T`` (años)."""
+
+    __slots__ = ("T", "forward", "params")
+
+    def __init__(self, T, forward, params):
+        orden = np.argsort(T)
+        self.T = np.asarray(T, dtype=np.float64)[orden]
+        self.forward = np.asarray(forward, dtype=np.float64)[orden]
+        self.params = np.asarray(params, dtype=np.float64).reshape(-1, 5)[orden]
+        if not len(self.T):
+            raise ValueError("La superficie necesita al menos un vencimiento")
+
+    def _forward(self, T: np.ndarray) -> np.ndarray:
+        # Interpolación log-lineal del forward en T
+        return np.exp(np.interp(T, self.T, np.log(self.forward)))
+
+    def _svi(self, i: np.ndarray, k: np.ndarray) -> np.ndarray:
+        a, b, rho, m, sigma = np.moveaxis(self.params[i], -1, 0)
+        return a + b * (rho * (k - m) + np.sqrt((k - m) ** 2 + sigma**2))
+
+    def total_variance(self, strike, T) -> np.ndarray:
+        strike, T = np.broadcast_arrays(np.asarray(strike, dtype=np.float64),
+                                        np.asarray(T, dtype=np.float64))
+        k = np.log(strike / self._forward(T))
+        n = len(self.T)
+        hi = np.clip(np.searchsorted(self.T, T), 1, max(n - 1, 1))
+        lo = hi - 1
+        if n == 1:
+            return self._svi(np.zeros_like(hi), k) * T / self.T[0]
+        w_lo = self._svi(lo, k)
+        w_hi = self._svi(hi, k)
+        theta = (T - self.T[lo]) / (self.T[hi] - self.T[lo])
+        w = w_lo + np.clip(theta, 0, 1) * (w_hi - w_lo)
+        # Fuera del rango de vencimientos: volatilidad implícita constante
+        w = np.where(T < self.T[0], w_lo * T / self.T[0], w)
+        return np.where(T > self.T[-1], w_hi * T / self.T[-1], w)
+
+    def iv(self, strike, T) -> np.ndarray:
+        """Volatilidad implícita para `strike` y `T` (años), con broadcasting."""
+        T = np.asarray(T, dtype=np.float64)
+        w = np.maximum(self.total_variance(strike, T), 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.sqrt(w / T)
+
+
+def fit_svi(k: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """
+    Ajusta SVI a cada fila de `k`/`w` ``(vencimientos, puntos)`` (NaN =
+    punto ausente).  Devuelve ``(vencimientos, 5)`` con ``a, b, rho, m,
+    sigma``; las filas sin un ajuste válido quedan con varianza constante.
+    """
+    k = np.atleast_2d(np.asarray(k, dtype=np.float64))
+    w = np.atleast_2d(np.asarray(w, dtype=np.float64))
+    ok = np.isfinite(k) & np.isfinite(w)
+    k0 = np.where(ok, k, 0.0)
+    w0 = np.where(ok, w, 0.0)
+
+    m, sigma = (g.ravel() for g in np.meshgrid(_GRILLA_M, _GRILLA_SIGMA, indexing="ij"))
+    # Diseño (vencimientos, grilla, puntos, 3): [1, k - m, sqrt((k - m)^2 + sigma^2)]
+    d = k0[:, None, :] - m[None, :, None]
+    X = np.stack([np.ones_like(d), d, np.sqrt(d**2 + sigma[None, :, None] ** 2)], axis=-1)
+    X = X * ok[:, None, :, None]
+    XtX = np.einsum("sgpi,sgpj->sgij", X, X) + 1e-10 * np.eye(3)
+    Xty = np.einsum("sgpi,sp->sgi", X, w0)
+    coef = np.linalg.solve(XtX, Xty[..., None])[..., 0]
+    a, c, b = coef[..., 0], coef[..., 1], coef[..., 2]
+
+    resid = np.einsum("sgpi,sgi->sgp", X, coef) - w0[:, None, :]
+    sse = np.sum((resid * ok[:, None, :]) ** 2, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = np.where(b > 0, c / b, 0.0)
+    # Sin arbitraje de mariposa trivial: b >= 0, |rho| < 1 y varianza mínima >= 0
+    valido = (b >= 0) & (np.abs(rho) < 1) & (a + b * sigma * np.sqrt(np.clip(1 - rho**2, 0, None)) >= 0)
+    sse = np.where(valido, sse, np.inf)
+
+    mejor = np.argmin(sse, axis=1)
+    filas = np.arange(len(k))
+    params = np.column_stack([a[filas, mejor], b[filas, mejor], rho[filas, mejor], m[mejor], sigma[mejor]])
+    sin_ajuste = ~np.isfinite(sse[filas, mejor])
+    if sin_ajuste.any():
+        media = np.nanmean(np.where(ok, w, np.nan), axis=1)
+        params[sin_ajuste] = np.column_stack([
+            media[sin_ajuste], np.zeros((sin_ajuste.sum(), 3)), np.full(sin_ajuste.sum(), 0.1),
+        ])
+    return params
+
+
+def _forward_implicito(v: pd.DataFrame, T: float, r: float) -> float | None:
+    calls = v[v["tipo"] == "CALL"].set_index("strike")["mid"]
+    puts = v[v["tipo"] == "PUT"].set_index("strike")["mid"]
+    comun = calls.index.intersection(puts.index)
+    if not len(comun):
+        return None
+    diff = (calls[comun] - puts[comun]).dropna()
+    if diff.empty:
+        return None
+    K = diff.abs().idxmin()
+    return float(K + np.exp(r * T) * diff[K])
+
+
+def superficie_desde_cadena(cadena: pd.DataFrame, r: float = 0.04) -> VolSurface | None:
+    """
+    Ajusta la superficie con las opciones fuera del dinero de `cadena`
+    (formato ``cargar_cadena_opciones``): puts con ``K < F`` y calls con
+    ``K >= F``.  ``None`` si ningún vencimiento tiene puntos suficientes.
+    """
+    c = cadena[(cadena["bid"] > 0) & cadena["impliedVolatility"].between(0.01, 5.0)]
+    Ts, forwards, ks, ws = [], [], [], []
+    for _, v in c.groupby("expiry"):
+        T = float(v["T"].iloc[0])
+        F = _forward_implicito(v, T, r)
+        if F is None or F <= 0:
+            continue
+        otm = v[((v["tipo"] == "PUT") & (v["strike"] < F)) | ((v["tipo"] == "CALL") & (v["strike"] >= F))]
+        if len(otm) < _MIN_PUNTOS:
+            continue
+        Ts.append(T)
+        forwards.append(F)
+        ks.append(np.log(otm["strike"].to_numpy() / F))
+        ws.append(otm["impliedVolatility"].to_numpy() ** 2 * T)
+    if not Ts:
+        return None
+
+    n = max(len(x) for x in ks)
+    k = np.full((len(ks), n), np.nan)
+    w = np.full((len(ks), n), np.nan)
+    for i, (ki, wi) in enumerate(zip(ks, ws)):
+        k[i, :len(ki)] = ki
+        w[i, :len(wi)] = wi
+    return VolSurface(Ts, forwards, fit_svi(k, w))
+
+
+@instrumented("cargar_superficie", kind="cache")
+@st.cache_data(show_spinner=False, ttl=TTL_SUPERFICIE, max_entries=256)
+def cargar_superficie(ticker: str, r: float = 0.04) -> VolSurface | None:
+    """Superficie de `ticker` ajustada sobre su cadena completa, cacheada."""
+    contar_miss("cargar_superficie")
+    return superficie_desde_cadena(cargar_cadena_opciones(ticker), r)